@@ -0,0 +1,180 @@
+"""
+Adaptive per-symbol polling for the Open Interest Monitor
+Each tick plans a sampling rate for every (symbol, exchange) series between one sample per
+MONITORING_INTERVAL and one per SAMPLER_MIN_INTERVAL: faster for recent volatility, for values
+approaching the spike threshold and during alert episodes. The plan is fitted to each exchange's
+requests-per-minute budget, and a token bucket per exchange enforces it tick by tick.
+"""
+
+import logging
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from config import (MONITORING_INTERVAL, SPIKE_THRESHOLD, SUPPORTED_EXCHANGES, SAMPLER_TICK, SAMPLER_MIN_INTERVAL,
+                    SAMPLER_EPISODE, SAMPLER_BUDGET_RPM)
+from exchange_service import REQUESTS_PER_SAMPLE
+from metrics import SAMPLER_DEFERRED_TOTAL, SAMPLER_PLANNED_RPM, SAMPLER_RATE
+from models import ExchangeOpenInterestData
+
+VOLATILITY_ALPHA = 0.3  # EWMA weight of the newest |% change|
+
+class AdaptiveSampler:
+    """Plans which series to sample each tick"""
+
+    def __init__(self, symbols: List[str], exchanges: List[str] = SUPPORTED_EXCHANGES,
+                 min_interval: float = SAMPLER_MIN_INTERVAL, max_interval: float = MONITORING_INTERVAL,
+                 budgets: Dict[str, int] = SAMPLER_BUDGET_RPM, spike_threshold: float = SPIKE_THRESHOLD,
+                 tick: float = SAMPLER_TICK, clock=time.time):
+        self.exchanges = list(exchanges)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.budgets = np.array([float(budgets.get(exchange, 0)) for exchange in self.exchanges])
+        self.spike_threshold = spike_threshold
+        self.tick = tick
+        self.clock = clock
+        self.index: Dict[tuple, int] = {}
+        self.set_symbols(symbols)
+        # Token buckets hold a few ticks' worth of requests so the first tick can sample everything once
+        self.capacity = np.maximum(self.budgets * max(tick, 60.0) / 60.0, REQUESTS_PER_SAMPLE)
+        self.tokens = self.capacity.copy()
+        self.refilled_at = clock()
+        self._over_budget_warned = set()
+
+    def set_symbols(self, symbols: List[str]):
+        """Rebuild the per-series arrays for a new symbol list, keeping the state of series that stay"""
+        keys = [(symbol, exchange) for exchange in self.exchanges for symbol in symbols]
+        kept = [(new, self.index[key]) for new, key in enumerate(keys) if key in self.index]
+        new_positions = np.array([new for new, _ in kept], dtype=int)
+        old_positions = np.array([old for _, old in kept], dtype=int)
+        count = len(keys)
+        arrays = {
+            'volatility': np.zeros(count),  # EWMA of |% change| scaled to one MONITORING_INTERVAL
+            'proximity': np.zeros(count),  # |% from the historical average| at the last sample
+            'episode_until': np.zeros(count),  # Alert episode end (epoch seconds)
+            'last_value': np.full(count, np.nan),
+            'last_time': np.full(count, np.nan),  # NaN: never sampled, due immediately
+            'rates': np.full(count, 60.0 / self.max_interval),  # Planned samples per minute
+        }
+        for name, array in arrays.items():
+            if kept:
+                array[new_positions] = getattr(self, name)[old_positions]
+            setattr(self, name, array)
+        for symbol, exchange in set(self.index) - set(keys):
+            SAMPLER_RATE.remove(symbol=symbol, exchange=exchange)
+        self.keys = keys
+        self.index = {key: position for position, key in enumerate(keys)}
+        self.exchange_of = np.array([self.exchanges.index(exchange) for _, exchange in keys], dtype=int)
+
+    def plan(self, now: float) -> np.ndarray:
+        """Planned samples per minute for every series, fitted to the exchange budgets"""
+        urgency = np.maximum(self.volatility, self.proximity) / self.spike_threshold
+        urgency = np.where(self.episode_until > now, 1.0, np.clip(urgency, 0.0, 1.0))
+        # Log interpolation: quiet series stay at max_interval, urgent ones approach min_interval
+        intervals = self.max_interval * (self.min_interval / self.max_interval) ** urgency
+        rates = 60.0 / intervals
+        baseline = 60.0 / self.max_interval
+        for position, exchange in enumerate(self.exchanges):
+            mask = self.exchange_of == position
+            series = int(mask.sum())
+            if not series:
+                continue
+            budget = self.budgets[position]
+            demand = rates[mask].sum() * REQUESTS_PER_SAMPLE
+            if demand <= budget:
+                continue
+            baseline_cost = series * baseline * REQUESTS_PER_SAMPLE
+            if baseline_cost >= budget:
+                # Not even one sample per interval fits: slow everything down evenly
+                rates[mask] = budget / (series * REQUESTS_PER_SAMPLE)
+                if exchange not in self._over_budget_warned:
+                    self._over_budget_warned.add(exchange)
+                    logging.warning(f"{exchange}: {series} series need {baseline_cost:.0f} requests/min at the base "
+                                    f"interval, over the {budget:.0f}/min budget; sampling below the base rate")
+            else:
+                # Everyone keeps the base rate; the extra rate is scaled to the remaining budget
+                extra = rates[mask] - baseline
+                rates[mask] = baseline + extra * (budget - baseline_cost) / (extra.sum() * REQUESTS_PER_SAMPLE)
+        return rates
+
+    def due(self, now: Optional[float] = None) -> Dict[str, List[str]]:
+        """Symbols to sample this tick per exchange, most overdue first, within the token buckets"""
+        now = self.clock() if now is None else now
+        self.rates = self.plan(now)
+        self.tokens = np.minimum(self.capacity, self.tokens + self.budgets * (now - self.refilled_at) / 60.0)
+        self.refilled_at = now
+
+        next_due = np.where(np.isnan(self.last_time), -np.inf, self.last_time + 60.0 / self.rates)
+        # Half a tick early rather than a tick late
+        overdue = now + self.tick / 2 - next_due
+        selected: Dict[str, List[str]] = {}
+        for position, exchange in enumerate(self.exchanges):
+            candidates = np.flatnonzero((self.exchange_of == position) & (overdue >= 0))
+            affordable = int(self.tokens[position] // REQUESTS_PER_SAMPLE)
+            if len(candidates) > affordable:
+                candidates = candidates[np.argsort(-overdue[candidates], kind='stable')][:affordable]
+                SAMPLER_DEFERRED_TOTAL.inc(int((overdue[self.exchange_of == position] >= 0).sum()) - affordable,
+                                           exchange=exchange)
+            self.tokens[position] -= len(candidates) * REQUESTS_PER_SAMPLE
+            selected[exchange] = [self.keys[i][0] for i in candidates]
+            SAMPLER_PLANNED_RPM.set(float(self.rates[self.exchange_of == position].sum() * REQUESTS_PER_SAMPLE),
+                                    exchange=exchange)
+        for (symbol, exchange), rate in zip(self.keys, self.rates):
+            SAMPLER_RATE.set(float(rate), symbol=symbol, exchange=exchange)
+        return selected
+
+    def observe(self, exchange_data: Dict[str, ExchangeOpenInterestData], averages: Dict[str, float],
+                now: Optional[float] = None):
+        """Update volatility and threshold proximity from the samples just fetched"""
+        now = self.clock() if now is None else now
+        for batch in exchange_data.values():
+            for record in batch.data:
+                position = self.index.get((record.symbol, record.exchange))
+                if position is None:
+                    continue
+                value = record.open_interest_value
+                previous, previous_time = self.last_value[position], self.last_time[position]
+                if previous > 0 and now > previous_time:
+                    change = abs(value - previous) / previous * 100
+                    # Random-walk scaling so fast and slow samples are comparable
+                    change *= np.sqrt(self.max_interval / (now - previous_time))
+                    self.volatility[position] += VOLATILITY_ALPHA * (change - self.volatility[position])
+                average = averages.get(record.symbol, 0.0)
+                self.proximity[position] = abs(value - average) / average * 100 if average > 0 else 0.0
+                self.last_value[position] = value
+                self.last_time[position] = now
+
+    def note_alert(self, symbol: str, exchange: str, now: Optional[float] = None):
+        """Start (or extend) an alert episode: sample the series at the fastest rate for SAMPLER_EPISODE"""
+        position = self.index.get((symbol, exchange))
+        if position is not None:
+            self.episode_until[position] = (self.clock() if now is None else now) + SAMPLER_EPISODE
+
+class AdaptiveAggregator:
+    """Drop-in for OpenInterestAggregator that only fetches the series the sampler says are due"""
+
+    def __init__(self, aggregator, sampler: AdaptiveSampler, monitor):
+        self.aggregator = aggregator
+        self.sampler = sampler
+        self.monitor = monitor
+
+    def get_all_exchange_data(self) -> Dict[str, ExchangeOpenInterestData]:
+        due = self.sampler.due()
+        exchange_data = self.aggregator.get_symbols_data(due)
+        self.sampler.observe(exchange_data, self.monitor.historical_averages)
+        return exchange_data
+
+    def stream_exchange_data(self, on_record) -> Dict[str, ExchangeOpenInterestData]:
+        """Streaming variant of get_all_exchange_data (see OpenInterestAggregator.stream_exchange_data)"""
+        due = self.sampler.due()
+        exchange_data = self.aggregator.stream_exchange_data(on_record, due)
+        self.sampler.observe(exchange_data, self.monitor.historical_averages)
+        return exchange_data
+
+    def set_token_list(self, token_list: List[str]):
+        self.aggregator.set_token_list(token_list)
+        self.sampler.set_symbols(token_list)
+
+    def get_history(self, symbols: List[str], limit: int) -> Dict[str, ExchangeOpenInterestData]:
+        return self.aggregator.get_history(symbols, limit)
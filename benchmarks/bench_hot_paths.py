@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Monitor hot-path benchmarks
+Times the monitor's per-cycle and storage paths over a synthetic history, writes
+machine-readable results and compares them with a baseline file, exiting non-zero when a
+benchmark regressed beyond the threshold
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import itertools
+import logging
+import math
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic_data import SyntheticAggregator, synthetic_history, synthetic_symbols, write_history_json
+from monitor import OpenInterestMonitor
+
+BENCHMARKS = [
+    'load_historical_data',
+    'save_historical_data',
+    'process_exchange_data',
+    'calculate_historical_averages',
+    'get_latest_15min_averages',
+    'export_15min_averages_to_csv',
+]
+DEFAULT_THRESHOLD = 0.20  # Best-of-N slowdown (20%) that counts as a regression; the minimum is least affected by noise
+MIN_RUN_TIME = 0.2  # Seconds each timed run of a fast benchmark is stretched to
+
+def time_runs(func: Callable, repeat: int, setup: Optional[Callable] = None, min_time: float = MIN_RUN_TIME) -> List[float]:
+    """Return `repeat` per-call timings of func.
+
+    Fast functions are called in a loop sized so each run lasts at least min_time, which keeps
+    sub-millisecond paths out of timer noise. Functions with a per-call setup run once per sample.
+    """
+    number = 1
+    if setup is None:
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        number = max(1, math.ceil(min_time / elapsed)) if elapsed > 0 else 1000
+    runs = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        runs.append((time.perf_counter() - started) / number)
+    return runs
+
+def run_benchmarks(symbols: int, days: float, resolution: int, repeat: int, selected: List[str]) -> Dict:
+    """Generate the synthetic history, run the selected benchmarks and return the results document"""
+    work_dir = tempfile.mkdtemp(prefix="oi-bench-hot-")
+    names = synthetic_symbols(symbols)
+    data_file = os.path.join(work_dir, "open_interest_data.json")
+    csv_file = os.path.join(work_dir, "open_interest_15min_averages.csv")
+    results = {}
+    try:
+        end = datetime.now()
+        history = synthetic_history(names, days, resolution, end)
+        records = sum(len(series) for series in history.values())
+        write_history_json(data_file, names, days, resolution, end)
+
+        monitor = OpenInterestMonitor(token_list=names, data_file=data_file, csv_file=csv_file, load_history=False)
+        monitor.historical_data.update(history)
+
+        # Steady-state cycle input: the monitor keeps the last 10 samples per symbol between cycles
+        cycle_monitor = OpenInterestMonitor(token_list=names, load_history=False)
+        aggregator = SyntheticAggregator(names, exchanges=("binance",))
+        snapshots = [aggregator.get_all_exchange_data()['binance'] for _ in range(20)]
+        for snapshot in snapshots[:10]:
+            cycle_monitor.process_exchange_data(snapshot)
+        cycle_monitor.calculate_historical_averages()
+        pending = itertools.cycle(snapshots)
+
+        loader = OpenInterestMonitor(token_list=names, data_file=data_file, load_history=False)
+
+        def export():
+            with contextlib.redirect_stdout(io.StringIO()):
+                monitor.export_15min_averages_to_csv()
+
+        cases = {
+            'load_historical_data': (loader.load_historical_data, loader.historical_data.clear, records),
+            'save_historical_data': (monitor.save_historical_data, None, records),
+            'process_exchange_data': (lambda: cycle_monitor.process_exchange_data(next(pending)), None, symbols),
+            'calculate_historical_averages': (monitor.calculate_historical_averages, None, records),
+            'get_latest_15min_averages': (monitor.get_latest_15min_averages, None, records),
+            'export_15min_averages_to_csv': (export, lambda: os.path.exists(csv_file) and os.remove(csv_file), records),
+        }
+        for name in selected:
+            func, setup, items = cases[name]
+            runs = time_runs(func, repeat, setup)
+            median = statistics.median(runs)
+            results[name] = {
+                'median': median,
+                'min': min(runs),
+                'mean': statistics.fmean(runs),
+                'runs': runs,
+                'items': items,
+                'items_per_second': items / median if median else 0.0,
+            }
+            print(f"  {name:<32} median {median * 1000:10.3f} ms  min {min(runs) * 1000:10.3f} ms  "
+                  f"{results[name]['items_per_second']:>14,.0f} items/s")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        'benchmark': 'hot_paths',
+        'created_at': datetime.now().isoformat(),
+        'params': {'symbols': symbols, 'days': days, 'resolution': resolution, 'records': records},
+        'repeat': repeat,
+        'environment': environment_info(),
+        'results': results,
+    }
+
+def environment_info() -> Dict:
+    """Describe where the results were produced"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'commit': commit,
+    }
+
+def compare_with_baseline(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Print a comparison table and return the names of benchmarks that regressed"""
+    if current['params'] != baseline.get('params'):
+        print(f"⚠️  Baseline parameters differ: {baseline.get('params')} vs {current['params']}")
+    regressions = []
+    print(f"\n{'benchmark (best of N)':<32} {'baseline ms':>12} {'current ms':>12} {'change':>9}")
+    for name, result in current['results'].items():
+        base = baseline.get('results', {}).get(name)
+        if not base:
+            print(f"{name:<32} {'-':>12} {result['min'] * 1000:>12.3f} {'new':>9}")
+            continue
+        change = result['min'] / base['min'] - 1 if base['min'] else 0.0
+        marker = ""
+        if change > threshold:
+            regressions.append(name)
+            marker = " ❌"
+        elif change < -threshold:
+            marker = " 🚀"
+        print(f"{name:<32} {base['min'] * 1000:>12.3f} {result['min'] * 1000:>12.3f} {change:>+9.1%}{marker}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Monitor hot-path benchmarks')
+    parser.add_argument('--symbols', type=int, default=200, help='Number of synthetic symbols')
+    parser.add_argument('--days', type=float, default=1, help='Days of history per symbol')
+    parser.add_argument('--resolution', type=int, default=60, help='Seconds between history samples')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per benchmark')
+    parser.add_argument('--only', nargs='+', choices=BENCHMARKS, help='Run only these benchmarks')
+    parser.add_argument('--json', type=str, help='Write machine-readable results to this file')
+    parser.add_argument('--baseline', type=str, help='Compare against this results file')
+    parser.add_argument('--save-baseline', type=str, help='Also write the results as a new baseline file')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Best-of-N slowdown fraction that fails the comparison')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    records = int(args.days * 86400 // args.resolution) * args.symbols
+    print(f"🏁 Hot-path benchmarks: {args.symbols} symbols x {args.days:g} days @ {args.resolution}s "
+          f"({records:,} records), {args.repeat} runs each")
+    current = run_benchmarks(args.symbols, args.days, args.resolution, args.repeat, args.only or BENCHMARKS)
+
+    for path in (args.json, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(current, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(current, baseline, args.threshold)
+        if regressions:
+            print(f"❌ Regressions over {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print(f"✅ No regressions over {args.threshold:.0%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Sharded worker pool throughput benchmark
+Runs monitoring cycles over a synthetic symbol universe with 1..N shard workers and reports
+symbols processed per second, speedup and parallel efficiency
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic_data import SyntheticAggregator, synthetic_symbols
+from sharded_pool import ShardedMonitorPool
+
+def run_pool(symbols, workers: int, cycles: int, warmup: int) -> dict:
+    """Time `cycles` sharded cycles after `warmup` cycles have filled each series' history"""
+    shard_dir = tempfile.mkdtemp(prefix="oi-bench-shards-")
+    pool = ShardedMonitorPool(symbols, workers, shard_dir=shard_dir, seed_file=None,
+                              aggregator_factory=SyntheticAggregator)
+    try:
+        pool.start()
+        for _ in range(warmup):
+            pool.collect_cycle()
+        started = time.perf_counter()
+        for _ in range(cycles):
+            result = pool.collect_cycle()
+            if not result.success:
+                raise RuntimeError(result.error)
+        elapsed = time.perf_counter() - started
+    finally:
+        pool.stop()
+        shutil.rmtree(shard_dir, ignore_errors=True)
+    return {
+        'workers': workers,
+        'cycles': cycles,
+        'seconds_per_cycle': elapsed / cycles,
+        'symbols_per_second': len(symbols) * cycles / elapsed,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Sharded worker pool throughput benchmark')
+    parser.add_argument('--symbols', type=int, default=2000, help='Size of the synthetic symbol universe')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help='Worker counts to compare')
+    parser.add_argument('--cycles', type=int, default=5, help='Timed cycles per worker count')
+    parser.add_argument('--warmup', type=int, default=10, help='Untimed cycles to fill history first')
+    parser.add_argument('--json', type=str, help='Write machine-readable results to this file')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    symbols = synthetic_symbols(args.symbols)
+    results = [run_pool(symbols, workers, args.cycles, args.warmup) for workers in args.workers]
+
+    base = results[0]['symbols_per_second'] / results[0]['workers']
+    print(f"{'workers':>8} {'s/cycle':>10} {'symbols/s':>12} {'speedup':>8} {'efficiency':>10}")
+    for result in results:
+        speedup = result['symbols_per_second'] / results[0]['symbols_per_second']
+        result['speedup'] = speedup
+        result['efficiency'] = result['symbols_per_second'] / (base * result['workers'])
+        print(f"{result['workers']:>8} {result['seconds_per_cycle']:>10.3f} {result['symbols_per_second']:>12.0f} "
+              f"{speedup:>8.2f} {result['efficiency']:>10.0%}")
+    print(f"CPU cores available: {os.cpu_count()}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'benchmark': 'sharded_pool', 'symbols': args.symbols, 'results': results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Monitor cold-start benchmark
+Measures, in fresh interpreters, the time from process start to a ready OpenInterestMonitor
+(import plus state restore), loading from the JSON history and from the binary checkpoint,
+and checks the checkpoint path against a target
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(REPO_DIR)
+
+from synthetic_data import synthetic_symbols, write_history_json
+
+DEFAULT_TARGET_MS = 300.0  # Import + checkpoint restore budget for the default universe
+
+CHILD_SCRIPT = """
+import json, os, sys, time
+started = time.perf_counter()
+sys.path.insert(0, {repo!r})
+import monitor
+imported = time.perf_counter()
+instance = monitor.OpenInterestMonitor(data_file={data_file!r}, csv_file={csv_file!r})
+ready = time.perf_counter()
+print(json.dumps({{'import': imported - started, 'restore': ready - imported, 'total': ready - started,
+                  'series': len(instance.historical_data), 'modules': len(sys.modules),
+                  'pandas_loaded': 'pandas' in sys.modules}}))
+"""
+
+def measure(work_dir: str, data_file: str, repeat: int) -> dict:
+    """Start `repeat` fresh interpreters and return median phase timings in milliseconds"""
+    script = CHILD_SCRIPT.format(repo=REPO_DIR, data_file=data_file, csv_file=os.path.join(work_dir, "averages.csv"))
+    samples = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", script], cwd=work_dir, capture_output=True, text=True, check=True)
+        samples.append(json.loads(output.stdout.strip().splitlines()[-1]))
+    result = {phase: statistics.median(s[phase] for s in samples) * 1000 for phase in ('import', 'restore', 'total')}
+    result['series'] = samples[0]['series']
+    result['pandas_loaded'] = samples[0]['pandas_loaded']
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description='Monitor cold-start benchmark')
+    parser.add_argument('--symbols', type=int, default=2000, help='Number of synthetic symbols in the history')
+    parser.add_argument('--samples', type=int, default=10, help='Stored samples per symbol (the live monitor keeps 10)')
+    parser.add_argument('--repeat', type=int, default=5, help='Fresh interpreters per scenario')
+    parser.add_argument('--target-ms', type=float, default=DEFAULT_TARGET_MS, help='Checkpoint cold-start target')
+    parser.add_argument('--json', type=str, help='Write machine-readable results to this file')
+    args = parser.parse_args()
+
+    from monitor import OpenInterestMonitor
+    logging.getLogger().setLevel(logging.WARNING)
+
+    work_dir = tempfile.mkdtemp(prefix="oi-bench-startup-")
+    try:
+        data_file = os.path.join(work_dir, "open_interest_data.json")
+        write_history_json(data_file, synthetic_symbols(args.symbols), 1, resolution=86400 // args.samples)
+        # Produce a checkpoint the way a live cycle does: load, then save history and checkpoint
+        monitor = OpenInterestMonitor(data_file=data_file, csv_file=os.path.join(work_dir, "averages.csv"))
+        monitor.save_historical_data()
+        monitor.save_checkpoint()
+
+        print(f"🏁 Cold start: {args.symbols} symbols x {args.samples} samples, {args.repeat} fresh interpreters each")
+        scenarios = {}
+        scenarios['checkpoint'] = measure(work_dir, data_file, args.repeat)
+        os.remove(monitor.checkpoint_file)
+        scenarios['json'] = measure(work_dir, data_file, args.repeat)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"{'scenario':<12} {'import ms':>10} {'restore ms':>11} {'total ms':>10}")
+    for name, result in scenarios.items():
+        print(f"{name:<12} {result['import']:>10.1f} {result['restore']:>11.1f} {result['total']:>10.1f}")
+    total = scenarios['checkpoint']['total']
+    passed = total <= args.target_ms
+    print(f"{'✅' if passed else '❌'} Checkpoint cold start {total:.1f} ms (target {args.target_ms:.0f} ms)")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'benchmark': 'startup', 'created_at': datetime.now().isoformat(), 'symbols': args.symbols,
+                       'samples': args.samples, 'target_ms': args.target_ms, 'passed': passed,
+                       'results': scenarios}, f, indent=2)
+    sys.exit(0 if passed else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Synthetic open interest data for benchmarks
+Deterministic random-walk series that stand in for exchange responses and stored history,
+so benchmarks exercise the monitor's hot paths without network access
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Make the repository modules importable when run as benchmarks/<script>.py
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import OpenInterestData, ExchangeOpenInterestData
+
+def synthetic_symbols(count: int) -> List[str]:
+    """Return `count` distinct USDT perpetual-style symbol names"""
+    return [f"SYN{i:05d}USDT" for i in range(count)]
+
+class SyntheticAggregator:
+    """Drop-in replacement for OpenInterestAggregator returning random-walk samples"""
+
+    def __init__(self, token_list: List[str], exchanges=("binance", "bybit"), seed: Optional[int] = 42,
+                 volatility: float = 0.01):
+        self.token_list = list(token_list)
+        self.exchanges = exchanges
+        self.volatility = volatility
+        self.random = random.Random(seed)
+        self.levels = {symbol: 1_000_000 * (1 + self.random.random()) for symbol in self.token_list}
+
+    def get_all_exchange_data(self) -> Dict[str, ExchangeOpenInterestData]:
+        """Advance every series one step and return it as per-exchange results"""
+        now = datetime.now()
+        for symbol in self.token_list:
+            self.levels[symbol] *= 1 + self.random.gauss(0, self.volatility)
+        results = {}
+        for exchange in self.exchanges:
+            data = [
+                OpenInterestData(
+                    symbol=symbol,
+                    exchange=exchange,
+                    open_interest=level / 2.0,
+                    open_interest_value=level,
+                    timestamp=now,
+                    price=2.0,
+                    volume_24h=level * 5,
+                    funding_rate=0.0001
+                )
+                for symbol, level in self.levels.items()
+            ]
+            results[exchange] = ExchangeOpenInterestData(exchange=exchange, data=data, timestamp=now, success=True)
+        return results
+
+def synthetic_series(symbol: str, days: float, resolution: int = 60, end: Optional[datetime] = None,
+                     seed: int = 42, volatility: float = 0.002, exchange: str = "binance") -> Iterator[OpenInterestData]:
+    """Yield one symbol's history oldest first: `days` of samples every `resolution` seconds up to `end`"""
+    rng = random.Random(f"{seed}-{symbol}")
+    end = (end or datetime.now()).replace(microsecond=0)
+    count = int(days * 86400 // resolution)
+    level = 1_000_000 * (1 + rng.random())
+    step = timedelta(seconds=resolution)
+    timestamp = end - step * (count - 1)
+    for _ in range(count):
+        level *= 1 + rng.gauss(0, volatility)
+        yield OpenInterestData(
+            symbol=symbol,
+            exchange=exchange,
+            open_interest=level / 2.0,
+            open_interest_value=level,
+            timestamp=timestamp,
+            price=2.0,
+            volume_24h=level * 5,
+            funding_rate=0.0001
+        )
+        timestamp += step
+
+def synthetic_history(symbols: List[str], days: float, resolution: int = 60, end: Optional[datetime] = None,
+                      seed: int = 42) -> Dict[str, List[OpenInterestData]]:
+    """Build an in-memory history store (symbol -> records) like OpenInterestMonitor.historical_data"""
+    end = end or datetime.now()
+    return {symbol: list(synthetic_series(symbol, days, resolution, end, seed)) for symbol in symbols}
+
+def write_history_json(path: str, symbols: List[str], days: float, resolution: int = 60,
+                       end: Optional[datetime] = None, seed: int = 42) -> Tuple[int, int]:
+    """Stream a history file in the monitor's open_interest_data.json format without holding it in memory.
+
+    Returns (records written, file size in bytes). Suitable for very large universes
+    (e.g. 5,000 symbols x 1 year at 1-minute resolution, roughly 2.6 billion records).
+    """
+    end = end or datetime.now()
+    records = 0
+    with open(path, 'w') as f:
+        f.write("{")
+        for index, symbol in enumerate(symbols):
+            f.write(("," if index else "") + f"\n{json.dumps(symbol)}: [")
+            for position, record in enumerate(synthetic_series(symbol, days, resolution, end, seed)):
+                f.write(("," if position else "") + json.dumps({
+                    'symbol': record.symbol,
+                    'exchange': record.exchange,
+                    'open_interest': record.open_interest,
+                    'open_interest_value': record.open_interest_value,
+                    'timestamp': record.timestamp.isoformat(),
+                    'price': record.price,
+                    'volume_24h': record.volume_24h,
+                    'funding_rate': record.funding_rate
+                }))
+                records += 1
+            f.write("]")
+        f.write("\n}\n")
+    return records, os.path.getsize(path)
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic open interest history file')
+    parser.add_argument('--symbols', type=int, default=5000, help='Number of synthetic symbols')
+    parser.add_argument('--days', type=float, default=365, help='Days of history per symbol')
+    parser.add_argument('--resolution', type=int, default=60, help='Seconds between samples')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed')
+    parser.add_argument('--output', default='synthetic_open_interest_data.json', help='Output history file')
+    args = parser.parse_args()
+
+    total = int(args.days * 86400 // args.resolution) * args.symbols
+    print(f"📝 Writing {total:,} records ({args.symbols} symbols x {args.days:g} days @ {args.resolution}s) to {args.output}")
+    started = time.perf_counter()
+    records, size = write_history_json(args.output, synthetic_symbols(args.symbols), args.days, args.resolution, seed=args.seed)
+    print(f"✅ Wrote {records:,} records, {size / 1024 / 1024:,.1f} MiB in {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""
+Telegram command bot for the Open Interest Monitor
+Long-polls getUpdates on the monitor's event loop and answers from its in-memory state (latest
+samples, derived metrics, baselines, recent alerts), with no file reads or exchange calls:
+
+    /oi SYMBOL             latest OI, price, funding and quadrant per exchange, vs. the baseline
+    /top [15m|1h]          biggest OI gainers and losers over the lookback (BOT_TOP_WINDOWS)
+    /status                cycles, series, recent alerts, market regime and mutes
+    /mute SYMBOL [1h]      stop sending a symbol's alerts for a while (default 1h, at most BOT_MAX_MUTE)
+    /unmute SYMBOL
+    /help
+
+Polling and replies share one keep-alive session, so a reply goes out over an open connection
+as soon as the long poll returns the command. Handlers only read memory and run between the
+cycle's awaits; the poll and the replies wait on the network in the bot's own task, never in a
+cycle. Only TELEGRAM_CHAT_ID and BOT_ALLOWED_CHATS are answered.
+"""
+
+import asyncio
+import logging
+import math
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from config import (TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, BOT_ALLOWED_CHATS, BOT_POLL_TIMEOUT, BOT_RETRY,
+                    BOT_STALE_AFTER, BOT_TOP_WINDOWS, BOT_TOP_K, BOT_MAX_MUTE)
+from history_store import parse_interval
+from metrics import BOT_COMMANDS_TOTAL, BOT_REPLY_SECONDS
+from models import OpenInterestData
+
+REPLY_TIMEOUT = 10  # Seconds for a sendMessage request
+DEFAULT_MUTE = 3600
+
+def format_usd(value: Optional[float]) -> str:
+    if value is None:
+        return "n/a"
+    for divisor, suffix in ((1e9, "B"), (1e6, "M"), (1e3, "K")):
+        if abs(value) >= divisor:
+            return f"${value / divisor:.2f}{suffix}"
+    return f"${value:.2f}"
+
+def format_age(seconds: float) -> str:
+    seconds = int(max(0, seconds))
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m"
+    return f"{seconds // 3600}h {seconds // 60 % 60}m"
+
+def window_change(records: List[OpenInterestData], exchange: str, lookback: float) -> Optional[Tuple[float, float]]:
+    """(% OI value change, latest OI value) of one series over the lookback, from the sample nearest to
+    latest - lookback (within half the lookback); None if the history does not reach back that far"""
+    series = [record for record in records if record.exchange == exchange]
+    if len(series) < 2:
+        return None
+    latest = series[-1]
+    target = latest.timestamp.timestamp() - lookback
+    reference = min(series[:-1], key=lambda record: abs(record.timestamp.timestamp() - target))
+    if abs(reference.timestamp.timestamp() - target) > lookback / 2 or not reference.open_interest_value:
+        return None
+    change = (latest.open_interest_value - reference.open_interest_value) / reference.open_interest_value * 100
+    return change, latest.open_interest_value
+
+class CommandBot:
+    """Answers Telegram commands from a monitor's in-memory state"""
+
+    def __init__(self, monitor, token: Optional[str] = TELEGRAM_BOT_TOKEN, poll_timeout: int = BOT_POLL_TIMEOUT):
+        self.monitor = monitor
+        self.token = token
+        self.poll_timeout = poll_timeout
+        self.allowed_chats = {str(chat) for chat in [TELEGRAM_CHAT_ID, *BOT_ALLOWED_CHATS] if chat}
+        self.offset: Optional[int] = None  # update_id after the last one handled
+        self.session = None
+        self.task: Optional[asyncio.Task] = None
+        self.started = time.time()
+        self.commands = {
+            'oi': self.command_oi,
+            'top': self.command_top,
+            'status': self.command_status,
+            'mute': self.command_mute,
+            'unmute': self.command_unmute,
+            'help': self.command_help,
+            'start': self.command_help,
+        }
+        self._refused_chats = set()
+
+    async def start(self):
+        if not self.token:
+            logging.warning("TELEGRAM_BOT_TOKEN not configured; command bot not started")
+            return
+        import aiohttp  # Deferred: only needed once the bot runs
+        self.session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=4, keepalive_timeout=BOT_POLL_TIMEOUT * 2))
+        self.task = asyncio.create_task(self.run(), name='command_bot')
+        logging.info(f"Command bot polling for {', '.join(f'/{name}' for name in self.commands)}")
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def api(self, method: str, payload: Dict, timeout: float) -> Dict:
+        import aiohttp  # Deferred: only needed once the bot runs
+        url = f"https://api.telegram.org/bot{self.token}/{method}"
+        async with self.session.post(url, json=payload, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            result = await response.json()
+            if response.status != 200 or not result.get('ok'):
+                raise RuntimeError(f"{method} failed ({response.status}): {result.get('description', result)}")
+            return result
+
+    async def run(self):
+        """Long-poll for commands until cancelled"""
+        while True:
+            try:
+                payload = {'timeout': self.poll_timeout, 'allowed_updates': ['message']}
+                if self.offset is not None:
+                    payload['offset'] = self.offset
+                result = await self.api('getUpdates', payload, self.poll_timeout + REPLY_TIMEOUT)
+                received = time.perf_counter()
+                for update in result['result']:
+                    self.offset = update['update_id'] + 1
+                    await self.handle(update, received)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # 409 Conflict: another process polls this bot token (or a webhook is set)
+                logging.error(f"Command bot polling error: {e}")
+                await asyncio.sleep(BOT_RETRY)
+
+    async def handle(self, update: Dict, received: float):
+        message = update.get('message') or {}
+        text = (message.get('text') or '').strip()
+        if not text.startswith('/'):
+            return
+        chat_id = str(message['chat']['id'])
+        if chat_id not in self.allowed_chats:
+            if chat_id not in self._refused_chats:
+                self._refused_chats.add(chat_id)
+                logging.warning(f"Command bot ignoring chat {chat_id} (neither TELEGRAM_CHAT_ID nor in BOT_ALLOWED_CHATS)")
+            return
+        if time.time() - message.get('date', 0) > BOT_STALE_AFTER:
+            return
+        name, *args = text.split()
+        name = name[1:].split('@')[0].lower()  # "/oi@SomeBot" in groups
+        command = self.commands.get(name)
+        if command is None:
+            BOT_COMMANDS_TOTAL.inc(command='unknown', status='ignored')
+            return
+        try:
+            reply = command(args)
+            status = 'ok'
+        except Exception as e:
+            logging.error(f"Command bot error handling {text!r}: {e}")
+            reply = f"❌ Error handling /{name}"
+            status = 'error'
+        payload = {'chat_id': chat_id, 'text': reply, 'parse_mode': 'HTML',
+                   'reply_to_message_id': message['message_id']}
+        if message.get('message_thread_id'):
+            payload['message_thread_id'] = message['message_thread_id']
+        try:
+            await self.api('sendMessage', payload, REPLY_TIMEOUT)
+            BOT_REPLY_SECONDS.observe(time.perf_counter() - received)
+        except Exception as e:
+            logging.error(f"Command bot reply to /{name} failed: {e}")
+            status = 'error'
+        BOT_COMMANDS_TOTAL.inc(command=name, status=status)
+
+    def symbol_arg(self, args: List[str]) -> Optional[str]:
+        """MILK, milk or MILKUSDT -> the monitored symbol, if any"""
+        if not args:
+            return None
+        name = args[0].upper()
+        for symbol in (name, f"{name}USDT"):
+            if self.monitor.historical_data.get(symbol):
+                return symbol
+        return None
+
+    def command_oi(self, args: List[str]) -> str:
+        symbol = self.symbol_arg(args)
+        if symbol is None:
+            return "Usage: /oi SYMBOL (a monitored symbol, e.g. /oi BTC)" if not args else f"❓ {args[0].upper()} is not monitored"
+        records = self.monitor.historical_data[symbol]
+        latest: Dict[str, OpenInterestData] = {}
+        for record in records:
+            latest[record.exchange] = record
+        message = f"📊 <b>{symbol}</b>\n\n"
+        total = 0.0
+        for exchange, record in sorted(latest.items()):
+            total += record.open_interest_value or 0
+            message += f"<b>{exchange.upper()}</b>: {format_usd(record.open_interest_value)} OI"
+            derived = self.monitor.derived.get(symbol, exchange)
+            if derived is not None and not math.isnan(derived.oi_change):
+                message += f" ({derived.oi_change:+.2f}%)"
+            message += f"\n  💵 Price ${record.price or 0:.4f}"
+            if record.funding_rate is not None:
+                message += f", funding {record.funding_rate:.4f}%"
+            if derived is not None:
+                message += f", {derived.quadrant.replace('_', ' ')}"
+            message += "\n"
+        baseline = self.monitor.historical_averages.get(symbol)
+        if baseline:
+            message += f"\n📏 Baseline: {format_usd(baseline)} ({(total / len(latest) - baseline) / baseline * 100:+.1f}%)\n"
+        window = self.monitor.last_15min_avg_per_symbol.get(symbol)
+        if window:
+            message += f"🕒 Last 15-min avg: {format_usd(window[1])}\n"
+        newest = max(record.timestamp for record in latest.values())
+        message += f"⏰ Updated {newest:%H:%M:%S} ({format_age(time.time() - newest.timestamp())} ago)"
+        if self.monitor.is_muted(symbol):
+            message += f"\n🔇 Alerts muted until {datetime.fromtimestamp(self.monitor.muted[symbol]):%H:%M}"
+        return message
+
+    def command_top(self, args: List[str]) -> str:
+        window = args[0].lower() if args else next(iter(BOT_TOP_WINDOWS))
+        if window not in BOT_TOP_WINDOWS:
+            return f"Usage: /top [{'|'.join(BOT_TOP_WINDOWS)}]"
+        lookback = BOT_TOP_WINDOWS[window]
+        changes = []
+        for symbol, records in self.monitor.historical_data.items():
+            for exchange in {record.exchange for record in records}:
+                change = window_change(records, exchange, lookback)
+                if change is not None:
+                    changes.append((change[0], symbol, exchange, change[1]))
+        if not changes:
+            return f"⏳ Not enough history in memory for {window} changes yet"
+        changes.sort()
+        message = f"🏆 <b>OI movers over {window}</b> ({len(changes)} series)\n"
+        for title, entries in (("📈 Gainers", [entry for entry in reversed(changes) if entry[0] > 0][:BOT_TOP_K]),
+                               ("📉 Losers", [entry for entry in changes if entry[0] < 0][:BOT_TOP_K])):
+            if entries:
+                message += f"\n<b>{title}</b>\n"
+                for rank, (change, symbol, exchange, value) in enumerate(entries, 1):
+                    message += f"  {rank}. {symbol} ({exchange}): {change:+.1f}% → {format_usd(value)}\n"
+        return message
+
+    def command_status(self, args: List[str]) -> str:
+        monitor = self.monitor
+        series = sum(len({record.exchange for record in records}) for records in monitor.historical_data.values())
+        newest = max((records[-1].timestamp for records in monitor.historical_data.values() if records), default=None)
+        hour_ago = datetime.now().timestamp() - 3600
+        recent = sum(1 for alert in monitor.recent_alerts
+                     if isinstance(alert['timestamp'], datetime) and alert['timestamp'].timestamp() >= hour_ago)
+        message = "🟢 <b>Open Interest Monitor</b>\n\n"
+        message += f"🔄 Cycles: {monitor.data_version}"
+        if newest is not None:
+            message += f" (last sample {newest:%H:%M:%S}, {format_age(time.time() - newest.timestamp())} ago)"
+        message += f"\n🔍 Series: {series} ({len(monitor.historical_data)} symbols)\n"
+        message += f"🚨 Alerts in the last hour: {recent}\n"
+        if monitor.market_regime is not None:
+            message += f"🌐 Market regime: {monitor.market_regime.regime}\n"
+        muted = [symbol for symbol in list(monitor.muted) if monitor.is_muted(symbol)]
+        if muted:
+            message += "🔇 Muted: " + ", ".join(
+                f"{symbol} until {datetime.fromtimestamp(monitor.muted[symbol]):%H:%M}" for symbol in sorted(muted)) + "\n"
+        message += f"⏱️ Bot up {format_age(time.time() - self.started)}"
+        return message
+
+    def command_mute(self, args: List[str]) -> str:
+        symbol = self.symbol_arg(args)
+        if symbol is None:
+            return "Usage: /mute SYMBOL [duration, e.g. 30m, 1h, 1d]" if not args else f"❓ {args[0].upper()} is not monitored"
+        try:
+            seconds = parse_interval(args[1]) if len(args) > 1 else DEFAULT_MUTE
+        except ValueError as e:
+            return f"❌ {e}"
+        seconds = min(seconds, BOT_MAX_MUTE)
+        self.monitor.mute(symbol, seconds)
+        logging.info(f"Alerts for {symbol} muted for {format_age(seconds)} from Telegram", extra={'symbol': symbol})
+        until = datetime.fromtimestamp(time.time() + seconds)
+        return f"🔇 {symbol} alerts muted for {format_age(seconds)} (until {until:%Y-%m-%d %H:%M})"
+
+    def command_unmute(self, args: List[str]) -> str:
+        symbol = self.symbol_arg(args)
+        if symbol is None:
+            return "Usage: /unmute SYMBOL" if not args else f"❓ {args[0].upper()} is not monitored"
+        if not self.monitor.unmute(symbol):
+            return f"{symbol} is not muted"
+        logging.info(f"Alerts for {symbol} unmuted from Telegram", extra={'symbol': symbol})
+        return f"🔔 {symbol} alerts unmuted"
+
+    def command_help(self, args: List[str]) -> str:
+        return ("🤖 <b>Open Interest Monitor commands</b>\n\n"
+                "/oi SYMBOL - current OI per exchange vs. baseline\n"
+                f"/top [{'|'.join(BOT_TOP_WINDOWS)}] - biggest OI gainers and losers\n"
+                "/status - monitor status\n"
+                "/mute SYMBOL [1h] - stop sending a symbol's alerts for a while\n"
+                "/unmute SYMBOL - send them again")
@@ -18,10 +18,116 @@ TOPIC_ID = os.getenv("TOPIC_ID")
 # Open Interest Monitoring Configuration
 SPIKE_THRESHOLD = 5.0  # 5% spike threshold (lowered for more sensitivity)
 MONITORING_INTERVAL = 900  # 15 minutes in seconds
+SCHEDULE_OFFSET = 0  # Seconds after each wall-clock interval boundary to fire a cycle
+ALERT_COOLDOWN = 3600  # Seconds before the same alert can be sent again
+SEVERITY_MEDIUM = 30.0  # Absolute % change at which an alert becomes medium severity
+SEVERITY_HIGH = 50.0  # Absolute % change at which an alert becomes high severity
+WINDOW_SPIKE_RATIO = 50.0  # New/previous 15-min average ratio that triggers a window spike alert
+
+# Market regime: a cycle where most series move together is reported once, keeping only abnormal movers
+REGIME_MIN_SERIES = 20  # Series needed in a cycle's cross-section before classifying it
+REGIME_MEDIAN_MOVE = 3.0  # Absolute median % OI change (cycle over cycle) of a market-wide move
+REGIME_CO_MOVE = 1.0  # % change in the median's direction that counts a series as moving with the market
+REGIME_BREADTH = 0.6  # Share of series that must move with the market
+REGIME_ZSCORE = 3.0  # Robust z-score (vs. the cross-section) above which a series' move is abnormal
+REGIME_MIN_DISPERSION = 0.5  # Floor (%) for the cross-sectional dispersion so quiet markets don't flag noise
 
 # Supported exchanges for open interest data
 SUPPORTED_EXCHANGES = ["binance", "bybit"]
 
-# Logging configuration
-LOG_LEVEL = "INFO"
-LOG_FILE = "open_interest_monitor.log" 
\ No newline at end of file
+# Adaptive polling: per-symbol sampling between SAMPLER_MIN_INTERVAL and MONITORING_INTERVAL,
+# faster for volatile symbols, symbols near the spike threshold and symbols in an alert episode
+ADAPTIVE_POLLING = os.getenv("ADAPTIVE_POLLING", "0") == "1"
+SAMPLER_TICK = 15  # Seconds between sampling ticks
+SAMPLER_MIN_INTERVAL = 60  # Fastest per-symbol sampling interval in seconds
+SAMPLER_EPISODE = 3600  # Seconds a symbol stays at the fastest rate after an alert
+SAMPLER_BUDGET_RPM = {  # Exchange requests per minute the sampler may spend
+    "binance": int(os.getenv("BINANCE_RPM_BUDGET", "600")),
+    "bybit": int(os.getenv("BYBIT_RPM_BUDGET", "300")),
+}
+
+# Full-universe mover scanner (scanner.py)
+SCANNER_INTERVAL = 300  # Seconds between scans of every linear perpetual
+SCANNER_WINDOWS = {"15m": 900, "1h": 3600, "4h": 14400}  # Leaderboard lookbacks in seconds
+SCANNER_TOP_K = 10  # Entries shown per leaderboard in the digest
+SCANNER_DIGEST_INTERVAL = 3600  # Seconds between leaderboard digests
+SCANNER_MIN_OI_VALUE = 1_000_000  # USD OI below which a series is left off the leaderboards
+SCANNER_PROMOTE_RANK = 3  # Gain/loss leaders up to this rank are promoted into detailed monitoring...
+SCANNER_PROMOTE_MOVE = 10.0  # ...if their absolute % OI change is at least this
+SCANNER_PROMOTION_TTL = 86400  # Seconds a promoted symbol stays monitored after it last qualified
+SCANNER_PROMOTED_FILE = "scanner_promoted.json"  # Token config of the promoted symbols
+SCANNER_STATE_FILE = "scanner_state.pkl"  # Recent samples, so leaderboards survive restarts
+SCANNER_FETCH_WORKERS = 8  # Concurrent per-symbol OI requests (Binance has no bulk OI endpoint)
+SCANNER_UNIVERSE_REFRESH = 3600  # Seconds between refreshes of the perpetual listings
+
+# Staged monitoring cycle (pipeline.py)
+PIPELINE_QUEUE_SIZE = 256  # Items a stage queue holds before the stage upstream waits (backpressure)
+PIPELINE_BATCH = 64  # Most samples detect and store take from their queue at once
+PIPELINE_FLUSH_TIMEOUT = 30  # Seconds a stopping process waits for the background persister
+
+# Derived per-series metrics (derived_metrics.py)
+DERIVED_ALPHA = 0.3  # EWMA weight of the newest sample in the smoothed changes and funding-weighted OI
+DERIVED_QUADRANT_MIN = 0.1  # Smoothed |% change| of OI and of price under which the OI/price quadrant is neutral
+
+# Periodic reports over the history store (reports.py)
+REPORT_PERIODS = {  # name -> (period seconds, phase of its local boundaries); epoch weeks start on Thursday
+    "daily": (86400, 0),
+    "weekly": (7 * 86400, 4 * 86400),  # Monday 00:00
+}
+REPORT_DELAY = 300  # Seconds after a period closes before its report runs
+REPORT_INTERVAL = 900  # Window size the history is resampled to for ranges, moves and time above baseline
+REPORT_HIT_HORIZON = 3600  # Seconds after an alert at which its move must still hold to count as a hit
+REPORT_TOP_MOVES = 3  # Biggest window-to-window moves kept per series
+REPORT_TOP_K = 5  # Entries per section of the Telegram digest
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "0")) or os.cpu_count() or 1  # Processes aggregating series
+REPORT_DIR = "reports"  # CSV/HTML artifacts
+
+# Telegram command bot (command_bot.py); a bot token's updates can only be polled by one process
+COMMAND_BOT = os.getenv("COMMAND_BOT", "0") == "1"
+BOT_ALLOWED_CHATS = [chat for chat in os.getenv("BOT_ALLOWED_CHATS", "").split(",") if chat]  # Besides TELEGRAM_CHAT_ID
+BOT_POLL_TIMEOUT = 50  # Seconds a getUpdates long poll waits for a command
+BOT_RETRY = 5  # Seconds before polling again after an error
+BOT_STALE_AFTER = 300  # Commands older than this (sent while the monitor was down) are ignored
+BOT_TOP_WINDOWS = {"15m": 900, "1h": 3600}  # /top lookbacks; the in-memory history holds about an hour per series
+BOT_TOP_K = 5  # Gainers and losers listed by /top
+BOT_MAX_MUTE = 7 * 86400  # Longest /mute in seconds
+
+# Metrics endpoint (http://127.0.0.1:<port>/metrics); unset or 0 disables it
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+# Query API (http://127.0.0.1:<port>/api/...); unset or 0 disables it
+QUERY_API_PORT = int(os.getenv("QUERY_API_PORT", "0"))
+QUERY_API_HOST = "127.0.0.1"
+QUERY_STREAM_CHUNK = 1000  # History responses with more samples are streamed in chunks of this size
+QUERY_CACHE_MAX_BYTES = 1 << 20  # Larger bodies are rendered per request rather than cached until the next cycle
+RECENT_ALERTS = 500  # Alerts kept in memory for the query API
+
+# Time-indexed history store (history_store.py) and its retention tiers (retention.py)
+HISTORY_STORE_CHUNK = 65536  # Records per chunk when streaming a range from the store
+RETENTION_TIERS = [  # (name, window seconds (0 = raw samples), retention seconds (None = forever), segment period)
+    ("raw", 0, 7 * 86400, "%Y%m%d"),
+    ("1m", 60, 30 * 86400, "%Y%m%d"),
+    ("15m", 900, 365 * 86400, "%Y%m"),
+    ("1h", 3600, None, "%Y"),
+]
+BASELINE_HORIZON = 7 * 86400  # Seconds of history behind each symbol's historical average
+RETENTION_CHECK_INTERVAL = 3600  # Seconds between expiry and disk budget passes
+HISTORY_DISK_BUDGET = int(os.getenv("HISTORY_DISK_BUDGET_MB", "2048")) * 1024 ** 2  # Bytes across every tier
+HISTORY_MEMORY_BUDGET = int(os.getenv("HISTORY_MEMORY_BUDGET_MB", "64")) * 1024 ** 2  # Bytes of tier state in memory
+
+# Slow-cycle profiling: cycles longer than CYCLE_BUDGET seconds are captured to PROFILE_DIR (0 disables)
+CYCLE_BUDGET = float(os.getenv("CYCLE_BUDGET", "120"))
+PROFILE_MODE = os.getenv("PROFILE_MODE", "sample")  # "sample" (low overhead) or "cprofile"
+PROFILE_DIR = "profiles"
+PROFILE_SAMPLE_INTERVAL = 0.01  # Seconds between stack samples once a cycle is over budget
+PROFILE_KEEP = 20  # Captures kept on disk
+
+# Logging configuration (see structured_logging.py)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")  # Writing a level into <log file>.level overrides it while running
+LOG_FILE = "open_interest_monitor.log"
+LOG_LEVEL_POLL = 5  # Seconds between checks of the level file
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_MB", "50")) * 1024 ** 2  # Rotate at this size...
+LOG_ROTATE_INTERVAL = 86400  # ...or at the next day boundary, whichever comes first
+LOG_BACKUPS = 7  # Rotated files kept
+LOG_SAMPLE_WINDOW = 60  # Seconds
+LOG_SAMPLE_BURST = 20  # INFO/WARNING records passed per call site, series and window; the rest are counted 
\ No newline at end of file
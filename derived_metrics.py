@@ -0,0 +1,153 @@
+"""
+Derived per-series metrics for the Open Interest Monitor
+Each sample updates its (symbol, exchange) series in O(1) from the previous sample and a few
+exponentially weighted averages, so alert rules, the query API, the snapshot segment and the
+checkpoint read current values without going back to the history:
+
+    oi_change            % change of the OI value since the previous sample
+    price_change         % change of the price since the previous sample
+    quadrant             OI/price regime of the smoothed changes: long_buildup (OI up, price up),
+                         short_buildup (OI up, price down), short_covering (OI down, price up),
+                         long_unwinding (OI down, price down), neutral while either smoothed move
+                         is under DERIVED_QUADRANT_MIN %
+    oi_volume_ratio      OI value / 24h quote volume (days of turnover held as open positions)
+    funding_oi           OI value x funding rate: USD per funding interval, positive when longs pay
+    funding_oi_ewma      its exponentially weighted average
+    contract_divergence  % change of contracts minus % change of notional since the previous
+                         sample: how much of the notional move came from price rather than positions
+"""
+
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config import DERIVED_ALPHA, DERIVED_QUADRANT_MIN, SUPPORTED_EXCHANGES
+from models import OpenInterestData
+
+QUADRANTS = ('long_buildup', 'short_buildup', 'short_covering', 'long_unwinding', 'neutral')
+# Numeric metrics alert rules can use, in addition to the quadrant filter
+DERIVED_METRICS = ('oi_change', 'price_change', 'oi_volume_ratio', 'funding_oi', 'funding_oi_ewma',
+                   'contract_divergence')
+SNAPSHOT_FIELDS = ('price_change', 'quadrant', 'oi_volume_ratio', 'funding_oi', 'funding_oi_ewma', 'contract_divergence')
+HISTORY_FIELDS = DERIVED_METRICS + ('quadrant',)  # Added to every /api/history sample
+NAN = float('nan')
+
+def _pct(current: Optional[float], previous: Optional[float]) -> float:
+    if current is None or not previous:
+        return NAN
+    return (current - previous) / previous * 100
+
+def _ewma(average: float, value: float, alpha: float) -> float:
+    if math.isnan(value):
+        return average
+    return value if math.isnan(average) else average + alpha * (value - average)
+
+class SeriesMetrics:
+    """Derived metrics of one series as of its latest sample"""
+    __slots__ = ('timestamp', 'open_interest', 'open_interest_value', 'price', 'previous_value', 'oi_change',
+                 'price_change', 'oi_change_ewma', 'price_change_ewma', 'quadrant', 'oi_volume_ratio', 'funding_oi',
+                 'funding_oi_ewma', 'contract_divergence', 'samples')
+
+    def __init__(self):
+        self.timestamp = NAN  # Epoch seconds of the latest sample
+        self.open_interest = NAN
+        self.open_interest_value = NAN
+        self.price = NAN
+        self.previous_value = NAN  # OI value of the sample before (the reference of rule alerts)
+        self.oi_change = NAN
+        self.price_change = NAN
+        self.oi_change_ewma = NAN
+        self.price_change_ewma = NAN
+        self.quadrant = 'neutral'
+        self.oi_volume_ratio = NAN
+        self.funding_oi = NAN
+        self.funding_oi_ewma = NAN
+        self.contract_divergence = NAN
+        self.samples = 0
+
+    def fields(self, names: Iterable[str]) -> Dict:
+        """The named metrics, with None for unknown values"""
+        values = {name: getattr(self, name) for name in names}
+        return {name: None if isinstance(value, float) and math.isnan(value) else value
+                for name, value in values.items()}
+
+    def snapshot_fields(self) -> Dict:
+        """The SeriesSnapshot fields, with None for unknown values"""
+        return self.fields(SNAPSHOT_FIELDS)
+
+class DerivedMetrics:
+    """Keeps the derived metrics of every series up to date, one sample at a time"""
+
+    def __init__(self, alpha: float = DERIVED_ALPHA, quadrant_min: float = DERIVED_QUADRANT_MIN):
+        self.alpha = alpha
+        self.quadrant_min = quadrant_min
+        self.series: Dict[Tuple[str, str], SeriesMetrics] = {}
+
+    def update(self, record: OpenInterestData):
+        """Fold a sample into its series; samples not newer than the series' latest are ignored"""
+        key = (record.symbol, record.exchange)
+        state = self.series.get(key)
+        if state is None:
+            state = self.series[key] = SeriesMetrics()
+        timestamp = record.timestamp.timestamp()
+        if timestamp <= state.timestamp:
+            return
+        value = record.open_interest_value
+        price = record.price if record.price else NAN
+        state.oi_change = _pct(value, state.open_interest_value)
+        state.price_change = _pct(price, state.price)
+        contracts_change = _pct(record.open_interest, state.open_interest)
+        state.contract_divergence = contracts_change - state.oi_change
+        state.oi_change_ewma = _ewma(state.oi_change_ewma, state.oi_change, self.alpha)
+        state.price_change_ewma = _ewma(state.price_change_ewma, state.price_change, self.alpha)
+        state.quadrant = self.classify(state.oi_change_ewma, state.price_change_ewma)
+        state.oi_volume_ratio = value / record.volume_24h if record.volume_24h else NAN
+        state.funding_oi = value * record.funding_rate if record.funding_rate is not None else NAN
+        state.funding_oi_ewma = _ewma(state.funding_oi_ewma, state.funding_oi, self.alpha)
+        state.previous_value = state.open_interest_value
+        state.timestamp = timestamp
+        state.open_interest = record.open_interest
+        state.open_interest_value = value
+        state.price = price
+        state.samples += 1
+
+    def classify(self, oi_change: float, price_change: float) -> str:
+        if not (abs(oi_change) >= self.quadrant_min and abs(price_change) >= self.quadrant_min):
+            return 'neutral'  # Also while either change is still unknown (NaN)
+        if oi_change > 0:
+            return 'long_buildup' if price_change > 0 else 'short_buildup'
+        return 'short_covering' if price_change > 0 else 'long_unwinding'
+
+    def warm(self, records: Iterable[OpenInterestData]):
+        """Seed series from samples already in the history (start-up without a checkpoint, backfill)"""
+        for record in sorted(records, key=lambda r: r.timestamp):
+            self.update(record)
+
+    def get(self, symbol: str, exchange: str) -> Optional[SeriesMetrics]:
+        return self.series.get((symbol, exchange))
+
+    def column(self, keys: List[Tuple[str, str]], name: str) -> list:
+        """One metric of the given series, in order (NaN, or 'neutral' for the quadrant, when unknown)"""
+        missing = 'neutral' if name == 'quadrant' else NAN
+        return [getattr(self.series[key], name) if key in self.series else missing for key in keys]
+
+    def quadrant_counts(self) -> Dict[str, int]:
+        counts = dict.fromkeys(QUADRANTS, 0)
+        for state in self.series.values():
+            counts[state.quadrant] += 1
+        return counts
+
+    def release(self, symbol: str):
+        """Forget a symbol that is no longer monitored"""
+        for exchange in SUPPORTED_EXCHANGES:
+            self.series.pop((symbol, exchange), None)
+
+    def state(self) -> Dict[Tuple[str, str], tuple]:
+        """Picklable copy for the checkpoint"""
+        return {key: tuple(getattr(metrics, name) for name in SeriesMetrics.__slots__)
+                for key, metrics in self.series.items()}
+
+    def restore(self, state: Dict[Tuple[str, str], tuple]):
+        for key, values in state.items():
+            metrics = self.series[key] = SeriesMetrics()
+            for name, value in zip(SeriesMetrics.__slots__, values):
+                setattr(metrics, name, value)
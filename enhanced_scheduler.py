@@ -4,85 +4,73 @@ Enhanced Open Interest Monitor Scheduler
 Runs the open interest monitor at specified intervals and sends alerts only when there are changes
 """
 
-import schedule
-import time
 import logging
-import subprocess
 import sys
 import os
-import json
 import asyncio
 import argparse
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('enhanced_scheduler.log'),
-        logging.StreamHandler()
-    ]
-)
+from config import SCHEDULE_OFFSET, METRICS_PORT, REPORT_PERIODS, REPORT_DELAY, COMMAND_BOT
+from metrics import start_metrics_server
+from models import OpenInterestData, MonitoringCycleResult
+from structured_logging import setup_logging
+from wallclock_scheduler import WallClockScheduler
+
+# Configure logging (queued JSON lines to a rotating file)
+setup_logging('enhanced_scheduler.log')
 
 class EnhancedScheduler:
-    def __init__(self, config_file: str = "tokens_config.json"):
+    def __init__(self, config_file: str = "tokens_config.json", bot: bool = COMMAND_BOT):
         self.config_file = config_file
-        self.data_file = "open_interest_data.json"
+        self.bot = bot  # Answer Telegram commands from the monitor's in-memory state
         self.last_report_time = None
         self.monitoring_start_time = datetime.now()
         self.previous_oi_values = {}  # Store previous OI values to detect changes
+        self.monitor = None  # In-process OpenInterestMonitor, created on first cycle
+        self.scheduler = WallClockScheduler()
         
-    def run_monitor_cycle(self):
-        """Run one monitoring cycle and check for changes"""
-        try:
-            logging.info(f"Starting enhanced monitoring cycle with config: {self.config_file}")
-            
-            # Run the monitor for one cycle
-            result = subprocess.run([
-                sys.executable, 'monitor.py', '--config', self.config_file
-            ], capture_output=True, text=True, timeout=300)  # 5 minute timeout
-            
-            if result.returncode == 0:
-                logging.info("Monitoring cycle completed successfully")
-                # Check for changes and send alerts
-                self.check_for_changes()
-            else:
-                logging.error(f"Monitoring cycle failed: {result.stderr}")
-                
-        except subprocess.TimeoutExpired:
-            logging.error("Monitoring cycle timed out")
-        except Exception as e:
-            logging.error(f"Error running monitoring cycle: {e}")
+    def get_monitor(self):
+        """Return the in-process monitor, creating it (and loading history) once"""
+        if self.monitor is None:
+            from monitor import OpenInterestMonitor
+            self.monitor = OpenInterestMonitor(self.config_file)
+        return self.monitor
 
-    def load_current_data(self) -> Dict:
-        """Load current open interest data from file"""
-        try:
-            if os.path.exists(self.data_file):
-                with open(self.data_file, 'r') as f:
-                    return json.load(f)
-        except Exception as e:
-            logging.error(f"Error loading data: {e}")
-        return {}
+    async def run_monitor_cycle_async(self):
+        """Run one in-process monitoring cycle and check its results for changes"""
+        logging.info(f"Starting enhanced monitoring cycle with config: {self.config_file}")
+        
+        monitor = self.get_monitor()
+        result = await monitor.run_monitoring_cycle()
+        
+        if result.success:
+            logging.info(f"Monitoring cycle completed successfully in {result.duration:.2f}s")
+            # Check for changes and send alerts
+            await self.check_for_changes(result)
+        else:
+            logging.error(f"Monitoring cycle failed: {result.error}")
 
-    def check_for_changes(self):
-        """Check for changes in Open Interest and send alerts"""
+    async def check_for_changes(self, result: MonitoringCycleResult):
+        """Check the latest cycle's records for changes in Open Interest and send alerts"""
         try:
-            # Load current data
-            data = self.load_current_data()
-            if not data:
+            if not result.latest_data:
                 logging.warning("No data available for change detection")
                 return
+            # Declared alert rules replace the built-in >1% check; the cycle already sent their alerts
+            if self.get_monitor().rule_engine is not None:
+                return
+            
+            # During a market-wide move only symbols moving abnormally against the market get change alerts
+            regime = self.get_monitor().market_regime
+            abnormal = None
+            if regime is not None and regime.regime != "normal":
+                abnormal = {symbol for symbol, _, _, _ in regime.abnormal}
             
             # Check each token for changes
-            for symbol, records in data.items():
-                if not records:
-                    continue
-                
-                # Get latest record
-                latest_record = records[-1]
-                current_oi_value = float(latest_record.get('open_interest_value', 0))
+            for symbol, latest_record in result.latest_data.items():
+                current_oi_value = float(latest_record.open_interest_value or 0)
                 
                 # Check if we have a previous value for this symbol
                 if symbol in self.previous_oi_values:
@@ -93,8 +81,9 @@ class EnhancedScheduler:
                     change_percentage = (change / previous_oi_value * 100) if previous_oi_value > 0 else 0
                     
                     # Only send alert if there's a significant change (more than 1%)
-                    if abs(change_percentage) > 1.0:
-                        self.send_change_alert(symbol, latest_record, previous_oi_value, current_oi_value, change_percentage)
+                    if (abs(change_percentage) > 1.0 and (abnormal is None or symbol in abnormal)
+                            and not self.get_monitor().is_muted(symbol)):
+                        await self.send_change_alert(symbol, latest_record, previous_oi_value, current_oi_value, change_percentage)
                 
                 # Update the previous value for next comparison
                 self.previous_oi_values[symbol] = current_oi_value
@@ -102,7 +91,20 @@ class EnhancedScheduler:
         except Exception as e:
             logging.error(f"Error checking for changes: {e}")
 
-    def send_change_alert(self, symbol: str, latest_record: Dict, previous_value: float, current_value: float, change_percentage: float):
+    async def send_report(self, period: str):
+        """Aggregate the period that just closed from the history store and send its digest"""
+        try:
+            from reports import run_report
+            monitor = self.get_monitor()
+            # Worker processes stream the history store; the event loop keeps running cycles meanwhile
+            digest, path, rows = await asyncio.to_thread(run_report, period, monitor.history_dir, monitor.alert_log)
+            logging.info(f"{period.capitalize()} report of {len(rows)} series written to {path}")
+            from telegram_service import send_telegram_message
+            await send_telegram_message(digest)
+        except Exception as e:
+            logging.error(f"Failed to send {period} report: {e}")
+
+    async def send_change_alert(self, symbol: str, latest_record: OpenInterestData, previous_value: float, current_value: float, change_percentage: float):
         """Send alert for Open Interest change"""
         try:
             from telegram_service import send_telegram_message
@@ -117,9 +119,8 @@ class EnhancedScheduler:
                 change_type = "DECREASE"
                 change_direction = "↘️"
             
-            # Calculate averages for context
-            data = self.load_current_data()
-            averages = self.calculate_averages(data.get(symbol, []))
+            # Calculate averages for context from the monitor's in-memory history
+            averages = self.calculate_averages(self.get_monitor().historical_data.get(symbol, []))
             avg_oi_value = averages['avg_oi_value']
             
             # Calculate percentage from average
@@ -133,11 +134,11 @@ class EnhancedScheduler:
             alert_message += f"💰 Previous OI: {self.format_number(previous_value)}\n"
             alert_message += f"💰 Current OI: {self.format_number(current_value)}\n"
             alert_message += f"📊 vs 24h Avg: {avg_change:+.1f}%\n"
-            alert_message += f"💵 Price: ${latest_record.get('price', 0):.4f}\n"
-            alert_message += f"📊 Volume 24h: {self.format_number(float(latest_record.get('volume_24h', 0)))}\n"
+            alert_message += f"💵 Price: ${latest_record.price or 0:.4f}\n"
+            alert_message += f"📊 Volume 24h: {self.format_number(float(latest_record.volume_24h or 0))}\n"
             
             # Add funding rate if available
-            funding_rate = latest_record.get('funding_rate', 0)
+            funding_rate = latest_record.funding_rate or 0
             if funding_rate != 0:
                 alert_message += f"💸 Funding: {funding_rate:.4f}%\n"
             
@@ -145,13 +146,13 @@ class EnhancedScheduler:
             alert_message += f"🔄 Next check in: 15 minutes\n"
             
             # Send the alert
-            asyncio.run(send_telegram_message(alert_message))
+            await send_telegram_message(alert_message)
             logging.info(f"Change alert sent for {symbol}: {change_percentage:+.2f}%")
             
         except Exception as e:
             logging.error(f"Failed to send change alert: {e}")
 
-    def calculate_averages(self, symbol_data: List) -> Dict:
+    def calculate_averages(self, symbol_data: List[OpenInterestData]) -> Dict:
         """Calculate average OI for a symbol"""
         if not symbol_data:
             return {"avg_oi": 0, "avg_oi_value": 0, "data_points": 0}
@@ -161,24 +162,15 @@ class EnhancedScheduler:
         recent_data = []
         
         for record in symbol_data:
-            try:
-                if isinstance(record['timestamp'], str):
-                    record_time = datetime.fromisoformat(record['timestamp'])
-                else:
-                    record_time = record['timestamp']
-                
-                if now - record_time <= timedelta(hours=24):
-                    recent_data.append(record)
-            except Exception as e:
-                logging.warning(f"Error parsing timestamp: {e}")
-                continue
+            if now - record.timestamp <= timedelta(hours=24):
+                recent_data.append(record)
         
         if not recent_data:
             return {"avg_oi": 0, "avg_oi_value": 0, "data_points": 0}
         
         # Calculate averages
-        total_oi = sum(float(r.get('open_interest', 0)) for r in recent_data)
-        total_oi_value = sum(float(r.get('open_interest_value', 0)) for r in recent_data)
+        total_oi = sum(float(r.open_interest or 0) for r in recent_data)
+        total_oi_value = sum(float(r.open_interest_value or 0) for r in recent_data)
         count = len(recent_data)
         
         return {
@@ -205,7 +197,7 @@ class EnhancedScheduler:
             
             startup_message = f"🚀 <b>Enhanced Open Interest Monitor Started</b>\n\n"
             startup_message += f"⏰ Monitoring every 15 minutes\n"
-            startup_message += f"📊 Change alerts only (no regular reports)\n"
+            startup_message += f"📊 Change alerts, daily and weekly OI reports\n"
             startup_message += f"📅 Started on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
             startup_message += f"✅ Enhanced scheduler is running..."
             
@@ -233,27 +225,33 @@ class EnhancedScheduler:
         except Exception as e:
             logging.error(f"Failed to send shutdown message: {e}")
 
+    async def run_async(self):
+        """Run scheduled monitoring cycles inside an existing event loop"""
+        if self.bot:
+            from command_bot import CommandBot
+            await CommandBot(self.get_monitor()).start()
+        # Schedule monitoring cycles on :00/:15/:30/:45 boundaries, plus once on startup
+        self.scheduler.add_job('enhanced_cycle', self.run_monitor_cycle_async, 15 * 60, SCHEDULE_OFFSET,
+                               run_immediately=True)
+        # Reports run REPORT_DELAY after each day/week closes, so its last cycle is stored
+        for period, (length, phase) in REPORT_PERIODS.items():
+            self.scheduler.add_job(f"{period}_report", lambda period=period: self.send_report(period), length,
+                                   phase + REPORT_DELAY)
+        await self.scheduler.run()
+
     def run(self):
         """Main function to run the enhanced scheduler"""
         print("🚀 Starting Enhanced Open Interest Monitor Scheduler...")
         print("⏰ Monitoring every 15 minutes")
-        print("📊 Change alerts only (no regular reports)")
+        print("📊 Change alerts, daily and weekly OI reports")
         print("📱 Telegram notifications enabled")
         print("🔄 Enhanced scheduler is running... (Press Ctrl+C to stop)")
         
         # Send startup message
         self.send_startup_message()
         
-        # Schedule monitoring cycles
-        schedule.every(15).minutes.do(self.run_monitor_cycle)
-        
-        # Also run immediately on startup
-        self.run_monitor_cycle()
-        
         try:
-            while True:
-                schedule.run_pending()
-                time.sleep(60)  # Check every minute
+            asyncio.run(self.run_async())
                 
         except KeyboardInterrupt:
             print("\n⏹️  Shutting down enhanced scheduler...")
@@ -268,9 +266,15 @@ def main():
     """Main entry point"""
     parser = argparse.ArgumentParser(description="Enhanced Open Interest Monitor Scheduler")
     parser.add_argument("--config", default="tokens_config.json", help="Path to the tokens configuration file")
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT, help="Serve Prometheus metrics on this local port")
+    parser.add_argument("--bot", action="store_true", default=COMMAND_BOT,
+                        help="Answer Telegram commands (/oi, /top, /status, /mute) from the in-memory state")
     args = parser.parse_args()
 
-    scheduler = EnhancedScheduler(config_file=args.config)
+    if args.metrics_port:
+        start_metrics_server(args.metrics_port)
+
+    scheduler = EnhancedScheduler(config_file=args.config, bot=args.bot)
     scheduler.run()
 
 if __name__ == "__main__":
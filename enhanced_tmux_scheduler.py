@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
 """
 Enhanced TMux-based OpenInterest Monitor Scheduler
-Runs the enhanced OpenInterest monitor in a tmux session with regular data reports
+Runs the enhanced OpenInterest monitor in a tmux session with regular data reports.
+Inside the session the monitor runs under the heartbeat supervisor (supervisor.py),
+which restarts a crashed or wedged worker in under a second
 """
 
 import subprocess
@@ -15,22 +17,16 @@ from datetime import datetime
 
 # Add the current directory to Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from structured_logging import setup_logging
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('enhanced_tmux_scheduler.log'),
-        logging.StreamHandler()
-    ]
-)
+# Configure logging (queued JSON lines to a rotating file)
+setup_logging('enhanced_tmux_scheduler.log')
 
 class EnhancedTmuxScheduler:
     def __init__(self, session_name="enhanced_openinterest_scheduler", config_file="tokens_config.json"):
         self.session_name = session_name
         self.config_file = config_file
-        self.script_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "enhanced_scheduler.py")
+        self.script_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "supervisor.py")
         
     def send_telegram_notification(self, message):
         """Send notification to Telegram"""
@@ -79,7 +75,7 @@ class EnhancedTmuxScheduler:
             return False
         
         # Send the startup command to the session with config file
-        startup_cmd = f"send-keys -t {self.session_name} 'python3 {self.script_path} --config {self.config_file}' Enter"
+        startup_cmd = f"send-keys -t {self.session_name} 'python3 {self.script_path} run --kind enhanced --config {self.config_file}' Enter"
         success, stdout, stderr = self.tmux_command(startup_cmd)
         
         if not success:
@@ -130,35 +126,18 @@ class EnhancedTmuxScheduler:
         
         return "running"
     
+    def print_worker_health(self):
+        """Print worker health reported by the supervisor's heartbeats"""
+        from supervisor import print_status
+        return print_status()
+
     def monitor_session(self):
-        """Monitor the tmux session and restart if needed"""
-        logging.info("Starting enhanced session monitor...")
+        """Supervise the enhanced monitor in the foreground with heartbeat-based restarts"""
+        from supervisor import SupervisedWorker, WorkerSupervisor
+        logging.info("Starting enhanced heartbeat supervisor...")
         
-        while True:
-            try:
-                status = self.get_session_status()
-                
-                if status == "not_running":
-                    logging.warning("Enhanced session not running, creating new session...")
-                    self.send_telegram_notification(
-                        f"⚠️ <b>Enhanced OpenInterest Monitor Restart</b>\n\n"
-                        f"📅 Session was down, restarting at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
-                        f"🔄 Creating new enhanced tmux session..."
-                    )
-                    self.create_session()
-                
-                elif status == "empty":
-                    logging.warning("Enhanced session exists but is empty, restarting...")
-                    self.restart_session()
-                
-                time.sleep(300)  # Check every 5 minutes
-                
-            except KeyboardInterrupt:
-                logging.info("Enhanced monitor interrupted by user")
-                break
-            except Exception as e:
-                logging.error(f"Enhanced monitor error: {e}")
-                time.sleep(60)  # Wait before retrying
+        worker = SupervisedWorker("enhanced", "enhanced", self.config_file)
+        WorkerSupervisor([worker]).run()
 
 def main():
     """Main function"""
@@ -179,8 +158,8 @@ def main():
         print("  python3 enhanced_tmux_scheduler.py attach                    - Attach to running session")
         print("  python3 enhanced_tmux_scheduler.py stop                      - Stop the enhanced monitor")
         print("  python3 enhanced_tmux_scheduler.py restart [--config FILE]   - Restart the enhanced monitor")
-        print("  python3 enhanced_tmux_scheduler.py status                    - Check session status")
-        print("  python3 enhanced_tmux_scheduler.py monitor                   - Monitor and auto-restart")
+        print("  python3 enhanced_tmux_scheduler.py status                    - Check session and worker health")
+        print("  python3 enhanced_tmux_scheduler.py monitor                   - Supervise in the foreground (no tmux)")
         print("")
         print("Examples:")
         print("  python3 enhanced_tmux_scheduler.py start                     - Start with default config")
@@ -246,9 +225,11 @@ def main():
             print("⚠️  Enhanced session exists but is empty")
         else:
             print("❌ Enhanced OpenInterest monitor is not running")
+        print("")
+        scheduler.print_worker_health()
     
     elif command == "monitor":
-        print("🔍 Starting enhanced session monitor (Ctrl+C to stop)...")
+        print("🔍 Starting enhanced heartbeat supervisor (Ctrl+C to stop)...")
         scheduler.monitor_session()
     
     else:
@@ -1,9 +1,52 @@
 import requests
+import contextvars
 import logging
-from typing import List, Optional, Dict, Any
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Dict, Any, Tuple
 from datetime import datetime
 from models import OpenInterestData, ExchangeOpenInterestData
-from config import BINANCE_API_KEY, BINANCE_API_SECRET, BYBIT_API_KEY, BYBIT_API_SECRET
+from config import (BINANCE_API_KEY, BINANCE_API_SECRET, BYBIT_API_KEY, BYBIT_API_SECRET, SCANNER_FETCH_WORKERS,
+                    SCANNER_UNIVERSE_REFRESH)
+from metrics import EXCHANGE_REQUEST_SECONDS, EXCHANGE_REQUEST_ERRORS
+from profiling import span
+
+# Symbols polled when no token list is configured
+DEFAULT_SYMBOLS = ["BTCUSDT", "ETHUSDT", "BNBUSDT", "ADAUSDT", "SOLUSDT",
+                   "DOTUSDT", "DOGEUSDT", "AVAXUSDT", "MATICUSDT", "LINKUSDT"]
+REQUESTS_PER_SAMPLE = 3  # Open interest, ticker and funding rate
+
+def record_request(exchange: str, endpoint: str, elapsed: float, failed: bool):
+    EXCHANGE_REQUEST_SECONDS.observe(elapsed, exchange=exchange, endpoint=endpoint)
+    if failed:
+        EXCHANGE_REQUEST_ERRORS.inc(exchange=exchange, endpoint=endpoint)
+
+def timed_get(session: requests.Session, exchange: str, endpoint: str, url: str, params: Dict[str, Any],
+              timeout: float = 10, timings: Optional[list] = None) -> requests.Response:
+    """GET an exchange endpoint, recording latency and errors per exchange and endpoint.
+
+    Requests made on pool threads pass `timings`: (exchange, endpoint, seconds, failed) is appended to it
+    and the thread that owns the exchange's metrics records it with record_request.
+    """
+    started = time.perf_counter()
+    failed = True
+    try:
+        with span(f"{exchange}.{endpoint}"):
+            response = session.get(url, params=params, timeout=timeout)
+        failed = response.status_code != 200
+    finally:
+        timing = (exchange, endpoint, time.perf_counter() - started, failed)
+        if timings is None:
+            record_request(*timing)
+        else:
+            timings.append(timing)
+    if logging.root.isEnabledFor(logging.DEBUG):
+        # Per-request log, off unless the level is switched to DEBUG (see structured_logging.py)
+        logging.debug(f"{exchange} {endpoint} {params} -> HTTP {response.status_code} in "
+                      f"{(time.perf_counter() - started) * 1000:.0f} ms",
+                      extra={'symbol': params.get('symbol'), 'exchange': exchange})
+    return response
 
 class BinanceOpenInterestService:
     """Service to fetch open interest data from Binance"""
@@ -13,66 +56,171 @@ class BinanceOpenInterestService:
         self.api_secret = api_secret or BINANCE_API_SECRET
         self.base_url = "https://fapi.binance.com"
         self.token_list = token_list
+        # Reuse connections across cycles when the service is kept alive in-process
+        self.session = requests.Session()
+        self._perpetuals: Tuple[float, List[str]] = (0.0, [])  # (fetched at, symbols)
+
+    def list_perpetuals(self, max_age: float = SCANNER_UNIVERSE_REFRESH) -> List[str]:
+        """Return every trading USDT-margined perpetual, refreshing the listing after max_age seconds"""
+        fetched_at, symbols = self._perpetuals
+        if symbols and time.time() - fetched_at < max_age:
+            return symbols
+        response = timed_get(self.session, 'binance', 'exchange_info', f"{self.base_url}/fapi/v1/exchangeInfo", {})
+        response.raise_for_status()
+        symbols = [
+            info['symbol'] for info in response.json().get('symbols', [])
+            if info.get('contractType') == 'PERPETUAL' and info.get('quoteAsset') == 'USDT' and info.get('status') == 'TRADING'
+        ]
+        self._perpetuals = (time.time(), symbols)
+        return symbols
+
+    def get_universe_data(self, workers: int = SCANNER_FETCH_WORKERS) -> ExchangeOpenInterestData:
+        """Fetch every perpetual: tickers and funding in bulk, open interest per symbol on a thread pool"""
+        try:
+            symbols = self.list_perpetuals()
+            ticker_response = timed_get(self.session, 'binance', 'ticker', f"{self.base_url}/fapi/v1/ticker/24hr", {})
+            ticker_response.raise_for_status()
+            tickers = {ticker['symbol']: ticker for ticker in ticker_response.json()}
+            premium_response = timed_get(self.session, 'binance', 'premium_index', f"{self.base_url}/fapi/v1/premiumIndex", {})
+            funding = {}
+            if premium_response.status_code == 200:
+                funding = {item['symbol']: item.get('lastFundingRate') for item in premium_response.json()}
+
+            # requests.Session is not thread-safe, so each pool thread gets its own
+            sessions = threading.local()
+            timings = []
+
+            def fetch_open_interest(symbol: str) -> Optional[float]:
+                if not hasattr(sessions, 'session'):
+                    sessions.session = requests.Session()
+                try:
+                    response = timed_get(sessions.session, 'binance', 'open_interest',
+                                         f"{self.base_url}/fapi/v1/openInterest", {"symbol": symbol}, timings=timings)
+                    if response.status_code == 200:
+                        return float(response.json().get('openInterest', 0))
+                except Exception as e:
+                    logging.warning(f"Error fetching open interest for {symbol}: {e}",
+                                    extra={'symbol': symbol, 'exchange': 'binance'})
+                return None
+
+            try:
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    open_interest = list(pool.map(fetch_open_interest, symbols))
+            finally:
+                for timing in timings:
+                    record_request(*timing)
+
+            now = datetime.now()
+            open_interest_data = []
+            for symbol, contracts in zip(symbols, open_interest):
+                if contracts is None:
+                    continue
+                ticker = tickers.get(symbol, {})
+                price = float(ticker.get('lastPrice', 0) or 0)
+                rate = funding.get(symbol)
+                open_interest_data.append(OpenInterestData(
+                    symbol=symbol,
+                    exchange='binance',
+                    open_interest=contracts,
+                    open_interest_value=contracts * price,
+                    timestamp=now,
+                    price=price,
+                    volume_24h=float(ticker.get('quoteVolume', 0) or 0),
+                    funding_rate=float(rate) if rate not in (None, "") else None
+                ))
+            return ExchangeOpenInterestData(exchange='binance', data=open_interest_data, timestamp=now, success=True)
+        except Exception as e:
+            logging.error(f"Error fetching Binance universe data: {e}")
+            return ExchangeOpenInterestData(exchange='binance', data=[], timestamp=datetime.now(), success=False, error=str(e))
     
-    def get_open_interest_data(self) -> ExchangeOpenInterestData:
-        """Fetch open interest data from Binance"""
+    def get_symbol_data(self, symbol: str) -> Optional[OpenInterestData]:
+        """Fetch one symbol's open interest, price, volume and funding (REQUESTS_PER_SAMPLE requests)"""
+        # Get open interest
+        oi_url = f"{self.base_url}/fapi/v1/openInterest"
+        oi_params = {"symbol": symbol}
+        oi_response = timed_get(self.session, 'binance', 'open_interest', oi_url, oi_params)
+        
+        if oi_response.status_code != 200:
+            return None
+        oi_data = oi_response.json()
+        
+        # Get ticker for price
+        ticker_url = f"{self.base_url}/fapi/v1/ticker/24hr"
+        ticker_params = {"symbol": symbol}
+        ticker_response = timed_get(self.session, 'binance', 'ticker', ticker_url, ticker_params)
+        
+        price = 0.0
+        volume = 0.0
+        if ticker_response.status_code == 200:
+            ticker_data = ticker_response.json()
+            price = float(ticker_data.get('lastPrice', 0))
+            volume = float(ticker_data.get('quoteVolume', 0))
+        
+        # Get funding rate
+        funding_url = f"{self.base_url}/fapi/v1/fundingRate"
+        funding_params = {"symbol": symbol, "limit": 1}
+        funding_response = timed_get(self.session, 'binance', 'funding_rate', funding_url, funding_params)
+        
+        funding_rate = None
+        if funding_response.status_code == 200:
+            funding_data = funding_response.json()
+            if funding_data:
+                funding_rate = float(funding_data[0].get('fundingRate', 0))
+        
+        oi_value = float(oi_data.get('openInterest', 0)) * price
+        
+        return OpenInterestData(
+            symbol=symbol,
+            exchange='binance',
+            open_interest=float(oi_data.get('openInterest', 0)),
+            open_interest_value=oi_value,
+            timestamp=datetime.now(),
+            price=price,
+            volume_24h=volume,
+            funding_rate=funding_rate
+        )
+    
+    def get_open_interest_history(self, symbol: str, limit: int) -> List[OpenInterestData]:
+        """Fetch a symbol's last `limit` 15-minute open interest samples, oldest first (backfill)"""
+        url = f"{self.base_url}/futures/data/openInterestHist"
+        params = {"symbol": symbol, "period": "15m", "limit": min(limit, 500)}
+        response = timed_get(self.session, 'binance', 'open_interest_history', url, params)
+        if response.status_code != 200:
+            return []
+        records = []
+        for entry in response.json():
+            open_interest = float(entry.get('sumOpenInterest', 0))
+            oi_value = float(entry.get('sumOpenInterestValue', 0))
+            records.append(OpenInterestData(
+                symbol=symbol,
+                exchange='binance',
+                open_interest=open_interest,
+                open_interest_value=oi_value,
+                timestamp=datetime.fromtimestamp(int(entry['timestamp']) / 1000),
+                price=oi_value / open_interest if open_interest else 0.0
+            ))
+        return records
+    
+    def get_open_interest_data(self, symbols: Optional[List[str]] = None,
+                               on_record: Optional[Callable[[OpenInterestData], None]] = None) -> ExchangeOpenInterestData:
+        """Fetch open interest data from Binance (for `symbols`, else the token list); on_record gets each record as soon as it is fetched"""
         try:
             open_interest_data = []
             
             # Get top symbols for monitoring (simplified approach)
-            symbols = self.token_list if self.token_list else ["BTCUSDT", "ETHUSDT", "BNBUSDT", "ADAUSDT", "SOLUSDT", 
-                      "DOTUSDT", "DOGEUSDT", "AVAXUSDT", "MATICUSDT", "LINKUSDT"]
+            if symbols is None:
+                symbols = self.token_list if self.token_list else DEFAULT_SYMBOLS
             
             for symbol in symbols:
                 try:
-                    # Get open interest
-                    oi_url = f"{self.base_url}/fapi/v1/openInterest"
-                    oi_params = {"symbol": symbol}
-                    oi_response = requests.get(oi_url, params=oi_params, timeout=10)
-                    
-                    if oi_response.status_code == 200:
-                        oi_data = oi_response.json()
-                        
-                        # Get ticker for price
-                        ticker_url = f"{self.base_url}/fapi/v1/ticker/24hr"
-                        ticker_params = {"symbol": symbol}
-                        ticker_response = requests.get(ticker_url, params=ticker_params, timeout=10)
-                        
-                        price = 0.0
-                        volume = 0.0
-                        if ticker_response.status_code == 200:
-                            ticker_data = ticker_response.json()
-                            price = float(ticker_data.get('lastPrice', 0))
-                            volume = float(ticker_data.get('quoteVolume', 0))
-                        
-                        # Get funding rate
-                        funding_url = f"{self.base_url}/fapi/v1/fundingRate"
-                        funding_params = {"symbol": symbol, "limit": 1}
-                        funding_response = requests.get(funding_url, params=funding_params, timeout=10)
-                        
-                        funding_rate = None
-                        if funding_response.status_code == 200:
-                            funding_data = funding_response.json()
-                            if funding_data:
-                                funding_rate = float(funding_data[0].get('fundingRate', 0))
-                        
-                        oi_value = float(oi_data.get('openInterest', 0)) * price
-                        
-                        oi_record = OpenInterestData(
-                            symbol=symbol,
-                            exchange='binance',
-                            open_interest=float(oi_data.get('openInterest', 0)),
-                            open_interest_value=oi_value,
-                            timestamp=datetime.now(),
-                            price=price,
-                            volume_24h=volume,
-                            funding_rate=funding_rate
-                        )
-                        
+                    oi_record = self.get_symbol_data(symbol)
+                    if oi_record:
                         open_interest_data.append(oi_record)
+                        if on_record:
+                            on_record(oi_record)
                     
                 except Exception as e:
-                    logging.warning(f"Error fetching data for {symbol}: {e}")
+                    logging.warning(f"Error fetching data for {symbol}: {e}", extra={'symbol': symbol, 'exchange': 'binance'})
                     continue
             
             return ExchangeOpenInterestData(
@@ -100,70 +248,165 @@ class BybitOpenInterestService:
         self.api_secret = api_secret or BYBIT_API_SECRET
         self.base_url = "https://api.bybit.com"
         self.token_list = token_list
+        # Reuse connections across cycles when the service is kept alive in-process
+        self.session = requests.Session()
+        self._perpetuals: Tuple[float, List[str]] = (0.0, [])  # (fetched at, symbols)
+
+    def list_perpetuals(self, max_age: float = SCANNER_UNIVERSE_REFRESH) -> List[str]:
+        """Return every trading USDT linear perpetual, refreshing the listing after max_age seconds"""
+        fetched_at, symbols = self._perpetuals
+        if symbols and time.time() - fetched_at < max_age:
+            return symbols
+        symbols = []
+        params = {"category": "linear", "limit": 1000}
+        while True:
+            response = timed_get(self.session, 'bybit', 'instruments_info', f"{self.base_url}/v5/market/instruments-info", params)
+            response.raise_for_status()
+            result = response.json().get('result', {})
+            symbols.extend(
+                info['symbol'] for info in result.get('list', [])
+                if info.get('contractType') == 'LinearPerpetual' and info.get('quoteCoin') == 'USDT'
+                and info.get('status') == 'Trading'
+            )
+            cursor = result.get('nextPageCursor')
+            if not cursor:
+                break
+            params = {**params, "cursor": cursor}
+        self._perpetuals = (time.time(), symbols)
+        return symbols
+
+    def get_universe_data(self) -> ExchangeOpenInterestData:
+        """Fetch every perpetual from the bulk linear tickers endpoint (one request carries OI, volume and funding)"""
+        try:
+            perpetuals = set(self.list_perpetuals())
+            response = timed_get(self.session, 'bybit', 'ticker', f"{self.base_url}/v5/market/tickers", {"category": "linear"})
+            response.raise_for_status()
+            now = datetime.now()
+            open_interest_data = []
+            for ticker in response.json().get('result', {}).get('list', []):
+                if ticker.get('symbol') not in perpetuals:
+                    continue
+                rate = ticker.get('fundingRate')
+                open_interest_data.append(OpenInterestData(
+                    symbol=ticker['symbol'],
+                    exchange='bybit',
+                    open_interest=float(ticker.get('openInterest', 0) or 0),
+                    open_interest_value=float(ticker.get('openInterestValue', 0) or 0),
+                    timestamp=now,
+                    price=float(ticker.get('lastPrice', 0) or 0),
+                    volume_24h=float(ticker.get('turnover24h', 0) or 0),
+                    funding_rate=float(rate) if rate not in (None, "") else None
+                ))
+            return ExchangeOpenInterestData(exchange='bybit', data=open_interest_data, timestamp=now, success=True)
+        except Exception as e:
+            logging.error(f"Error fetching Bybit universe data: {e}")
+            return ExchangeOpenInterestData(exchange='bybit', data=[], timestamp=datetime.now(), success=False, error=str(e))
+    
+    def get_symbol_data(self, symbol: str) -> Optional[OpenInterestData]:
+        """Fetch one symbol's open interest, price, volume and funding (REQUESTS_PER_SAMPLE requests)"""
+        # Get open interest
+        oi_url = f"{self.base_url}/v5/market/open-interest"
+        oi_params = {"category": "linear", "symbol": symbol}
+        oi_response = timed_get(self.session, 'bybit', 'open_interest', oi_url, oi_params)
+        
+        if oi_response.status_code != 200:
+            return None
+        oi_data = oi_response.json()
+        
+        if oi_data.get('retCode') != 0 or not oi_data.get('result', {}).get('list'):
+            return None
+        oi_info = oi_data['result']['list'][0]
+        
+        # Get ticker for price
+        ticker_url = f"{self.base_url}/v5/market/tickers"
+        ticker_params = {"category": "linear", "symbol": symbol}
+        ticker_response = timed_get(self.session, 'bybit', 'ticker', ticker_url, ticker_params)
+        
+        price = 0.0
+        volume = 0.0
+        if ticker_response.status_code == 200:
+            ticker_data = ticker_response.json()
+            if ticker_data.get('retCode') == 0 and ticker_data.get('result', {}).get('list'):
+                ticker_info = ticker_data['result']['list'][0]
+                price = float(ticker_info.get('lastPrice', 0))
+                volume = float(ticker_info.get('turnover24h', 0))
+        
+        # Get funding rate
+        funding_url = f"{self.base_url}/v5/market/funding/history"
+        funding_params = {"category": "linear", "symbol": symbol, "limit": 1}
+        funding_response = timed_get(self.session, 'bybit', 'funding_rate', funding_url, funding_params)
+        
+        funding_rate = None
+        if funding_response.status_code == 200:
+            funding_data = funding_response.json()
+            if funding_data.get('retCode') == 0 and funding_data.get('result', {}).get('list'):
+                funding_info = funding_data['result']['list'][0]
+                funding_rate = float(funding_info.get('fundingRate', 0))
+        
+        return OpenInterestData(
+            symbol=symbol,
+            exchange='bybit',
+            open_interest=float(oi_info.get('openInterest', 0)),
+            open_interest_value=float(oi_info.get('openInterestValue', 0)),
+            timestamp=datetime.now(),
+            price=price,
+            volume_24h=volume,
+            funding_rate=funding_rate
+        )
+    
+    def get_open_interest_history(self, symbol: str, limit: int) -> List[OpenInterestData]:
+        """Fetch a symbol's last `limit` 15-minute open interest samples, oldest first (backfill).
+        Bybit only reports contracts here, so values are priced at the current last price."""
+        url = f"{self.base_url}/v5/market/open-interest"
+        params = {"category": "linear", "symbol": symbol, "intervalTime": "15min", "limit": min(limit, 200)}
+        response = timed_get(self.session, 'bybit', 'open_interest_history', url, params)
+        if response.status_code != 200:
+            return []
+        data = response.json()
+        if data.get('retCode') != 0 or not data.get('result', {}).get('list'):
+            return []
+        
+        ticker_url = f"{self.base_url}/v5/market/tickers"
+        ticker_params = {"category": "linear", "symbol": symbol}
+        ticker_response = timed_get(self.session, 'bybit', 'ticker', ticker_url, ticker_params)
+        price = 0.0
+        if ticker_response.status_code == 200:
+            ticker_data = ticker_response.json()
+            if ticker_data.get('retCode') == 0 and ticker_data.get('result', {}).get('list'):
+                price = float(ticker_data['result']['list'][0].get('lastPrice', 0))
+        
+        return [
+            OpenInterestData(
+                symbol=symbol,
+                exchange='bybit',
+                open_interest=float(entry.get('openInterest', 0)),
+                open_interest_value=float(entry.get('openInterest', 0)) * price,
+                timestamp=datetime.fromtimestamp(int(entry['timestamp']) / 1000),
+                price=price
+            )
+            for entry in reversed(data['result']['list'])
+        ]
     
-    def get_open_interest_data(self) -> ExchangeOpenInterestData:
-        """Fetch open interest data from Bybit"""
+    def get_open_interest_data(self, symbols: Optional[List[str]] = None,
+                               on_record: Optional[Callable[[OpenInterestData], None]] = None) -> ExchangeOpenInterestData:
+        """Fetch open interest data from Bybit (for `symbols`, else the token list); on_record gets each record as soon as it is fetched"""
         try:
             open_interest_data = []
             
             # Get top symbols for monitoring
-            symbols = self.token_list if self.token_list else ["BTCUSDT", "ETHUSDT", "BNBUSDT", "ADAUSDT", "SOLUSDT", 
-                      "DOTUSDT", "DOGEUSDT", "AVAXUSDT", "MATICUSDT", "LINKUSDT"]
+            if symbols is None:
+                symbols = self.token_list if self.token_list else DEFAULT_SYMBOLS
             
             for symbol in symbols:
                 try:
-                    # Get open interest
-                    oi_url = f"{self.base_url}/v5/market/open-interest"
-                    oi_params = {"category": "linear", "symbol": symbol}
-                    oi_response = requests.get(oi_url, params=oi_params, timeout=10)
-                    
-                    if oi_response.status_code == 200:
-                        oi_data = oi_response.json()
-                        
-                        if oi_data.get('retCode') == 0 and oi_data.get('result', {}).get('list'):
-                            oi_info = oi_data['result']['list'][0]
-                            
-                            # Get ticker for price
-                            ticker_url = f"{self.base_url}/v5/market/tickers"
-                            ticker_params = {"category": "linear", "symbol": symbol}
-                            ticker_response = requests.get(ticker_url, params=ticker_params, timeout=10)
-                            
-                            price = 0.0
-                            volume = 0.0
-                            if ticker_response.status_code == 200:
-                                ticker_data = ticker_response.json()
-                                if ticker_data.get('retCode') == 0 and ticker_data.get('result', {}).get('list'):
-                                    ticker_info = ticker_data['result']['list'][0]
-                                    price = float(ticker_info.get('lastPrice', 0))
-                                    volume = float(ticker_info.get('turnover24h', 0))
-                            
-                            # Get funding rate
-                            funding_url = f"{self.base_url}/v5/market/funding/history"
-                            funding_params = {"category": "linear", "symbol": symbol, "limit": 1}
-                            funding_response = requests.get(funding_url, params=funding_params, timeout=10)
-                            
-                            funding_rate = None
-                            if funding_response.status_code == 200:
-                                funding_data = funding_response.json()
-                                if funding_data.get('retCode') == 0 and funding_data.get('result', {}).get('list'):
-                                    funding_info = funding_data['result']['list'][0]
-                                    funding_rate = float(funding_info.get('fundingRate', 0))
-                            
-                            oi_record = OpenInterestData(
-                                symbol=symbol,
-                                exchange='bybit',
-                                open_interest=float(oi_info.get('openInterest', 0)),
-                                open_interest_value=float(oi_info.get('openInterestValue', 0)),
-                                timestamp=datetime.now(),
-                                price=price,
-                                volume_24h=volume,
-                                funding_rate=funding_rate
-                            )
-                            
-                            open_interest_data.append(oi_record)
+                    oi_record = self.get_symbol_data(symbol)
+                    if oi_record:
+                        open_interest_data.append(oi_record)
+                        if on_record:
+                            on_record(oi_record)
                     
                 except Exception as e:
-                    logging.warning(f"Error fetching data for {symbol}: {e}")
+                    logging.warning(f"Error fetching data for {symbol}: {e}", extra={'symbol': symbol, 'exchange': 'bybit'})
                     continue
             
             return ExchangeOpenInterestData(
@@ -190,13 +433,19 @@ class OpenInterestAggregator:
         self.binance_service = BinanceOpenInterestService(token_list=token_list)
         self.bybit_service = BybitOpenInterestService(token_list=token_list)
     
+    def set_token_list(self, token_list: Optional[list]):
+        """Change the symbols polled from now on (config hot reload)"""
+        self.binance_service.token_list = token_list
+        self.bybit_service.token_list = token_list
+    
     def get_all_exchange_data(self) -> Dict[str, ExchangeOpenInterestData]:
         """Fetch open interest data from all supported exchanges"""
         results = {}
         
         # Fetch from Binance
         try:
-            binance_data = self.binance_service.get_open_interest_data()
+            with span('binance'):
+                binance_data = self.binance_service.get_open_interest_data()
             results['binance'] = binance_data
         except Exception as e:
             logging.error(f"Error fetching Binance data: {e}")
@@ -210,7 +459,8 @@ class OpenInterestAggregator:
         
         # Fetch from Bybit
         try:
-            bybit_data = self.bybit_service.get_open_interest_data()
+            with span('bybit'):
+                bybit_data = self.bybit_service.get_open_interest_data()
             results['bybit'] = bybit_data
         except Exception as e:
             logging.error(f"Error fetching Bybit data: {e}")
@@ -222,4 +472,57 @@ class OpenInterestAggregator:
                 error=str(e)
             )
         
+        return results
+
+    def get_symbols_data(self, symbols_by_exchange: Dict[str, List[str]]) -> Dict[str, ExchangeOpenInterestData]:
+        """Fetch only the given symbols from each exchange (adaptive polling)"""
+        results = {}
+        for exchange, service in (('binance', self.binance_service), ('bybit', self.bybit_service)):
+            with span(exchange):
+                results[exchange] = service.get_open_interest_data(symbols_by_exchange.get(exchange, []))
+        return results
+
+    def stream_exchange_data(self, on_record: Callable[[OpenInterestData], None],
+                             symbols_by_exchange: Optional[Dict[str, List[str]]] = None) -> Dict[str, ExchangeOpenInterestData]:
+        """Fetch all exchanges concurrently, handing each record to on_record (on a fetch thread) as soon as
+        it arrives; returns the same results as get_all_exchange_data (or get_symbols_data)"""
+        services = (('binance', self.binance_service), ('bybit', self.bybit_service))
+
+        def fetch(exchange, service):
+            symbols = symbols_by_exchange.get(exchange, []) if symbols_by_exchange is not None else None
+            try:
+                with span(exchange):
+                    return service.get_open_interest_data(symbols, on_record)
+            except Exception as e:
+                logging.error(f"Error fetching {exchange} data: {e}")
+                return ExchangeOpenInterestData(exchange=exchange, data=[], timestamp=datetime.now(), success=False,
+                                                error=str(e))
+
+        with ThreadPoolExecutor(max_workers=len(services)) as pool:
+            # Each thread runs in a copy of the caller's context so profiling spans and log context follow it
+            futures = {exchange: pool.submit(contextvars.copy_context().run, fetch, exchange, service)
+                       for exchange, service in services}
+            return {exchange: future.result() for exchange, future in futures.items()}
+
+    def get_history(self, symbols: List[str], limit: int) -> Dict[str, ExchangeOpenInterestData]:
+        """Fetch the recent open interest history of symbols from each exchange (backfill of added symbols)"""
+        results = {}
+        for exchange, service in (('binance', self.binance_service), ('bybit', self.bybit_service)):
+            records = []
+            for symbol in symbols:
+                try:
+                    records.extend(service.get_open_interest_history(symbol, limit))
+                except Exception as e:
+                    logging.warning(f"Error fetching {exchange} history for {symbol}: {e}",
+                                    extra={'symbol': symbol, 'exchange': exchange})
+            results[exchange] = ExchangeOpenInterestData(exchange=exchange, data=records, timestamp=datetime.now(),
+                                                         success=True)
+        return results
+
+    def get_universe_data(self) -> Dict[str, ExchangeOpenInterestData]:
+        """Fetch every linear perpetual from all supported exchanges (scanner mode)"""
+        results = {}
+        for exchange, service in (('binance', self.binance_service), ('bybit', self.bybit_service)):
+            with span(f"{exchange}.universe"):
+                results[exchange] = service.get_universe_data()
         return results 
\ No newline at end of file
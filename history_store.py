@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+Time-indexed history store for the Open Interest Monitor
+Every sample the monitor fetches is appended to a per-series segment of fixed-size binary
+records next to its data file (open_interest_data.history/raw/<exchange>/<symbol>/YYYYMMDD.seg);
+the retention tiers (retention.py) keep their windows in stores of the same shape. Segment
+names index the periods and records within a segment are sorted by time, so a range lookup
+picks its segments by name and binary-searches the first and last one; year-long ranges are
+answered in milliseconds and streamed chunk by chunk.
+
+    python3 history_store.py query --symbols BTCUSDT --from 2024-01-01 --resample 1h --agg ohlc
+    python3 history_store.py import --history open_interest_data.json
+    python3 history_store.py info
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from config import HISTORY_STORE_CHUNK
+from models import OpenInterestData
+
+RECORD = np.dtype([
+    ('timestamp', '<f8'),
+    ('open_interest', '<f8'),
+    ('open_interest_value', '<f8'),
+    ('price', '<f8'),
+    ('volume_24h', '<f8'),
+    ('funding_rate', '<f8'),
+])
+SEGMENT_SUFFIX = ".seg"
+SERIES_NAME = re.compile(r"^[A-Za-z0-9_.-]+$")
+INTERVAL_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+AGGREGATIONS = ("mean", "last", "max", "min", "ohlc")
+
+def parse_interval(value: str) -> int:
+    """'15m' -> 900 seconds"""
+    match = re.fullmatch(r"(\d+)([smhd])", value.strip())
+    if not match or int(match.group(1)) == 0:
+        raise ValueError(f"Invalid interval {value!r} (e.g. 1m, 15m, 1h, 1d)")
+    return int(match.group(1)) * INTERVAL_UNITS[match.group(2)]
+
+def parse_time(value: Optional[str]) -> Optional[datetime]:
+    """ISO 8601 or epoch seconds"""
+    if not value:
+        return None
+    try:
+        return datetime.fromtimestamp(float(value))
+    except ValueError:
+        return datetime.fromisoformat(value)
+
+def to_rows(records: Iterable[OpenInterestData]) -> np.ndarray:
+    """Pack samples into store records (NaN for missing values)"""
+    nan = float('nan')
+    return np.array([
+        (r.timestamp.timestamp(), r.open_interest, r.open_interest_value,
+         nan if r.price is None else r.price, nan if r.volume_24h is None else r.volume_24h,
+         nan if r.funding_rate is None else r.funding_rate)
+        for r in records
+    ], dtype=RECORD)
+
+def row_dicts(symbol: str, exchange: str, rows: np.ndarray) -> Iterator[Dict]:
+    """Store records as sample dicts"""
+    for ts, oi, oi_value, price, volume, funding in rows.tolist():
+        yield {'symbol': symbol, 'exchange': exchange, 'timestamp': datetime.fromtimestamp(ts),
+               'open_interest': oi, 'open_interest_value': oi_value, 'price': None if price != price else price,
+               'volume_24h': None if volume != volume else volume,
+               'funding_rate': None if funding != funding else funding}
+
+class HistoryStore:
+    """Append-only segment files per (exchange, symbol) and period, with range lookup by binary search"""
+
+    def __init__(self, root: str, dtype: np.dtype = RECORD, segment_format: str = '%Y%m%d'):
+        self.root = root
+        self.dtype = dtype  # Any record layout whose first field is a sorted 'timestamp'
+        self.segment_format = segment_format  # One segment per strftime period
+        self.last_timestamp: Dict[Tuple[str, str], float] = {}  # Newest stored record per series
+
+    def segment_key(self, timestamp: float) -> str:
+        return datetime.fromtimestamp(timestamp).strftime(self.segment_format)
+
+    def series_dir(self, exchange: str, symbol: str) -> str:
+        return os.path.join(self.root, exchange, symbol)
+
+    def series(self) -> List[Tuple[str, str]]:
+        """Every stored (exchange, symbol)"""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            (exchange, symbol)
+            for exchange in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, exchange))
+            for symbol in os.listdir(os.path.join(self.root, exchange))
+        )
+
+    def segments(self, exchange: str, symbol: str) -> List[str]:
+        """Segment keys of a series, oldest first"""
+        directory = self.series_dir(exchange, symbol)
+        if not SERIES_NAME.match(exchange) or not SERIES_NAME.match(symbol) or not os.path.isdir(directory):
+            return []
+        return sorted(name[:-len(SEGMENT_SUFFIX)] for name in os.listdir(directory) if name.endswith(SEGMENT_SUFFIX))
+
+    def segment_path(self, exchange: str, symbol: str, key: str) -> str:
+        return os.path.join(self.series_dir(exchange, symbol), f"{key}{SEGMENT_SUFFIX}")
+
+    def read_segment(self, exchange: str, symbol: str, key: str) -> np.ndarray:
+        path = self.segment_path(exchange, symbol, key)
+        size = os.path.getsize(path) // self.dtype.itemsize
+        if size == 0:
+            return np.empty(0, dtype=self.dtype)
+        return np.memmap(path, dtype=self.dtype, mode='r', shape=(size,))
+
+    def newest(self, exchange: str, symbol: str) -> float:
+        """Timestamp of a series' newest stored sample"""
+        key = (exchange, symbol)
+        if key not in self.last_timestamp:
+            segments = self.segments(exchange, symbol)
+            rows = self.read_segment(exchange, symbol, segments[-1]) if segments else []
+            self.last_timestamp[key] = float(rows[-1]['timestamp']) if len(rows) else float('-inf')
+        return self.last_timestamp[key]
+
+    def tail(self, exchange: str, symbol: str, count: int) -> np.ndarray:
+        """A series' newest `count` records, oldest first"""
+        parts: List[np.ndarray] = []
+        remaining = count
+        for key in reversed(self.segments(exchange, symbol)):
+            if remaining <= 0:
+                break
+            rows = self.read_segment(exchange, symbol, key)[-remaining:]
+            parts.insert(0, rows)
+            remaining -= len(rows)
+        return np.concatenate(parts) if parts else np.empty(0, dtype=self.dtype)
+
+    def append(self, records: Iterable[OpenInterestData]):
+        """Store new samples; samples older than a series' newest are merged in order"""
+        grouped: Dict[Tuple[str, str], List[OpenInterestData]] = defaultdict(list)
+        for record in records:
+            grouped[(record.exchange, record.symbol)].append(record)
+        for (exchange, symbol), batch in grouped.items():
+            self.append_rows(exchange, symbol, to_rows(batch))
+
+    def append_rows(self, exchange: str, symbol: str, rows: np.ndarray):
+        """Store one series' records, appending to segment files when they are newer than what is stored"""
+        if not len(rows) or not SERIES_NAME.match(exchange) or not SERIES_NAME.match(symbol):
+            return
+        keys = np.array([self.segment_key(ts) for ts in rows['timestamp'].tolist()])
+        for key in dict.fromkeys(keys.tolist()):
+            part = rows[keys == key]
+            newest = self.newest(exchange, symbol)
+            if part['timestamp'][0] > newest and np.all(np.diff(part['timestamp']) > 0):
+                os.makedirs(self.series_dir(exchange, symbol), exist_ok=True)
+                with open(self.segment_path(exchange, symbol, key), 'ab') as f:
+                    f.write(part.tobytes())
+            else:
+                self.merge(exchange, symbol, key, part)
+            self.last_timestamp[(exchange, symbol)] = max(newest, float(part['timestamp'].max()))
+
+    def merge(self, exchange: str, symbol: str, key: str, rows: np.ndarray):
+        """Rewrite one segment with extra rows, sorted by time (a later row wins on equal timestamps)"""
+        path = self.segment_path(exchange, symbol, key)
+        if os.path.exists(path):
+            rows = np.concatenate([np.array(self.read_segment(exchange, symbol, key)), rows])
+        rows = rows[np.argsort(rows['timestamp'], kind='stable')]
+        keep = np.append(rows['timestamp'][1:] != rows['timestamp'][:-1], True)
+        os.makedirs(self.series_dir(exchange, symbol), exist_ok=True)
+        tmp_file = f"{path}.tmp"
+        with open(tmp_file, 'wb') as f:
+            f.write(rows[keep].tobytes())
+        os.replace(tmp_file, path)
+
+    def scan(self, exchange: str, symbol: str, start: Optional[float] = None, end: Optional[float] = None,
+             chunk: int = HISTORY_STORE_CHUNK) -> Iterator[np.ndarray]:
+        """Stream a series' records in [start, end] as chunks of at most `chunk` rows"""
+        first = self.segment_key(start) if start is not None else None
+        last = self.segment_key(end) if end is not None else None
+        for key in self.segments(exchange, symbol):
+            if (first and key < first) or (last and key > last):
+                continue
+            rows = self.read_segment(exchange, symbol, key)
+            lo = int(np.searchsorted(rows['timestamp'], start, 'left')) if start is not None else 0
+            hi = int(np.searchsorted(rows['timestamp'], end, 'right')) if end is not None else len(rows)
+            for position in range(lo, hi, chunk):
+                yield rows[position:min(position + chunk, hi)]
+
+    def segment_files(self) -> List[Tuple[str, str, str, int]]:
+        """(key, exchange, symbol, bytes) of every segment"""
+        files = []
+        for exchange, symbol in self.series():
+            for key in self.segments(exchange, symbol):
+                files.append((key, exchange, symbol, os.path.getsize(self.segment_path(exchange, symbol, key))))
+        return files
+
+    def drop_segment(self, exchange: str, symbol: str, key: str):
+        os.remove(self.segment_path(exchange, symbol, key))
+        if not self.segments(exchange, symbol):
+            self.last_timestamp.pop((exchange, symbol), None)
+
+    def expire(self, cutoff: float) -> int:
+        """Delete segments whose whole period is older than the cutoff; return the bytes freed"""
+        first_kept = self.segment_key(cutoff)
+        freed = 0
+        for key, exchange, symbol, size in self.segment_files():
+            if key < first_kept:
+                self.drop_segment(exchange, symbol, key)
+                freed += size
+        return freed
+
+class Resampler:
+    """Interval-aligned OHLC/mean/count of the OI value over streamed chunks of samples or tier windows"""
+
+    def __init__(self, interval: int):
+        self.interval = interval
+        self.pending: Optional[Dict] = None  # Last window of the previous chunk, which may continue
+
+    def feed(self, rows: np.ndarray) -> Iterator[Dict]:
+        if not len(rows):
+            return
+        if 'count' in rows.dtype.names:
+            opens, highs, lows, closes = rows['open'], rows['high'], rows['low'], rows['close']
+            totals, counts = rows['total'], rows['count']
+        else:
+            opens = highs = lows = closes = totals = rows['open_interest_value']
+            counts = np.ones(len(rows))
+        window_ids = np.floor(rows['timestamp'] / self.interval).astype(np.int64)
+        starts = np.flatnonzero(np.r_[True, window_ids[1:] != window_ids[:-1]])
+        ends = np.r_[starts[1:], len(rows)]
+        highs = np.maximum.reduceat(highs, starts)
+        lows = np.minimum.reduceat(lows, starts)
+        totals = np.add.reduceat(totals, starts)
+        counts = np.add.reduceat(counts, starts)
+        for i in range(len(starts)):
+            window = {'window': int(window_ids[starts[i]]), 'open': float(opens[starts[i]]), 'high': float(highs[i]),
+                      'low': float(lows[i]), 'close': float(closes[ends[i] - 1]), 'total': float(totals[i]),
+                      'count': int(counts[i])}
+            if self.pending is not None:
+                if self.pending['window'] == window['window']:
+                    window = {'window': window['window'], 'open': self.pending['open'],
+                              'high': max(self.pending['high'], window['high']),
+                              'low': min(self.pending['low'], window['low']), 'close': window['close'],
+                              'total': self.pending['total'] + window['total'],
+                              'count': self.pending['count'] + window['count']}
+                else:
+                    yield self.finish(self.pending)
+            self.pending = window
+
+    def flush(self) -> Iterator[Dict]:
+        if self.pending is not None:
+            yield self.finish(self.pending)
+            self.pending = None
+
+    def finish(self, window: Dict) -> Dict:
+        start = window['window'] * self.interval
+        return {
+            'window_start': datetime.fromtimestamp(start),
+            'window_end': datetime.fromtimestamp(start + self.interval),
+            'open': window['open'],
+            'high': window['high'],
+            'low': window['low'],
+            'close': window['close'],
+            'mean': window['total'] / window['count'],
+            'count': window['count'],
+        }
+
+def query(history, symbols: List[str], exchange: Optional[str] = None, start: Optional[datetime] = None,
+          end: Optional[datetime] = None, interval: Optional[int] = None, agg: str = "mean") -> Iterator[Dict]:
+    """Stream rows for the symbols (every stored exchange unless one is given) from a RetentionManager:
+    raw samples, or windows resampled from the coarsest tier that fits the interval"""
+    start_ts = start.timestamp() if start else None
+    end_ts = end.timestamp() if end else None
+    exchanges = [exchange] if exchange else sorted({e for e, _ in history.raw.series()})
+    for symbol in symbols:
+        for series_exchange in exchanges:
+            if interval is None:
+                for rows in history.raw.scan(series_exchange, symbol, start_ts, end_ts):
+                    yield from row_dicts(symbol, series_exchange, rows)
+                continue
+            resampler = Resampler(interval)
+            for rows in history.window_scan(series_exchange, symbol, start_ts, end_ts, interval):
+                for window in resampler.feed(rows):
+                    yield aggregate_row(symbol, series_exchange, window, agg)
+            for window in resampler.flush():
+                yield aggregate_row(symbol, series_exchange, window, agg)
+
+def aggregate_row(symbol: str, exchange: str, window: Dict, agg: str) -> Dict:
+    row = {'symbol': symbol, 'exchange': exchange, 'window_start': window['window_start']}
+    if agg == "ohlc":
+        row.update({'open': window['open'], 'high': window['high'], 'low': window['low'], 'close': window['close']})
+    else:
+        row[agg] = window[{'last': 'close', 'max': 'high', 'min': 'low', 'mean': 'mean'}[agg]]
+    row['count'] = window['count']
+    return row
+
+def write_rows(rows: Iterator[Dict], output_format: str, out):
+    """Write streamed rows as CSV, JSON lines or a fixed-width table"""
+    writer = None
+    for row in rows:
+        if output_format == "jsonl":
+            out.write(json.dumps(row, default=lambda value: value.isoformat()) + "\n")
+            continue
+        values = {key: value.strftime('%Y-%m-%d %H:%M:%S') if isinstance(value, datetime) else value
+                  for key, value in row.items()}
+        if writer is None:
+            if output_format == "csv":
+                writer = csv.DictWriter(out, fieldnames=list(values))
+                writer.writeheader()
+            else:
+                writer = list(values)
+                out.write(" ".join(f"{key:>19}" if key in ('timestamp', 'window_start') else f"{key:>16}"
+                                   for key in writer) + "\n")
+        if output_format == "csv":
+            writer.writerow(values)
+        else:
+            out.write(" ".join(
+                f"{value:>19}" if key in ('timestamp', 'window_start')
+                else f"{value:>16,.2f}" if isinstance(value, float)
+                else f"{'-' if value is None else value:>16}"
+                for key, value in values.items()
+            ) + "\n")
+
+def main():
+    parser = argparse.ArgumentParser(description="Query and maintain the monitor's time-indexed history store")
+    parser.add_argument('--dir', default="open_interest_data.history", help='History store (next to the data file)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    query_parser = commands.add_parser('query', help='Stream history for symbols and a time range')
+    query_parser.add_argument('--symbols', nargs='+', required=True, help='Symbols, e.g. BTCUSDT ETHUSDT')
+    query_parser.add_argument('--exchange', help='Only this exchange')
+    query_parser.add_argument('--from', dest='start', help='Start (ISO 8601 or epoch seconds)')
+    query_parser.add_argument('--to', dest='end', help='End, inclusive (ISO 8601 or epoch seconds)')
+    query_parser.add_argument('--resample', help='Window size, e.g. 1m, 15m, 1h, 1d (raw samples if omitted)')
+    query_parser.add_argument('--agg', choices=AGGREGATIONS, default="mean", help='Aggregation of each window')
+    query_parser.add_argument('--format', choices=("table", "csv", "jsonl"), default="table", help='Output format')
+    query_parser.add_argument('--output', help='Write to this file instead of stdout')
+
+    import_parser = commands.add_parser('import', help='Load a history JSON, checkpoint or shard directory into the store')
+    import_parser.add_argument('--history', required=True, help='History source (same as replay.py --history)')
+
+    commands.add_parser('info', help="Show each retention tier's series, size and span")
+    args = parser.parse_args()
+    from retention import RetentionManager  # Deferred: retention builds on this module
+    history = RetentionManager(args.dir)
+
+    if args.command == 'import':
+        from replay import load_history_source  # Deferred: pulls in the monitor
+        source_dir = f"{os.path.splitext(args.history)[0]}.history"
+        if os.path.abspath(source_dir) == os.path.abspath(args.dir) or os.path.abspath(args.history) == os.path.abspath(args.dir):
+            print(f"❌ {args.history} is already stored in {args.dir}")
+            sys.exit(1)
+        source = load_history_source(args.history)
+        for records in source.values():
+            history.append(sorted(records, key=lambda r: r.timestamp))
+        history.enforce()
+        print(f"✅ Imported {sum(len(records) for records in source.values()):,} samples of {len(source)} symbols "
+              f"into {args.dir}")
+        return
+    if args.command == 'info':
+        for tier in history.tiers:
+            files = tier.store.segment_files()
+            keys = sorted(key for key, _, _, _ in files)
+            span = f"{keys[0]}..{keys[-1]}" if keys else "empty"
+            retention = f"{tier.retention / 86400:g}d" if tier.retention else "forever"
+            print(f"{tier.name:<4} keeps {retention:<8} {len(tier.store.series()):>6} series "
+                  f"{sum(size for _, _, _, size in files) / 1024 ** 2:>10.1f} MB  {span}")
+        return
+
+    try:
+        start, end = parse_time(args.start), parse_time(args.end)
+        interval = parse_interval(args.resample) if args.resample else None
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    started = time.perf_counter()
+    out = open(args.output, 'w', newline='') if args.output else sys.stdout
+    try:
+        write_rows(query(history, [symbol.upper() for symbol in args.symbols], args.exchange, start, end, interval,
+                         args.agg), args.format, out)
+    finally:
+        if args.output:
+            out.close()
+            print(f"✅ Wrote {args.output} in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""
+Prometheus-style metrics for the Open Interest Monitor
+Counters, gauges and histograms rendered in the Prometheus text format and served on a
+local /metrics endpoint.
+
+Hot-path updates take no locks: each labelled series is a small object whose fields are
+bumped in place. Every series has a single writer in practice (the event loop, or the fetch
+thread for exchange requests), so under the GIL updates are not lost, and a scrape at worst
+sees a histogram's sum and count one observation apart.
+"""
+
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+def _format_labels(labelnames: Sequence[str], labelvalues: Tuple, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{str(value)}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    """Base class: a named metric family with labelled series"""
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[Tuple, object] = {}
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _child(self, labels: Dict) -> object:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        child = self._series.get(key)
+        if child is None:
+            # setdefault keeps the first child if two threads race to create it
+            child = self._series.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def remove(self, **labels):
+        """Stop exporting a labelled series (e.g. a symbol that is no longer monitored)"""
+        self._series.pop(tuple(str(labels.get(name, "")) for name in self.labelnames), None)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in list(self._series.items()):
+            lines.extend(self._render_child(key, child))
+        return lines
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0, **labels):
+        self._child(labels).value += amount
+
+    def get(self, **labels) -> float:
+        return self._child(labels).value
+
+    def _render_child(self, key, child):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"]
+
+class Gauge(_Metric):
+    """Value that can go up and down, or be computed at scrape time"""
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self._functions: Dict[Tuple, Callable[[], float]] = {}
+
+    def _new_child(self):
+        return _Value()
+
+    def set(self, value: float, **labels):
+        self._child(labels).value = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        self._child(labels).value += amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self._child(labels).value -= amount
+
+    def get(self, **labels) -> float:
+        return self._child(labels).value
+
+    def set_function(self, func: Callable[[], float], **labels):
+        """Compute this series lazily at scrape time (keeps expensive sizes off the hot path)"""
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        self._functions[key] = func
+        self._series.setdefault(key, _Value())
+
+    def _render_child(self, key, child):
+        value = child.value
+        func = self._functions.get(key)
+        if func is not None:
+            try:
+                value = func()
+            except Exception as e:
+                logging.warning(f"Error computing gauge {self.name}: {e}")
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"]
+
+class _HistogramValue:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+class Histogram(_Metric):
+    """Distribution of observations in fixed buckets"""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramValue(len(self.buckets) + 1)
+
+    def observe(self, value: float, **labels):
+        child = self._child(labels)
+        child.counts[bisect.bisect_left(self.buckets, value)] += 1
+        child.sum += value
+        child.count += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of a with-block"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def get_count(self, **labels) -> int:
+        return self._child(labels).count
+
+    def _render_child(self, key, child):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), child.counts):
+            cumulative += count
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', _format_value(float(bound))))} {cumulative}")
+        lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(child.sum)}")
+        lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {child.count}")
+        return lines
+
+class MetricsRegistry:
+    """Collection of metric families rendered together"""
+
+    def __init__(self):
+        self.metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self.metrics[metric.name] = metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = MetricsRegistry()
+
+# --- Monitor metrics ---
+CYCLE_SECONDS = Histogram("oi_cycle_seconds", "Duration of a full monitoring cycle")
+CYCLE_PHASE_SECONDS = Histogram("oi_cycle_phase_seconds", "Duration of each monitoring cycle phase", ["phase"])
+CYCLES_TOTAL = Counter("oi_cycles_total", "Monitoring cycles run", ["status"])
+EXCHANGE_REQUEST_SECONDS = Histogram("oi_exchange_request_seconds", "Exchange API request latency",
+                                     ["exchange", "endpoint"],
+                                     buckets=(0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0))
+EXCHANGE_REQUEST_ERRORS = Counter("oi_exchange_request_errors_total", "Failed or non-200 exchange API requests",
+                                  ["exchange", "endpoint"])
+ALERTS_TOTAL = Counter("oi_alerts_total", "Alerts generated", ["type", "severity"])
+NOTIFIER_QUEUE_DEPTH = Gauge("oi_notifier_queue_depth", "Telegram messages currently being sent")
+NOTIFICATIONS_TOTAL = Counter("oi_notifications_total", "Telegram messages attempted", ["status"])
+HISTORY_SERIES = Gauge("oi_history_series", "Series held in the in-memory history store")
+HISTORY_RECORDS = Gauge("oi_history_records", "Records held in the in-memory history store")
+HISTORY_FILE_BYTES = Gauge("oi_history_file_bytes", "Size of the persisted history file")
+SCHEDULER_LATENESS_SECONDS = Histogram("oi_scheduler_lateness_seconds", "Delay between a job's boundary and its start",
+                                       ["job"], buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0, 60.0))
+SCHEDULER_SKIPPED_TOTAL = Counter("oi_scheduler_skipped_total", "Boundaries skipped because a run was in progress", ["job"])
+SAMPLER_RATE = Gauge("oi_sampler_rate_per_minute", "Effective per-symbol sampling rate under adaptive polling",
+                     ["symbol", "exchange"])
+SAMPLER_PLANNED_RPM = Gauge("oi_sampler_planned_requests_per_minute", "Requests per minute the sampling plan spends",
+                            ["exchange"])
+SAMPLER_DEFERRED_TOTAL = Counter("oi_sampler_deferred_total", "Due samples deferred to a later tick by the request budget",
+                                 ["exchange"])
+SCANNER_SERIES = Gauge("oi_scanner_series", "Perpetual series seen by the universe scanner in its last scan", ["exchange"])
+SCANNER_PROMOTED = Gauge("oi_scanner_promoted", "Symbols the scanner has promoted into detailed monitoring")
+QUERY_REQUESTS_TOTAL = Counter("oi_query_requests_total", "Query API requests by cache result",
+                               ["endpoint", "result"])
+HISTORY_TIER_BYTES = Gauge("oi_history_tier_bytes", "Disk used by each history retention tier", ["tier"])
+HISTORY_LATE_SAMPLES = Counter("oi_history_late_samples_total",
+                               "Samples older than a tier's open window, kept raw but not rolled up")
+PIPELINE_ITEMS_TOTAL = Counter("oi_pipeline_items_total", "Items each monitoring pipeline stage has processed", ["stage"])
+PIPELINE_QUEUE_DEPTH = Gauge("oi_pipeline_queue_depth", "Items waiting in each monitoring pipeline stage's queue", ["stage"])
+PIPELINE_DROPPED_TOTAL = Counter("oi_pipeline_dropped_total", "Unusable samples dropped by the normalize stage",
+                                 ["exchange"])
+PIPELINE_PERSIST_SUPERSEDED = Counter("oi_pipeline_persist_superseded_total",
+                                      "Background writes replaced by a newer state before they started")
+DERIVED_QUADRANT_SERIES = Gauge("oi_derived_quadrant_series", "Series in each OI/price quadrant", ["quadrant"])
+BOT_COMMANDS_TOTAL = Counter("oi_bot_commands_total", "Telegram bot commands handled", ["command", "status"])
+BOT_REPLY_SECONDS = Histogram("oi_bot_reply_seconds", "Time from receiving a bot command to its reply being sent",
+                              buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5))
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes are not worth a log line each
+
+_server: Optional[ThreadingHTTPServer] = None
+
+def start_metrics_server(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve /metrics from a daemon thread (once per process)"""
+    global _server
+    if _server is None:
+        _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        thread = threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True)
+        thread.start()
+        logging.info(f"Metrics endpoint listening on http://{host}:{_server.server_address[1]}/metrics")
+    return _server
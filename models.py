@@ -1,5 +1,5 @@
-from dataclasses import dataclass
-from typing import Optional, Dict, List
+from dataclasses import dataclass, field
+from typing import Optional, Dict, List, Tuple, Union
 from datetime import datetime
 import json
 
@@ -22,10 +22,13 @@ class OpenInterestAlert:
     exchange: str
     current_oi: float
     previous_oi: float
-    percentage_change: float
+    percentage_change: Optional[float]  # % OI change; None for declared rules on other metrics
     timestamp: datetime
-    alert_type: str  # "spike" or "drop"
+    alert_type: str  # "spike" or "drop" ("avg_" prefixed for average deviation), "metric" for other metrics
     severity: str  # "high", "medium", "low"
+    rule: Optional[str] = None  # Name of the declared rule that raised it (rule engine only)
+    metric: Optional[str] = None  # Metric of a declared rule that is not a % OI change (e.g. oi_volume_ratio)...
+    metric_value: Optional[float] = None  # ...and its value
 
 @dataclass
 class ExchangeOpenInterestData:
@@ -36,6 +39,106 @@ class ExchangeOpenInterestData:
     success: bool
     error: Optional[str] = None
 
+@dataclass
+class WindowAverageSpike:
+    """Data structure for a 15-min window average spike"""
+    symbol: str
+    old_avg: float
+    new_avg: float
+    ratio: float
+    window_start: datetime
+    window_end: datetime
+
+@dataclass
+class MonitoringCycleResult:
+    """Data structure for the outcome of a single monitoring cycle"""
+    timestamp: datetime
+    success: bool
+    total_symbols: int = 0
+    alerts: List[OpenInterestAlert] = field(default_factory=list)
+    window_spikes: List[WindowAverageSpike] = field(default_factory=list)
+    latest_data: Dict[str, OpenInterestData] = field(default_factory=dict)  # symbol -> latest record
+    duration: float = 0.0  # seconds
+    error: Optional[str] = None
+    regime: Optional["MarketRegime"] = None  # Set when the cycle started a market-wide move
+    exchange_data: Dict[str, ExchangeOpenInterestData] = field(default_factory=dict)  # The cycle's samples per exchange
+
+@dataclass
+class MarketRegime:
+    """Cross-sectional view of one cycle's OI changes"""
+    timestamp: datetime
+    regime: str  # "normal", "deleveraging" or "leveraging"
+    series: int  # (symbol, exchange) series with a change this cycle
+    median_change: float  # %
+    dispersion: float  # Robust standard deviation of the changes, %
+    breadth: float  # Share of series moving with the median
+    abnormal: List[Tuple[str, str, float, float]] = field(default_factory=list)  # (symbol, exchange, change %, z-score)
+    suppressed: int = 0  # Alerts withheld because their series moved with the market
+
+@dataclass
+class AlertRule:
+    """A declarative alert rule from a token config"""
+    name: str
+    metric: str  # "pct_change", "pct_from_mean", "window_avg_ratio" or a derived metric (derived_metrics.py)
+    window: int  # Samples back for pct_change / pct_from_mean, minutes for window_avg_ratio
+    comparator: str  # "gt", "gte", "lt", "lte", "abs_gt" or "abs_gte"
+    threshold: float
+    severity: Union[str, Dict[str, float], None] = None  # Fixed level or {"medium": %, "high": %}; None uses SEVERITY_*
+    cooldown: Optional[float] = None  # Seconds; defaults to ALERT_COOLDOWN
+    quadrants: Optional[Tuple[str, ...]] = None  # Only fire for series in these OI/price quadrants
+
+@dataclass
+class ReplayConfig:
+    """Detection parameters for one replay run"""
+    spike_threshold: float
+    severity_medium: float
+    severity_high: float
+    window_spike_ratio: float
+    alert_cooldown: float
+    rules_file: Optional[str] = None  # Token config whose declared rules replace the built-in ones
+    market_regime: bool = True  # Collapse market-wide moves into one regime alert
+
+@dataclass
+class ReplayAlert:
+    """An alert raised during replay, stamped with the simulated cycle time"""
+    cycle_time: datetime
+    symbol: str
+    rule: str  # "change", "average", "window", "regime" or a declared rule name
+    alert_type: str
+    severity: str
+    percentage_change: Optional[float]  # None for declared rules on metrics other than a % OI change
+
+@dataclass
+class SeriesSnapshot:
+    """Latest sample and derived statistics of one (symbol, exchange) series, as published by the monitor"""
+    symbol: str
+    exchange: str
+    timestamp: datetime
+    open_interest: float
+    open_interest_value: float  # in USD
+    price: Optional[float]
+    volume_24h: Optional[float]
+    funding_rate: Optional[float]
+    avg_oi: Optional[float]  # Historical average OI value of the symbol
+    pct_change: Optional[float]  # % change from the series' previous sample
+    pct_from_avg: Optional[float]  # % from avg_oi
+    avg_15min: Optional[float]  # Latest 15-min window average of the symbol
+    samples: int  # Samples of the series in the monitor's history
+    # Derived metrics (derived_metrics.py)
+    price_change: Optional[float] = None  # % change of the price from the previous sample
+    quadrant: Optional[str] = None  # OI/price regime: long_buildup, short_buildup, short_covering, long_unwinding, neutral
+    oi_volume_ratio: Optional[float] = None  # OI value / 24h quote volume
+    funding_oi: Optional[float] = None  # OI value x funding rate (USD per funding interval)
+    funding_oi_ewma: Optional[float] = None
+    contract_divergence: Optional[float] = None  # % change of contracts minus % change of notional
+
+@dataclass
+class MonitorSnapshot:
+    """A consistent copy of the monitor's snapshot segment"""
+    published_at: datetime
+    cycle: int
+    series: List[SeriesSnapshot] = field(default_factory=list)
+
 class OpenInterestDataEncoder(json.JSONEncoder):
     """Custom JSON encoder for datetime objects"""
     def default(self, obj):
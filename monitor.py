@@ -1,55 +1,302 @@
 import asyncio
+import atexit
 import logging
 import json
 import os
+import pickle
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
-from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from collections import defaultdict, deque
+from contextlib import contextmanager
 import sys
 import csv
-import pandas as pd
-
-from config import SPIKE_THRESHOLD, MONITORING_INTERVAL
-from models import OpenInterestData, OpenInterestAlert, OpenInterestDataEncoder
-from exchange_service import OpenInterestAggregator
-from telegram_service import send_telegram_message, format_open_interest_alert, format_summary_message
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('open_interest_monitor.log'),
-        logging.StreamHandler()
-    ]
-)
+import time
+
+from config import (SPIKE_THRESHOLD, MONITORING_INTERVAL, SCHEDULE_OFFSET, ALERT_COOLDOWN, METRICS_PORT,
+                    SEVERITY_MEDIUM, SEVERITY_HIGH, WINDOW_SPIKE_RATIO, ADAPTIVE_POLLING, SAMPLER_TICK,
+                    QUERY_API_PORT, RECENT_ALERTS, SUPPORTED_EXCHANGES, LOG_FILE, PIPELINE_FLUSH_TIMEOUT, COMMAND_BOT)
+from models import (OpenInterestData, OpenInterestAlert, OpenInterestDataEncoder, WindowAverageSpike, MonitoringCycleResult,
+                    ExchangeOpenInterestData, MarketRegime, SeriesSnapshot)
+from derived_metrics import QUADRANTS, DerivedMetrics
+from exchange_service import OpenInterestAggregator, DEFAULT_SYMBOLS
+from telegram_service import (send_telegram_message, format_open_interest_alert, format_summary_message,
+                              format_market_regime_alert, format_rule_metric_alert)
+from wallclock_scheduler import WallClockScheduler
+from metrics import (ALERTS_TOTAL, CYCLE_PHASE_SECONDS, CYCLE_SECONDS, CYCLES_TOTAL, DERIVED_QUADRANT_SERIES,
+                     HISTORY_FILE_BYTES, HISTORY_RECORDS, HISTORY_SERIES, start_metrics_server)
+from pipeline import BackgroundPersister, CyclePipeline
+from profiling import CycleProfiler, span
+from snapshot import SnapshotWriter
+from structured_logging import pop_log_context, push_log_context, setup_logging
+
+CHECKPOINT_VERSION = 1
+HISTORY_DEPTH = 10  # Samples kept per symbol (declared rules may need more)
+# Optional token-config thresholds and their defaults; edits to a running monitor's config apply live
+CONFIG_SETTINGS = {
+    'spike_threshold': SPIKE_THRESHOLD,
+    'severity_medium': SEVERITY_MEDIUM,
+    'severity_high': SEVERITY_HIGH,
+    'window_spike_ratio': WINDOW_SPIKE_RATIO,
+    'alert_cooldown': ALERT_COOLDOWN,
+}
+
+DEFAULT_CONFIG = "tokens_config.json"
+
+def config_data_files(config_path: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """Data and CSV files of a monitor for a token config: per-token configs get their own (milk.json ->
+    open_interest_data_milk.json), so each process is the single writer of its history, checkpoint
+    and snapshot segment; the multi-token config keeps the default files"""
+    if not config_path or os.path.basename(config_path) == DEFAULT_CONFIG:
+        return None, None
+    name = os.path.splitext(os.path.basename(config_path))[0]
+    return f"open_interest_data_{name}.json", f"open_interest_15min_averages_{name}.csv"
+
+# Configure logging (queued JSON lines to a rotating file; no-op if the importer configured logging)
+setup_logging(LOG_FILE)
 
 class OpenInterestMonitor:
     """Monitor open interest changes and generate alerts"""
     
-    def __init__(self, token_json_path=None):
-        self.token_list = self.load_token_list(token_json_path) if token_json_path else None
-        self.token_names = self.extract_token_names(token_json_path) if token_json_path else None
+    def __init__(self, token_json_path=None, token_list=None, data_file=None, csv_file=None, load_history=True):
+        if token_list:
+            self.token_list = list(token_list)
+            self.token_names = [symbol.replace('USDT', '') for symbol in self.token_list]
+        else:
+            self.token_list = self.load_token_list(token_json_path) if token_json_path else None
+            self.token_names = self.extract_token_names(token_json_path) if token_json_path else None
+        self.spike_threshold = SPIKE_THRESHOLD
+        self.severity_medium = SEVERITY_MEDIUM
+        self.severity_high = SEVERITY_HIGH
+        self.window_spike_ratio = WINDOW_SPIKE_RATIO
+        self.alert_cooldown = ALERT_COOLDOWN
+        self.clock = time.time  # Alert cooldowns use this clock; replay substitutes simulated time
+        self.config_path = token_json_path
+        self.config_mtime = None  # mtime of config_path when it was last applied
+        self.history_depth = HISTORY_DEPTH
+        self.rule_engine = None  # Declarative rules from the token config, if it declares any
+        self.detect_regimes = True  # Collapse market-wide moves into one regime alert
+        self.regime_detector = None  # Created on the first cycle
+        self.market_regime: Optional[MarketRegime] = None  # Latest cycle's classification
+        self.sampler = None  # Adaptive per-symbol polling, if enabled
+        self.persisted_interval = None  # MONITORING_INTERVAL bucket last persisted by an adaptive tick
+        self.fence = None  # Returns False once another writer owns this monitor's data (shard_lease.py)
         self.aggregator = OpenInterestAggregator(self.token_list)
         self.historical_data = defaultdict(list)  # symbol -> list of historical data
-        self.alerts_sent = set()  # Track sent alerts to avoid duplicates
-        self.data_file = "open_interest_data.json"
-        self.alerts_file = "open_interest_alerts.json"
+        self.derived = DerivedMetrics()  # Per-series derived metrics, updated with every sample
+        self.alerts_sent = {}  # alert_key -> time sent, to avoid duplicates within ALERT_COOLDOWN
+        self.muted = {}  # symbol -> clock time until which its alerts are detected but not sent (/mute)
+        # Per-token configs get their own files unless the caller picks them (see config_data_files)
+        config_data_file, config_csv_file = config_data_files(token_json_path)
+        self.data_file = data_file or config_data_file or "open_interest_data.json"
+        self.csv_file = csv_file or config_csv_file or "open_interest_15min_averages.csv"
+        self.checkpoint_file = f"{os.path.splitext(self.data_file)[0]}.ckpt"
+        self.snapshot_file = f"{os.path.splitext(self.data_file)[0]}.snap"
+        self.snapshot_writer = None  # Created on the first publish
+        self.history_dir = f"{os.path.splitext(self.data_file)[0]}.history"
+        self.retention = None  # Retention tiers of the history store, created on the first cycle
+        self.history_store = None  # Their raw tier
+        self.alert_log = f"{os.path.splitext(self.data_file)[0]}.alerts.jsonl"  # Every alert, for report hit rates
+        self.recent_alerts = deque(maxlen=RECENT_ALERTS)  # Alert dicts for the query API, oldest first
+        self.data_version = 0  # Bumped after every cycle; the query API keys its cache and ETags on it
         self.historical_averages = {}  # symbol -> historical average
         self.last_15min_averages = {}  # symbol -> last 15-min average
         self.last_15min_window = {}    # symbol -> (start, end) of last 15-min window
         self.last_15min_avg_per_symbol = {}  # symbol -> (last_window_end, last_avg)
+        self.scheduler = WallClockScheduler()
+        self.profiler = CycleProfiler()
+        self.pipeline = CyclePipeline(self)
+        self.persister = BackgroundPersister(self.persist)  # Writes the CSV, JSON history and checkpoint off the cycle
+        atexit.register(self.persister.flush, PIPELINE_FLUSH_TIMEOUT)
+        self.register_metrics()
+        if token_json_path:
+            try:
+                self.config_mtime = os.path.getmtime(token_json_path)
+                self.apply_settings(self.parse_settings(token_json_path))
+            except (OSError, ValueError, TypeError) as e:
+                logging.error(f"Error loading settings from {token_json_path}: {e}")
+            self.load_rule_engine(token_json_path)
         
         if self.token_list:
             logging.info(f"Monitoring specific tokens: {self.token_list}")
         else:
             logging.info("Monitoring default token list")
         
-        # Load existing data if available
-        self.load_historical_data()
-        self.calculate_historical_averages()
+        # Load existing data if available (the checkpoint skips parsing the JSON history)
+        if load_history and not self.load_checkpoint():
+            self.load_historical_data()
+            self.calculate_historical_averages()
+            self.derived.warm(record for records in self.historical_data.values() for record in records)
     
-    def load_token_list(self, json_path):
+    def register_metrics(self):
+        """Expose history store size as scrape-time gauges"""
+        HISTORY_SERIES.set_function(lambda: len(self.historical_data))
+        HISTORY_RECORDS.set_function(lambda: sum(len(records) for records in self.historical_data.values()))
+        HISTORY_FILE_BYTES.set_function(lambda: os.path.getsize(self.data_file) if os.path.exists(self.data_file) else 0)
+        for quadrant in QUADRANTS:
+            DERIVED_QUADRANT_SERIES.set_function(lambda quadrant=quadrant: self.derived.quadrant_counts()[quadrant],
+                                                 quadrant=quadrant)
+
+    def load_rule_engine(self, json_path: str):
+        """Evaluate alerts with the declarative rule engine if the token config declares rules"""
+        try:
+            with open(json_path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if isinstance(data, dict) and data.get('rules'):
+            from rules import RuleEngine  # Deferred: numpy is only needed once rules are declared
+            self.rule_engine = RuleEngine(json_path, (self.severity_medium, self.severity_high),
+                                          self.sampler.min_interval if self.sampler else MONITORING_INTERVAL)
+            self.history_depth = max(HISTORY_DEPTH, self.rule_engine.plan.depth)
+
+    @staticmethod
+    def parse_settings(json_path: str) -> Dict[str, float]:
+        """The CONFIG_SETTINGS values of a token config, defaulting the ones it does not set"""
+        with open(json_path, 'r') as f:
+            data = json.load(f)
+        settings = data if isinstance(data, dict) else {}
+        return {name: float(settings.get(name, default)) for name, default in CONFIG_SETTINGS.items()}
+
+    def apply_settings(self, settings: Dict[str, float]) -> List[str]:
+        """Set the config thresholds; return the ones that changed"""
+        changed = []
+        for name, value in settings.items():
+            if getattr(self, name) != value:
+                setattr(self, name, value)
+                changed.append(f"{name}={value:g}")
+        if self.sampler:
+            self.sampler.spike_threshold = self.spike_threshold
+        return changed
+
+    async def reload_config_if_changed(self) -> bool:
+        """Apply edits to the token config: subscribe added symbols, release removed ones and change thresholds
+        and rules, keeping the state of every unchanged symbol; an invalid config keeps the previous settings"""
+        if not self.config_path:
+            return False
+        try:
+            mtime = os.path.getmtime(self.config_path)
+        except OSError as e:
+            logging.error(f"Cannot read token config {self.config_path}: {e}")
+            return False
+        if mtime == self.config_mtime:
+            return False
+        self.config_mtime = mtime
+        try:
+            settings = self.parse_settings(self.config_path)
+            token_list = self.load_token_list(self.config_path)
+            if not token_list:
+                raise ValueError("no symbols")
+        except (OSError, ValueError, TypeError) as e:
+            logging.error(f"Invalid token config {self.config_path}, keeping previous settings: {e}")
+            return False
+        changed = self.apply_settings(settings)
+        self.token_names = self.extract_token_names(self.config_path)
+        added, removed = await self.set_token_list(token_list)
+        self.reload_rules()
+        logging.info(f"Reloaded {self.config_path}: added {added or 'none'}, removed {removed or 'none'}, "
+                     f"changed {', '.join(changed) or 'no thresholds'}")
+        return True
+
+    def reload_rules(self):
+        """Follow the config's rules: load them when first declared, drop the engine when they are removed"""
+        try:
+            with open(self.config_path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if not (isinstance(data, dict) and data.get('rules')):
+            if self.rule_engine is not None:
+                logging.info(f"{self.config_path} no longer declares rules; using the built-in alerts")
+                self.rule_engine = None
+                self.history_depth = HISTORY_DEPTH
+            return
+        try:
+            if self.rule_engine is None:
+                self.load_rule_engine(self.config_path)
+            else:
+                self.rule_engine.default_severity = (self.severity_medium, self.severity_high)
+                self.rule_engine.reload_if_changed()
+        except (OSError, ValueError) as e:
+            logging.error(f"Invalid rules in {self.config_path}, keeping the built-in alerts: {e}")
+            return
+        self.history_depth = max(HISTORY_DEPTH, self.rule_engine.plan.depth)
+
+    async def set_token_list(self, token_list: List[str]) -> Tuple[List[str], List[str]]:
+        """Change the monitored symbols in place: backfill the added ones and release the removed ones.
+        Returns (added, removed)."""
+        previous = self.token_list or DEFAULT_SYMBOLS
+        added = [symbol for symbol in token_list if symbol not in previous]
+        removed = [symbol for symbol in previous if symbol not in token_list]
+        self.token_list = list(token_list)
+        self.aggregator.set_token_list(self.token_list)
+        self.release_symbols(removed)
+        if added:
+            # Backfill may call the exchanges, so it runs in a thread like the cycle's fetch
+            try:
+                await asyncio.to_thread(self.backfill_symbols, added)
+            except Exception as e:
+                logging.error(f"Error backfilling {added}: {e}")
+        return added, removed
+
+    def release_symbols(self, symbols: List[str]):
+        """Drop the in-memory state of symbols that are no longer monitored; their stored history is kept"""
+        for symbol in symbols:
+            for state in (self.historical_data, self.historical_averages, self.last_15min_averages,
+                          self.last_15min_window, self.last_15min_avg_per_symbol):
+                state.pop(symbol, None)
+            self.derived.release(symbol)
+            if self.retention:
+                self.retention.release(symbol)
+        if self.regime_detector:
+            self.regime_detector.release(symbols)
+        prefixes = tuple(f"{symbol}_" for symbol in symbols)
+        if prefixes:
+            self.alerts_sent = {key: sent for key, sent in self.alerts_sent.items() if not key.startswith(prefixes)}
+
+    def backfill_symbols(self, symbols: List[str]):
+        """Seed added symbols with their recent samples from the history store, else from the exchanges'
+        open interest history, and warm their retention state"""
+        from history_store import row_dicts  # Deferred: numpy
+        retention = self.open_retention()
+        missing = []
+        for symbol in symbols:
+            records = []
+            for exchange in SUPPORTED_EXCHANGES:
+                rows = retention.raw.tail(exchange, symbol, self.history_depth)
+                records.extend(OpenInterestData(**sample) for sample in row_dicts(symbol, exchange, rows))
+                retention.state(exchange, symbol)
+            if records:
+                self.historical_data[symbol] = sorted(records, key=lambda r: r.timestamp)[-self.history_depth:]
+            else:
+                missing.append(symbol)
+        if missing:
+            exchange_data = self.aggregator.get_history(missing, self.history_depth)
+            records = [record for batch in exchange_data.values() for record in batch.data]
+            retention.append(records)
+            for record in sorted(records, key=lambda r: r.timestamp):
+                self.historical_data[record.symbol].append(record)
+            for symbol in missing:
+                self.historical_data[symbol] = self.historical_data[symbol][-self.history_depth:]
+        for symbol in symbols:
+            self.derived.warm(self.historical_data[symbol])
+        self.calculate_historical_averages()
+        logging.info(f"Backfilled {len(symbols) - len(missing)} symbols from the history store and "
+                     f"{len(missing)} from the exchanges")
+
+    def enable_adaptive_polling(self):
+        """Sample each symbol at its own rate within the exchange request budgets (see adaptive_sampler.py)"""
+        from adaptive_sampler import AdaptiveAggregator, AdaptiveSampler  # Deferred: numpy
+        self.sampler = AdaptiveSampler(self.token_list or DEFAULT_SYMBOLS, spike_threshold=self.spike_threshold,
+                                       clock=self.clock)
+        self.aggregator = AdaptiveAggregator(self.aggregator, self.sampler, self)
+        if self.rule_engine is not None:
+            # Window rules need their windows' worth of samples at the fastest rate, not per MONITORING_INTERVAL
+            self.rule_engine.set_interval(self.sampler.min_interval)
+            self.history_depth = max(HISTORY_DEPTH, self.rule_engine.plan.depth)
+        logging.info(f"Adaptive polling enabled for {len(self.sampler.keys)} series")
+
+    @staticmethod
+    def load_token_list(json_path):
         try:
             with open(json_path, 'r') as f:
                 data = json.load(f)
@@ -80,7 +327,8 @@ class OpenInterestMonitor:
             logging.error(f"Error loading token list from {json_path}: {e}")
         return None
     
-    def extract_token_names(self, json_path):
+    @staticmethod
+    def extract_token_names(json_path):
         """Extract token names for display purposes"""
         try:
             with open(json_path, 'r') as f:
@@ -134,11 +382,30 @@ class OpenInterestMonitor:
         except Exception as e:
             logging.error(f"Error loading historical data: {e}")
     
-    def save_historical_data(self):
-        """Save historical data to file"""
+    def persisted_state(self) -> Dict:
+        """Copy of the state written after a cycle, safe to write from another thread while cycles go on"""
+        return {
+            'historical_data': {symbol: list(records) for symbol, records in self.historical_data.items()},
+            'historical_averages': dict(self.historical_averages),
+            'last_15min_avg_per_symbol': dict(self.last_15min_avg_per_symbol),
+            'alerts_sent': dict(self.alerts_sent),
+            'derived': self.derived.state(),
+            'token_list': list(self.token_list) if self.token_list else None,
+        }
+
+    def persist(self, state: Dict):
+        """Write a persisted_state(): the 15-min averages CSV, the JSON history and the checkpoint"""
+        self.export_15min_averages_to_csv(token_list=state['token_list'], historical_data=state['historical_data'])
+        # Save the recent samples detection needs; long-term history lives in the retention tiers
+        self.save_historical_data(state)
+        self.save_checkpoint(state)
+
+    def save_historical_data(self, state: Optional[Dict] = None):
+        """Save historical data (of a persisted_state(), if given) to file"""
         try:
             data_to_save = {}
-            for symbol, records in self.historical_data.items():
+            historical_data = state['historical_data'] if state else self.historical_data
+            for symbol, records in historical_data.items():
                 data_to_save[symbol] = [
                     {
                         'symbol': record.symbol,
@@ -153,11 +420,157 @@ class OpenInterestMonitor:
                     for record in records
                 ]
             
-            with open(self.data_file, 'w') as f:
+            # Write to a temp file and rename so readers (and failover nodes) never see a partial file
+            tmp_file = f"{self.data_file}.tmp"
+            with open(tmp_file, 'w') as f:
                 json.dump(data_to_save, f, indent=2, cls=OpenInterestDataEncoder)
+            os.replace(tmp_file, self.data_file)
         except Exception as e:
             logging.error(f"Error saving historical data: {e}")
     
+    def save_checkpoint(self, state: Optional[Dict] = None):
+        """Write the monitor's in-memory state (or a persisted_state()) to a compact binary checkpoint next to the data file.
+
+        The checkpoint records the data file's size and mtime, so it is only used on start
+        while it matches the JSON history saved in the same cycle.
+        """
+        try:
+            state = state or self.persisted_state()
+            stat = os.stat(self.data_file)
+            checkpoint = {
+                'version': CHECKPOINT_VERSION,
+                'data_file_stat': (stat.st_size, stat.st_mtime_ns),
+                'series': {
+                    symbol: [
+                        (r.exchange, r.open_interest, r.open_interest_value, r.timestamp.timestamp(),
+                         r.price, r.volume_24h, r.funding_rate)
+                        for r in records
+                    ]
+                    for symbol, records in state['historical_data'].items()
+                },
+                'historical_averages': state['historical_averages'],
+                'last_15min_avg_per_symbol': {
+                    symbol: (window_end.timestamp(), avg)
+                    for symbol, (window_end, avg) in state['last_15min_avg_per_symbol'].items()
+                },
+                'alerts_sent': state['alerts_sent'],
+                'derived': state['derived'],
+            }
+            tmp_file = f"{self.checkpoint_file}.tmp"
+            with open(tmp_file, 'wb') as f:
+                pickle.dump(checkpoint, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_file, self.checkpoint_file)
+        except Exception as e:
+            logging.error(f"Error saving checkpoint: {e}")
+
+    def snapshot_series(self) -> List[SeriesSnapshot]:
+        """Each series' latest sample and derived statistics"""
+        series = []
+        for symbol, records in self.historical_data.items():
+            latest, previous, counts = {}, {}, defaultdict(int)
+            for record in records:
+                if record.exchange in latest:
+                    previous[record.exchange] = latest[record.exchange]
+                latest[record.exchange] = record
+                counts[record.exchange] += 1
+            avg_oi = self.historical_averages.get(symbol)
+            window = self.last_15min_avg_per_symbol.get(symbol)
+            for exchange, record in latest.items():
+                before = previous.get(exchange)
+                derived = self.derived.get(symbol, exchange)
+                series.append(SeriesSnapshot(
+                    symbol=symbol,
+                    exchange=exchange,
+                    timestamp=record.timestamp,
+                    open_interest=record.open_interest,
+                    open_interest_value=record.open_interest_value,
+                    price=record.price,
+                    volume_24h=record.volume_24h,
+                    funding_rate=record.funding_rate,
+                    avg_oi=avg_oi,
+                    pct_change=self.calculate_percentage_change(record.open_interest_value, before.open_interest_value)
+                    if before else None,
+                    pct_from_avg=self.calculate_percentage_change(record.open_interest_value, avg_oi) if avg_oi else None,
+                    avg_15min=window[1] if window else None,
+                    samples=counts[exchange],
+                    **(derived.snapshot_fields() if derived else {}),
+                ))
+        return series
+
+    def publish_snapshot(self):
+        """Publish each series' latest sample and derived statistics to the shared snapshot segment"""
+        try:
+            if self.snapshot_writer is None:
+                self.snapshot_writer = SnapshotWriter(self.snapshot_file)
+            self.snapshot_writer.publish(self.snapshot_series())
+        except Exception as e:
+            logging.error(f"Error publishing snapshot: {e}")
+
+    def open_retention(self):
+        """The history store's retention tiers, created on first use"""
+        if self.retention is None:
+            from retention import RetentionManager  # Deferred: numpy
+            self.retention = RetentionManager(self.history_dir, clock=self.clock)
+            self.history_store = self.retention.raw
+        return self.retention
+
+    def store_history(self, exchange_data: Dict[str, ExchangeOpenInterestData]):
+        """Append the cycle's samples to the history store and roll them up into the retention tiers"""
+        self.store_samples([record for batch in exchange_data.values() if batch.success for record in batch.data])
+
+    def store_samples(self, records: List[OpenInterestData]):
+        """Append samples to the history store and roll them up into the retention tiers"""
+        try:
+            self.open_retention().append(records)
+        except Exception as e:
+            logging.error(f"Error appending to the history store: {e}")
+
+    def load_checkpoint(self) -> bool:
+        """Restore state from the checkpoint; return False if it is missing, stale or unreadable"""
+        try:
+            if not os.path.exists(self.checkpoint_file) or not os.path.exists(self.data_file):
+                return False
+            with open(self.checkpoint_file, 'rb') as f:
+                state = pickle.load(f)
+            stat = os.stat(self.data_file)
+            if state.get('version') != CHECKPOINT_VERSION or tuple(state['data_file_stat']) != (stat.st_size, stat.st_mtime_ns):
+                logging.info("Checkpoint is stale; loading history from JSON")
+                return False
+            fromtimestamp = datetime.fromtimestamp
+            for symbol, rows in state['series'].items():
+                self.historical_data[symbol] = [
+                    OpenInterestData(symbol, exchange, oi, oi_value, fromtimestamp(ts), price, volume, funding)
+                    for exchange, oi, oi_value, ts, price, volume, funding in rows
+                ]
+            self.historical_averages.update(state['historical_averages'])
+            self.last_15min_avg_per_symbol.update({
+                symbol: (fromtimestamp(window_end), avg)
+                for symbol, (window_end, avg) in state['last_15min_avg_per_symbol'].items()
+            })
+            self.alerts_sent.update(state['alerts_sent'])
+            if 'derived' in state:
+                self.derived.restore(state['derived'])
+            else:
+                self.derived.warm(record for records in self.historical_data.values() for record in records)
+            logging.info(f"Loaded checkpoint for {len(self.historical_data)} symbols")
+            return True
+        except Exception as e:
+            logging.warning(f"Error loading checkpoint, falling back to JSON history: {e}")
+            self.historical_data.clear()
+            self.historical_averages.clear()
+            self.last_15min_avg_per_symbol.clear()
+            self.alerts_sent.clear()
+            self.derived.series.clear()
+            return False
+
+    def classify_severity(self, percentage_change: float) -> str:
+        """Map a percentage change to an alert severity"""
+        if abs(percentage_change) >= self.severity_high:
+            return "high"
+        if abs(percentage_change) >= self.severity_medium:
+            return "medium"
+        return "low"
+
     def calculate_percentage_change(self, current: float, previous: float) -> float:
         """Calculate percentage change between two values"""
         if previous == 0:
@@ -179,16 +592,11 @@ class OpenInterestMonitor:
         )
         
         # Check if change exceeds threshold (both increase and decrease)
-        if abs(percentage_change) >= SPIKE_THRESHOLD:
+        if abs(percentage_change) >= self.spike_threshold:
             # Determine alert type and severity
             alert_type = "spike" if percentage_change > 0 else "drop"
             
-            if abs(percentage_change) >= 50:
-                severity = "high"
-            elif abs(percentage_change) >= 30:
-                severity = "medium"
-            else:
-                severity = "low"
+            severity = self.classify_severity(percentage_change)
             
             # Create alert using USD values
             alert = OpenInterestAlert(
@@ -215,68 +623,215 @@ class OpenInterestMonitor:
             return alerts
         
         for oi_data in exchange_data.data:
-            symbol = oi_data.symbol
-            
-            # Add current data to historical data
-            self.historical_data[symbol].append(oi_data)
-            
-            # Keep only last 10 data points per symbol
-            if len(self.historical_data[symbol]) > 10:
-                self.historical_data[symbol] = self.historical_data[symbol][-10:]
-            
-            # Detect spikes
-            alert = self.detect_spikes(symbol, oi_data)
-            if alert:
-                # Check if we've already sent an alert for this symbol recently
-                alert_key = f"{symbol}_{alert.alert_type}_{alert.severity}"
-                if alert_key not in self.alerts_sent:
-                    alerts.append(alert)
-                    self.alerts_sent.add(alert_key)
-                    
-                    # Remove from sent alerts after 1 hour to allow new alerts
-                    asyncio.create_task(self.remove_alert_from_sent(alert_key))
+            alerts.extend(self.ingest_sample(oi_data))
+        
+        return alerts
+    
+    def ingest_sample(self, oi_data: OpenInterestData) -> List[OpenInterestAlert]:
+        """Add one sample to the history and return its built-in rule alerts"""
+        alerts = []
+        symbol = oi_data.symbol
+        self.derived.update(oi_data)
+        
+        # Add current data to historical data
+        self.historical_data[symbol].append(oi_data)
+        
+        # Keep only the last history_depth data points per symbol
+        if len(self.historical_data[symbol]) > self.history_depth:
+            self.historical_data[symbol] = self.historical_data[symbol][-self.history_depth:]
+        
+        # Detect spikes
+        alert = self.detect_spikes(symbol, oi_data)
+        if alert:
+            # Check if we've already sent an alert for this symbol recently
+            alert_key = f"{symbol}_{alert.alert_type}_{alert.severity}"
+            if self.mark_alert_sent(alert_key):
+                alerts.append(alert)
+        
+        # Also check for deviation from historical average
+        avg_oi = self.historical_averages.get(symbol, 0.0)
+        if avg_oi > 0:
+            avg_percentage_change = self.calculate_percentage_change(
+                oi_data.open_interest_value, 
+                avg_oi
+            )
             
-            # Also check for deviation from historical average
-            avg_oi = self.historical_averages.get(symbol, 0.0)
-            if avg_oi > 0:
-                avg_percentage_change = self.calculate_percentage_change(
-                    oi_data.open_interest_value, 
-                    avg_oi
+            if abs(avg_percentage_change) >= self.spike_threshold:
+                # Create average-based alert
+                avg_alert_type = "spike" if avg_percentage_change > 0 else "drop"
+                avg_severity = self.classify_severity(avg_percentage_change)
+                
+                avg_alert = OpenInterestAlert(
+                    symbol=symbol,
+                    exchange=oi_data.exchange,
+                    current_oi=oi_data.open_interest_value,
+                    previous_oi=avg_oi,  # Using average as "previous"
+                    percentage_change=avg_percentage_change,
+                    timestamp=oi_data.timestamp,
+                    alert_type=f"avg_{avg_alert_type}",
+                    severity=avg_severity
                 )
                 
-                if abs(avg_percentage_change) >= SPIKE_THRESHOLD:
-                    # Create average-based alert
-                    avg_alert_type = "spike" if avg_percentage_change > 0 else "drop"
-                    avg_severity = "high" if abs(avg_percentage_change) >= 50 else "medium" if abs(avg_percentage_change) >= 30 else "low"
-                    
-                    avg_alert = OpenInterestAlert(
-                        symbol=symbol,
-                        exchange=oi_data.exchange,
-                        current_oi=oi_data.open_interest_value,
-                        previous_oi=avg_oi,  # Using average as "previous"
-                        percentage_change=avg_percentage_change,
-                        timestamp=oi_data.timestamp,
-                        alert_type=f"avg_{avg_alert_type}",
-                        severity=avg_severity
-                    )
-                    
-                    avg_alert_key = f"{symbol}_avg_{avg_alert_type}_{avg_severity}"
-                    if avg_alert_key not in self.alerts_sent:
-                        alerts.append(avg_alert)
-                        self.alerts_sent.add(avg_alert_key)
-                        asyncio.create_task(self.remove_alert_from_sent(avg_alert_key))
+                avg_alert_key = f"{symbol}_avg_{avg_alert_type}_{avg_severity}"
+                if self.mark_alert_sent(avg_alert_key):
+                    alerts.append(avg_alert)
         
         return alerts
     
-    async def remove_alert_from_sent(self, alert_key: str, delay: int = 3600):
-        """Remove alert from sent set after delay"""
-        await asyncio.sleep(delay)
-        self.alerts_sent.discard(alert_key)
-    
-    async def send_alerts(self, alerts: List[OpenInterestAlert]):
-        """Send alerts to Telegram"""
+    def prepare_detection(self):
+        """Pick up rule file edits before a cycle's samples are evaluated"""
+        if self.rule_engine is not None and self.rule_engine.reload_if_changed():
+            self.history_depth = max(HISTORY_DEPTH, self.rule_engine.plan.depth)
+
+    def detect_samples(self, records: List[OpenInterestData], exchanges: int) -> Tuple[List[OpenInterestAlert], List[WindowAverageSpike]]:
+        """Add samples to the history and return their alerts (and window spikes of declared window rules).
+
+        Uses the declared rules when the token config has them, otherwise the built-in rules.
+        """
+        if self.rule_engine is None:
+            alerts = []
+            for oi_data in records:
+                alerts.extend(self.ingest_sample(oi_data))
+            return alerts, []
+
+        updated = []
+        # Series of every exchange share a symbol's history list
+        limit = self.history_depth * max(1, exchanges)
+        for oi_data in records:
+            self.derived.update(oi_data)
+            history = self.historical_data[oi_data.symbol]
+            history.append(oi_data)
+            if len(history) > limit:
+                del history[:-limit]
+            updated.append((oi_data.symbol, oi_data.exchange))
+        return self.rule_engine.evaluate(self, updated)
+
+    def detect_window_spikes(self) -> List[WindowAverageSpike]:
+        """Built-in 15-min window spikes, once a cycle's samples are all in (declared rules report their own)"""
+        return self.detect_15min_average_spikes() if self.rule_engine is None else []
+
+    def detect_cycle_alerts(self, exchange_data: Dict[str, ExchangeOpenInterestData]) -> Tuple[List[OpenInterestAlert], List[WindowAverageSpike]]:
+        """Add one cycle's samples to the history and return its alerts and 15-min window spikes."""
+        self.prepare_detection()
+        records = []
+        for exchange_data_obj in exchange_data.values():
+            if not exchange_data_obj.success:
+                logging.warning(f"Failed to get data from {exchange_data_obj.exchange}: {exchange_data_obj.error}")
+                continue
+            records.extend(exchange_data_obj.data)
+        alerts, window_spikes = self.detect_samples(records, len(exchange_data))
+        return alerts, window_spikes + self.detect_window_spikes()
+
+    def apply_market_regime(self, exchange_data: Dict[str, ExchangeOpenInterestData], alerts: List[OpenInterestAlert],
+                            classify: bool = True) -> Tuple[Optional[MarketRegime], List[OpenInterestAlert]]:
+        """Classify the cycle's cross-section and, during a market-wide move, keep only alerts of abnormal series.
+
+        Returns the regime to announce (None unless a market-wide move is outside the alert
+        cooldown) and the alerts to send. classify=False (adaptive ticks between classifications)
+        only merges the samples into the next cross-section and filters by the current regime.
+        """
+        if not self.detect_regimes:
+            return None, alerts
+        if self.regime_detector is None:
+            from regime import MarketRegimeDetector  # Deferred: keeps numpy out of the monitor's import time
+            self.regime_detector = MarketRegimeDetector()
+        if classify:
+            regime = self.regime_detector.observe(exchange_data, datetime.fromtimestamp(self.clock()))
+            self.market_regime = regime
+        else:
+            self.regime_detector.merge(exchange_data)
+            regime = self.market_regime
+        if regime is None or regime.regime == "normal":
+            return None, alerts
+        abnormal = {(symbol, exchange) for symbol, exchange, _, _ in regime.abnormal}
+        kept = [alert for alert in alerts if (alert.symbol, alert.exchange) in abnormal]
+        if not classify:
+            return None, kept
+        regime.suppressed = len(alerts) - len(kept)
+        logging.info(f"Market-wide {regime.regime}: median {regime.median_change:+.2f}%, {regime.breadth:.0%} of "
+                     f"{regime.series} series moving together; kept {len(kept)} of {len(alerts)} alerts")
+        if not self.mark_alert_sent(f"market_{regime.regime}"):
+            return None, kept
+        return regime, kept
+
+    def record_alerts(self, alerts: List[OpenInterestAlert], window_spikes: List[WindowAverageSpike],
+                      regime: Optional[MarketRegime]):
+        """Keep a cycle's alerts in recent_alerts for the query API and append them to the alert log"""
+        self.append_alert_log(alerts)
+        for alert in alerts:
+            self.recent_alerts.append({
+                'symbol': alert.symbol, 'exchange': alert.exchange, 'type': alert.alert_type,
+                'severity': alert.severity, 'percentage_change': alert.percentage_change,
+                'current_oi': alert.current_oi, 'previous_oi': alert.previous_oi,
+                'timestamp': alert.timestamp, 'rule': alert.rule, 'metric': alert.metric,
+                'metric_value': alert.metric_value,
+            })
+        for spike in window_spikes:
+            self.recent_alerts.append({
+                'symbol': spike.symbol, 'exchange': None, 'type': 'window_avg_spike', 'severity': 'high',
+                'ratio': spike.ratio, 'old_avg': spike.old_avg, 'new_avg': spike.new_avg, 'timestamp': spike.window_end,
+            })
+        if regime:
+            self.recent_alerts.append({
+                'symbol': 'MARKET', 'exchange': None, 'type': f"market_{regime.regime}", 'severity': 'high',
+                'percentage_change': regime.median_change, 'breadth': regime.breadth, 'series': regime.series,
+                'timestamp': regime.timestamp,
+            })
+
+    def append_alert_log(self, alerts: List[OpenInterestAlert]):
+        """Append alerts as JSON lines; reports.py scores them against the history store"""
         if not alerts:
             return
+        try:
+            with open(self.alert_log, 'a') as f:
+                for alert in alerts:
+                    f.write(json.dumps({
+                        'symbol': alert.symbol, 'exchange': alert.exchange, 'type': alert.alert_type,
+                        'severity': alert.severity, 'percentage_change': alert.percentage_change,
+                        'current_oi': alert.current_oi, 'previous_oi': alert.previous_oi,
+                        'timestamp': alert.timestamp.timestamp(), 'rule': alert.rule, 'metric': alert.metric,
+                        'metric_value': alert.metric_value,
+                    }) + "\n")
+        except OSError as e:
+            logging.error(f"Error appending to alert log {self.alert_log}: {e}")
+
+    def mark_alert_sent(self, alert_key: str, cooldown: Optional[float] = None) -> bool:
+        """Record an alert as sent; return False if it was already sent within the cooldown
+        (alert_cooldown unless a rule gives its own).
+
+        Expiry is checked against timestamps rather than with a sleeping task, so
+        the dedup state survives across event loops when cycles are driven in-process.
+        """
+        now = self.clock()
+        sent_at = self.alerts_sent.get(alert_key)
+        if sent_at is not None and now - sent_at < (self.alert_cooldown if cooldown is None else cooldown):
+            return False
+        self.alerts_sent[alert_key] = now
+        return True
+    
+    def mute(self, symbol: str, seconds: float):
+        """Stop sending a symbol's alerts for a while; they are still detected, recorded and logged"""
+        self.muted[symbol] = self.clock() + seconds
+
+    def unmute(self, symbol: str) -> bool:
+        return self.muted.pop(symbol, None) is not None
+
+    def is_muted(self, symbol: str) -> bool:
+        until = self.muted.get(symbol)
+        if until is not None and self.clock() >= until:
+            del self.muted[symbol]
+            return False
+        return until is not None
+
+    def fenced_out(self) -> bool:
+        """Whether another writer took over this monitor's data, so it must neither notify nor persist"""
+        return self.fence is not None and not self.fence()
+
+    async def send_alerts(self, alerts: List[OpenInterestAlert], chat_id: Optional[str] = None, topic_id: Optional[str] = None):
+        """Send alerts to Telegram (to the configured chat unless chat_id/topic_id are given)"""
+        alerts = [alert for alert in alerts if not self.is_muted(alert.symbol)]
+        if not alerts or self.fenced_out():
+            return
         
         for alert in alerts:
             try:
@@ -293,21 +848,36 @@ class OpenInterestMonitor:
                     'alert_type': alert.alert_type,
                     'severity': alert.severity,
                     'timestamp': alert.timestamp.strftime("%Y-%m-%d %H:%M:%S"),
-                    'avg_oi': avg_oi  # This will be updated to use USD value
+                    'avg_oi': avg_oi,  # This will be updated to use USD value
+                    'rule': alert.rule,
+                    'metric': alert.metric,
+                    'metric_value': alert.metric_value
                 }
                 
-                message = format_open_interest_alert(alert_dict)
-                await send_telegram_message(message)
+                # Declared rules on metrics other than a % OI change show the metric instead of a change
+                if alert.metric:
+                    message = format_rule_metric_alert(alert_dict)
+                    shown = f"{alert.metric} {alert.metric_value:.4g}"
+                else:
+                    message = format_open_interest_alert(alert_dict)
+                    shown = f"{alert.percentage_change:+.2f}%"
+                await send_telegram_message(message, chat_id=chat_id, topic_id=topic_id)
                 
-                logging.info(f"Sent alert for {alert.symbol} on {alert.exchange}: {alert.percentage_change:+.2f}%")
+                logging.info(f"Sent alert for {alert.symbol} on {alert.exchange}: {shown}",
+                             extra={'symbol': alert.symbol, 'exchange': alert.exchange})
                 
             except Exception as e:
-                logging.error(f"Error sending alert for {alert.symbol}: {e}")
+                logging.error(f"Error sending alert for {alert.symbol}: {e}",
+                              extra={'symbol': alert.symbol, 'exchange': alert.exchange})
     
     def calculate_historical_averages(self):
-        """Calculate the historical average open interest for each symbol from all data."""
+        """Calculate the historical average open interest for each symbol: over BASELINE_HORIZON from the
+        retention tiers once they hold the symbol, else over the samples in memory."""
         for symbol, records in self.historical_data.items():
-            if records:
+            baseline = self.retention.baseline(symbol) if self.retention else None
+            if baseline is not None:
+                self.historical_averages[symbol] = baseline
+            elif records:
                 # Use open_interest_value (USD) instead of open_interest (contracts)
                 avg = sum(r.open_interest_value for r in records) / len(records)
                 self.historical_averages[symbol] = avg
@@ -344,7 +914,8 @@ class OpenInterestMonitor:
         )
         await send_telegram_message(message)
 
-    async def send_15min_spike_alert(self, symbol: str, old_avg: float, new_avg: float, ratio: float, window_start, window_end):
+    async def send_15min_spike_alert(self, symbol: str, old_avg: float, new_avg: float, ratio: float, window_start, window_end,
+                                     chat_id: Optional[str] = None, topic_id: Optional[str] = None):
         # Get current OI and historical average OI
         current_oi = 0.0
         historical_avg_oi = self.historical_averages.get(symbol, 0.0)
@@ -364,7 +935,7 @@ class OpenInterestMonitor:
             f"<b>Window:</b> {window_start.strftime('%Y-%m-%d %H:%M:%S')} - {window_end.strftime('%Y-%m-%d %H:%M:%S')}\n\n"
             f"🔥 <b>New 15-min average is more than 50x the previous window!</b> 🔥"
         )
-        await send_telegram_message(message)
+        await send_telegram_message(message, chat_id=chat_id, topic_id=topic_id)
 
     def get_latest_15min_averages(self):
         """Return dict: symbol -> (window_start, window_end, avg) for the latest 15-min window."""
@@ -383,67 +954,189 @@ class OpenInterestMonitor:
                 result[symbol] = (window_start, window_end, avg)
         return result
 
-    async def run_monitoring_cycle(self):
-        """Run one monitoring cycle"""
+    @contextmanager
+    def phase(self, name: str):
+        """Time one phase of a monitoring cycle (metrics histogram and profiling span)"""
+        with CYCLE_PHASE_SECONDS.time(phase=name), span(name):
+            yield
+
+    def detect_15min_average_spikes(self) -> List[WindowAverageSpike]:
+        """Compare each symbol's new 15-min average to the previous window and return spikes above window_spike_ratio"""
+        spikes = []
+        latest_averages = self.get_latest_15min_averages()
+        for symbol, (window_start, window_end, new_avg) in latest_averages.items():
+            last_entry = self.last_15min_avg_per_symbol.get(symbol)
+            if last_entry:
+                last_window_end, old_avg = last_entry
+                # Only compare if this is a new window
+                if window_end > last_window_end and old_avg > 0:
+                    ratio = new_avg / old_avg
+                    if ratio > self.window_spike_ratio:
+                        spikes.append(WindowAverageSpike(symbol, old_avg, new_avg, ratio, window_start, window_end))
+            # Update last seen window and avg
+            self.last_15min_avg_per_symbol[symbol] = (window_end, new_avg)
+        return spikes
+
+    async def run_monitoring_cycle(self, send_notifications: bool = True, persist: bool = True,
+                                   classify_regime: bool = True) -> MonitoringCycleResult:
+        """Run one monitoring cycle and return its result.
+
+        State (historical data, averages, sent alerts, HTTP sessions) is kept on the
+        instance, so callers can drive repeated cycles in-process. With
+        send_notifications=False, alerts are only returned, not sent to Telegram.
+        persist=False skips the CSV export and history/checkpoint saves (adaptive ticks); otherwise they
+        are written by the background persister after the cycle returns. classify_regime=False merges
+        the samples into the next market regime classification instead of classifying (adaptive ticks).
+        """
+        started = time.perf_counter()
+        now = datetime.now()
+        capture = self.profiler.begin('cycle')
+        log_token = push_log_context(cycle=self.data_version)
+        status = 'error'
         try:
             logging.info("Starting monitoring cycle...")
-            # Fetch data from all exchanges
-            exchange_data = self.aggregator.get_all_exchange_data()
-            all_alerts = []
+            with self.phase('config'):
+                # Token config edits apply between cycles, before anything is fetched for the old symbol set
+                await self.reload_config_if_changed()
+            with self.phase('pipeline'):
+                # Fetch, detect, notify and store run as concurrent stages; samples flow through as they arrive
+                exchange_data, all_alerts, window_spikes, sent = await self.pipeline.run(send_notifications, classify_regime)
             total_symbols = 0
-            now = datetime.now()
-            # Process data from each exchange
-            for exchange_name, exchange_data_obj in exchange_data.items():
-                alerts = self.process_exchange_data(exchange_data_obj)
-                all_alerts.extend(alerts)
-                total_symbols += len(exchange_data_obj.data) if exchange_data_obj.success else 0
-            # Send individual alerts
-            await self.send_alerts(all_alerts)
-            # Send summary message
-            if all_alerts:
-                # Add average OI data to alert dicts for summary
-                alert_dicts = []
-                for alert in all_alerts:
-                    alert_dict = alert.__dict__.copy()
-                    alert_dict['avg_oi'] = self.historical_averages.get(alert.symbol, 0.0)
-                    alert_dicts.append(alert_dict)
-                
-                summary_message = format_summary_message(
-                    alert_dicts, 
-                    total_symbols
-                )
-                await send_telegram_message(summary_message)
-            # --- Update 15-min averages CSV ---
-            self.export_15min_averages_to_csv()
-            # --- Compare new 15-min average to previous and alert if >50x ---
-            latest_averages = self.get_latest_15min_averages()
-            for symbol, (window_start, window_end, new_avg) in latest_averages.items():
-                last_entry = self.last_15min_avg_per_symbol.get(symbol)
-                if last_entry:
-                    last_window_end, old_avg = last_entry
-                    # Only compare if this is a new window
-                    if window_end > last_window_end and old_avg > 0:
-                        ratio = new_avg / old_avg
-                        if ratio > 50:
-                            await self.send_15min_spike_alert(symbol, old_avg, new_avg, ratio, window_start, window_end)
-                # Update last seen window and avg
-                self.last_15min_avg_per_symbol[symbol] = (window_end, new_avg)
-            # Save data (no cleanup - keep data forever)
-            self.save_historical_data()
+            latest_data = {}
+            with self.phase('detect'):
+                # Cross-sectional steps need the whole cycle
+                window_spikes += self.detect_window_spikes()
+                regime, all_alerts = self.apply_market_regime(exchange_data, all_alerts, classify_regime)
+                for exchange_data_obj in exchange_data.values():
+                    if exchange_data_obj.success:
+                        total_symbols += len(exchange_data_obj.data)
+                        for oi_data in exchange_data_obj.data:
+                            latest_data[oi_data.symbol] = self.historical_data[oi_data.symbol][-1]
+            for alert in all_alerts:
+                ALERTS_TOTAL.inc(type=alert.alert_type, severity=alert.severity)
+                if self.sampler:
+                    self.sampler.note_alert(alert.symbol, alert.exchange)
+            for spike in window_spikes:
+                ALERTS_TOTAL.inc(type='window_avg_spike', severity='high')
+            if regime:
+                ALERTS_TOTAL.inc(type=f"market_{regime.regime}", severity='high')
+            fenced_out = self.fenced_out()
+            if fenced_out:
+                logging.warning("Another writer owns this monitor's data; skipping the alert log, snapshot, "
+                                "notifications and saves")
+            else:
+                self.record_alerts(all_alerts, window_spikes, regime)
+                with self.phase('publish'):
+                    self.publish_snapshot()
+            if send_notifications and not fenced_out:
+                with self.phase('alert'):
+                    if regime:
+                        await self.send_market_regime_alert(regime)
+                    # Send the alerts the pipeline held back while a market regime could still apply
+                    sent_ids = {id(alert) for alert in sent}
+                    await self.send_alerts([alert for alert in all_alerts if id(alert) not in sent_ids])
+                    # Send summary message
+                    if all_alerts:
+                        await self.send_summary(all_alerts, total_symbols)
+                    for spike in window_spikes:
+                        if self.is_muted(spike.symbol):
+                            continue
+                        await self.send_15min_spike_alert(spike.symbol, spike.old_avg, spike.new_avg, spike.ratio,
+                                                          spike.window_start, spike.window_end)
             # Recalculate historical averages
             self.calculate_historical_averages()
+            if persist and not fenced_out:
+                with self.phase('save'):
+                    # The CSV export, JSON history and checkpoint are written in the background
+                    self.persister.submit(self.persisted_state())
             logging.info(f"Monitoring cycle completed. Processed {total_symbols} symbols, generated {len(all_alerts)} alerts")
+            CYCLES_TOTAL.inc(status='success')
+            status = 'success'
+            CYCLE_SECONDS.observe(time.perf_counter() - started)
+            return MonitoringCycleResult(
+                timestamp=now,
+                success=True,
+                total_symbols=total_symbols,
+                alerts=all_alerts,
+                window_spikes=window_spikes,
+                latest_data=latest_data,
+                duration=time.perf_counter() - started,
+                regime=regime,
+                exchange_data=exchange_data
+            )
         except Exception as e:
             error_message = f"Error in monitoring cycle: {e}"
             logging.error(error_message)
-            await send_telegram_message(f"❌ <b>Open Interest Monitor Error</b>\n\n{error_message}")
+            CYCLES_TOTAL.inc(status='error')
+            if send_notifications:
+                await send_telegram_message(f"❌ <b>Open Interest Monitor Error</b>\n\n{error_message}")
+            return MonitoringCycleResult(
+                timestamp=now,
+                success=False,
+                duration=time.perf_counter() - started,
+                error=str(e)
+            )
+        finally:
+            self.data_version += 1
+            self.profiler.end(capture, status)
+            pop_log_context(log_token)
+
+    async def send_market_regime_alert(self, regime: MarketRegime, chat_id: Optional[str] = None,
+                                       topic_id: Optional[str] = None):
+        """Send one message for a market-wide move"""
+        regime_dict = regime.__dict__.copy()
+        regime_dict['timestamp'] = regime.timestamp.strftime("%Y-%m-%d %H:%M:%S")
+        await send_telegram_message(format_market_regime_alert(regime_dict), chat_id=chat_id, topic_id=topic_id)
+
+    async def send_summary(self, alerts: List[OpenInterestAlert], total_symbols: int,
+                           chat_id: Optional[str] = None, topic_id: Optional[str] = None):
+        """Send the summary message for a cycle's alerts"""
+        alerts = [alert for alert in alerts if not self.is_muted(alert.symbol)]
+        if not alerts:
+            return
+        # Add average OI data to alert dicts for summary
+        alert_dicts = []
+        for alert in alerts:
+            alert_dict = alert.__dict__.copy()
+            alert_dict['avg_oi'] = self.historical_averages.get(alert.symbol, 0.0)
+            alert_dicts.append(alert_dict)
+        
+        summary_message = format_summary_message(
+            alert_dicts, 
+            total_symbols
+        )
+        await send_telegram_message(summary_message, chat_id=chat_id, topic_id=topic_id)
     
-    async def start_monitoring(self):
-        """Start continuous monitoring"""
+    async def start_monitoring(self, announce: bool = True):
+        """Start continuous monitoring (announce=False skips the Telegram startup message, e.g. on supervised restarts)"""
         logging.info("Starting Open Interest Monitor...")
         logging.info(f"Monitoring interval: {MONITORING_INTERVAL} seconds")
-        logging.info(f"Spike threshold: {SPIKE_THRESHOLD}%")
+        logging.info(f"Spike threshold: {self.spike_threshold}%")
+        
+        if announce:
+            await self.send_startup_message()
         
+        if self.sampler:
+            # Short ticks sample whatever is due; state is persisted once per interval
+            self.scheduler.add_job('monitoring_tick', self.run_adaptive_tick, SAMPLER_TICK, run_immediately=True)
+        else:
+            # Fire cycles on wall-clock boundaries (:00, :15, ...) so every 15-min window gets one sample
+            self.scheduler.add_job('monitoring_cycle', self.run_monitoring_cycle, MONITORING_INTERVAL, SCHEDULE_OFFSET)
+        try:
+            await self.scheduler.run()
+        except KeyboardInterrupt:
+            logging.info("Monitoring stopped by user")
+
+    async def run_adaptive_tick(self) -> MonitoringCycleResult:
+        """One adaptive polling tick; the first tick of each MONITORING_INTERVAL also persists state and
+        classifies the market regime on the samples merged since the previous one"""
+        interval = int(self.clock() // MONITORING_INTERVAL)
+        first = interval != self.persisted_interval
+        self.persisted_interval = interval
+        return await self.run_monitoring_cycle(persist=first, classify_regime=first)
+
+    async def send_startup_message(self):
+        """Send the monitor startup message to Telegram"""
         # Send startup message
         if self.token_names:
             if len(self.token_names) == 1:
@@ -455,7 +1148,7 @@ class OpenInterestMonitor:
         
         startup_message = f"🚀 <b>{token_display}</b>\n\n"
         startup_message += f"📊 Monitoring interval: {MONITORING_INTERVAL} seconds\n"
-        startup_message += f"🚨 Spike threshold: {SPIKE_THRESHOLD}%\n"
+        startup_message += f"🚨 Spike threshold: {self.spike_threshold}%\n"
         startup_message += f"⏰ Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
         
         # Add current OI and average OI info if monitoring specific tokens
@@ -472,20 +1165,13 @@ class OpenInterestMonitor:
                 startup_message += f"\n📊 <b>Average OI:</b> ${avg_oi:,.0f}"
         
         await send_telegram_message(startup_message)
-        
-        while True:
-            try:
-                await self.run_monitoring_cycle()
-                await asyncio.sleep(MONITORING_INTERVAL)
-            except KeyboardInterrupt:
-                logging.info("Monitoring stopped by user")
-                break
-            except Exception as e:
-                logging.error(f"Unexpected error in monitoring loop: {e}")
-                await asyncio.sleep(60)  # Wait 1 minute before retrying
 
-    def export_15min_averages_to_csv(self, output_file='open_interest_15min_averages.csv', token_list=None):
-        """Export 15-min window averages for all tokens to a CSV file, appending and deduplicating."""
+    def export_15min_averages_to_csv(self, output_file=None, token_list=None, historical_data=None):
+        """Export 15-min window averages for all tokens to a CSV file, appending and deduplicating.
+        Rows average a symbol across exchanges, so the per-series derived metrics are left to /api/history."""
+        import pandas as pd  # Deferred: pandas dominates import time and is only needed here
+        output_file = output_file or self.csv_file
+        historical_data = self.historical_data if historical_data is None else historical_data
         rows = []
         # Use self.token_list if set, else token_list argument, else all tokens
         if self.token_list:
@@ -493,9 +1179,9 @@ class OpenInterestMonitor:
         elif token_list:
             symbols_to_process = token_list
         else:
-            symbols_to_process = self.historical_data.keys()
+            symbols_to_process = historical_data.keys()
         for symbol in symbols_to_process:
-            records = self.historical_data.get(symbol, [])
+            records = historical_data.get(symbol, [])
             if not records:
                 continue
             sorted_records = sorted(records, key=lambda r: r.timestamp)
@@ -563,6 +1249,13 @@ async def main():
     parser.add_argument('token_json_path', nargs='?', help='Path to JSON file with token symbols (deprecated, use --config)')
     parser.add_argument('--export-csv', action='store_true', help='Export 15-min averages to CSV and exit')
     parser.add_argument('--token-json', type=str, help='Path to JSON file with token symbols for export')
+    parser.add_argument('--once', action='store_true', help='Run a single monitoring cycle and exit')
+    parser.add_argument('--metrics-port', type=int, default=METRICS_PORT, help='Serve Prometheus metrics on this local port')
+    parser.add_argument('--api-port', type=int, default=QUERY_API_PORT, help='Serve the read-only query API on this local port')
+    parser.add_argument('--adaptive', action='store_true', default=ADAPTIVE_POLLING,
+                        help='Poll volatile symbols more often within the exchange request budgets')
+    parser.add_argument('--bot', action='store_true', default=COMMAND_BOT,
+                        help='Answer Telegram commands (/oi, /top, /status, /mute) from the in-memory state')
     
     args = parser.parse_args()
     
@@ -570,12 +1263,25 @@ async def main():
     token_json_path = args.config or args.token_json_path
     
     monitor = OpenInterestMonitor(token_json_path)
+    if args.metrics_port:
+        start_metrics_server(args.metrics_port)
     if args.export_csv:
         token_list = None
         if args.token_json:
             token_list = monitor.load_token_list(args.token_json)
         monitor.export_15min_averages_to_csv(token_list=token_list)
         return
+    if args.once:
+        result = await monitor.run_monitoring_cycle()
+        sys.exit(0 if result.success else 1)
+    if args.adaptive:
+        monitor.enable_adaptive_polling()
+    if args.api_port:
+        from query_api import QueryAPI  # Deferred: aiohttp's server side is only needed when the API is on
+        await QueryAPI(monitor, args.api_port).start()
+    if args.bot:
+        from command_bot import CommandBot
+        await CommandBot(monitor).start()
     await monitor.start_monitoring()
 
 if __name__ == "__main__":
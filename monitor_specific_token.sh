@@ -45,6 +45,8 @@ show_usage() {
     echo "  create <token>    - Create a new token config"
     echo "  attach <token>    - Attach to token's tmux session"
     echo "  logs <token>      - View logs for specific token"
+    echo "  start-all         - Monitor every token config in one shared process"
+    echo "  stop-all          - Stop the shared multi-token process"
     echo "  help              - Show this help message"
     echo ""
     echo "Examples:"
@@ -52,6 +54,7 @@ show_usage() {
     echo "  $0 start btc      # Start monitoring BTC token"
     echo "  $0 status milk    # Check MILK monitoring status"
     echo "  $0 create eth     # Create ETH token config"
+    echo "  $0 start-all      # One process, one fetch per cycle for all tokens"
     echo ""
     echo "Available tokens:"
     echo "  milk, h, more, sahara, dmc, mav, cudis"
@@ -177,6 +180,45 @@ start_token_monitoring() {
     echo "📝 To view logs: $0 logs $token_name"
 }
 
+# Function to start one shared process for every token config
+start_all_monitoring() {
+    check_tmux
+    
+    print_header "Starting Multi-Token Monitoring"
+    
+    local session_name="oi-all"
+    
+    if tmux has-session -t "$session_name" 2>/dev/null; then
+        print_warning "Session $session_name already exists"
+        print_status "Use 'tmux attach-session -t $session_name' to attach"
+        exit 0
+    fi
+    
+    print_status "Creating tmux session: $session_name"
+    tmux new-session -d -s "$session_name" -n "monitor"
+    tmux send-keys -t "$session_name:monitor" "cd $(pwd)" C-m
+    tmux send-keys -t "$session_name:monitor" "python3 multi_tenant.py --all" C-m
+    
+    print_status "✅ Multi-token monitoring started successfully!"
+    echo ""
+    echo "📱 Session name: $session_name"
+    echo "⏹️  To stop: $0 stop-all"
+}
+
+# Function to stop the shared multi-token process
+stop_all_monitoring() {
+    local session_name="oi-all"
+    
+    print_status "Stopping multi-token monitoring..."
+    
+    if tmux has-session -t "$session_name" 2>/dev/null; then
+        tmux kill-session -t "$session_name"
+        print_status "✅ Multi-token monitoring stopped"
+    else
+        print_warning "No active multi-token session found"
+    fi
+}
+
 # Function to stop monitoring a specific token
 stop_token_monitoring() {
     local token_name=$1
@@ -241,6 +283,19 @@ check_token_status() {
         echo -e "  ${RED}✗${NC} Session not running: $session_name"
     fi
     
+    echo ""
+    echo "Latest Snapshot:"
+    echo "================"
+    # Each token's monitor publishes its own segment (see config_data_files in monitor.py)
+    local snapshot_file="open_interest_data_${token_name}.snap"
+    if [[ -f "$snapshot_file" && -f "$config_file" ]]; then
+        # Read from the token monitor's snapshot segment instead of parsing the history JSON
+        snapshot_symbol=$(python3 -c "import json; s = json.load(open('$config_file'))['symbol']; s = s.replace('/USDT:USDT', 'USDT') if s.endswith('/USDT:USDT') else s.replace(':USDT', 'USDT'); print(s.replace('/', ''))" 2>/dev/null)
+        python3 snapshot.py --file "$snapshot_file" --symbol "$snapshot_symbol" 2>/dev/null | sed 's/^/  /' || echo "  Snapshot not readable"
+    else
+        echo "  No snapshot published yet"
+    fi
+    
     echo ""
     echo "Recent Logs:"
     echo "============"
@@ -323,6 +378,12 @@ case "${1:-help}" in
     logs)
         view_token_logs "$2"
         ;;
+    start-all)
+        start_all_monitoring
+        ;;
+    stop-all)
+        stop_all_monitoring
+        ;;
     help|--help|-h)
         show_usage
         ;;
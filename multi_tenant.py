@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Multi-tenant Open Interest Monitor
+Runs many token-group configs (milk.json, h.json, ...) in a single process: the union of
+their symbols is fetched once per cycle, and each group's threshold and alert routing are
+applied to the shared state. Declarative alert rules (rules.py) need a monitor of their own, so
+group configs that declare them are rejected. Edited, added or deleted group configs are picked up between
+cycles without a restart.
+"""
+
+import argparse
+import asyncio
+import glob
+import json
+import logging
+import os
+from datetime import datetime
+from typing import List, Optional
+
+from config import SPIKE_THRESHOLD, MONITORING_INTERVAL, SCHEDULE_OFFSET, METRICS_PORT, SCANNER_PROMOTED_FILE
+from metrics import start_metrics_server
+from models import MonitoringCycleResult
+from monitor import OpenInterestMonitor
+from telegram_service import send_telegram_message
+
+# JSON files skipped by --all: data files, the aggregate tokens_config.json, whose symbols are
+# already covered by the per-token configs, and the scanner's promoted set, which the scanner monitors itself
+NON_GROUP_CONFIGS = {"open_interest_data.json", "open_interest_alerts.json", "tokens_config.json", "test_symbols.json",
+                     os.path.basename(SCANNER_PROMOTED_FILE)}
+NON_GROUP_PREFIXES = ("open_interest_data_",)  # Per-token monitors' data files (monitor.config_data_files)
+
+class TokenGroup:
+    """A token-group config: its symbols, alert threshold and Telegram destination"""
+
+    def __init__(self, config_path: str):
+        self.config_path = config_path
+        self.name = os.path.splitext(os.path.basename(config_path))[0]
+
+        with open(config_path, 'r') as f:
+            data = json.load(f)
+        settings = data if isinstance(data, dict) else {}
+        if settings.get('rules') or settings.get('overrides'):
+            raise ValueError(f"{config_path} declares alert rules, which the shared multi-tenant monitor "
+                             f"cannot apply per group; run it with monitor.py --config instead")
+
+        self.symbols = OpenInterestMonitor.load_token_list(config_path) or []
+        self.symbol_set = set(self.symbols)
+        self.token_names = OpenInterestMonitor.extract_token_names(config_path) or []
+        # Optional per-group overrides; fall back to the global .env / config.py settings
+        self.chat_id: Optional[str] = settings.get('chat_id')
+        self.topic_id: Optional[str] = settings.get('topic_id')
+        self.spike_threshold = float(settings.get('spike_threshold', SPIKE_THRESHOLD))
+
+    def __repr__(self):
+        return f"TokenGroup({self.name}, symbols={self.symbols}, threshold={self.spike_threshold}%)"
+
+class MultiTenantMonitor:
+    """Monitor many token groups with one fetch, one history store and one writer"""
+
+    def __init__(self, config_paths: List[str], discover_dir: Optional[str] = None):
+        self.config_paths = list(config_paths)
+        self.discover_dir = discover_dir  # --all: also pick up group configs created while running
+        self.config_mtimes = {path: os.path.getmtime(path) for path in self.config_paths}
+        self.groups = [TokenGroup(path) for path in config_paths]
+        self.groups = [group for group in self.groups if group.symbols]
+        if not self.groups:
+            raise ValueError("No token groups with symbols were loaded")
+
+        # Union of symbols, keeping first-seen order
+        symbols = list(dict.fromkeys(symbol for group in self.groups for symbol in group.symbols))
+        self.monitor = OpenInterestMonitor(token_list=symbols)
+        # Detect at the most sensitive group threshold; each group filters to its own
+        self.monitor.spike_threshold = min(group.spike_threshold for group in self.groups)
+
+        logging.info(f"Multi-tenant monitor loaded {len(self.groups)} groups covering {len(symbols)} symbols")
+        for group in self.groups:
+            logging.info(f"  {group}")
+
+    async def reload_groups_if_changed(self) -> bool:
+        """Apply edited, new and deleted group configs: the shared monitor subscribes added symbols and
+        releases dropped ones in place; a config that no longer parses keeps its previous group"""
+        paths = list(self.config_paths)
+        if self.discover_dir is not None:
+            paths.extend(path for path in discover_group_configs(self.discover_dir) if path not in paths)
+        mtimes = {}
+        for path in paths:
+            try:
+                mtimes[path] = os.path.getmtime(path)
+            except OSError:
+                continue  # Deleted
+        if mtimes == self.config_mtimes:
+            return False
+        groups = {group.config_path: group for group in self.groups}
+        for path, mtime in mtimes.items():
+            if self.config_mtimes.get(path) == mtime:
+                continue
+            try:
+                groups[path] = TokenGroup(path)
+            except (OSError, ValueError, TypeError) as e:
+                logging.error(f"Invalid token group config {path}, keeping the previous one: {e}")
+        self.config_mtimes = mtimes
+        reloaded = [groups[path] for path in mtimes if path in groups and groups[path].symbols]
+        if not reloaded:
+            logging.error("No token groups with symbols left after reloading, keeping the previous groups")
+            return False
+        self.groups = reloaded
+        symbols = list(dict.fromkeys(symbol for group in self.groups for symbol in group.symbols))
+        added, removed = await self.monitor.set_token_list(symbols)
+        self.monitor.spike_threshold = min(group.spike_threshold for group in self.groups)
+        logging.info(f"Reloaded token groups: {len(self.groups)} groups covering {len(symbols)} symbols "
+                     f"(added {added or 'none'}, removed {removed or 'none'})")
+        return True
+
+    async def route_cycle_result(self, result: MonitoringCycleResult):
+        """Send each group the alerts for its own symbols and threshold"""
+        for group in self.groups:
+            try:
+                if result.regime:
+                    await self.monitor.send_market_regime_alert(result.regime, chat_id=group.chat_id, topic_id=group.topic_id)
+                alerts = [
+                    alert for alert in result.alerts
+                    if alert.symbol in group.symbol_set and abs(alert.percentage_change) >= group.spike_threshold
+                ]
+                await self.monitor.send_alerts(alerts, chat_id=group.chat_id, topic_id=group.topic_id)
+                if alerts:
+                    group_symbols = sum(1 for symbol in result.latest_data if symbol in group.symbol_set)
+                    await self.monitor.send_summary(alerts, group_symbols, chat_id=group.chat_id, topic_id=group.topic_id)
+
+                for spike in result.window_spikes:
+                    if spike.symbol in group.symbol_set:
+                        await self.monitor.send_15min_spike_alert(
+                            spike.symbol, spike.old_avg, spike.new_avg, spike.ratio,
+                            spike.window_start, spike.window_end,
+                            chat_id=group.chat_id, topic_id=group.topic_id
+                        )
+            except Exception as e:
+                logging.error(f"Error routing alerts for group {group.name}: {e}")
+
+    async def run_cycle(self) -> MonitoringCycleResult:
+        """Run one shared monitoring cycle and route its alerts per group"""
+        try:
+            await self.reload_groups_if_changed()
+        except Exception as e:
+            logging.error(f"Error reloading token group configs: {e}")
+        result = await self.monitor.run_monitoring_cycle(send_notifications=False)
+        if result.success:
+            await self.route_cycle_result(result)
+        else:
+            await send_telegram_message(f"❌ <b>Open Interest Monitor Error</b>\n\nError in monitoring cycle: {result.error}")
+        return result
+
+    async def send_startup_messages(self):
+        """Announce the monitor to each group's destination"""
+        for group in self.groups:
+            message = f"🚀 <b>Open Interest For {', '.join(group.token_names).upper()} Monitor Started</b>\n\n"
+            message += f"📊 Monitoring interval: {MONITORING_INTERVAL} seconds\n"
+            message += f"🚨 Spike threshold: {group.spike_threshold}%\n"
+            message += f"🧩 Shared multi-tenant process ({len(self.groups)} groups)\n"
+            message += f"⏰ Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+            await send_telegram_message(message, chat_id=group.chat_id, topic_id=group.topic_id)
+
+    async def start(self):
+        """Run shared cycles on wall-clock boundaries until interrupted"""
+        await self.send_startup_messages()
+        self.monitor.scheduler.add_job('multi_tenant_cycle', self.run_cycle, MONITORING_INTERVAL, SCHEDULE_OFFSET)
+        await self.monitor.scheduler.run()
+
+def discover_group_configs(directory: str = ".") -> List[str]:
+    """Return every token-group JSON config in a directory"""
+    paths = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+        path = os.path.normpath(path)
+        name = os.path.basename(path)
+        if name in NON_GROUP_CONFIGS or name.startswith(NON_GROUP_PREFIXES):
+            continue
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except Exception:
+            continue
+        if isinstance(data, dict) and ('symbol' in data or 'symbols' in data):
+            paths.append(path)
+    return paths
+
+async def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Multi-tenant Open Interest Monitor')
+    parser.add_argument('configs', nargs='*', help='Token-group config files (e.g. milk.json h.json)')
+    parser.add_argument('--all', action='store_true', help='Load every token-group config in the current directory')
+    parser.add_argument('--once', action='store_true', help='Run a single cycle and exit')
+    parser.add_argument('--metrics-port', type=int, default=METRICS_PORT, help='Serve Prometheus metrics on this local port')
+    args = parser.parse_args()
+
+    config_paths = [os.path.normpath(path) for path in args.configs]
+    if args.all:
+        config_paths.extend(path for path in discover_group_configs() if path not in config_paths)
+    if not config_paths:
+        parser.error("Pass one or more config files or --all")
+
+    daemon = MultiTenantMonitor(config_paths, discover_dir="." if args.all else None)
+    if args.metrics_port:
+        start_metrics_server(args.metrics_port)
+    if args.once:
+        await daemon.run_cycle()
+        return
+    await daemon.start()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,292 @@
+"""
+Staged monitoring cycle for the Open Interest Monitor
+A cycle runs as concurrent stages connected by bounded queues:
+
+    fetch ──> normalize ──┬──> detect ──> notify
+                          └──> store
+
+Fetch threads (one per exchange) hand over each sample as soon as it is fetched and wait when the
+normalize queue is full, so a slow stage slows the fetch down instead of buffering without bound.
+normalize drops unusable samples and fans the rest out; detect runs the alert rules on
+micro-batches of whatever has arrived; notify sends each alert as soon as it is detected; store
+appends micro-batches to the history store off the event loop. Cross-sectional steps (market
+regime, 15-min window spikes, the snapshot) run once the fetch is complete. Alerts are held only
+while the samples that arrived so far leave a market-wide move possible (see CrossSectionBound in
+regime.py), so such a move still collapses into one message while a normal cycle's alerts go out
+as soon as the bound rules it out.
+
+After the cycle, BackgroundPersister writes the JSON history, checkpoint and CSV export on its own
+thread; a state still waiting to be written is superseded by a newer one. Stages count their
+items (oi_pipeline_items_total) and expose their queue depth (oi_pipeline_queue_depth).
+"""
+
+import asyncio
+import logging
+import math
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import PIPELINE_QUEUE_SIZE, PIPELINE_BATCH, SUPPORTED_EXCHANGES
+from metrics import PIPELINE_DROPPED_TOTAL, PIPELINE_ITEMS_TOTAL, PIPELINE_PERSIST_SUPERSEDED, PIPELINE_QUEUE_DEPTH
+from models import ExchangeOpenInterestData, OpenInterestAlert, OpenInterestData, WindowAverageSpike
+
+QUEUED_STAGES = ('normalize', 'detect', 'store', 'notify')
+STAGES = ('fetch',) + QUEUED_STAGES
+DONE = None  # End-of-cycle marker passed down each queue
+
+class HoldAll:
+    """Holds every alert until the cycle's end (an adaptive tick during a market-wide move)"""
+
+    def add(self, records) -> bool:
+        return True
+
+HOLD_ALL = HoldAll()
+
+class CyclePipeline:
+    """Runs one monitoring cycle's stages; the monitor keeps one instance across cycles"""
+
+    def __init__(self, monitor, queue_size: int = PIPELINE_QUEUE_SIZE, batch: int = PIPELINE_BATCH):
+        self.monitor = monitor
+        self.queue_size = queue_size
+        self.batch = batch
+        # Queues belong to the running event loop, so each cycle creates its own
+        self.queues: Dict[str, asyncio.Queue] = {}
+        self.counts: Dict[str, int] = {}
+        self.peaks: Dict[str, int] = {}
+        self.aborted = False
+        for stage in QUEUED_STAGES:
+            PIPELINE_QUEUE_DEPTH.set_function(lambda stage=stage: self.depth(stage), stage=stage)
+
+    def depth(self, stage: str) -> int:
+        queue = self.queues.get(stage)
+        return queue.qsize() if queue is not None else 0
+
+    def regime_bound(self, classify: bool):
+        """Bound that holds this cycle's alerts while a market regime could apply (None if none can)"""
+        detector = self.monitor.regime_detector
+        if not self.monitor.detect_regimes or detector is None:
+            return None  # Classification needs the previous cycle's snapshot
+        if not classify:
+            # Between classifications the current regime's filter applies once the tick is fetched
+            regime = self.monitor.market_regime
+            return HOLD_ALL if regime is not None and regime.regime != "normal" else None
+        bound = detector.bound()
+        return bound if bound.possible() else None
+
+    def counted(self, stage: str, items: int = 1):
+        self.counts[stage] += items
+        PIPELINE_ITEMS_TOTAL.inc(items, stage=stage)
+
+    async def put(self, stage: str, item):
+        queue = self.queues[stage]
+        await queue.put(item)
+        if item is not DONE:
+            self.peaks[stage] = max(self.peaks[stage], queue.qsize())
+
+    async def take(self, stage: str) -> Tuple[list, bool]:
+        """Wait for at least one item, then take whatever else is queued, up to the batch size.
+        Returns (items, whether the end-of-cycle marker was reached)."""
+        queue = self.queues[stage]
+        items = [await queue.get()]
+        while len(items) < self.batch and not queue.empty():
+            items.append(queue.get_nowait())
+        if items[-1] is DONE:
+            return items[:-1], True
+        return items, False
+
+    async def run(self, notify: bool, classify: bool = True) -> Tuple[Dict[str, ExchangeOpenInterestData],
+                                                                      List[OpenInterestAlert], List[WindowAverageSpike],
+                                                                      List[OpenInterestAlert]]:
+        """Fetch, detect and store one cycle. Returns the normalized exchange data, the alerts and window
+        spikes detected while samples arrived, and the alerts already sent. classify=False marks an adaptive
+        tick between market regime classifications."""
+        self.queues = {stage: asyncio.Queue(self.queue_size) for stage in QUEUED_STAGES}
+        self.counts = dict.fromkeys(STAGES, 0)
+        self.peaks = dict.fromkeys(QUEUED_STAGES, 0)
+        self.aborted = False
+        self.accepted: Dict[str, List[OpenInterestData]] = defaultdict(list)
+        self.alerts: List[OpenInterestAlert] = []
+        self.window_spikes: List[WindowAverageSpike] = []
+        self.sent: List[OpenInterestAlert] = []
+        self.notifying = notify
+        self.holding = self.regime_bound(classify)
+        self.monitor.prepare_detection()
+
+        started = time.perf_counter()
+        fetch = asyncio.create_task(self.fetch())
+        stages = [asyncio.create_task(self.normalize()), asyncio.create_task(self.detect()),
+                  asyncio.create_task(self.store())]
+        if self.notifying:
+            stages.append(asyncio.create_task(self.notify()))
+        try:
+            # A failing stage surfaces here at once instead of leaving fetch waiting for room in a full queue
+            results, *_ = await asyncio.gather(fetch, *stages)
+        except BaseException:
+            await self.abort(fetch, stages)
+            raise
+        self.log_summary(time.perf_counter() - started)
+
+        exchange_data = {}
+        for exchange, batch in results.items():
+            if not batch.success:
+                logging.warning(f"Failed to get data from {batch.exchange}: {batch.error}")
+            exchange_data[exchange] = ExchangeOpenInterestData(exchange=batch.exchange, data=self.accepted[exchange],
+                                                               timestamp=batch.timestamp, success=batch.success,
+                                                               error=batch.error)
+        return exchange_data, self.alerts, self.window_spikes, self.sent
+
+    async def abort(self, fetch: asyncio.Task, stages: List[asyncio.Task]):
+        """Stop the stages and release fetch threads waiting for room in the normalize queue"""
+        self.aborted = True
+        for task in stages:
+            task.cancel()
+        queue = self.queues['normalize']
+        while not fetch.done():
+            while not queue.empty():
+                queue.get_nowait()
+            await asyncio.sleep(0.01)
+
+    async def fetch(self) -> Dict[str, ExchangeOpenInterestData]:
+        """Hand each sample to normalize as it is fetched; aggregators that cannot stream hand over whole batches"""
+        loop = asyncio.get_running_loop()
+        aggregator = self.monitor.aggregator
+
+        async def hand_over(record: OpenInterestData):
+            await self.put('normalize', record)
+            self.counted('fetch')  # On the loop thread, the metrics' only writer
+
+        def on_record(record: OpenInterestData):
+            # Runs on a fetch thread; waiting for room here is the backpressure on the exchanges
+            if not self.aborted:
+                asyncio.run_coroutine_threadsafe(hand_over(record), loop).result()
+
+        try:
+            if hasattr(aggregator, 'stream_exchange_data'):
+                return await asyncio.to_thread(aggregator.stream_exchange_data, on_record)
+            results = await asyncio.to_thread(aggregator.get_all_exchange_data)
+            for batch in results.values():
+                if batch.success:
+                    for record in batch.data:
+                        await self.put('normalize', record)
+                        self.counted('fetch')
+            return results
+        finally:
+            if not self.aborted:
+                await self.put('normalize', DONE)
+
+    async def normalize(self):
+        """Drop samples without a usable OI value and fan the rest out to detect and store"""
+        done = False
+        while not done:
+            records, done = await self.take('normalize')
+            for record in records:
+                value = record.open_interest_value
+                if value is None or not math.isfinite(value) or value < 0:
+                    PIPELINE_DROPPED_TOTAL.inc(exchange=record.exchange)
+                    logging.warning(f"Dropping unusable {record.exchange} sample for {record.symbol}: OI value {value}",
+                                    extra={'symbol': record.symbol, 'exchange': record.exchange})
+                    continue
+                self.accepted[record.exchange].append(record)
+                await self.put('detect', record)
+                await self.put('store', record)
+            self.counted('normalize', len(records))
+        await self.put('detect', DONE)
+        await self.put('store', DONE)
+
+    async def detect(self):
+        """Run detection on each micro-batch and pass its alerts on for sending"""
+        exchanges = len(SUPPORTED_EXCHANGES)
+        done = False
+        while not done:
+            records, done = await self.take('detect')
+            if records:
+                alerts, window_spikes = self.monitor.detect_samples(records, exchanges)
+                self.alerts.extend(alerts)
+                self.window_spikes.extend(window_spikes)
+                self.counted('detect', len(records))
+                if self.holding is not None and not self.holding.add(records):
+                    # The cross-section so far rules a market-wide move out: release the held alerts
+                    self.holding = None
+                    alerts = self.alerts
+                if self.notifying and self.holding is None:
+                    for alert in alerts:
+                        await self.put('notify', alert)
+        if self.notifying:
+            await self.put('notify', DONE)
+
+    async def store(self):
+        """Append micro-batches to the history store on a worker thread"""
+        done = False
+        while not done:
+            records, done = await self.take('store')
+            if records and not self.monitor.fenced_out():
+                await asyncio.to_thread(self.monitor.store_samples, records)
+                self.counted('store', len(records))
+
+    async def notify(self):
+        """Send each alert as soon as it is detected"""
+        queue = self.queues['notify']
+        while True:
+            alert = await queue.get()
+            if alert is DONE:
+                break
+            await self.monitor.send_alerts([alert])
+            self.sent.append(alert)
+            self.counted('notify')
+
+    def log_summary(self, elapsed: float):
+        rates = ", ".join(
+            f"{stage} {self.counts[stage]} ({self.counts[stage] / elapsed:.0f}/s"
+            + (f", peak queue {self.peaks[stage]}/{self.queue_size})" if stage in self.peaks else ")")
+            for stage in STAGES if stage != 'notify' or self.notifying
+        ) if elapsed > 0 else ""
+        logging.info(f"Pipeline: {rates}")
+
+class BackgroundPersister:
+    """Writes states on a background thread; a state still waiting is superseded by a newer one"""
+
+    def __init__(self, write: Callable[[Dict], None]):
+        self.write = write
+        self.pending: Optional[Dict] = None
+        self.busy = False
+        self.condition = threading.Condition()
+        self.thread: Optional[threading.Thread] = None
+
+    def submit(self, state: Dict):
+        with self.condition:
+            if self.pending is not None:
+                PIPELINE_PERSIST_SUPERSEDED.inc()
+            self.pending = state
+            self.condition.notify_all()
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='persister', daemon=True)
+                self.thread.start()
+
+    def run(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.pending is not None)
+                state, self.pending = self.pending, None
+                self.busy = True
+            try:
+                self.write(state)
+                PIPELINE_ITEMS_TOTAL.inc(stage='persist')
+            except Exception as e:
+                logging.error(f"Error persisting monitor state: {e}")
+            finally:
+                with self.condition:
+                    self.busy = False
+                    self.condition.notify_all()
+
+    def discard(self):
+        """Drop a state still waiting to be written (a write already running completes)"""
+        with self.condition:
+            self.pending = None
+            self.condition.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every submitted state is written; False on timeout"""
+        with self.condition:
+            return self.condition.wait_for(lambda: self.pending is None and not self.busy, timeout)
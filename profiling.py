@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Hot-path profiling for the Open Interest Monitor
+Lightweight spans around each cycle phase and exchange call, plus automatic capture of
+slow cycles: once a cycle runs past its budget, a sampling profiler and tracemalloc are
+switched on until it finishes, and the spans, stacks and allocation snapshot are written
+to disk. `python3 profiling.py list|show` summarizes the captures.
+"""
+
+import argparse
+import contextvars
+import cProfile
+import json
+import logging
+import os
+import pstats
+import shutil
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from config import CYCLE_BUDGET, PROFILE_DIR, PROFILE_MODE, PROFILE_SAMPLE_INTERVAL, PROFILE_KEEP
+
+MAX_SPANS = 100000  # Spans kept per cycle; later ones are only counted
+MAX_STACK_DEPTH = 64
+
+_current_trace: contextvars.ContextVar = contextvars.ContextVar('oi_current_trace', default=None)
+_current_span: contextvars.ContextVar = contextvars.ContextVar('oi_current_span', default=None)
+
+class CycleTrace:
+    """Spans recorded during one cycle (shared with worker threads via contextvars)"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = time.perf_counter()
+        self.spans: List[Dict] = []
+        self.dropped = 0
+
+    def add(self, span: Dict):
+        if len(self.spans) < MAX_SPANS:
+            self.spans.append(span)
+        else:
+            self.dropped += 1
+
+@contextmanager
+def span(name: str, **attrs):
+    """Record the duration of a with-block in the current cycle's trace (no-op outside a cycle)"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    parent = _current_span.get()
+    token = _current_span.set(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        ended = time.perf_counter()
+        _current_span.reset(token)
+        trace.add({
+            'name': name,
+            'parent': parent,
+            'start': started - trace.started,
+            'duration': ended - started,
+            'thread': threading.current_thread().name,
+            **attrs,
+        })
+
+def _collapse_stack(frame) -> str:
+    """Render a frame's stack root-first as 'file:function:line;...' (flamegraph collapsed format)"""
+    parts = []
+    while frame is not None and len(parts) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        parts.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+class SlowCycleWatchdog(threading.Thread):
+    """Waits out the cycle budget, then samples every thread's stack until the cycle ends"""
+
+    def __init__(self, budget: float, interval: float):
+        super().__init__(name="oi-profile-watchdog", daemon=True)
+        self.budget = budget
+        self.interval = interval
+        self.done = threading.Event()
+        self.overran = False
+        self.started_tracemalloc = False
+        self.samples: Counter = Counter()
+
+    def run(self):
+        if self.done.wait(self.budget):
+            return
+        self.overran = True
+        logging.warning(f"Cycle exceeded its {self.budget:g}s budget; sampling stacks until it finishes")
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(16)
+            self.started_tracemalloc = True
+        own_ident = threading.get_ident()
+        while not self.done.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident != own_ident:
+                    self.samples[f"{names.get(ident, ident)};{_collapse_stack(frame)}"] += 1
+
+class CycleCapture:
+    """Per-cycle profiling state returned by CycleProfiler.begin"""
+
+    def __init__(self, trace: CycleTrace, token, watchdog: Optional[SlowCycleWatchdog] = None,
+                 profiler: Optional[cProfile.Profile] = None, started_tracemalloc: bool = False):
+        self.trace = trace
+        self.token = token
+        self.watchdog = watchdog
+        self.profiler = profiler
+        self.started_tracemalloc = started_tracemalloc
+        self.started_at = datetime.now()
+
+class CycleProfiler:
+    """Trace every cycle and write a profile capture for cycles that exceed the budget.
+
+    Modes:
+      sample  - nothing runs until the budget is exceeded; then stacks are sampled and
+                tracemalloc is enabled for the rest of the cycle (low overhead, default)
+      cprofile - cProfile and tracemalloc run for every cycle on the event loop thread and
+                 are kept only for slow cycles (full call counts, noticeably slower cycles)
+    A budget of 0 disables captures; spans are still recorded.
+    """
+
+    def __init__(self, budget: float = CYCLE_BUDGET, capture_dir: str = PROFILE_DIR, mode: str = PROFILE_MODE,
+                 sample_interval: float = PROFILE_SAMPLE_INTERVAL, keep: int = PROFILE_KEEP):
+        if mode not in ('sample', 'cprofile'):
+            raise ValueError(f"Unknown profile mode: {mode}")
+        self.budget = budget
+        self.capture_dir = capture_dir
+        self.mode = mode
+        self.sample_interval = sample_interval
+        self.keep = keep
+        self.last_trace: Optional[CycleTrace] = None
+
+    def begin(self, name: str = 'cycle') -> CycleCapture:
+        """Start tracing a cycle; call end() with the result from the same task"""
+        trace = CycleTrace(name)
+        token = _current_trace.set(trace)
+        watchdog = profiler = None
+        started_tracemalloc = False
+        if self.budget > 0:
+            if self.mode == 'sample':
+                watchdog = SlowCycleWatchdog(self.budget, self.sample_interval)
+                watchdog.start()
+            else:
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start(16)
+                    started_tracemalloc = True
+                profiler = cProfile.Profile()
+                profiler.enable()
+        return CycleCapture(trace, token, watchdog, profiler, started_tracemalloc)
+
+    def end(self, capture: CycleCapture, status: str = 'success') -> Optional[str]:
+        """Stop tracing; write a capture if the cycle overran and return its directory"""
+        duration = time.perf_counter() - capture.trace.started
+        _current_trace.reset(capture.token)
+        self.last_trace = capture.trace
+        overran = False
+        snapshot = None
+        if capture.watchdog is not None:
+            capture.watchdog.done.set()
+            capture.watchdog.join()
+            overran = capture.watchdog.overran
+            if overran and tracemalloc.is_tracing():
+                snapshot = tracemalloc.take_snapshot()
+            if capture.watchdog.started_tracemalloc:
+                tracemalloc.stop()
+        if capture.profiler is not None:
+            capture.profiler.disable()
+            overran = duration > self.budget
+            if overran and tracemalloc.is_tracing():
+                snapshot = tracemalloc.take_snapshot()
+            if capture.started_tracemalloc:
+                tracemalloc.stop()
+        if not overran:
+            return None
+        try:
+            return self.write_capture(capture, duration, status, snapshot)
+        except Exception as e:
+            logging.error(f"Error writing profile capture: {e}")
+            return None
+
+    def write_capture(self, capture: CycleCapture, duration: float, status: str, snapshot) -> str:
+        """Write spans, samples, cProfile stats and the tracemalloc snapshot for a slow cycle"""
+        stamp = capture.started_at.strftime('%Y%m%d-%H%M%S')
+        path = os.path.join(self.capture_dir, f"{capture.trace.name}-{stamp}-{os.getpid()}")
+        os.makedirs(path, exist_ok=True)
+        meta = {
+            'name': capture.trace.name,
+            'started_at': capture.started_at.isoformat(),
+            'duration': duration,
+            'budget': self.budget,
+            'mode': self.mode,
+            'status': status,
+            'pid': os.getpid(),
+            'dropped_spans': capture.trace.dropped,
+            'spans': capture.trace.spans,
+        }
+        with open(os.path.join(path, 'capture.json'), 'w') as f:
+            json.dump(meta, f)
+        if capture.watchdog is not None and capture.watchdog.samples:
+            with open(os.path.join(path, 'samples.txt'), 'w') as f:
+                for stack, count in capture.watchdog.samples.most_common():
+                    f.write(f"{stack} {count}\n")
+        if capture.profiler is not None:
+            capture.profiler.dump_stats(os.path.join(path, 'cprofile.prof'))
+        if snapshot is not None:
+            snapshot.dump(os.path.join(path, 'tracemalloc.snapshot'))
+        logging.warning(f"Slow cycle ({duration:.1f}s > {self.budget:g}s budget) captured in {path}")
+        self.prune_captures()
+        return path
+
+    def prune_captures(self):
+        """Keep only the newest captures"""
+        captures = list_captures(self.capture_dir)
+        for old in captures[:-self.keep] if self.keep > 0 else []:
+            shutil.rmtree(old, ignore_errors=True)
+
+def list_captures(capture_dir: str = PROFILE_DIR) -> List[str]:
+    """Capture directories, oldest first"""
+    if not os.path.isdir(capture_dir):
+        return []
+    paths = [os.path.join(capture_dir, name) for name in os.listdir(capture_dir)]
+    paths = [path for path in paths if os.path.exists(os.path.join(path, 'capture.json'))]
+    return sorted(paths, key=os.path.getmtime)
+
+def load_capture(path: str) -> Dict:
+    with open(os.path.join(path, 'capture.json'), 'r') as f:
+        return json.load(f)
+
+def summarize_spans(spans: List[Dict]) -> List[Dict]:
+    """Aggregate spans by name: count, total, max; sorted by total time"""
+    totals = defaultdict(lambda: {'count': 0, 'total': 0.0, 'max': 0.0})
+    for s in spans:
+        entry = totals[s['name']]
+        entry['count'] += 1
+        entry['total'] += s['duration']
+        entry['max'] = max(entry['max'], s['duration'])
+    return sorted(({'name': name, **entry} for name, entry in totals.items()), key=lambda e: e['total'], reverse=True)
+
+def summarize_samples(samples_file: str):
+    """Return (total samples, self counts, inclusive counts) per frame from a collapsed stacks file"""
+    self_counts: Counter = Counter()
+    inclusive_counts: Counter = Counter()
+    total = 0
+    with open(samples_file, 'r') as f:
+        for line in f:
+            stack, _, count = line.rstrip('\n').rpartition(' ')
+            count = int(count)
+            frames = stack.split(';')[1:]  # First element is the thread name
+            if not frames:
+                continue
+            total += count
+            self_counts[frames[-1]] += count
+            for frame in set(frames):
+                inclusive_counts[frame] += count
+    return total, self_counts, inclusive_counts
+
+def print_capture(path: str, top: int = 20):
+    """Print a human-readable summary of one capture"""
+    meta = load_capture(path)
+    print(f"📁 {path}")
+    print(f"⏱️  {meta['name']} started {meta['started_at']}: {meta['duration']:.1f}s "
+          f"(budget {meta['budget']:g}s, mode {meta['mode']}, status {meta['status']})")
+
+    print(f"\n📊 Spans ({len(meta['spans'])} recorded, {meta['dropped_spans']} dropped)")
+    print(f"  {'span':<32} {'count':>7} {'total s':>10} {'max s':>9} {'share':>7}")
+    for entry in summarize_spans(meta['spans'])[:top]:
+        share = entry['total'] / meta['duration'] * 100 if meta['duration'] else 0.0
+        print(f"  {entry['name']:<32} {entry['count']:>7} {entry['total']:>10.3f} {entry['max']:>9.3f} {share:>6.1f}%")
+
+    samples_file = os.path.join(path, 'samples.txt')
+    if os.path.exists(samples_file):
+        total, self_counts, inclusive_counts = summarize_samples(samples_file)
+        print(f"\n🔬 Sampled stacks after budget overrun ({total} samples)")
+        print("  Self time:")
+        for frame, count in self_counts.most_common(top):
+            print(f"    {count / total * 100:5.1f}%  {frame}")
+        print("  Inclusive time:")
+        for frame, count in inclusive_counts.most_common(top):
+            print(f"    {count / total * 100:5.1f}%  {frame}")
+
+    prof_file = os.path.join(path, 'cprofile.prof')
+    if os.path.exists(prof_file):
+        print("\n🔬 cProfile (event loop thread, by cumulative time)")
+        pstats.Stats(prof_file, stream=sys.stdout).sort_stats('cumulative').print_stats(top)
+
+    snapshot_file = os.path.join(path, 'tracemalloc.snapshot')
+    if os.path.exists(snapshot_file):
+        snapshot = tracemalloc.Snapshot.load(snapshot_file)
+        stats = snapshot.statistics('lineno')
+        total_size = sum(stat.size for stat in stats)
+        print(f"\n🧠 Live allocations at cycle end ({total_size / 1024 / 1024:.1f} MiB traced)")
+        for stat in stats[:top]:
+            frame = stat.traceback[0]
+            print(f"  {stat.size / 1024:10.1f} KiB {stat.count:>8} blocks  {frame.filename}:{frame.lineno}")
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Summarize slow-cycle profile captures')
+    parser.add_argument('command', nargs='?', default='list', choices=['list', 'show'], help='List captures or show one')
+    parser.add_argument('capture', nargs='?', default='latest', help='Capture directory or name (default: latest)')
+    parser.add_argument('--dir', default=PROFILE_DIR, help='Profile capture directory')
+    parser.add_argument('--top', type=int, default=20, help='Rows per section')
+    args = parser.parse_args()
+
+    captures = list_captures(args.dir)
+    if args.command == 'list':
+        if not captures:
+            print(f"No profile captures in {args.dir}")
+            return
+        for path in captures:
+            meta = load_capture(path)
+            slowest = summarize_spans(meta['spans'])[:1]
+            hottest = f"{slowest[0]['name']} {slowest[0]['total']:.1f}s" if slowest else "-"
+            print(f"{os.path.basename(path)}  {meta['duration']:8.1f}s  {meta['mode']:<8}  {meta['status']:<8}  top span: {hottest}")
+        return
+
+    if args.capture == 'latest':
+        if not captures:
+            print(f"No profile captures in {args.dir}")
+            sys.exit(1)
+        path = captures[-1]
+    else:
+        path = args.capture if os.path.isdir(args.capture) else os.path.join(args.dir, args.capture)
+    if not os.path.exists(os.path.join(path, 'capture.json')):
+        print(f"❌ No capture at {path}")
+        sys.exit(1)
+    print_capture(path, args.top)
+
+if __name__ == "__main__":
+    main()
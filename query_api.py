@@ -0,0 +1,271 @@
+"""
+Read-only HTTP query API for the Open Interest Monitor
+Runs on the monitor's event loop and answers from its in-memory state, so dashboards no longer
+copy the JSON history off the box:
+
+    GET /api/snapshot                      latest sample and statistics of every series
+    GET /api/history/{symbol}              samples with their derived metrics (?exchange=, ?from=, ?to=)
+    GET /api/windows/{symbol}              resampled windows (?interval=15m, ?exchange=, ?from=, ?to=)
+    GET /api/alerts                        recent alerts (?symbol=, ?since=, ?limit=)
+
+History and windows come from the history store and its retention tiers once the monitor has
+them, else from memory. Responses carry an ETag derived from the monitor's data version, so
+If-None-Match is answered with 304 without rendering anything. Rendered bodies of up to
+QUERY_CACHE_MAX_BYTES are cached until the next cycle; windows, and history from the store (or over
+QUERY_STREAM_CHUNK samples), are streamed in chunks.
+Store scans and their rendering run on worker threads, so a long range never stalls the cycles.
+Derived metrics of history samples are recomputed over the requested range, so the first sample
+has no changes and the smoothed values settle over the following samples.
+"""
+
+import asyncio
+import json
+import logging
+import time
+import zlib
+from bisect import bisect_left, bisect_right
+from dataclasses import asdict
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from aiohttp import web
+
+from config import QUERY_API_HOST, QUERY_CACHE_MAX_BYTES, QUERY_STREAM_CHUNK, SUPPORTED_EXCHANGES
+from derived_metrics import HISTORY_FIELDS, DerivedMetrics
+from history_store import Resampler, parse_interval, parse_time, row_dicts, to_rows
+from metrics import QUERY_REQUESTS_TOTAL
+from models import OpenInterestData, OpenInterestDataEncoder
+
+def record_dict(record: OpenInterestData) -> Dict:
+    return {
+        'symbol': record.symbol,
+        'exchange': record.exchange,
+        'timestamp': record.timestamp,
+        'open_interest': record.open_interest,
+        'open_interest_value': record.open_interest_value,
+        'price': record.price,
+        'volume_24h': record.volume_24h,
+        'funding_rate': record.funding_rate,
+    }
+
+def with_derived(samples: Iterator[Dict], derived: DerivedMetrics) -> Iterator[Dict]:
+    """Sample dicts with the derived metrics of their series as of each sample"""
+    for sample in samples:
+        derived.update(OpenInterestData(**sample))
+        yield {**sample, **derived.get(sample['symbol'], sample['exchange']).fields(HISTORY_FIELDS)}
+
+def resampled(resampler: Resampler, chunks: Iterator) -> Iterator[List[Dict]]:
+    """The windows completed by each chunk of rows, then the last, partial ones"""
+    for rows in chunks:
+        yield list(resampler.feed(rows))
+    yield list(resampler.flush())
+
+def time_range(records: List[OpenInterestData], start: Optional[datetime], end: Optional[datetime]) -> Tuple[int, int]:
+    """Index bounds of the records inside [start, end]; records are appended in fetch order"""
+    lo = bisect_left(records, start, key=lambda r: r.timestamp) if start else 0
+    hi = bisect_right(records, end, key=lambda r: r.timestamp) if end else len(records)
+    return lo, max(lo, hi)
+
+class QueryAPI:
+    """aiohttp application serving a monitor's in-memory state"""
+
+    def __init__(self, monitor, port: int, host: str = QUERY_API_HOST):
+        self.monitor = monitor
+        self.host = host
+        self.port = port
+        self.cache: Dict[str, bytes] = {}  # path and query -> rendered body, for cache_version
+        self.cache_version = None
+        self.instance = f"{int(time.time()):x}"  # Keeps ETags from colliding across restarts
+        self.runner: Optional[web.AppRunner] = None
+        self.app = web.Application()
+        self.app.router.add_get('/api/snapshot', self.handle_snapshot)
+        self.app.router.add_get('/api/history/{symbol}', self.handle_history)
+        self.app.router.add_get('/api/windows/{symbol}', self.handle_windows)
+        self.app.router.add_get('/api/alerts', self.handle_alerts)
+
+    async def start(self):
+        self.runner = web.AppRunner(self.app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, self.host, self.port)
+        await site.start()
+        logging.info(f"Query API listening on http://{self.host}:{self.port}/api/")
+
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+    def etag(self, request: web.Request) -> str:
+        """Every response is a function of the data version and the request, so no body is needed"""
+        return f'"{self.instance}-{self.monitor.data_version:x}-{zlib.crc32(request.path_qs.encode()):08x}"'
+
+    def not_modified(self, request: web.Request, etag: str) -> bool:
+        tags = request.headers.get('If-None-Match', '')
+        return tags.strip() == '*' or etag in [tag.strip() for tag in tags.split(',')]
+
+    def cached(self, request: web.Request) -> Optional[bytes]:
+        """The body rendered for this request during the current cycle, if any"""
+        if self.cache_version != self.monitor.data_version:
+            self.cache.clear()
+            self.cache_version = self.monitor.data_version
+        return self.cache.get(request.path_qs)
+
+    def store(self, request: web.Request, version: int, body: bytes):
+        """Cache a body rendered at version, unless it is too large or a cycle has run since"""
+        if len(body) <= QUERY_CACHE_MAX_BYTES and version == self.cache_version:
+            self.cache[request.path_qs] = body
+
+    async def respond(self, request: web.Request, endpoint: str, render, in_thread: bool = False) -> web.Response:
+        """Serve a rendered JSON body from the per-cycle cache, rendering it on a miss (on a worker thread
+        with in_thread, for renders that read the history store)"""
+        etag = self.etag(request)
+        if self.not_modified(request, etag):
+            QUERY_REQUESTS_TOTAL.inc(endpoint=endpoint, result='not_modified')
+            return web.Response(status=304, headers={'ETag': etag})
+        body = self.cached(request)
+        if body is None:
+            version = self.cache_version
+            def encode() -> bytes:
+                return json.dumps(render(), cls=OpenInterestDataEncoder).encode()
+            try:
+                body = await asyncio.to_thread(encode) if in_thread else encode()
+            except ValueError as e:
+                QUERY_REQUESTS_TOTAL.inc(endpoint=endpoint, result='bad_request')
+                raise web.HTTPBadRequest(text=str(e))
+            self.store(request, version, body)
+            QUERY_REQUESTS_TOTAL.inc(endpoint=endpoint, result='miss')
+        else:
+            QUERY_REQUESTS_TOTAL.inc(endpoint=endpoint, result='hit')
+        return web.Response(body=body, content_type='application/json', headers={'ETag': etag})
+
+    def query_range(self, request: web.Request) -> Tuple[str, List[str], Optional[datetime], Optional[datetime]]:
+        symbol = request.match_info['symbol'].upper()
+        exchange = request.query.get('exchange')
+        return (symbol, [exchange] if exchange else SUPPORTED_EXCHANGES, parse_time(request.query.get('from')),
+                parse_time(request.query.get('to')))
+
+    def memory_records(self, symbol: str, exchange: str, start: Optional[datetime],
+                       end: Optional[datetime]) -> List[OpenInterestData]:
+        """The symbol's in-memory samples of one exchange in range"""
+        records = self.monitor.historical_data.get(symbol, [])
+        lo, hi = time_range(records, start, end)
+        # References only; the cycle may replace the list while we stream
+        return [r for r in records[lo:hi] if r.exchange == exchange]
+
+    def scan(self, symbol: str, exchange: str, start: Optional[datetime], end: Optional[datetime]) -> Iterator:
+        """Store chunks of one series in range: the history store when the monitor has one, else memory"""
+        store = self.monitor.history_store
+        if store is not None:
+            yield from store.scan(exchange, symbol, start.timestamp() if start else None,
+                                  end.timestamp() if end else None, QUERY_STREAM_CHUNK)
+            return
+        records = self.memory_records(symbol, exchange, start, end)
+        for position in range(0, len(records), QUERY_STREAM_CHUNK):
+            yield to_rows(records[position:position + QUERY_STREAM_CHUNK])
+
+    async def handle_snapshot(self, request: web.Request) -> web.Response:
+        def render():
+            return {'data_version': self.monitor.data_version,
+                    'series': [asdict(s) for s in self.monitor.snapshot_series()]}
+        return await self.respond(request, 'snapshot', render)
+
+    async def handle_history(self, request: web.Request) -> web.StreamResponse:
+        try:
+            symbol, exchanges, start, end = self.query_range(request)
+        except ValueError as e:
+            QUERY_REQUESTS_TOTAL.inc(endpoint='history', result='bad_request')
+            raise web.HTTPBadRequest(text=str(e))
+        if self.monitor.history_store is None:
+            records = [r for exchange in exchanges for r in self.memory_records(symbol, exchange, start, end)]
+            if len(records) <= QUERY_STREAM_CHUNK:
+                return await self.respond(request, 'history',
+                                          lambda: list(with_derived((record_dict(r) for r in records), DerivedMetrics())))
+
+        def render_chunks() -> Iterator[bytes]:
+            derived = DerivedMetrics()
+            for exchange in exchanges:
+                for rows in self.scan(symbol, exchange, start, end):
+                    chunk = ",".join(json.dumps(sample, cls=OpenInterestDataEncoder)
+                                     for sample in with_derived(row_dicts(symbol, exchange, rows), derived))
+                    if chunk:
+                        yield chunk.encode()
+
+        return await self.stream(request, 'history', render_chunks(), b"[", b"]")
+
+    async def handle_windows(self, request: web.Request) -> web.StreamResponse:
+        try:
+            interval = parse_interval(request.query.get('interval', '15m'))
+            symbol, exchanges, start, end = self.query_range(request)
+        except ValueError as e:
+            QUERY_REQUESTS_TOTAL.inc(endpoint='windows', result='bad_request')
+            raise web.HTTPBadRequest(text=str(e))
+
+        def render_chunks() -> Iterator[bytes]:
+            for exchange in exchanges:
+                resampler = Resampler(interval)
+                if self.monitor.retention is not None:
+                    chunks = self.monitor.retention.window_scan(exchange, symbol, start.timestamp() if start else None,
+                                                                end.timestamp() if end else None, interval)
+                else:
+                    chunks = self.scan(symbol, exchange, start, end)
+                for windows in resampled(resampler, chunks):
+                    chunk = ",".join(json.dumps({'exchange': exchange, **window}, cls=OpenInterestDataEncoder)
+                                     for window in windows)
+                    if chunk:
+                        yield chunk.encode()
+
+        head = json.dumps({'symbol': symbol, 'interval': interval})[:-1] + ', "windows": ['
+        return await self.stream(request, 'windows', render_chunks(), head.encode(), b"]}", cache=True)
+
+    async def stream(self, request: web.Request, endpoint: str, chunks: Iterator[bytes], head: bytes, tail: bytes,
+                     cache: bool = False) -> web.StreamResponse:
+        """Stream head, the comma-separated chunks and tail; each chunk is read and rendered on a worker
+        thread and the loop only writes it out. With cache, a body that stays under QUERY_CACHE_MAX_BYTES
+        is kept for the rest of the cycle."""
+        etag = self.etag(request)
+        if self.not_modified(request, etag):
+            QUERY_REQUESTS_TOTAL.inc(endpoint=endpoint, result='not_modified')
+            return web.Response(status=304, headers={'ETag': etag})
+        if cache:
+            body = self.cached(request)
+            if body is not None:
+                QUERY_REQUESTS_TOTAL.inc(endpoint=endpoint, result='hit')
+                return web.Response(body=body, content_type='application/json', headers={'ETag': etag})
+        version = self.cache_version
+        response = web.StreamResponse(headers={'ETag': etag, 'Content-Type': 'application/json'})
+        response.enable_chunked_encoding()
+        await response.prepare(request)
+
+        parts: Optional[List[bytes]] = [head] if cache else None
+        size = len(head)
+        await response.write(head)
+        separator = b""
+        while True:
+            chunk = await asyncio.to_thread(next, chunks, None)
+            if chunk is None:
+                break
+            await response.write(separator + chunk)
+            if parts is not None:
+                size += len(separator) + len(chunk)
+                parts.extend((separator, chunk))
+                if size > QUERY_CACHE_MAX_BYTES:
+                    parts = None
+            separator = b","
+        await response.write(tail)
+        await response.write_eof()
+        if parts is not None:
+            self.store(request, version, b"".join(parts + [tail]))
+        QUERY_REQUESTS_TOTAL.inc(endpoint=endpoint, result='streamed')
+        return response
+
+    async def handle_alerts(self, request: web.Request) -> web.Response:
+        def render():
+            symbol = request.query.get('symbol', '').upper()
+            since = parse_time(request.query.get('since'))
+            limit = int(request.query.get('limit', 100))
+            alerts = [
+                alert for alert in reversed(self.monitor.recent_alerts)
+                if (not symbol or alert['symbol'] == symbol) and (since is None or alert['timestamp'] >= since)
+            ]
+            return alerts[:limit]
+        return await self.respond(request, 'alerts', render)
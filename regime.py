@@ -0,0 +1,172 @@
+"""
+Market-wide regime detection for the Open Interest Monitor
+Looks at one cycle's snapshot across every (symbol, exchange) series at once: the median and
+robust dispersion of the OI change since the previous cycle and the share of series moving with
+the median. A market-wide move (e.g. everything deleveraging together) is reported as one regime
+alert, and only series whose change is abnormal relative to the cross-section keep their alerts.
+Adaptive polling samples a few series per tick, so its ticks are merged and the cross-section is
+classified once per MONITORING_INTERVAL.
+"""
+
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from config import (REGIME_MIN_SERIES, REGIME_MEDIAN_MOVE, REGIME_CO_MOVE, REGIME_BREADTH, REGIME_ZSCORE,
+                    REGIME_MIN_DISPERSION)
+from models import ExchangeOpenInterestData, MarketRegime, OpenInterestData
+
+MAD_SCALE = 1.4826  # Scales the median absolute deviation to a standard deviation for normal data
+
+class MarketRegimeDetector:
+    """Classifies each cycle's cross-section of OI changes against the previous cycle's snapshot"""
+
+    def __init__(self, min_series: int = REGIME_MIN_SERIES, median_move: float = REGIME_MEDIAN_MOVE,
+                 co_move: float = REGIME_CO_MOVE, breadth: float = REGIME_BREADTH, zscore: float = REGIME_ZSCORE,
+                 min_dispersion: float = REGIME_MIN_DISPERSION):
+        self.min_series = min_series
+        self.median_move = median_move
+        self.co_move = co_move
+        self.breadth = breadth
+        self.zscore = zscore
+        self.min_dispersion = min_dispersion
+        self.previous: Dict[str, Tuple[Tuple[str, ...], np.ndarray]] = {}  # exchange -> (symbols, OI values)
+        self.pending: Dict[str, Dict[str, float]] = {}  # exchange -> symbol -> newest OI value merged since then
+
+    def bound(self) -> 'CrossSectionBound':
+        """Start following the next cycle's cross-section as it arrives"""
+        return CrossSectionBound(self)
+
+    def merge(self, exchange_data: Dict[str, ExchangeOpenInterestData]):
+        """Keep each series' newest value for the next classification (an adaptive tick that does not classify)"""
+        for exchange, batch in exchange_data.items():
+            if batch.success and batch.data:
+                self.pending.setdefault(exchange, {}).update(
+                    (record.symbol, record.open_interest_value or 0.0) for record in batch.data)
+
+    def release(self, symbols: Iterable[str]):
+        """Forget series that are no longer monitored"""
+        dropped = set(symbols)
+        for exchange, (previous_symbols, previous_values) in list(self.previous.items()):
+            kept = [position for position, symbol in enumerate(previous_symbols) if symbol not in dropped]
+            if len(kept) < len(previous_symbols):
+                self.previous[exchange] = (tuple(previous_symbols[position] for position in kept), previous_values[kept])
+        for series in self.pending.values():
+            for symbol in dropped:
+                series.pop(symbol, None)
+
+    def snapshot(self, exchange_data: Dict[str, ExchangeOpenInterestData]) -> Dict[str, Tuple[Tuple[str, ...], np.ndarray]]:
+        """Each exchange's (symbols, OI values) to classify: this cycle's, merged into the pending ticks' if any"""
+        if self.pending:
+            self.merge(exchange_data)
+            pending, self.pending = self.pending, {}
+            return {exchange: (tuple(series), np.fromiter(series.values(), dtype=float, count=len(series)))
+                    for exchange, series in pending.items()}
+        snapshot = {}
+        for exchange, batch in exchange_data.items():
+            if batch.success and batch.data:
+                symbols = tuple(record.symbol for record in batch.data)
+                snapshot[exchange] = (symbols, np.fromiter((record.open_interest_value or 0.0 for record in batch.data),
+                                                           dtype=float, count=len(symbols)))
+        return snapshot
+
+    def changes(self, snapshot: Dict[str, Tuple[Tuple[str, ...], np.ndarray]]) -> Tuple[list, np.ndarray]:
+        """Return the (symbol, exchange) keys and % OI changes since the previous snapshot, and remember this one"""
+        keys = []
+        parts = []
+        for exchange, (symbols, values) in snapshot.items():
+            previous = self.previous.get(exchange)
+            if previous is None or previous[0] == symbols:
+                self.previous[exchange] = (symbols, values)
+            else:
+                # Series missing from this snapshot (not sampled since) keep their last value as the reference
+                merged = dict(zip(previous[0], previous[1].tolist()))
+                merged.update(zip(symbols, values.tolist()))
+                self.previous[exchange] = (tuple(merged), np.fromiter(merged.values(), dtype=float, count=len(merged)))
+            if previous is None:
+                continue
+            previous_symbols, previous_values = previous
+            if previous_symbols == symbols:
+                aligned = previous_values
+            else:
+                # The exchange listed a different universe this cycle: align by symbol
+                index = {symbol: position for position, symbol in enumerate(previous_symbols)}
+                positions = np.fromiter((index.get(symbol, -1) for symbol in symbols), dtype=int, count=len(symbols))
+                aligned = np.where(positions >= 0, previous_values[positions], np.nan)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                parts.append(np.where(aligned > 0, (values - aligned) / aligned * 100, np.nan))
+            keys.extend((symbol, exchange) for symbol in symbols)
+        return keys, np.concatenate(parts) if parts else np.empty(0)
+
+    def observe(self, exchange_data: Dict[str, ExchangeOpenInterestData],
+                timestamp: Optional[datetime] = None) -> Optional[MarketRegime]:
+        """Classify this cycle; None until there are two snapshots covering at least min_series series"""
+        keys, changes = self.changes(self.snapshot(exchange_data))
+        valid = ~np.isnan(changes)
+        count = int(valid.sum())
+        if count < self.min_series:
+            return None
+        observed = changes[valid]
+        median = float(np.median(observed))
+        dispersion = max(float(np.median(np.abs(observed - median))) * MAD_SCALE, self.min_dispersion)
+        direction = np.sign(median)
+        breadth = float(np.mean((np.sign(observed) == direction) & (np.abs(observed) >= self.co_move))) if direction else 0.0
+
+        if abs(median) >= self.median_move and breadth >= self.breadth:
+            regime = "deleveraging" if median < 0 else "leveraging"
+        else:
+            regime = "normal"
+
+        zscores = np.where(valid, (changes - median) / dispersion, 0.0)
+        abnormal = np.flatnonzero(np.abs(zscores) >= self.zscore)
+        order = abnormal[np.argsort(-np.abs(zscores[abnormal]))]
+        return MarketRegime(
+            timestamp=timestamp or datetime.now(),
+            regime=regime,
+            series=count,
+            median_change=median,
+            dispersion=dispersion,
+            breadth=breadth,
+            abnormal=[(keys[i][0], keys[i][1], float(changes[i]), float(zscores[i])) for i in order],
+        )
+
+class CrossSectionBound:
+    """Follows a cycle's cross-section while its samples arrive and tells once a market-wide move is ruled out.
+
+    A move needs `breadth` of the comparable series to move at least `co_move` one way, so it is
+    impossible once more than the rest of the series that can still be compared (those in the previous
+    snapshot) lag behind in both directions. Each exchange is also checked on its own, as an exchange
+    whose fetch fails is left out of the classification.
+    """
+
+    def __init__(self, detector: MarketRegimeDetector):
+        self.detector = detector
+        self.previous = {exchange: dict(zip(symbols, values.tolist()))
+                         for exchange, (symbols, values) in detector.previous.items()}
+        self.lagging = {exchange: [0, 0] for exchange in self.previous}  # Series not moving up, not moving down
+
+    def add(self, records: Iterable[OpenInterestData]) -> bool:
+        """Count newly arrived samples; returns whether a market-wide move is still possible"""
+        co_move = self.detector.co_move
+        for record in records:
+            previous = self.previous.get(record.exchange, {}).get(record.symbol)
+            if not previous or previous <= 0:
+                continue
+            change = ((record.open_interest_value or 0.0) - previous) / previous * 100
+            lagging = self.lagging[record.exchange]
+            lagging[0] += change < co_move
+            lagging[1] += change > -co_move
+        return self.possible()
+
+    def possible(self) -> bool:
+        return self.possible_across(list(self.previous)) or any(self.possible_across([exchange])
+                                                                 for exchange in self.previous)
+
+    def possible_across(self, exchanges: list) -> bool:
+        total = sum(len(self.previous[exchange]) for exchange in exchanges)
+        if total < self.detector.min_series:
+            return False
+        # The breadth is largest if every series still to arrive moves with the market
+        return any((total - sum(self.lagging[exchange][side] for exchange in exchanges)) / total >= self.detector.breadth
+                   for side in (0, 1))
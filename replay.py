@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+Open Interest alert replay and backtest
+Streams stored history through the live detection path (detect_spikes, the average-deviation
+rule and the 15-minute window ratio rule) cycle by cycle with a simulated clock, and sweeps
+detection parameters in parallel. Each configuration is scored on alert counts, lead time
+before large moves and overlap with the current settings
+"""
+
+import argparse
+import bisect
+import glob
+import itertools
+import json
+import logging
+import os
+import pickle
+import statistics
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from config import (SPIKE_THRESHOLD, SEVERITY_MEDIUM, SEVERITY_HIGH, WINDOW_SPIKE_RATIO, ALERT_COOLDOWN,
+                    MONITORING_INTERVAL, SUPPORTED_EXCHANGES)
+from models import OpenInterestData, ExchangeOpenInterestData, ReplayConfig, ReplayAlert
+from monitor import OpenInterestMonitor
+
+EVENT_MOVE = 50.0  # % move within the horizon that counts as an event worth alerting on
+EVENT_HORIZON = 4.0  # Hours
+MARKET_SYMBOL = "MARKET"  # Symbol recorded for market regime alerts
+
+Cycle = Tuple[datetime, List[ExchangeOpenInterestData]]
+
+def load_store_history(history_dir: str) -> Dict[str, List[OpenInterestData]]:
+    """Every sample in a history store's raw tier (retention.py), oldest first per symbol"""
+    from retention import RetentionManager  # Deferred: numpy is only needed when a store is read
+    from history_store import row_dicts
+    raw = RetentionManager(history_dir).raw
+    history = defaultdict(list)
+    for exchange, symbol in raw.series():
+        for rows in raw.scan(exchange, symbol):
+            history[symbol].extend(OpenInterestData(**row) for row in row_dicts(symbol, exchange, rows))
+    for records in history.values():
+        records.sort(key=lambda record: record.timestamp)
+    return dict(history)
+
+def load_history_source(path: str) -> Dict[str, List[OpenInterestData]]:
+    """Load stored history: a history JSON file, a monitor checkpoint, a shard directory or a history store.
+
+    The JSON and checkpoint only keep the newest samples per symbol, so when the history store
+    next to a data file (<data file>.history) exists its raw tier is read instead.
+    """
+    if os.path.isdir(path) and os.path.isdir(os.path.join(path, "raw")):
+        return load_store_history(path)
+    if os.path.isdir(path):
+        files = sorted(glob.glob(os.path.join(path, "shard-*.json")))
+    else:
+        files = [path]
+    history = {}
+    for data_file in files:
+        history_dir = f"{os.path.splitext(data_file)[0]}.history"
+        if os.path.isdir(os.path.join(history_dir, "raw")):
+            history.update(load_store_history(history_dir))
+        elif data_file.endswith(".ckpt"):
+            with open(data_file, 'rb') as f:
+                state = pickle.load(f)
+            for symbol, rows in state['series'].items():
+                history[symbol] = [
+                    OpenInterestData(symbol, exchange, oi, oi_value, datetime.fromtimestamp(ts), price, volume, funding)
+                    for exchange, oi, oi_value, ts, price, volume, funding in rows
+                ]
+        else:
+            loader = OpenInterestMonitor(token_list=[], data_file=data_file, load_history=False)
+            loader.load_historical_data()
+            history.update(loader.historical_data)
+    return history
+
+def build_cycles(history: Dict[str, List[OpenInterestData]], interval: int = MONITORING_INTERVAL) -> List[Cycle]:
+    """Group stored samples into monitoring cycles.
+
+    Each cycle gets the first sample per symbol and exchange in its interval, as a live
+    poller would have seen it; exchanges are processed in the live order.
+    """
+    buckets: Dict[int, Dict[Tuple[str, str], OpenInterestData]] = defaultdict(dict)
+    for symbol, records in history.items():
+        for record in records:
+            bucket = buckets[int(record.timestamp.timestamp() // interval)]
+            key = (record.exchange, symbol)
+            if key not in bucket or record.timestamp < bucket[key].timestamp:
+                bucket[key] = record
+    order = {exchange: index for index, exchange in enumerate(SUPPORTED_EXCHANGES)}
+    cycles = []
+    for bucket_id in sorted(buckets):
+        per_exchange = defaultdict(list)
+        for (exchange, _), record in buckets[bucket_id].items():
+            per_exchange[exchange].append(record)
+        cycle_time = datetime.fromtimestamp(bucket_id * interval)
+        batches = [
+            ExchangeOpenInterestData(exchange=exchange, data=records, timestamp=cycle_time, success=True)
+            for exchange, records in sorted(per_exchange.items(), key=lambda item: order.get(item[0], len(order)))
+        ]
+        cycles.append((cycle_time, batches))
+    return cycles
+
+def replay(cycles: List[Cycle], config: ReplayConfig) -> List[ReplayAlert]:
+    """Run the monitor's detection path over the cycles with a simulated clock"""
+    symbols = sorted({record.symbol for _, batches in cycles for batch in batches for record in batch.data})
+    monitor = OpenInterestMonitor(token_list=symbols, load_history=False)
+    monitor.spike_threshold = config.spike_threshold
+    monitor.severity_medium = config.severity_medium
+    monitor.severity_high = config.severity_high
+    monitor.window_spike_ratio = config.window_spike_ratio
+    monitor.alert_cooldown = config.alert_cooldown
+    monitor.detect_regimes = config.market_regime
+    if config.rules_file:
+        monitor.load_rule_engine(config.rules_file)
+    simulated_now = [0.0]
+    monitor.clock = lambda: simulated_now[0]
+
+    alerts = []
+    for cycle_time, batches in cycles:
+        simulated_now[0] = cycle_time.timestamp()
+        # Same steps as run_monitoring_cycle: detection over the cycle's data, then averages
+        exchange_data = {batch.exchange: batch for batch in batches}
+        cycle_alerts, window_spikes = monitor.detect_cycle_alerts(exchange_data)
+        regime, cycle_alerts = monitor.apply_market_regime(exchange_data, cycle_alerts)
+        if regime:
+            alerts.append(ReplayAlert(cycle_time, MARKET_SYMBOL, "regime", f"market_{regime.regime}", "high",
+                                      regime.median_change))
+        for alert in cycle_alerts:
+            rule = alert.rule or ("average" if alert.alert_type.startswith("avg_") else "change")
+            alerts.append(ReplayAlert(cycle_time, alert.symbol, rule, alert.alert_type, alert.severity,
+                                      alert.percentage_change))
+        for spike in window_spikes:
+            alerts.append(ReplayAlert(cycle_time, spike.symbol, "window", "window_avg_spike", "high",
+                                      (spike.ratio - 1) * 100))
+        monitor.calculate_historical_averages()
+    return alerts
+
+def find_events(cycles: List[Cycle], move: float = EVENT_MOVE, horizon: float = EVENT_HORIZON) -> List[Tuple[str, datetime, datetime]]:
+    """Find large moves: (symbol, move start, move end) where OI changed by `move`% within `horizon` hours.
+
+    A symbol's next event is only looked for after its previous event ended.
+    """
+    series = defaultdict(list)  # symbol -> [(time, value)] using the first exchange seen per cycle
+    for cycle_time, batches in cycles:
+        seen = set()
+        for batch in batches:
+            for record in batch.data:
+                if record.symbol not in seen:
+                    seen.add(record.symbol)
+                    series[record.symbol].append((cycle_time.timestamp(), record.open_interest_value))
+
+    events = []
+    horizon_seconds = horizon * 3600
+    for symbol, points in series.items():
+        times = [t for t, _ in points]
+        earliest = 0
+        for index, (t, value) in enumerate(points):
+            start = max(earliest, bisect.bisect_left(times, t - horizon_seconds))
+            for j in range(start, index):
+                base = points[j][1]
+                if base > 0 and abs(value / base - 1) * 100 >= move:
+                    events.append((symbol, datetime.fromtimestamp(points[j][0]), datetime.fromtimestamp(t)))
+                    earliest = index
+                    break
+    return events
+
+def score(alerts: List[ReplayAlert], events: List[Tuple[str, datetime, datetime]], horizon: float = EVENT_HORIZON) -> Dict:
+    """Lead time and precision of alerts against the events (market regime alerts name no symbol and are left out)"""
+    alerts = [alert for alert in alerts if alert.rule != "regime"]
+    by_symbol = defaultdict(list)
+    for alert in alerts:
+        by_symbol[alert.symbol].append(alert.cycle_time)
+    for times in by_symbol.values():
+        times.sort()
+
+    lead_times = []
+    for symbol, move_start, move_end in events:
+        times = by_symbol.get(symbol, [])
+        index = bisect.bisect_left(times, move_start)
+        if index < len(times) and times[index] <= move_end:
+            lead_times.append((move_end - times[index]).total_seconds() / 60)
+
+    horizon_delta = horizon * 3600
+    event_ends = defaultdict(list)
+    for symbol, _, move_end in events:
+        event_ends[symbol].append(move_end.timestamp())
+    for ends in event_ends.values():
+        ends.sort()
+    useful = 0
+    for alert in alerts:
+        ends = event_ends.get(alert.symbol, [])
+        t = alert.cycle_time.timestamp()
+        index = bisect.bisect_left(ends, t)
+        if index < len(ends) and ends[index] - t <= horizon_delta:
+            useful += 1
+
+    return {
+        'events': len(events),
+        'events_caught': len(lead_times),
+        'recall': len(lead_times) / len(events) if events else None,
+        'precision': useful / len(alerts) if alerts else None,
+        'median_lead_minutes': statistics.median(lead_times) if lead_times else None,
+    }
+
+def alert_identities(alerts: List[ReplayAlert]) -> set:
+    # Symbol and cycle only: declared rule sets name their rules differently from the built-in ones
+    return {(alert.symbol, alert.cycle_time) for alert in alerts}
+
+_worker_cycles: List[Cycle] = []
+_worker_events: List = []
+
+def _init_worker(source: str, interval: int, event_move: float, event_horizon: float):
+    """Load and group the history once per worker process"""
+    global _worker_cycles, _worker_events
+    logging.getLogger().setLevel(logging.WARNING)
+    _worker_cycles = build_cycles(load_history_source(source), interval)
+    _worker_events = find_events(_worker_cycles, event_move, event_horizon)
+
+def _run_config(config: ReplayConfig, event_horizon: float) -> Tuple[ReplayConfig, List[ReplayAlert], Dict, float]:
+    started = time.perf_counter()
+    alerts = replay(_worker_cycles, config)
+    elapsed = time.perf_counter() - started
+    return config, alerts, score(alerts, _worker_events, event_horizon), elapsed
+
+def sweep(source: str, configs: List[ReplayConfig], workers: int = 1, interval: int = MONITORING_INTERVAL,
+          event_move: float = EVENT_MOVE, event_horizon: float = EVENT_HORIZON) -> Dict:
+    """Replay every configuration (in parallel when workers > 1) and summarize them.
+
+    The first configuration is the baseline that overlap is measured against.
+    """
+    _init_worker(source, interval, event_move, event_horizon)
+    if not _worker_cycles:
+        raise ValueError(f"No history found in {source}")
+    simulated_seconds = (_worker_cycles[-1][0] - _worker_cycles[0][0]).total_seconds() + interval
+
+    if workers > 1 and len(configs) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(source, interval, event_move, event_horizon)) as executor:
+            runs = list(executor.map(_run_config, configs, itertools.repeat(event_horizon)))
+    else:
+        runs = [_run_config(config, event_horizon) for config in configs]
+
+    baseline = alert_identities(runs[0][1])
+    results = []
+    for config, alerts, scores, elapsed in runs:
+        identities = alert_identities(alerts)
+        union = baseline | identities
+        results.append({
+            'config': config.__dict__,
+            'alerts': len(alerts),
+            'alerts_per_day': len(alerts) / (simulated_seconds / 86400),
+            'by_rule': dict(Counter(alert.rule for alert in alerts)),
+            'by_severity': dict(Counter(alert.severity for alert in alerts)),
+            'overlap_with_baseline': len(baseline & identities) / len(union) if union else 1.0,
+            'replay_seconds': elapsed,
+            'speedup': simulated_seconds / elapsed if elapsed else None,
+            **scores,
+        })
+    return {
+        'source': source,
+        'cycles': len(_worker_cycles),
+        'symbols': len({r.symbol for _, batches in _worker_cycles for b in batches for r in b.data}),
+        'start': _worker_cycles[0][0].isoformat(),
+        'end': _worker_cycles[-1][0].isoformat(),
+        'event_move': event_move,
+        'event_horizon_hours': event_horizon,
+        'results': results,
+    }
+
+def print_report(report: Dict):
+    """Print the sweep summary table"""
+    print(f"📼 Replayed {report['cycles']} cycles of {report['symbols']} symbols ({report['start']} → {report['end']})")
+    print(f"🎯 Events: moves of {report['event_move']:g}% within {report['event_horizon_hours']:g}h\n")
+    print(f"{'thresh':>6} {'med':>5} {'high':>5} {'ratio':>6} {'alerts':>7} {'/day':>7} {'chg/avg/win/mkt':>17} "
+          f"{'caught':>9} {'lead min':>9} {'prec':>6} {'overlap':>8} {'speedup':>9}  rules")
+    for result in report['results']:
+        config = result['config']
+        rules = result['by_rule']
+        if config.get('rules_file'):
+            by_rule = "-"
+            label = f"{os.path.basename(config['rules_file'])} ({', '.join(f'{k} {v}' for k, v in rules.items())})"
+        else:
+            by_rule = (f"{rules.get('change', 0):>4}/{rules.get('average', 0):>4}/{rules.get('window', 0):>3}/"
+                       f"{rules.get('regime', 0):>3}")
+            label = "built-in"
+        if not config.get('market_regime', True):
+            label += ", no regime"
+        caught = f"{result['events_caught']}/{result['events']}"
+        lead = f"{result['median_lead_minutes']:.0f}" if result['median_lead_minutes'] is not None else "-"
+        precision = f"{result['precision']:.0%}" if result['precision'] is not None else "-"
+        speedup = f"{result['speedup']:,.0f}x" if result['speedup'] else "-"
+        print(f"{config['spike_threshold']:>6g} {config['severity_medium']:>5g} {config['severity_high']:>5g} "
+              f"{config['window_spike_ratio']:>6g} {result['alerts']:>7} {result['alerts_per_day']:>7.1f} "
+              f"{by_rule:>17} "
+              f"{caught:>9} {lead:>9} {precision:>6} {result['overlap_with_baseline']:>8.0%} {speedup:>9}  {label}")
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Replay stored open interest history through the alert rules')
+    parser.add_argument('--history', default='open_interest_data.json',
+                        help='History JSON file, monitor checkpoint (.ckpt), shard directory or history store '
+                             '(a data file\'s .history store is read when it exists)')
+    parser.add_argument('--threshold', type=float, nargs='+', default=[SPIKE_THRESHOLD], help='Spike thresholds (%%) to sweep')
+    parser.add_argument('--medium', type=float, nargs='+', default=[SEVERITY_MEDIUM], help='Medium severity cutoffs (%%)')
+    parser.add_argument('--high', type=float, nargs='+', default=[SEVERITY_HIGH], help='High severity cutoffs (%%)')
+    parser.add_argument('--window-ratio', type=float, nargs='+', default=[WINDOW_SPIKE_RATIO], help='15-min average ratios')
+    parser.add_argument('--cooldown', type=float, nargs='+', default=[ALERT_COOLDOWN], help='Alert cooldowns (seconds)')
+    parser.add_argument('--rules', nargs='+', default=[], help='Token configs with declared rules to replay as well')
+    parser.add_argument('--regime', choices=['on', 'off'], nargs='+', default=['on'],
+                        help='Replay with and/or without market regime collapsing')
+    parser.add_argument('--interval', type=int, default=MONITORING_INTERVAL, help='Simulated cycle interval (seconds)')
+    parser.add_argument('--event-move', type=float, default=EVENT_MOVE, help='Move (%%) that counts as an event')
+    parser.add_argument('--event-horizon', type=float, default=EVENT_HORIZON, help='Hours within which the move happens')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Parallel replay processes')
+    parser.add_argument('--json', type=str, help='Write machine-readable results to this file')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    baseline = ReplayConfig(SPIKE_THRESHOLD, SEVERITY_MEDIUM, SEVERITY_HIGH, WINDOW_SPIKE_RATIO, ALERT_COOLDOWN)
+    configs = [baseline] + [
+        config for config in (
+            ReplayConfig(*values[:5], market_regime=values[5] == 'on')
+            for values in itertools.product(args.threshold, args.medium, args.high, args.window_ratio, args.cooldown,
+                                            args.regime)
+        )
+        if config != baseline and config.severity_medium < config.severity_high
+    ] + [
+        ReplayConfig(SPIKE_THRESHOLD, SEVERITY_MEDIUM, SEVERITY_HIGH, WINDOW_SPIKE_RATIO, ALERT_COOLDOWN, rules_file)
+        for rules_file in args.rules
+    ]
+    report = sweep(args.history, configs, args.workers, args.interval, args.event_move, args.event_horizon)
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Periodic Open Interest reports over the history store
+Aggregates a period (the day or week that just closed) of every stored series across a process
+pool: each worker streams one series chunk by chunk from the retention tiers (history_store.py,
+retention.py), resampled to REPORT_INTERVAL windows, and returns a single summary row, so memory
+stays bounded by the number of series whatever the length of the history. Per series it reports:
+
+    range                  first, last, low and high OI value, % change and % range over the period
+    biggest moves          the REPORT_TOP_MOVES largest window-to-window % changes
+    time above baseline    share of windows whose mean is above the series' average over the
+                           BASELINE_HORIZON before the period
+    alert hit rate         share of the period's alerts (from the monitor's alert log) whose move still
+                           held REPORT_HIT_HORIZON later, i.e. the OI value was still on the alert's
+                           side of the value it was measured from
+
+The rows are written to a CSV or HTML artifact in REPORT_DIR and summarized in a compact Telegram digest.
+
+    python3 reports.py --period daily
+    python3 reports.py --period weekly --format html --send
+"""
+
+import argparse
+import asyncio
+import csv
+import heapq
+import html
+import json
+import math
+import multiprocessing
+import os
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from config import (REPORT_PERIODS, REPORT_INTERVAL, REPORT_HIT_HORIZON, REPORT_TOP_MOVES, REPORT_WORKERS, REPORT_DIR,
+                    BASELINE_HORIZON)
+
+REPORT_FIELDS = ('symbol', 'exchange', 'samples', 'first', 'last', 'low', 'high', 'change_pct', 'range_pct',
+                 'biggest_moves', 'baseline', 'above_baseline_pct', 'alerts', 'alerts_scored', 'alert_hits',
+                 'hit_rate_pct')
+BASELINE_WINDOW = 3600  # Resampling interval of the baseline (the coarsest retention tier)
+# Workers never fork the caller: the scheduler runs reports on a thread of the monitor process, whose other
+# threads (event loop, persister, log listener) may hold locks a forked child would inherit held
+START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+_history = None  # Worker process' RetentionManager
+
+def period_bounds(period: str, now: Optional[float] = None) -> Tuple[float, float]:
+    """Start and end (epoch seconds) of the latest period closed at `now`, on local boundaries"""
+    length, phase = REPORT_PERIODS[period]
+    now = time.time() if now is None else now
+    utc_offset = datetime.fromtimestamp(now).astimezone().utcoffset().total_seconds()
+    end = (now + utc_offset - phase) // length * length + phase - utc_offset
+    return end - length, end
+
+def load_alerts(path: str, start: float, end: float) -> Dict[Tuple[str, str], List[Tuple[float, float, float]]]:
+    """(exchange, symbol) -> (timestamp, previous OI value, % change) of the alerts in [start, end), oldest first.
+    The log is read line by line; only the period's alerts are kept."""
+    alerts = defaultdict(list)
+    if not os.path.exists(path):
+        return alerts
+    with open(path, 'r') as f:
+        for line in f:
+            try:
+                alert = json.loads(line)
+                timestamp = float(alert['timestamp'])
+                if alert.get('percentage_change') is None:
+                    continue  # A rule on another metric: no OI move to score
+                if start <= timestamp < end:
+                    alerts[(alert['exchange'], alert['symbol'])].append(
+                        (timestamp, float(alert['previous_oi']), float(alert['percentage_change'])))
+            except (ValueError, KeyError, TypeError):
+                continue  # A line cut short by a crash
+    for series in alerts.values():
+        series.sort()
+    return alerts
+
+class SeriesReport:
+    """Folds one series' resampled windows, in time order, into its report row"""
+
+    def __init__(self, baseline: Optional[float], alerts: List[Tuple[float, float, float]],
+                 top_moves: int = REPORT_TOP_MOVES, hit_horizon: float = REPORT_HIT_HORIZON):
+        self.baseline = baseline
+        self.pending = list(reversed(alerts))  # Alerts waiting for the window REPORT_HIT_HORIZON later
+        self.alerts = len(alerts)
+        self.top_moves = top_moves
+        self.hit_horizon = hit_horizon
+        self.moves: List[Tuple[float, float, float]] = []  # Min-heap of (|% change|, % change, window end)
+        self.first = self.last = None
+        self.low = math.inf
+        self.high = -math.inf
+        self.samples = 0
+        self.windows = 0
+        self.above = 0
+        self.scored = 0
+        self.hits = 0
+
+    def add(self, window: Dict):
+        end = window['window_end'].timestamp()
+        if self.last is not None and self.last > 0:
+            change = (window['close'] - self.last) / self.last * 100
+            move = (abs(change), change, end)
+            if len(self.moves) < self.top_moves:
+                heapq.heappush(self.moves, move)
+            elif move > self.moves[0]:
+                heapq.heapreplace(self.moves, move)
+        if self.first is None:
+            self.first = window['open']
+        self.last = window['close']
+        self.low = min(self.low, window['low'])
+        self.high = max(self.high, window['high'])
+        self.samples += window['count']
+        self.windows += 1
+        if self.baseline is not None and window['mean'] > self.baseline:
+            self.above += 1
+        # An alert is scored on the close of the window its horizon ends in
+        while self.pending and self.pending[-1][0] + self.hit_horizon <= end:
+            _, previous, change = self.pending.pop()
+            self.scored += 1
+            if (window['close'] - previous) * change > 0:
+                self.hits += 1
+
+    def row(self, symbol: str, exchange: str) -> Dict:
+        moves = sorted(self.moves, reverse=True)
+        return {
+            'symbol': symbol,
+            'exchange': exchange,
+            'samples': self.samples,
+            'first': self.first,
+            'last': self.last,
+            'low': self.low,
+            'high': self.high,
+            'change_pct': (self.last - self.first) / self.first * 100 if self.first else None,
+            'range_pct': (self.high - self.low) / self.low * 100 if self.low > 0 else None,
+            'biggest_moves': [(change, datetime.fromtimestamp(end).strftime('%Y-%m-%d %H:%M'))
+                              for _, change, end in moves],
+            'baseline': self.baseline,
+            'above_baseline_pct': self.above / self.windows * 100 if self.baseline is not None else None,
+            'alerts': self.alerts,
+            'alerts_scored': self.scored,
+            'alert_hits': self.hits,
+            'hit_rate_pct': self.hits / self.scored * 100 if self.scored else None,
+        }
+
+def init_worker(root: str):
+    global _history
+    from retention import RetentionManager  # Deferred: numpy, only needed in the workers
+    _history = RetentionManager(root)
+
+def windows(exchange: str, symbol: str, start: float, end: float, interval: int):
+    """Resampled windows starting in [start, end), streamed chunk by chunk"""
+    from history_store import Resampler  # Deferred: numpy, only needed in the workers
+    resampler = Resampler(interval)
+    for rows in _history.window_scan(exchange, symbol, start, end, interval):
+        for window in resampler.feed(rows):
+            if window['window_start'].timestamp() < end:
+                yield window
+    for window in resampler.flush():
+        if window['window_start'].timestamp() < end:
+            yield window
+
+def series_report(task: Tuple[str, str, float, float, List[Tuple[float, float, float]]]) -> Optional[Dict]:
+    """One series' report row (None if it has no samples in the period); runs in a worker process"""
+    exchange, symbol, start, end, alerts = task
+    total = count = 0.0
+    for window in windows(exchange, symbol, start - BASELINE_HORIZON, start, BASELINE_WINDOW):
+        total += window['mean'] * window['count']
+        count += window['count']
+    report = SeriesReport(total / count if count else None, alerts)
+    for window in windows(exchange, symbol, start, end, REPORT_INTERVAL):
+        report.add(window)
+    return report.row(symbol, exchange) if report.windows else None
+
+def generate_report(history_dir: str, alert_log: str, start: float, end: float,
+                    workers: int = REPORT_WORKERS) -> List[Dict]:
+    """Report rows of every stored series over [start, end), aggregated across a process pool"""
+    from retention import RetentionManager  # Deferred: numpy
+    alerts = load_alerts(alert_log, start, end)
+    series = RetentionManager(history_dir).raw.series()
+    tasks = [(exchange, symbol, start, end, alerts.get((exchange, symbol), [])) for exchange, symbol in series]
+    if not tasks:
+        return []
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), mp_context=multiprocessing.get_context(START_METHOD),
+                             initializer=init_worker, initargs=(history_dir,)) as pool:
+        rows = pool.map(series_report, tasks, chunksize=max(1, len(tasks) // (workers * 4)))
+        return [row for row in rows if row is not None]
+
+def format_cell(field: str, value) -> str:
+    if value is None:
+        return ""
+    if field == 'biggest_moves':
+        return "; ".join(f"{change:+.2f}% @ {at}" for change, at in value)
+    if isinstance(value, float):
+        return f"{value:.2f}"
+    return str(value)
+
+def write_artifact(rows: List[Dict], path: str, output_format: str, title: str):
+    """Write the rows as CSV or an HTML table, atomically"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_file = f"{path}.tmp"
+    with open(tmp_file, 'w', newline='') as f:
+        if output_format == "csv":
+            writer = csv.writer(f)
+            writer.writerow(REPORT_FIELDS)
+            for row in rows:
+                writer.writerow([format_cell(field, row[field]) for field in REPORT_FIELDS])
+        else:
+            f.write(f"<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>{html.escape(title)}</title>\n"
+                    "<style>body{font-family:sans-serif}table{border-collapse:collapse}"
+                    "td,th{border:1px solid #ccc;padding:2px 6px;text-align:right}</style></head><body>\n")
+            f.write(f"<h1>{html.escape(title)}</h1>\n<table>\n<tr>")
+            f.write("".join(f"<th>{field}</th>" for field in REPORT_FIELDS) + "</tr>\n")
+            for row in rows:
+                f.write("<tr>" + "".join(f"<td>{html.escape(format_cell(field, row[field]))}</td>"
+                                         for field in REPORT_FIELDS) + "</tr>\n")
+            f.write("</table>\n</body></html>\n")
+    os.replace(tmp_file, path)
+
+def run_report(period: str, history_dir: str, alert_log: str, output_format: str = "csv",
+               end: Optional[float] = None, workers: int = REPORT_WORKERS) -> Tuple[str, str, List[Dict]]:
+    """Generate a period's report and its artifact; returns (Telegram digest, artifact path, rows)"""
+    from telegram_service import format_oi_report
+    start, end = period_bounds(period, end)
+    rows = generate_report(history_dir, alert_log, start, end, workers)
+    rows.sort(key=lambda row: (row['symbol'], row['exchange']))
+    label = f"{datetime.fromtimestamp(start):%Y-%m-%d %H:%M} - {datetime.fromtimestamp(end):%Y-%m-%d %H:%M}"
+    path = os.path.join(REPORT_DIR, f"oi_report_{period}_{datetime.fromtimestamp(start):%Y%m%d}.{output_format}")
+    write_artifact(rows, path, output_format, f"Open Interest {period} report {label}")
+    return format_oi_report(period, label, rows, os.path.basename(path)), path, rows
+
+def main():
+    parser = argparse.ArgumentParser(description='Periodic Open Interest reports over the history store')
+    parser.add_argument('--period', choices=sorted(REPORT_PERIODS), default="daily", help='Report period')
+    parser.add_argument('--dir', default="open_interest_data.history", help='History store (next to the data file)')
+    parser.add_argument('--alerts', default="open_interest_data.alerts.jsonl", help="The monitor's alert log")
+    parser.add_argument('--end', help='Report the period closed at this time (ISO 8601 or epoch seconds; default now)')
+    parser.add_argument('--format', choices=("csv", "html"), default="csv", help='Artifact format')
+    parser.add_argument('--workers', type=int, default=REPORT_WORKERS, help='Worker processes')
+    parser.add_argument('--send', action='store_true', help='Send the digest to Telegram instead of printing it')
+    args = parser.parse_args()
+    from history_store import parse_time  # Deferred: numpy
+
+    try:
+        end = parse_time(args.end)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    started = time.perf_counter()
+    digest, path, rows = run_report(args.period, args.dir, args.alerts, args.format,
+                                    end.timestamp() if end else None, max(1, args.workers))
+    print(f"✅ Reported {len(rows)} series to {path} in {time.perf_counter() - started:.1f}s")
+    if args.send:
+        from telegram_service import send_telegram_message
+        asyncio.run(send_telegram_message(digest))
+        print("📱 Digest sent to Telegram")
+    else:
+        print(digest)
+
+if __name__ == "__main__":
+    main()
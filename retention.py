@@ -0,0 +1,273 @@
+"""
+Tiered retention for the Open Interest Monitor's history store
+Raw samples are kept for a week, then only as 1-minute windows for 30 days, 15-minute windows
+for a year and hourly windows forever (RETENTION_TIERS). Each tier is rolled up incrementally:
+a sample folds into the series' open 1-minute window, a closed 1-minute window folds into the
+open 15-minute window, and so on, so every sample costs O(1) whatever the horizon. Closed
+hourly windows also feed a rolling per-series sum over BASELINE_HORIZON, which makes the
+historical average a constant-cost lookup instead of a mean over whatever is in memory.
+
+Expired segments are deleted every RETENTION_CHECK_INTERVAL; past HISTORY_DISK_BUDGET the
+oldest segments of the finest tiers go first, and the baseline horizon shrinks to fit
+HISTORY_MEMORY_BUDGET.
+"""
+
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from config import (RETENTION_TIERS, BASELINE_HORIZON, RETENTION_CHECK_INTERVAL, HISTORY_DISK_BUDGET,
+                    HISTORY_MEMORY_BUDGET, SUPPORTED_EXCHANGES)
+from history_store import RECORD, HistoryStore, to_rows
+from metrics import HISTORY_LATE_SAMPLES, HISTORY_TIER_BYTES
+from models import OpenInterestData
+
+WINDOW_RECORD = np.dtype([
+    ('timestamp', '<f8'),  # Window start
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('total', '<f8'),  # Sum of the OI values, so means combine exactly
+    ('count', '<f8'),
+])
+# Rough in-memory cost per series (open windows, dict entries) and per baseline entry, for the memory budget
+SERIES_STATE_BYTES = 1024
+BASELINE_ENTRY_BYTES = 160
+
+@dataclass
+class Tier:
+    name: str
+    interval: int  # Window seconds; 0 for raw samples
+    retention: Optional[int]  # Seconds; None keeps the tier forever
+    store: HistoryStore
+
+class SeriesState:
+    """Open windows of every rolled-up tier and the rolling baseline of one series"""
+    __slots__ = ('windows', 'baseline', 'baseline_total', 'baseline_count')
+
+    def __init__(self, levels: int):
+        self.windows: List[Optional[list]] = [None] * levels  # [start, open, high, low, close, total, count]
+        self.baseline = deque()  # (start, total, count) of closed top-tier windows
+        self.baseline_total = 0.0
+        self.baseline_count = 0.0
+
+class RetentionManager:
+    """Maintains the retention tiers of a history store directory"""
+
+    def __init__(self, root: str, tiers=RETENTION_TIERS, baseline_horizon: float = BASELINE_HORIZON,
+                 disk_budget: int = HISTORY_DISK_BUDGET, memory_budget: int = HISTORY_MEMORY_BUDGET,
+                 clock=time.time):
+        self.root = root
+        self.tiers = [
+            Tier(name, interval, retention,
+                 HistoryStore(os.path.join(root, name), WINDOW_RECORD if interval else RECORD, segment_format))
+            for name, interval, retention, segment_format in tiers
+        ]
+        self.raw = self.tiers[0].store
+        self.top = self.tiers[-1]
+        self.baseline_horizon = baseline_horizon
+        self.baseline_entries = int(baseline_horizon // self.top.interval)
+        self.disk_budget = disk_budget
+        self.memory_budget = memory_budget
+        self.clock = clock
+        self.states: Dict[Tuple[str, str], SeriesState] = {}
+        self.enforced_at = 0.0
+        self._memory_budget_warned = False
+
+    def append(self, records: Iterable[OpenInterestData]):
+        """Store raw samples and roll them up into the tiers"""
+        by_series: Dict[Tuple[str, str], List[OpenInterestData]] = {}
+        for record in records:
+            by_series.setdefault((record.exchange, record.symbol), []).append(record)
+        for (exchange, symbol), batch in by_series.items():
+            state = self.state(exchange, symbol)
+            self.raw.append_rows(exchange, symbol, to_rows(batch))
+            closed: List[List[tuple]] = [[] for _ in self.tiers]
+            for record in batch:
+                value = record.open_interest_value
+                self.fold(state, 1, record.timestamp.timestamp(), (value, value, value, value, value, 1.0), closed)
+            for level in range(1, len(self.tiers)):
+                if closed[level]:
+                    self.tiers[level].store.append_rows(exchange, symbol, np.array(closed[level], dtype=WINDOW_RECORD))
+        if self.clock() - self.enforced_at >= RETENTION_CHECK_INTERVAL:
+            self.enforce()
+
+    def fold(self, state: SeriesState, level: int, timestamp: float, window: tuple, closed: List[List[tuple]]):
+        """Fold a sample (level 1) or a closed lower-tier window into the tier's open window"""
+        if level == len(self.tiers):
+            self.add_baseline(state, timestamp, window)
+            return
+        interval = self.tiers[level].interval
+        start = timestamp - timestamp % interval
+        current = state.windows[level]
+        if current is not None and start < current[0]:
+            if level == 1:
+                HISTORY_LATE_SAMPLES.inc()
+            return
+        if current is not None and start > current[0]:
+            finished = tuple(current)
+            closed[level].append(finished)
+            self.fold(state, level + 1, finished[0], finished[1:], closed)
+            current = None
+        opening, high, low, closing, total, count = window
+        if current is None:
+            state.windows[level] = [start, opening, high, low, closing, total, count]
+        else:
+            current[2] = max(current[2], high)
+            current[3] = min(current[3], low)
+            current[4] = closing
+            current[5] += total
+            current[6] += count
+
+    def add_baseline(self, state: SeriesState, start: float, window: tuple):
+        """Add a closed top-tier window to the rolling baseline and drop the ones past the horizon"""
+        total, count = window[4], window[5]
+        state.baseline.append((start, total, count))
+        state.baseline_total += total
+        state.baseline_count += count
+        while state.baseline and (state.baseline[0][0] <= start - self.baseline_horizon
+                                  or len(state.baseline) > self.baseline_entries):
+            _, old_total, old_count = state.baseline.popleft()
+            state.baseline_total -= old_total
+            state.baseline_count -= old_count
+
+    def state(self, exchange: str, symbol: str) -> SeriesState:
+        """A series' rollup state, restored from the stores the first time it is seen"""
+        key = (exchange, symbol)
+        state = self.states.get(key)
+        if state is not None:
+            return state
+        state = SeriesState(len(self.tiers))
+        self.states[key] = state
+        self.fit_memory_budget()
+        if self.raw.newest(exchange, symbol) == float('-inf'):
+            return state
+        # Each open window holds what the tier below has stored (or raw samples) since the end of the
+        # tier's last stored window; earlier input was already rolled up into that window
+        for level in range(1, len(self.tiers)):
+            stored = self.tiers[level].store.newest(exchange, symbol)
+            start = stored + self.tiers[level].interval if stored != float('-inf') else None
+            for rows in self.tiers[level - 1].store.scan(exchange, symbol, start):
+                for row in rows.tolist():
+                    if level == 1:
+                        row = (row[0], row[2], row[2], row[2], row[2], row[2], 1.0)
+                    self.fold(state, level, row[0], row[1:], [[] for _ in self.tiers])
+        # Re-adding the stored top-tier windows in order applies the same horizon cut as the running series
+        top_newest = self.top.store.newest(exchange, symbol)
+        if top_newest != float('-inf'):
+            for rows in self.top.store.scan(exchange, symbol, top_newest - self.baseline_horizon):
+                for row in rows.tolist():
+                    self.add_baseline(state, row[0], row[1:])
+        return state
+
+    def release(self, symbol: str):
+        """Forget a symbol's in-memory state (it is no longer monitored); its stored tiers are kept"""
+        for exchange in SUPPORTED_EXCHANGES:
+            self.states.pop((exchange, symbol), None)
+        self.fit_memory_budget()
+
+    def symbols(self) -> List[str]:
+        """Every symbol stored in any tier"""
+        return sorted({symbol for tier in self.tiers for _, symbol in tier.store.series()})
+
+    def move_symbol(self, symbol: str, target: 'RetentionManager'):
+        """Move a symbol's segments in every tier to another store directory, merging segments it already has"""
+        self.release(symbol)
+        target.release(symbol)
+        for tier, target_tier in zip(self.tiers, target.tiers):
+            store, target_store = tier.store, target_tier.store
+            for exchange in SUPPORTED_EXCHANGES:
+                for key in store.segments(exchange, symbol):
+                    path = store.segment_path(exchange, symbol, key)
+                    target_path = target_store.segment_path(exchange, symbol, key)
+                    if os.path.exists(target_path):
+                        target_store.merge(exchange, symbol, key, np.array(store.read_segment(exchange, symbol, key)))
+                        os.remove(path)
+                    else:
+                        os.makedirs(target_store.series_dir(exchange, symbol), exist_ok=True)
+                        os.replace(path, target_path)
+                store.last_timestamp.pop((exchange, symbol), None)
+                target_store.last_timestamp.pop((exchange, symbol), None)
+                directory = store.series_dir(exchange, symbol)
+                if os.path.isdir(directory) and not os.listdir(directory):
+                    os.rmdir(directory)
+
+    def fit_memory_budget(self):
+        """Shorten the baseline horizon when every series' full horizon would not fit the memory budget"""
+        per_series = self.memory_budget / max(1, len(self.states)) - SERIES_STATE_BYTES
+        entries = min(int(self.baseline_horizon // self.top.interval), max(1, int(per_series // BASELINE_ENTRY_BYTES)))
+        if entries < self.baseline_entries and not self._memory_budget_warned:
+            self._memory_budget_warned = True
+            logging.warning(f"History memory budget: baseline horizon cut to {entries} {self.top.name} windows "
+                            f"at {len(self.states)} series (shrinks further as series are added)")
+        self.baseline_entries = entries
+
+    def baseline(self, symbol: str) -> Optional[float]:
+        """Average OI value of a symbol over the baseline horizon, across exchanges (None if nothing is stored)"""
+        total = count = 0.0
+        for exchange in SUPPORTED_EXCHANGES:
+            state = self.states.get((exchange, symbol))
+            if state is None:
+                continue
+            total += state.baseline_total
+            count += state.baseline_count
+            for window in state.windows[1:]:
+                if window is not None:
+                    total += window[5]
+                    count += window[6]
+        return total / count if count else None
+
+    def window_scan(self, exchange: str, symbol: str, start: Optional[float], end: Optional[float],
+                    interval: int) -> Iterator[np.ndarray]:
+        """Chunks covering [start, end] for resampling to `interval`: the coarsest tier whose windows divide
+        it, then finer tiers and raw samples for what has not been rolled up yet"""
+        if start is not None:
+            start -= start % interval
+        cursor = start
+        for tier in reversed(self.tiers[1:]):
+            if interval % tier.interval:
+                continue
+            for rows in tier.store.scan(exchange, symbol, cursor, end):
+                yield rows
+                cursor = float(rows['timestamp'][-1]) + tier.interval
+        yield from self.raw.scan(exchange, symbol, cursor, end)
+
+    def enforce(self):
+        """Delete expired segments, then the oldest segments of the finest tiers while over the disk budget"""
+        now = self.clock()
+        self.enforced_at = now
+        try:
+            for tier in self.tiers:
+                if tier.retention is not None:
+                    freed = tier.store.expire(now - tier.retention)
+                    if freed:
+                        logging.info(f"History tier {tier.name}: expired {freed / 1024 ** 2:.1f} MB")
+            files = {tier.name: sorted(tier.store.segment_files()) for tier in self.tiers}
+            tier_bytes = {name: sum(size for _, _, _, size in segments) for name, segments in files.items()}
+            usage = sum(tier_bytes.values())
+            for tier in self.tiers[:-1]:
+                segments = files[tier.name]
+                newest_key = segments[-1][0] if segments else None
+                dropped = 0
+                for key, exchange, symbol, size in segments:
+                    if usage <= self.disk_budget or key == newest_key:
+                        break
+                    tier.store.drop_segment(exchange, symbol, key)
+                    tier_bytes[tier.name] -= size
+                    usage -= size
+                    dropped += 1
+                if dropped:
+                    logging.warning(f"History disk budget: dropped the {dropped} oldest {tier.name} segments")
+            if usage > self.disk_budget:
+                logging.warning(f"History uses {usage / 1024 ** 2:.0f} MB, over the {self.disk_budget / 1024 ** 2:.0f} MB "
+                                f"budget, with every finer tier trimmed to its newest period")
+            for name, size in tier_bytes.items():
+                HISTORY_TIER_BYTES.set(float(size), tier=name)
+        except OSError as e:
+            logging.error(f"Error enforcing history retention: {e}")
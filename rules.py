@@ -0,0 +1,347 @@
+"""
+Declarative alert rules for the Open Interest Monitor
+Rules are declared in a token config ("rules" plus per-symbol "overrides") and compiled into a
+plan that evaluates every rule for every series in one batched numpy pass per cycle. The
+engine reloads the plan when the config file changes. Rules on derived metrics (derived_metrics.py)
+read the monitor's incrementally maintained values instead of the history, and any rule can be
+limited to series in given OI/price quadrants.
+
+Example config:
+    {
+      "symbols": ["BTCUSDT", "ETHUSDT"],
+      "rules": [
+        {"name": "oi_change", "metric": "pct_change", "window": 1, "comparator": "abs_gte", "threshold": 5},
+        {"name": "avg_deviation", "metric": "pct_from_mean", "window": 9, "comparator": "abs_gte", "threshold": 5,
+         "severity": {"medium": 30, "high": 50}, "cooldown": 3600},
+        {"name": "window_ratio", "metric": "window_avg_ratio", "window": 15, "comparator": "gt", "threshold": 50,
+         "severity": "high"},
+        {"name": "crowded_longs", "metric": "oi_volume_ratio", "comparator": "gte", "threshold": 1.5,
+         "quadrant": ["long_buildup"], "severity": "medium"}
+      ],
+      "overrides": {"ETHUSDT": {"oi_change": {"threshold": 10}, "avg_deviation": {"enabled": false}}}
+    }
+"""
+
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import MONITORING_INTERVAL
+from derived_metrics import DERIVED_METRICS, QUADRANTS
+from models import AlertRule, OpenInterestAlert, WindowAverageSpike
+
+METRICS = ('pct_change', 'pct_from_mean', 'window_avg_ratio') + DERIVED_METRICS
+# % OI changes: their alerts carry the value as percentage_change, a direction and the default severity cutoffs.
+# Alerts of the other metrics (except window_avg_ratio, reported as window spikes) carry the metric and its value.
+OI_CHANGE_METRICS = ('pct_change', 'pct_from_mean', 'oi_change')
+COMPARATORS = {
+    'gt': lambda values, thresholds: values > thresholds,
+    'gte': lambda values, thresholds: values >= thresholds,
+    'lt': lambda values, thresholds: values < thresholds,
+    'lte': lambda values, thresholds: values <= thresholds,
+    'abs_gt': lambda values, thresholds: np.abs(values) > thresholds,
+    'abs_gte': lambda values, thresholds: np.abs(values) >= thresholds,
+}
+SEVERITY_LEVELS = ('low', 'medium', 'high')
+OVERRIDE_FIELDS = ('threshold', 'cooldown', 'enabled', 'severity')
+
+def normalize_symbol(symbol: str) -> str:
+    """Match the symbol form produced by OpenInterestMonitor.load_token_list"""
+    return symbol.replace('/', '').replace(":USDT", "USDT").replace("/USDT:USDT", "USDT")
+
+def parse_rules(config: Dict) -> Tuple[List[AlertRule], Dict[str, Dict[str, Dict]]]:
+    """Validate a config's "rules" and "overrides" sections; raise ValueError on mistakes"""
+    rules = []
+    for index, spec in enumerate(config.get('rules') or []):
+        label = spec.get('name', f"rules[{index}]")
+        unknown = set(spec) - {'name', 'metric', 'window', 'comparator', 'threshold', 'severity', 'cooldown', 'quadrant'}
+        if unknown:
+            raise ValueError(f"Rule {label}: unknown fields {sorted(unknown)}")
+        for key in ('name', 'metric', 'comparator', 'threshold'):
+            if key not in spec:
+                raise ValueError(f"Rule {label}: missing '{key}'")
+        if spec['metric'] not in METRICS:
+            raise ValueError(f"Rule {label}: metric must be one of {METRICS}")
+        if spec['comparator'] not in COMPARATORS:
+            raise ValueError(f"Rule {label}: comparator must be one of {tuple(COMPARATORS)}")
+        severity = spec.get('severity')
+        if isinstance(severity, str) and severity not in SEVERITY_LEVELS:
+            raise ValueError(f"Rule {label}: severity must be one of {SEVERITY_LEVELS}")
+        if isinstance(severity, dict) and not set(severity) <= {'medium', 'high'}:
+            raise ValueError(f"Rule {label}: severity cutoffs must be 'medium' and/or 'high'")
+        window = int(spec.get('window', 15 if spec['metric'] == 'window_avg_ratio' else 1))
+        if window < 1:
+            raise ValueError(f"Rule {label}: window must be at least 1")
+        quadrants = spec.get('quadrant')
+        if isinstance(quadrants, str):
+            quadrants = [quadrants]
+        if quadrants is not None and (not quadrants or not set(quadrants) <= set(QUADRANTS)):
+            raise ValueError(f"Rule {label}: quadrant must be one or more of {QUADRANTS}")
+        rules.append(AlertRule(
+            name=spec['name'],
+            metric=spec['metric'],
+            window=window,
+            comparator=spec['comparator'],
+            threshold=float(spec['threshold']),
+            severity=severity,
+            cooldown=float(spec['cooldown']) if spec.get('cooldown') is not None else None,
+            quadrants=tuple(quadrants) if quadrants else None,
+        ))
+    names = [rule.name for rule in rules]
+    if len(names) != len(set(names)):
+        raise ValueError("Rule names must be unique")
+
+    overrides = {}
+    for symbol, per_rule in (config.get('overrides') or {}).items():
+        for rule_name, fields in per_rule.items():
+            if rule_name not in names:
+                raise ValueError(f"Override for {symbol}: unknown rule '{rule_name}'")
+            unknown = set(fields) - set(OVERRIDE_FIELDS)
+            if unknown:
+                raise ValueError(f"Override for {symbol}.{rule_name}: unknown fields {sorted(unknown)}")
+        overrides[normalize_symbol(symbol)] = per_rule
+    return rules, overrides
+
+class CompiledRule:
+    """A rule with its parameters broadcast to one array entry per series"""
+
+    def __init__(self, rule: AlertRule, thresholds, medium, high, fixed_severity: Optional[str], cooldowns, enabled):
+        self.rule = rule
+        self.compare = COMPARATORS[rule.comparator]
+        self.thresholds = thresholds
+        self.medium = medium
+        self.high = high
+        self.fixed_severity = fixed_severity
+        self.cooldowns = cooldowns
+        self.enabled = enabled
+
+class RulePlan:
+    """Rules compiled for batched evaluation over (symbol, exchange) series.
+    interval is the fastest rate series are sampled at; window rules size their history by it."""
+
+    def __init__(self, rules: List[AlertRule], overrides: Dict[str, Dict[str, Dict]],
+                 default_severity: Tuple[float, float], interval: int = MONITORING_INTERVAL):
+        self.rules = rules
+        self.overrides = overrides
+        self.default_severity = default_severity
+        self.interval = interval
+        self._compiled_for: Optional[Tuple[str, ...]] = None
+        self._compiled: List[CompiledRule] = []
+        self.depth = 2
+        for rule in rules:
+            if rule.metric == 'window_avg_ratio':
+                # Two full windows of samples at the fastest sampling rate plus the current one
+                self.depth = max(self.depth, 2 * -(-rule.window * 60 // interval) + 1)
+            elif rule.metric not in DERIVED_METRICS:  # Derived metrics need no history
+                self.depth = max(self.depth, rule.window + 1)
+
+    def compile(self, symbols: Tuple[str, ...]):
+        """Broadcast rule parameters and overrides over the series' symbols (cached per symbol set)"""
+        if symbols == self._compiled_for:
+            return
+        count = len(symbols)
+        compiled = []
+        for rule in self.rules:
+            if isinstance(rule.severity, dict):
+                base_medium = rule.severity.get('medium', np.inf)
+                base_high = rule.severity.get('high', np.inf)
+            elif rule.metric in OI_CHANGE_METRICS:
+                base_medium, base_high = self.default_severity
+            else:
+                base_medium = base_high = np.inf  # The % cutoffs mean nothing for other units
+            thresholds = np.full(count, rule.threshold)
+            medium = np.full(count, float(base_medium))
+            high = np.full(count, float(base_high))
+            cooldowns = np.full(count, rule.cooldown if rule.cooldown is not None else np.nan)  # NaN: monitor default
+            enabled = np.ones(count, dtype=bool)
+            for index, symbol in enumerate(symbols):
+                override = self.overrides.get(symbol, {}).get(rule.name)
+                if not override:
+                    continue
+                if 'threshold' in override:
+                    thresholds[index] = float(override['threshold'])
+                if 'cooldown' in override:
+                    cooldowns[index] = float(override['cooldown'])
+                if 'enabled' in override:
+                    enabled[index] = bool(override['enabled'])
+                if isinstance(override.get('severity'), dict):
+                    medium[index] = float(override['severity'].get('medium', medium[index]))
+                    high[index] = float(override['severity'].get('high', high[index]))
+            fixed = rule.severity if isinstance(rule.severity, str) else None
+            compiled.append(CompiledRule(rule, thresholds, medium, high, fixed, cooldowns, enabled))
+        self._compiled = compiled
+        self._compiled_for = symbols
+
+    def build_matrix(self, series: List[List]) -> Tuple[np.ndarray, np.ndarray]:
+        """Right-aligned (values, timestamps) matrices of the last `depth` samples, NaN-padded"""
+        values = np.full((len(series), self.depth), np.nan)
+        times = np.full((len(series), self.depth), np.nan)
+        for row, records in enumerate(series):
+            tail = records[-self.depth:]
+            offset = self.depth - len(tail)
+            for column, record in enumerate(tail, offset):
+                values[row, column] = record.open_interest_value
+                times[row, column] = record.timestamp.timestamp()
+        return values, times
+
+    @staticmethod
+    def compute_metric(metric: str, window: int, values: np.ndarray, times: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (metric value, reference value) per series"""
+        current = values[:, -1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if metric == 'pct_change':
+                reference = values[:, -1 - window]
+            elif metric == 'pct_from_mean':
+                previous = values[:, -1 - window:-1]
+                counts = np.sum(~np.isnan(previous), axis=1)
+                reference = np.where(counts > 0, np.nansum(previous, axis=1) / np.maximum(counts, 1), np.nan)
+            else:
+                buckets = np.floor(times / (window * 60))
+                current_bucket = buckets[:, -1:]
+                in_current = buckets == current_bucket
+                in_previous = buckets == current_bucket - 1
+                filled = np.nan_to_num(values)
+                current_avg = np.sum(filled * in_current, axis=1) / np.sum(in_current, axis=1)
+                reference = np.sum(filled * in_previous, axis=1) / np.sum(in_previous, axis=1)
+                ratio = np.where(reference > 0, current_avg / reference, np.nan)
+                return ratio, reference
+            change = np.where(reference > 0, (current - reference) / reference * 100, np.nan)
+        return change, reference
+
+    @staticmethod
+    def derived_metric(metric: str, keys: List[Tuple[str, str]], derived) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (metric value, previous OI value) per series from the derived metrics"""
+        if derived is None:
+            unknown = np.full(len(keys), np.nan)
+            return unknown, unknown
+        return (np.array(derived.column(keys, metric), dtype=float),
+                np.array(derived.column(keys, 'previous_value'), dtype=float))
+
+    def evaluate(self, keys: List[Tuple[str, str]], series: List[List],
+                 derived=None) -> List[Tuple[CompiledRule, int, float, float]]:
+        """Evaluate every rule over every series; return hits as (rule, row, value, reference).
+        Derived metrics and quadrants come from `derived` (a DerivedMetrics); without it they are unknown."""
+        if not keys or not self.rules:
+            return []
+        self.compile(tuple(symbol for symbol, _ in keys))
+        values, times = self.build_matrix(series)
+        metrics = {}
+        quadrants = None
+        hits = []
+        for compiled in self._compiled:
+            rule = compiled.rule
+            key = (rule.metric, rule.window)
+            if key not in metrics:
+                if rule.metric in DERIVED_METRICS:
+                    metrics[key] = self.derived_metric(rule.metric, keys, derived)
+                else:
+                    metrics[key] = self.compute_metric(rule.metric, rule.window, values, times)
+            metric_values, reference = metrics[key]
+            with np.errstate(invalid='ignore'):
+                mask = compiled.enabled & ~np.isnan(metric_values) & compiled.compare(metric_values, compiled.thresholds)
+            if rule.quadrants:
+                if quadrants is None:
+                    quadrants = np.array(derived.column(keys, 'quadrant') if derived else ['neutral'] * len(keys))
+                mask &= np.isin(quadrants, rule.quadrants)
+            for row in np.flatnonzero(mask):
+                hits.append((compiled, int(row), float(metric_values[row]), float(reference[row])))
+        return hits
+
+    def severity_of(self, compiled: CompiledRule, row: int, value: float) -> str:
+        if compiled.fixed_severity:
+            return compiled.fixed_severity
+        magnitude = abs(value) if compiled.rule.metric != 'window_avg_ratio' else value
+        if magnitude >= compiled.high[row]:
+            return "high"
+        if magnitude >= compiled.medium[row]:
+            return "medium"
+        return "low"
+
+class RuleEngine:
+    """Owns the compiled plan for a config file and reloads it when the file changes"""
+
+    def __init__(self, config_path: str, default_severity: Tuple[float, float], interval: int = MONITORING_INTERVAL):
+        self.config_path = config_path
+        self.default_severity = default_severity
+        self.interval = interval
+        self.plan: Optional[RulePlan] = None
+        self._mtime: Optional[float] = None
+        self.reload_if_changed()
+
+    def reload_if_changed(self) -> bool:
+        """Recompile the plan if the config changed; keep the previous plan if the new one is invalid"""
+        try:
+            mtime = os.path.getmtime(self.config_path)
+        except OSError as e:
+            logging.error(f"Cannot read rules config {self.config_path}: {e}")
+            return False
+        if mtime == self._mtime:
+            return False
+        self._mtime = mtime
+        try:
+            with open(self.config_path, 'r') as f:
+                rules, overrides = parse_rules(json.load(f))
+        except (OSError, ValueError) as e:
+            if self.plan is None:
+                raise
+            logging.error(f"Invalid rules in {self.config_path}, keeping previous rules: {e}")
+            return False
+        self.plan = RulePlan(rules, overrides, self.default_severity, self.interval)
+        logging.info(f"Loaded {len(rules)} alert rules from {self.config_path} "
+                     f"({len(overrides)} symbols with overrides)")
+        return True
+
+    def set_interval(self, interval: int):
+        """Resize the plan's history for a new fastest sampling interval (e.g. adaptive polling)"""
+        if interval == self.interval:
+            return
+        self.interval = interval
+        self.plan = RulePlan(self.plan.rules, self.plan.overrides, self.default_severity, interval)
+
+    def evaluate(self, monitor, updated: List[Tuple[str, str]]) -> Tuple[List[OpenInterestAlert], List[WindowAverageSpike]]:
+        """Evaluate the plan over the series updated this cycle and apply per-rule cooldowns"""
+        series = [
+            [record for record in monitor.historical_data[symbol] if record.exchange == exchange]
+            for symbol, exchange in updated
+        ]
+        alerts, window_spikes = [], []
+        for compiled, row, value, reference in self.plan.evaluate(updated, series, monitor.derived):
+            symbol, exchange = updated[row]
+            rule = compiled.rule
+            latest = series[row][-1]
+            severity = self.plan.severity_of(compiled, row, value)
+            if rule.metric == 'window_avg_ratio':
+                direction = "spike" if value >= 1 else "drop"
+            elif rule.metric in OI_CHANGE_METRICS:
+                direction = "spike" if value > 0 else "drop"
+            else:
+                direction = "metric"
+            cooldown = compiled.cooldowns[row]
+            if not monitor.mark_alert_sent(f"{symbol}_{exchange}_{rule.name}_{direction}_{severity}",
+                                           cooldown=None if np.isnan(cooldown) else float(cooldown)):
+                continue
+            if rule.metric == 'window_avg_ratio':
+                window_seconds = rule.window * 60
+                window_start = datetime.fromtimestamp(latest.timestamp.timestamp() // window_seconds * window_seconds)
+                window_end = datetime.fromtimestamp(window_start.timestamp() + window_seconds)
+                window_spikes.append(WindowAverageSpike(symbol, reference, reference * value, value, window_start, window_end))
+                continue
+            oi_change = rule.metric in OI_CHANGE_METRICS
+            alerts.append(OpenInterestAlert(
+                symbol=symbol,
+                exchange=exchange,
+                current_oi=latest.open_interest_value,
+                previous_oi=reference,
+                percentage_change=value if oi_change else None,
+                timestamp=latest.timestamp,
+                alert_type=f"avg_{direction}" if rule.metric == 'pct_from_mean' else direction,
+                severity=severity,
+                rule=rule.name,
+                metric=None if oi_change else rule.metric,
+                metric_value=None if oi_change else value,
+            ))
+        return alerts, window_spikes
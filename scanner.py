@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Full-universe Open Interest mover scanner
+Ingests every linear perpetual on Binance and Bybit each scan, keeps top-K leaderboards of the
+largest OI gains and losses over 15m, 1h and 4h and of OI relative to 24h volume, publishes them
+as a periodic digest and promotes the leaders into detailed monitoring
+"""
+
+import argparse
+import asyncio
+import bisect
+import heapq
+import itertools
+import json
+import logging
+import os
+import pickle
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from config import (MONITORING_INTERVAL, SCANNER_INTERVAL, SCANNER_WINDOWS, SCANNER_TOP_K, SCANNER_DIGEST_INTERVAL,
+                    SCANNER_MIN_OI_VALUE, SCANNER_PROMOTE_RANK, SCANNER_PROMOTE_MOVE, SCANNER_PROMOTION_TTL,
+                    SCANNER_PROMOTED_FILE, SCANNER_STATE_FILE, METRICS_PORT)
+from exchange_service import OpenInterestAggregator
+from metrics import SCANNER_PROMOTED, SCANNER_SERIES, start_metrics_server
+from models import ExchangeOpenInterestData
+from monitor import OpenInterestMonitor
+from telegram_service import send_telegram_message, format_scanner_digest
+from wallclock_scheduler import WallClockScheduler
+
+STATE_VERSION = 1
+MONITOR_DATA_FILE = "scanner_monitor_data.json"  # History of the promoted symbols' detailed monitor
+MONITOR_CSV_FILE = "scanner_monitor_15min_averages.csv"
+
+Key = Tuple[str, str]  # (symbol, exchange)
+
+class Leaderboard:
+    """Top-K keys by a score that changes every scan.
+
+    An update pushes a new heap entry and leaves the superseded one behind; reads skip entries
+    whose version is no longer current, and the heap is rebuilt once stale entries dominate.
+    """
+
+    def __init__(self, name: str, title: str, unit: str, sign: int = 1):
+        self.name = name
+        self.title = title
+        self.unit = unit  # "pct" or "ratio"
+        self.sign = sign  # -1 ranks the most negative values first (losses)
+        self.scores: Dict[Key, Tuple[float, int]] = {}  # key -> (score, version)
+        self.heap: List[Tuple[float, int, Key]] = []  # (-score, version, key)
+        self._versions = itertools.count()
+
+    def __len__(self):
+        return len(self.scores)
+
+    def update(self, key: Key, value: float):
+        version = next(self._versions)
+        score = value * self.sign
+        self.scores[key] = (score, version)
+        heapq.heappush(self.heap, (-score, version, key))
+        if len(self.heap) > 2 * len(self.scores) + 64:
+            self._compact()
+
+    def discard(self, key: Key):
+        self.scores.pop(key, None)
+
+    def _compact(self):
+        self.heap = [(-score, version, key) for key, (score, version) in self.scores.items()]
+        heapq.heapify(self.heap)
+
+    def top(self, k: int) -> List[Tuple[Key, float]]:
+        """Return up to k (key, value) pairs, best first"""
+        result = []
+        kept = []
+        while self.heap and len(result) < k:
+            entry = heapq.heappop(self.heap)
+            negative_score, version, key = entry
+            current = self.scores.get(key)
+            if current is None or current[1] != version:
+                continue  # Superseded or discarded: drop for good
+            kept.append(entry)
+            result.append((key, -negative_score * self.sign))
+        for entry in kept:
+            heapq.heappush(self.heap, entry)
+        return result
+
+class SnapshotAggregator:
+    """Serves the detailed monitor its symbols from the scanner's latest snapshot instead of refetching them"""
+
+    def __init__(self, scanner: "MoverScanner"):
+        self.scanner = scanner
+
+    def get_all_exchange_data(self) -> Dict[str, ExchangeOpenInterestData]:
+        symbols = set(self.scanner.promoted)
+        return {
+            exchange: ExchangeOpenInterestData(exchange, [record for record in batch.data if record.symbol in symbols],
+                                               batch.timestamp, batch.success, batch.error)
+            for exchange, batch in self.scanner.snapshot.items()
+        }
+
+    def set_token_list(self, token_list: Optional[list]):
+        pass  # The promoted set is read at every fetch
+
+    def get_history(self, symbols: List[str], limit: int) -> Dict[str, ExchangeOpenInterestData]:
+        """Backfill of newly promoted symbols, from the exchanges"""
+        return self.scanner.aggregator.get_history(symbols, limit)
+
+class MoverScanner:
+    """Scans every perpetual, ranks the movers and manages the promoted symbol set"""
+
+    def __init__(self, aggregator=None, windows: Dict[str, int] = SCANNER_WINDOWS, interval: int = SCANNER_INTERVAL,
+                 min_oi_value: float = SCANNER_MIN_OI_VALUE, promote: bool = True,
+                 state_file: Optional[str] = SCANNER_STATE_FILE, promoted_file: str = SCANNER_PROMOTED_FILE):
+        self.aggregator = aggregator or OpenInterestAggregator()
+        self.windows = windows
+        self.interval = interval
+        self.min_oi_value = min_oi_value
+        self.promote = promote
+        self.state_file = state_file
+        self.promoted_file = promoted_file
+        self.clock = time.time
+        self.boards: Dict[str, Leaderboard] = {}
+        for label in windows:
+            self.boards[f"gain_{label}"] = Leaderboard(f"gain_{label}", f"📈 Largest OI gain ({label})", 'pct')
+            self.boards[f"loss_{label}"] = Leaderboard(f"loss_{label}", f"📉 Largest OI loss ({label})", 'pct', sign=-1)
+        self.boards['oi_to_volume'] = Leaderboard('oi_to_volume', "⚖️ OI relative to 24h volume", 'ratio')
+        self.samples: Dict[Key, Tuple[List[float], List[float]]] = {}  # key -> (scan times, OI values)
+        self.snapshot: Dict[str, ExchangeOpenInterestData] = {}
+        self.promoted: Dict[str, Dict] = {}  # symbol -> {'since', 'last_seen', 'reason'}
+        self.monitor: Optional[OpenInterestMonitor] = None
+        self.monitor_bucket: Optional[int] = None
+        self.scheduler = WallClockScheduler()
+        SCANNER_PROMOTED.set_function(lambda: len(self.promoted))
+        self.load_state()
+
+    def load_state(self):
+        """Restore recent samples and promotions so leaderboards survive a restart"""
+        if not self.state_file or not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file, 'rb') as f:
+                state = pickle.load(f)
+            if state.get('version') != STATE_VERSION:
+                return
+            self.samples = state['samples']
+            self.promoted = state['promoted']
+            logging.info(f"Restored scanner state: {len(self.samples)} series, {len(self.promoted)} promoted symbols")
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable scanner state {self.state_file}: {e}")
+
+    def save_state(self):
+        if not self.state_file:
+            return
+        tmp_file = f"{self.state_file}.tmp"
+        with open(tmp_file, 'wb') as f:
+            pickle.dump({'version': STATE_VERSION, 'samples': self.samples, 'promoted': self.promoted}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, self.state_file)
+
+    def ingest(self, snapshot: Dict[str, ExchangeOpenInterestData], now: float):
+        """Add one scan and update every leaderboard entry it touches"""
+        self.snapshot = snapshot
+        horizon = max(self.windows.values()) + self.interval
+        tolerance = self.interval / 2
+        for exchange, batch in snapshot.items():
+            if not batch.success:
+                logging.warning(f"Scanner skipped {exchange}: {batch.error}")
+                continue
+            SCANNER_SERIES.set(len(batch.data), exchange=exchange)
+            seen = set()
+            for record in batch.data:
+                key = (record.symbol, exchange)
+                seen.add(key)
+                times, values = self.samples.setdefault(key, ([], []))
+                times.append(now)
+                values.append(record.open_interest_value)
+                cut = bisect.bisect_left(times, now - horizon)
+                if cut:
+                    del times[:cut]
+                    del values[:cut]
+
+                current = record.open_interest_value
+                listed = current >= self.min_oi_value
+                for label, seconds in self.windows.items():
+                    # Latest sample at least one window old (within half a scan interval)
+                    index = bisect.bisect_right(times, now - seconds + tolerance) - 1
+                    if listed and index >= 0 and times[index] < now and values[index] > 0:
+                        change = (current - values[index]) / values[index] * 100
+                        self.boards[f"gain_{label}"].update(key, change)
+                        self.boards[f"loss_{label}"].update(key, change)
+                    else:
+                        self.boards[f"gain_{label}"].discard(key)
+                        self.boards[f"loss_{label}"].discard(key)
+                if listed and record.volume_24h:
+                    self.boards['oi_to_volume'].update(key, current / record.volume_24h)
+                else:
+                    self.boards['oi_to_volume'].discard(key)
+
+            # Delisted (or no longer returned) on an exchange that answered: forget the series
+            for key in [key for key in self.samples if key[1] == exchange and key not in seen]:
+                del self.samples[key]
+                for board in self.boards.values():
+                    board.discard(key)
+
+    def update_promotions(self, now: float) -> List[str]:
+        """Promote gain/loss leaders with large enough moves and expire stale promotions; return new symbols"""
+        if not self.promote:
+            return []
+        promoted = []
+        for name, board in self.boards.items():
+            if name == 'oi_to_volume':
+                continue
+            for (symbol, exchange), change in board.top(SCANNER_PROMOTE_RANK):
+                if abs(change) < SCANNER_PROMOTE_MOVE:
+                    break
+                entry = self.promoted.get(symbol)
+                if entry is None:
+                    entry = self.promoted[symbol] = {'since': now, 'reason': f"{name} {change:+.1f}% on {exchange}"}
+                    promoted.append(symbol)
+                entry['last_seen'] = now
+        expired = [symbol for symbol, entry in self.promoted.items() if now - entry['last_seen'] > SCANNER_PROMOTION_TTL]
+        for symbol in expired:
+            del self.promoted[symbol]
+        if promoted or expired:
+            logging.info(f"Scanner promoted {promoted or 'none'}, expired {expired or 'none'}")
+            self.write_promoted_file()
+        return promoted
+
+    def write_promoted_file(self):
+        """Write the promoted set as a token config so other monitors can pick it up"""
+        data = {
+            'symbols': sorted(self.promoted),
+            'promoted': {
+                symbol: {
+                    'since': datetime.fromtimestamp(entry['since']).isoformat(),
+                    'last_seen': datetime.fromtimestamp(entry['last_seen']).isoformat(),
+                    'reason': entry['reason'],
+                }
+                for symbol, entry in sorted(self.promoted.items())
+            },
+        }
+        tmp_file = f"{self.promoted_file}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_file, self.promoted_file)
+
+    def leaderboards(self, k: int = SCANNER_TOP_K) -> List[Dict]:
+        return [
+            {'title': board.title, 'unit': board.unit,
+             'entries': [(symbol, exchange, value) for (symbol, exchange), value in board.top(k)]}
+            for board in self.boards.values()
+        ]
+
+    async def run_scan(self):
+        """Scan the universe, update leaderboards and promotions, and drive the detailed monitor"""
+        started = time.perf_counter()
+        snapshot = await asyncio.to_thread(self.aggregator.get_universe_data)
+        now = self.clock()
+        self.ingest(snapshot, now)
+        promoted = self.update_promotions(now)
+        self.save_state()
+        logging.info(f"Scan completed in {time.perf_counter() - started:.2f}s: "
+                     f"{sum(len(batch.data) for batch in snapshot.values())} series, {len(self.promoted)} promoted")
+        for symbol in promoted:
+            await send_telegram_message(f"🎯 <b>{symbol}</b> promoted into detailed OI monitoring\n\n"
+                                        f"<b>Reason:</b> {self.promoted[symbol]['reason']}")
+        # The detailed monitor keeps its usual cadence, fed from the scan that crosses each interval
+        bucket = int(now // MONITORING_INTERVAL)
+        if bucket != self.monitor_bucket:
+            self.monitor_bucket = bucket
+            await self.run_monitor_cycle()
+
+    async def run_monitor_cycle(self):
+        """Run the detailed monitor over the promoted symbols"""
+        if self.monitor is not None and self.monitor.token_list != sorted(self.promoted):
+            # Backfills newly promoted symbols and releases every piece of state of expired ones
+            await self.monitor.set_token_list(sorted(self.promoted))
+        if not self.promoted or not self.snapshot:
+            return
+        if self.monitor is None:
+            self.monitor = OpenInterestMonitor(token_list=sorted(self.promoted), data_file=MONITOR_DATA_FILE,
+                                               csv_file=MONITOR_CSV_FILE)
+            self.monitor.aggregator = SnapshotAggregator(self)
+        await self.monitor.run_monitoring_cycle()
+
+    async def send_digest(self):
+        boards = self.leaderboards()
+        if not any(board['entries'] for board in boards):
+            return
+        universe = sum(len(batch.data) for batch in self.snapshot.values())
+        await send_telegram_message(format_scanner_digest(boards, universe, sorted(self.promoted)))
+
+    async def start(self):
+        """Scan and publish digests on wall-clock boundaries until interrupted"""
+        self.scheduler.add_job('scanner_scan', self.run_scan, self.interval, run_immediately=True)
+        self.scheduler.add_job('scanner_digest', self.send_digest, SCANNER_DIGEST_INTERVAL)
+        await self.scheduler.run()
+
+def print_leaderboards(boards: List[Dict]):
+    for board in boards:
+        print(f"\n{board['title']}")
+        if not board['entries']:
+            print("  (needs more history)")
+        for rank, (symbol, exchange, value) in enumerate(board['entries'], 1):
+            shown = f"{value:+.1f}%" if board['unit'] == 'pct' else f"{value:.2f}x"
+            print(f"  {rank:>2}. {symbol:<20} {exchange:<8} {shown:>10}")
+
+async def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Full-universe Open Interest mover scanner')
+    parser.add_argument('--once', action='store_true', help='Run a single scan, print the leaderboards and exit')
+    parser.add_argument('--top', type=int, default=SCANNER_TOP_K, help='Entries printed per leaderboard with --once')
+    parser.add_argument('--interval', type=int, default=SCANNER_INTERVAL, help='Seconds between scans')
+    parser.add_argument('--no-promote', action='store_true', help='Publish leaderboards only, never promote symbols')
+    parser.add_argument('--metrics-port', type=int, default=METRICS_PORT, help='Serve Prometheus metrics on this local port')
+    args = parser.parse_args()
+
+    scanner = MoverScanner(interval=args.interval, promote=not args.no_promote)
+    if args.metrics_port:
+        start_metrics_server(args.metrics_port)
+    if args.once:
+        await scanner.run_scan()
+        print(f"🔭 Scanned {sum(len(batch.data) for batch in scanner.snapshot.values())} perpetual series")
+        print_leaderboards(scanner.leaderboards(args.top))
+        return
+    await scanner.start()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+Multi-node sharded Open Interest Monitor with lease-based failover
+Nodes claim symbol shards through expiring leases in a shared coordination store and keep
+them alive with heartbeats. When a node dies, its leases expire and other nodes take the
+shards over within seconds, resuming from the shard's persisted series state
+"""
+
+import argparse
+import asyncio
+import logging
+import math
+import os
+import socket
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from config import MONITORING_INTERVAL, SCHEDULE_OFFSET, PIPELINE_FLUSH_TIMEOUT
+from sharded_pool import ConsistentHashRing, SHARD_DIR, shard_data_file, shard_csv_file
+
+LEASE_TTL = 6.0  # Seconds a lease stays valid without renewal
+HEARTBEAT_INTERVAL = 1.0  # Seconds between heartbeats / lease renewals
+
+class LeaseStore(ABC):
+    """Coordination store interface for shard leases and node heartbeats.
+    LeaseNode calls it from worker threads, so implementations must be thread-safe."""
+
+    @abstractmethod
+    def acquire(self, shard_id: int, node_id: str, ttl: float) -> Optional[int]:
+        """Claim a shard if it is free or its lease expired; return the new fencing token"""
+
+    @abstractmethod
+    def renew(self, shard_id: int, node_id: str, ttl: float) -> bool:
+        """Extend a lease held by node_id; return False if it was lost"""
+
+    @abstractmethod
+    def release(self, shard_id: int, node_id: str):
+        """Give up a lease held by node_id"""
+
+    @abstractmethod
+    def check(self, shard_id: int, node_id: str, token: int) -> bool:
+        """Whether node_id still holds an unexpired lease under this fencing token"""
+
+    @abstractmethod
+    def record_cycle(self, shard_id: int, node_id: str, token: int, cycle_time: float) -> bool:
+        """Record when the shard's last cycle completed; False if the token is no longer current"""
+
+    @abstractmethod
+    def list_leases(self) -> List[Dict]:
+        """Return every shard lease"""
+
+    @abstractmethod
+    def heartbeat(self, node_id: str):
+        """Mark a node as alive"""
+
+    @abstractmethod
+    def live_nodes(self, ttl: float) -> List[str]:
+        """Return nodes that sent a heartbeat within ttl seconds"""
+
+class SQLiteLeaseStore(LeaseStore):
+    """Lease store on a shared SQLite file (local tests, single host or a shared volume)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()  # One connection, shared by the node's worker threads
+        self.conn = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS leases ("
+            "shard_id INTEGER PRIMARY KEY, owner TEXT, expires_at REAL, token INTEGER NOT NULL DEFAULT 0, "
+            "last_cycle_at REAL)"
+        )
+        self.conn.execute("CREATE TABLE IF NOT EXISTS nodes (node_id TEXT PRIMARY KEY, last_seen REAL)")
+
+    def acquire(self, shard_id: int, node_id: str, ttl: float) -> Optional[int]:
+        with self.lock:
+            now = time.time()
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.conn.execute("SELECT owner, expires_at, token FROM leases WHERE shard_id = ?", (shard_id,)).fetchone()
+                if row is None:
+                    token = 1
+                    self.conn.execute("INSERT INTO leases (shard_id, owner, expires_at, token) VALUES (?, ?, ?, ?)",
+                                      (shard_id, node_id, now + ttl, token))
+                else:
+                    owner, expires_at, token = row
+                    if owner not in (None, node_id) and expires_at is not None and expires_at > now:
+                        self.conn.execute("COMMIT")
+                        return None
+                    token += 1
+                    self.conn.execute("UPDATE leases SET owner = ?, expires_at = ?, token = ? WHERE shard_id = ?",
+                                      (node_id, now + ttl, token, shard_id))
+                self.conn.execute("COMMIT")
+                return token
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def renew(self, shard_id: int, node_id: str, ttl: float) -> bool:
+        with self.lock:
+            now = time.time()
+            cursor = self.conn.execute(
+                "UPDATE leases SET expires_at = ? WHERE shard_id = ? AND owner = ? AND expires_at > ?",
+                (now + ttl, shard_id, node_id, now)
+            )
+            return cursor.rowcount == 1
+
+    def release(self, shard_id: int, node_id: str):
+        with self.lock:
+            self.conn.execute("UPDATE leases SET owner = NULL, expires_at = NULL WHERE shard_id = ? AND owner = ?",
+                              (shard_id, node_id))
+
+    def check(self, shard_id: int, node_id: str, token: int) -> bool:
+        with self.lock:
+            row = self.conn.execute("SELECT 1 FROM leases WHERE shard_id = ? AND owner = ? AND token = ? AND expires_at > ?",
+                                    (shard_id, node_id, token, time.time())).fetchone()
+            return row is not None
+
+    def record_cycle(self, shard_id: int, node_id: str, token: int, cycle_time: float) -> bool:
+        with self.lock:
+            cursor = self.conn.execute("UPDATE leases SET last_cycle_at = ? WHERE shard_id = ? AND owner = ? AND token = ?",
+                                       (cycle_time, shard_id, node_id, token))
+            return cursor.rowcount == 1
+
+    def list_leases(self) -> List[Dict]:
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT shard_id, owner, expires_at, token, last_cycle_at FROM leases ORDER BY shard_id"
+            ).fetchall()
+        return [
+            {'shard_id': r[0], 'owner': r[1], 'expires_at': r[2], 'token': r[3], 'last_cycle_at': r[4]}
+            for r in rows
+        ]
+
+    def heartbeat(self, node_id: str):
+        with self.lock:
+            self.conn.execute("INSERT INTO nodes (node_id, last_seen) VALUES (?, ?) "
+                              "ON CONFLICT(node_id) DO UPDATE SET last_seen = excluded.last_seen", (node_id, time.time()))
+
+    def live_nodes(self, ttl: float) -> List[str]:
+        with self.lock:
+            rows = self.conn.execute("SELECT node_id FROM nodes WHERE last_seen > ? ORDER BY node_id",
+                                     (time.time() - ttl,)).fetchall()
+        return [r[0] for r in rows]
+
+class LeaseNode:
+    """A node that claims shards through leases and runs monitoring cycles for them.
+    Lease store calls and shard file flushes run in worker threads so renewals are never held up."""
+
+    def __init__(self, node_id: str, store: LeaseStore, token_list: List[str], num_shards: int,
+                 shard_dir: str = SHARD_DIR, lease_ttl: float = LEASE_TTL, heartbeat_interval: float = HEARTBEAT_INTERVAL,
+                 aggregator_factory=None):
+        self.node_id = node_id
+        self.store = store
+        self.num_shards = num_shards
+        self.shard_dir = shard_dir
+        self.lease_ttl = lease_ttl
+        self.heartbeat_interval = heartbeat_interval
+        self.aggregator_factory = aggregator_factory
+        self.assignment = ConsistentHashRing(list(range(num_shards))).partition(list(token_list))
+        self.owned = {}  # shard_id -> OpenInterestMonitor
+        self.tokens: Dict[int, int] = {}  # shard_id -> fencing token of every held lease (owned or loading)
+        self.valid_until: Dict[int, float] = {}  # shard_id -> time before which no other node can hold its lease
+        self.loading: Dict[int, asyncio.Task] = {}  # shard_id -> take-over loading the shard's state
+        self.catch_ups: Dict[int, asyncio.Task] = {}  # shard_id -> cycle run on take-over for a missed window
+        self.releasing: Dict[int, asyncio.Task] = {}  # shard_id -> flush and release of a dropped shard
+        self.cycle_lock = asyncio.Lock()
+        os.makedirs(shard_dir, exist_ok=True)
+
+    async def fair_share(self) -> int:
+        """Number of shards this node should own given the live node count"""
+        live = max(1, len(await asyncio.to_thread(self.store.live_nodes, self.lease_ttl)))
+        return math.ceil(self.num_shards / live)
+
+    async def renew(self, shard_id: int) -> bool:
+        """Renew a held lease and extend how long its writes stay unfenced"""
+        started = time.time()
+        if not await asyncio.to_thread(self.store.renew, shard_id, self.node_id, self.lease_ttl):
+            return False
+        self.valid_until[shard_id] = started + self.lease_ttl
+        return True
+
+    def holds(self, shard_id: int, token: int) -> bool:
+        """Fence check without a store round trip: the token is current and its last renewal has not run out"""
+        return self.tokens.get(shard_id) == token and time.time() < self.valid_until.get(shard_id, 0.0)
+
+    async def take_over(self, shard_id: int, token: int):
+        """Load a shard's persisted state and catch up on a missed window"""
+        from monitor import OpenInterestMonitor
+        symbols = self.assignment[shard_id]
+        # Loading the shard's history can take a while; it runs as its own task so heartbeats keep renewing
+        monitor = await asyncio.to_thread(
+            OpenInterestMonitor,
+            token_list=symbols,
+            data_file=shard_data_file(self.shard_dir, shard_id),
+            csv_file=shard_csv_file(self.shard_dir, shard_id)
+        )
+        if self.tokens.get(shard_id) != token:
+            return  # Lost while loading
+        if self.aggregator_factory is not None:
+            monitor.aggregator = self.aggregator_factory(symbols)
+        # Notifications and saves are fenced: once the lease may have passed to another node, this node's writes stop
+        monitor.fence = lambda: self.holds(shard_id, token)
+        self.owned[shard_id] = monitor
+        logging.info(f"Node {self.node_id} took shard {shard_id} (token {token}, {len(symbols)} symbols)")
+
+        # If the previous owner missed the current window, run it now
+        leases = await asyncio.to_thread(self.store.list_leases)
+        lease = next((l for l in leases if l['shard_id'] == shard_id), None)
+        last_cycle_at = lease['last_cycle_at'] if lease else None
+        window_start = (time.time() - SCHEDULE_OFFSET) // MONITORING_INTERVAL * MONITORING_INTERVAL + SCHEDULE_OFFSET
+        if last_cycle_at is None or last_cycle_at < window_start:
+            task = asyncio.create_task(self.run_shard_cycle(shard_id))
+            self.catch_ups[shard_id] = task
+            task.add_done_callback(lambda done: self.forget_task(self.catch_ups, shard_id, done))
+
+    @staticmethod
+    def forget_task(tasks: Dict[int, asyncio.Task], shard_id: int, task: asyncio.Task):
+        if tasks.get(shard_id) is task:
+            del tasks[shard_id]
+
+    def drop_shard(self, shard_id: int, release: bool = True) -> Optional[asyncio.Task]:
+        """Stop running a shard. With release, return the task that flushes its files and then releases
+        its lease; heartbeats keep renewing the lease until then"""
+        monitor = self.owned.pop(shard_id, None)
+        self.tokens.pop(shard_id, None)
+        self.valid_until.pop(shard_id, None)
+        for tasks in (self.loading, self.catch_ups):
+            task = tasks.pop(shard_id, None)
+            if task is not None:
+                task.cancel()
+        if not release:
+            if monitor is not None:
+                # The lease was lost: the new owner's writes win, so a state still waiting is stale
+                monitor.persister.discard()
+            logging.info(f"Node {self.node_id} dropped shard {shard_id}")
+            return None
+        task = asyncio.create_task(self.release_shard(shard_id, monitor))
+        self.releasing[shard_id] = task
+        task.add_done_callback(lambda done: self.forget_task(self.releasing, shard_id, done))
+        return task
+
+    async def release_shard(self, shard_id: int, monitor):
+        """Finish writing a dropped shard's files (the next owner loads them), then release its lease"""
+        if monitor is not None:
+            await asyncio.to_thread(monitor.persister.flush, PIPELINE_FLUSH_TIMEOUT)
+        await asyncio.to_thread(self.store.release, shard_id, self.node_id)
+        logging.info(f"Node {self.node_id} dropped shard {shard_id}")
+
+    async def heartbeat_once(self):
+        """Renew owned leases, then claim or release shards toward the fair share"""
+        await asyncio.to_thread(self.store.heartbeat, self.node_id)
+        for shard_id in list(self.tokens):
+            if not await self.renew(shard_id):
+                logging.warning(f"Node {self.node_id} lost lease on shard {shard_id}")
+                self.drop_shard(shard_id, release=False)
+        for shard_id in list(self.releasing):
+            if not await asyncio.to_thread(self.store.renew, shard_id, self.node_id, self.lease_ttl):
+                logging.warning(f"Node {self.node_id} lost lease on shard {shard_id} before its files were flushed")
+
+        share = await self.fair_share()
+        # Release extra shards (e.g. a node joined) when no cycle is writing them
+        while len(self.tokens) > share and self.owned and not self.cycle_lock.locked():
+            self.drop_shard(max(self.owned))
+
+        for shard_id in range(self.num_shards):
+            if len(self.tokens) >= share:
+                break
+            if shard_id in self.tokens or shard_id in self.releasing or not self.assignment[shard_id]:
+                continue
+            started = time.time()
+            token = await asyncio.to_thread(self.store.acquire, shard_id, self.node_id, self.lease_ttl)
+            if token is not None:
+                self.tokens[shard_id] = token
+                self.valid_until[shard_id] = started + self.lease_ttl
+                task = asyncio.create_task(self.take_over(shard_id, token))
+                self.loading[shard_id] = task
+                task.add_done_callback(lambda done, shard_id=shard_id: self.forget_task(self.loading, shard_id, done))
+
+    async def heartbeat_loop(self):
+        while True:
+            try:
+                await self.heartbeat_once()
+            except Exception as e:
+                logging.error(f"Heartbeat error on node {self.node_id}: {e}")
+            await asyncio.sleep(self.heartbeat_interval)
+
+    async def run_shard_cycle(self, shard_id: int):
+        """Run one cycle for a shard this node still holds"""
+        async with self.cycle_lock:
+            monitor = self.owned.get(shard_id)
+            if monitor is None or not await self.renew(shard_id):
+                return
+            token = self.tokens[shard_id]
+            result = await monitor.run_monitoring_cycle()
+            if result.success and not await asyncio.to_thread(self.store.record_cycle, shard_id, self.node_id,
+                                                              token, time.time()):
+                logging.warning(f"Node {self.node_id} lost shard {shard_id} during its cycle (token {token})")
+
+    async def run_cycles(self):
+        """Run a cycle for every owned shard"""
+        for shard_id in sorted(self.owned):
+            await self.run_shard_cycle(shard_id)
+
+    async def run(self):
+        """Heartbeat and run wall-clock aligned cycles until cancelled"""
+        from wallclock_scheduler import WallClockScheduler
+        scheduler = WallClockScheduler()
+        scheduler.add_job('lease_cycle', self.run_cycles, MONITORING_INTERVAL, SCHEDULE_OFFSET)
+        heartbeat = asyncio.create_task(self.heartbeat_loop())
+        try:
+            await scheduler.run()
+        finally:
+            heartbeat.cancel()
+            for shard_id in list(self.tokens):
+                self.drop_shard(shard_id)
+            await asyncio.gather(*self.releasing.values(), return_exceptions=True)
+
+def print_status(store: LeaseStore):
+    """Print shard ownership and live nodes"""
+    now = time.time()
+    print(f"Live nodes: {', '.join(store.live_nodes(LEASE_TTL)) or 'none'}")
+    print(f"{'shard':>5}  {'owner':<24} {'expires in':>10}  {'token':>5}  last cycle")
+    for lease in store.list_leases():
+        expires = f"{lease['expires_at'] - now:.1f}s" if lease['owner'] and lease['expires_at'] else "-"
+        last = datetime.fromtimestamp(lease['last_cycle_at']).strftime('%Y-%m-%d %H:%M:%S') if lease['last_cycle_at'] else "-"
+        print(f"{lease['shard_id']:>5}  {lease['owner'] or '(free)':<24} {expires:>10}  {lease['token']:>5}  {last}")
+
+async def main():
+    """Main function"""
+    from monitor import OpenInterestMonitor
+
+    parser = argparse.ArgumentParser(description='Multi-node sharded Open Interest Monitor with lease failover')
+    parser.add_argument('command', nargs='?', default='run', choices=['run', 'status'], help='Run a node or show leases')
+    parser.add_argument('--store', type=str, default='shard_leases.db', help='Path to the shared SQLite lease store')
+    parser.add_argument('--config', type=str, default='tokens_config.json', help='Path to JSON config file with token symbols')
+    parser.add_argument('--shards', type=int, default=8, help='Total number of shards (same on every node)')
+    parser.add_argument('--shard-dir', type=str, default=SHARD_DIR, help='Shared directory holding shard storage partitions')
+    parser.add_argument('--node-id', type=str, default=f"{socket.gethostname()}-{os.getpid()}", help='Unique node id')
+    args = parser.parse_args()
+
+    store = SQLiteLeaseStore(args.store)
+    if args.command == 'status':
+        print_status(store)
+        return
+
+    token_list = OpenInterestMonitor.load_token_list(args.config)
+    if not token_list:
+        parser.error(f"No symbols found in {args.config}")
+    node = LeaseNode(args.node_id, store, token_list, args.shards, shard_dir=args.shard_dir)
+    await node.run()
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        logging.info("Lease node stopped by user")
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Sharded multi-core Open Interest Monitor
+Partitions the symbol universe across worker processes by consistent hashing. Each shard
+owns its series state and storage partition (fetch, detection, CSV export and JSON save run
+in the shard's own interpreter); the coordinator classifies the market regime across every
+shard's samples, merges alerts and sends one summary
+"""
+
+import argparse
+import asyncio
+import bisect
+import glob
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from config import MONITORING_INTERVAL, SCHEDULE_OFFSET, PIPELINE_FLUSH_TIMEOUT
+from models import ExchangeOpenInterestData, MonitoringCycleResult
+from telegram_service import send_telegram_message
+
+SHARD_DIR = "shards"
+MANIFEST_FILE = "manifest.json"
+CYCLE_TIMEOUT = 300  # Seconds to wait for every shard to report a cycle
+
+class ConsistentHashRing:
+    """Consistent-hash ring mapping symbols to shard ids"""
+
+    def __init__(self, shard_ids: List[int], vnodes: int = 64):
+        self.shard_ids = list(shard_ids)
+        self._ring = []  # Sorted (hash, shard_id)
+        for shard_id in self.shard_ids:
+            for vnode in range(vnodes):
+                self._ring.append((self._hash(f"shard-{shard_id}-{vnode}"), shard_id))
+        self._ring.sort()
+        self._hashes = [h for h, _ in self._ring]
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], 'big')
+
+    def shard_for(self, symbol: str) -> int:
+        """Return the shard that owns a symbol"""
+        index = bisect.bisect(self._hashes, self._hash(symbol)) % len(self._ring)
+        return self._ring[index][1]
+
+    def partition(self, symbols: List[str]) -> Dict[int, List[str]]:
+        """Split symbols into per-shard lists (every shard id present, possibly empty)"""
+        assignment = {shard_id: [] for shard_id in self.shard_ids}
+        for symbol in symbols:
+            assignment[self.shard_for(symbol)].append(symbol)
+        return assignment
+
+def shard_data_file(shard_dir: str, shard_id: int) -> str:
+    return os.path.join(shard_dir, f"shard-{shard_id}.json")
+
+def shard_csv_file(shard_dir: str, shard_id: int) -> str:
+    return os.path.join(shard_dir, f"shard-{shard_id}_15min_averages.csv")
+
+def shard_history_dir(shard_dir: str, shard_id: int) -> str:
+    return os.path.join(shard_dir, f"shard-{shard_id}.history")
+
+def write_json_atomic(path: str, data):
+    """Write JSON to a temp file and rename it over the target"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+def rebalance_partitions(shard_dir: str, assignment: Dict[int, List[str]], seed_file: Optional[str] = None) -> bool:
+    """Move series history between partition files when the shard assignment changed.
+
+    Returns True if partitions were rewritten. On first start, partitions are seeded from
+    seed_file (the single-process open_interest_data.json) if it exists.
+    """
+    os.makedirs(shard_dir, exist_ok=True)
+    manifest_path = os.path.join(shard_dir, MANIFEST_FILE)
+    wanted = {str(shard_id): sorted(symbols) for shard_id, symbols in assignment.items()}
+
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+        if manifest.get('assignment') == wanted:
+            return False
+
+    # Gather all series currently on disk
+    series = {}
+    partition_files = glob.glob(os.path.join(shard_dir, "shard-*.json"))
+    for path in partition_files:
+        with open(path, 'r') as f:
+            series.update(json.load(f))
+    if not partition_files and seed_file and os.path.exists(seed_file):
+        with open(seed_file, 'r') as f:
+            series.update(json.load(f))
+        logging.info(f"Seeding shard partitions from {seed_file}")
+
+    for shard_id, symbols in assignment.items():
+        partition = {symbol: series[symbol] for symbol in symbols if symbol in series}
+        write_json_atomic(shard_data_file(shard_dir, shard_id), partition)
+
+    # Move each series' history store to the shard that owns it now; shards that no longer exist keep
+    # only the history of symbols that left the token list
+    owner = {symbol: shard_id for shard_id, symbols in assignment.items() for symbol in symbols}
+    history_dirs = glob.glob(os.path.join(shard_dir, "shard-*.history"))
+    if history_dirs:
+        from retention import RetentionManager  # Deferred: numpy, only needed when a history store exists
+        for path in history_dirs:
+            shard_id = os.path.basename(path)[len("shard-"):-len(".history")]
+            if not shard_id.isdigit():
+                continue
+            source = RetentionManager(path)
+            for symbol in source.symbols():
+                target = owner.get(symbol)
+                if target is not None and target != int(shard_id):
+                    source.move_symbol(symbol, RetentionManager(shard_history_dir(shard_dir, target)))
+
+    # Drop partitions of shards that no longer exist
+    for path in partition_files:
+        shard_id = os.path.basename(path)[len("shard-"):-len(".json")]
+        if shard_id.isdigit() and int(shard_id) not in assignment:
+            os.remove(path)
+            csv_path = shard_csv_file(shard_dir, int(shard_id))
+            if os.path.exists(csv_path):
+                os.remove(csv_path)
+
+    write_json_atomic(manifest_path, {'num_shards': len(assignment), 'assignment': wanted,
+                                      'updated_at': datetime.now().isoformat()})
+    logging.info(f"Rebalanced {len(series)} series across {len(assignment)} shards")
+    return True
+
+def shard_worker_main(shard_id: int, symbols: List[str], shard_dir: str, task_queue, result_queue,
+                      aggregator_factory: Optional[Callable] = None):
+    """Worker process: own one shard's monitor and run cycles on request"""
+    # Ctrl+C is handled by the coordinator, which asks workers to stop cleanly
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    from monitor import OpenInterestMonitor
+
+    monitor = OpenInterestMonitor(
+        token_list=symbols,
+        data_file=shard_data_file(shard_dir, shard_id),
+        csv_file=shard_csv_file(shard_dir, shard_id)
+    )
+    if aggregator_factory is not None:
+        monitor.aggregator = aggregator_factory(symbols)
+    # The market regime is a property of the whole cross-section, so the coordinator classifies it
+    monitor.detect_regimes = False
+    result_queue.put(('ready', shard_id, None, None))
+
+    while True:
+        command, cycle_id = task_queue.get()
+        if command == 'stop':
+            # Worker processes skip atexit handlers, so write the last state before exiting
+            monitor.persister.flush(PIPELINE_FLUSH_TIMEOUT)
+            break
+        if command == 'cycle':
+            result = asyncio.run(monitor.run_monitoring_cycle(send_notifications=False))
+            averages = {symbol: monitor.historical_averages.get(symbol, 0.0) for symbol in result.latest_data}
+            result_queue.put(('result', shard_id, cycle_id, (result, averages)))
+
+    result_queue.put(('stopped', shard_id, None, None))
+
+class ShardedMonitorPool:
+    """Coordinator for a pool of shard worker processes"""
+
+    def __init__(self, token_list: List[str], num_workers: int, shard_dir: str = SHARD_DIR,
+                 seed_file: Optional[str] = "open_interest_data.json", aggregator_factory: Optional[Callable] = None):
+        if num_workers < 1:
+            raise ValueError("num_workers must be at least 1")
+        self.token_list = list(token_list)
+        self.num_workers = num_workers
+        self.shard_dir = shard_dir
+        self.seed_file = seed_file
+        self.aggregator_factory = aggregator_factory
+        self.ring = ConsistentHashRing(list(range(num_workers)))
+        self.assignment = self.ring.partition(self.token_list)
+        self.processes: Dict[int, multiprocessing.Process] = {}
+        self.task_queues: Dict[int, multiprocessing.Queue] = {}
+        self.result_queue: Optional[multiprocessing.Queue] = None
+        self.cycle_id = 0
+        self.shard_averages: Dict[str, float] = {}  # symbol -> historical average reported by its shard
+        self.notifier = None  # Lightweight OpenInterestMonitor used only for message formatting
+
+    def start(self):
+        """Rebalance storage for the current shard count and spawn the workers"""
+        rebalance_partitions(self.shard_dir, self.assignment, self.seed_file)
+        self.result_queue = multiprocessing.Queue()
+        for shard_id, symbols in self.assignment.items():
+            if not symbols:
+                continue
+            task_queue = multiprocessing.Queue()
+            process = multiprocessing.Process(
+                target=shard_worker_main,
+                args=(shard_id, symbols, self.shard_dir, task_queue, self.result_queue, self.aggregator_factory),
+                name=f"oi-shard-{shard_id}",
+                daemon=True
+            )
+            process.start()
+            self.task_queues[shard_id] = task_queue
+            self.processes[shard_id] = process
+            logging.info(f"Started shard {shard_id} (pid {process.pid}) with {len(symbols)} symbols")
+
+        ready = set()
+        while len(ready) < len(self.processes):
+            kind, shard_id, _, _ = self.result_queue.get(timeout=CYCLE_TIMEOUT)
+            if kind == 'ready':
+                ready.add(shard_id)
+
+    def stop(self, timeout: float = 10.0):
+        """Ask every worker to finish and exit, terminating stragglers"""
+        for task_queue in self.task_queues.values():
+            task_queue.put(('stop', None))
+        deadline = time.time() + timeout
+        for shard_id, process in self.processes.items():
+            process.join(max(0.0, deadline - time.time()))
+            if process.is_alive():
+                logging.warning(f"Shard {shard_id} did not stop in time, terminating")
+                process.terminate()
+                process.join()
+        self.processes.clear()
+        self.task_queues.clear()
+
+    def collect_cycle(self, timeout: float = CYCLE_TIMEOUT) -> MonitoringCycleResult:
+        """Run one cycle on every shard and merge their results"""
+        self.cycle_id += 1
+        started = time.perf_counter()
+        for task_queue in self.task_queues.values():
+            task_queue.put(('cycle', self.cycle_id))
+
+        merged = MonitoringCycleResult(timestamp=datetime.now(), success=True)
+        shard_samples = {}  # shard_id -> that shard's samples per exchange
+        pending = set(self.task_queues)
+        deadline = time.time() + timeout
+        while pending:
+            try:
+                kind, shard_id, cycle_id, payload = self.result_queue.get(timeout=max(0.01, deadline - time.time()))
+            except queue.Empty:
+                merged.success = False
+                merged.error = f"Shards timed out: {sorted(pending)}"
+                break
+            if kind != 'result' or cycle_id != self.cycle_id:
+                continue  # Late result from an earlier cycle
+            pending.discard(shard_id)
+            result, averages = payload
+            self.shard_averages.update(averages)
+            merged.total_symbols += result.total_symbols
+            merged.alerts.extend(result.alerts)
+            merged.window_spikes.extend(result.window_spikes)
+            merged.latest_data.update(result.latest_data)
+            shard_samples[shard_id] = result.exchange_data
+            if not result.success:
+                merged.success = False
+                merged.error = f"Shard {shard_id}: {result.error}"
+
+        # One cross-section per exchange, in shard order so it lines up with the previous cycle's
+        for shard_id in sorted(shard_samples):
+            for exchange, batch in shard_samples[shard_id].items():
+                if not batch.success:
+                    continue
+                combined = merged.exchange_data.setdefault(
+                    exchange, ExchangeOpenInterestData(exchange=exchange, data=[], timestamp=batch.timestamp, success=True))
+                combined.data.extend(batch.data)
+        merged.alerts.sort(key=lambda alert: abs(alert.percentage_change), reverse=True)
+        merged.duration = time.perf_counter() - started
+        return merged
+
+    async def run_cycle(self) -> MonitoringCycleResult:
+        """Run a sharded cycle and send the merged alerts and summary"""
+        result = await asyncio.to_thread(self.collect_cycle)
+        if self.notifier is None:
+            from monitor import OpenInterestMonitor
+            self.notifier = OpenInterestMonitor(token_list=self.token_list, load_history=False)
+        # Give the formatter each alert's average and latest value without loading history
+        self.notifier.historical_averages.update(self.shard_averages)
+        for symbol, record in result.latest_data.items():
+            self.notifier.historical_data[symbol] = [record]
+        # Classify the cycle once across every shard's series before any alert goes out
+        result.regime, result.alerts = self.notifier.apply_market_regime(result.exchange_data, result.alerts)
+
+        if result.regime:
+            await self.notifier.send_market_regime_alert(result.regime)
+        await self.notifier.send_alerts(result.alerts)
+        if result.alerts:
+            await self.notifier.send_summary(result.alerts, result.total_symbols)
+        for spike in result.window_spikes:
+            await self.notifier.send_15min_spike_alert(spike.symbol, spike.old_avg, spike.new_avg, spike.ratio,
+                                                       spike.window_start, spike.window_end)
+        if not result.success:
+            await send_telegram_message(f"❌ <b>Open Interest Monitor Error</b>\n\nError in sharded cycle: {result.error}")
+        logging.info(f"Sharded cycle {self.cycle_id} completed in {result.duration:.2f}s: "
+                     f"{result.total_symbols} symbols, {len(result.alerts)} alerts")
+        return result
+
+async def main():
+    """Main function"""
+    from monitor import OpenInterestMonitor
+    from wallclock_scheduler import WallClockScheduler
+
+    parser = argparse.ArgumentParser(description='Sharded multi-core Open Interest Monitor')
+    parser.add_argument('--config', type=str, default='tokens_config.json', help='Path to JSON config file with token symbols')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Number of shard worker processes')
+    parser.add_argument('--shard-dir', type=str, default=SHARD_DIR, help='Directory holding shard storage partitions')
+    parser.add_argument('--once', action='store_true', help='Run a single cycle and exit')
+    args = parser.parse_args()
+
+    token_list = OpenInterestMonitor.load_token_list(args.config)
+    if not token_list:
+        parser.error(f"No symbols found in {args.config}")
+
+    pool = ShardedMonitorPool(token_list, args.workers, shard_dir=args.shard_dir)
+    pool.start()
+    try:
+        if args.once:
+            await pool.run_cycle()
+            return
+        scheduler = WallClockScheduler()
+        scheduler.add_job('sharded_cycle', pool.run_cycle, MONITORING_INTERVAL, SCHEDULE_OFFSET)
+        await scheduler.run()
+    finally:
+        pool.stop()
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        logging.info("Sharded monitor stopped by user")
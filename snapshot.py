@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Latest-snapshot segment for the Open Interest Monitor
+The monitor publishes each series' latest sample and derived statistics into a fixed-layout,
+memory-mapped file next to its data file (open_interest_data.snap). Any local process can map
+it and read a consistent copy without parsing JSON and without locking the writer:
+
+    header (64 bytes, little-endian)
+        0  magic        8s   b"OISNAP01"
+        8  layout       u32  LAYOUT_VERSION
+        12 record_size  u32  RECORD.size
+        16 capacity     u32  records the file has room for
+        20 count        u32  records published
+        24 sequence     u64  seqlock: odd while the writer is updating
+        32 published_at f64  epoch seconds
+        40 cycle        u64  publications since the writer started
+    records (RECORD.size bytes each, NaN for missing values)
+        symbol 24s, exchange 8s, timestamp, open_interest, open_interest_value, price,
+        volume_24h, funding_rate, avg_oi, pct_change, pct_from_avg, avg_15min, price_change,
+        oi_volume_ratio, funding_oi, funding_oi_ewma, contract_divergence (f64), samples (u32),
+        quadrant (u8, index into derived_metrics.QUADRANTS, 255 when unknown)
+
+Readers copy the records between two reads of the sequence and retry if it was odd or changed.
+When the writer needs more room (or restarts) it replaces the file; readers notice the new inode
+and remap.
+"""
+
+import argparse
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+import time
+from dataclasses import asdict
+from datetime import datetime
+from typing import List, Optional
+
+from derived_metrics import QUADRANTS
+from models import MonitorSnapshot, SeriesSnapshot
+
+MAGIC = b"OISNAP01"
+LAYOUT_VERSION = 2
+HEADER = struct.Struct('<8sIIIIQdQ')
+HEADER_SIZE = 64
+SEQUENCE = struct.Struct('<Q')
+SEQUENCE_OFFSET = 24
+RECORD = struct.Struct('<24s8s15dIB3x')
+NO_QUADRANT = 255
+DEFAULT_CAPACITY = 256
+READ_RETRIES = 10000
+
+def _optional(value: float) -> Optional[float]:
+    return None if math.isnan(value) else value
+
+def _float(value: Optional[float]) -> float:
+    return float('nan') if value is None else float(value)
+
+class SnapshotWriter:
+    """Publishes snapshots into the segment; a single writer per file"""
+
+    def __init__(self, path: str, capacity: int = DEFAULT_CAPACITY):
+        self.path = path
+        self.capacity = 0
+        self.sequence = 0
+        self.cycle = 0
+        self.mm: Optional[mmap.mmap] = None
+        self._create(capacity)
+
+    def _create(self, capacity: int):
+        """Lay out a fresh file and atomically swap it in, so readers never map a partial one"""
+        size = HEADER_SIZE + capacity * RECORD.size
+        tmp_file = f"{self.path}.tmp"
+        with open(tmp_file, 'wb') as f:
+            f.truncate(size)
+        with open(tmp_file, 'r+b') as f:
+            mm = mmap.mmap(f.fileno(), size)
+        HEADER.pack_into(mm, 0, MAGIC, LAYOUT_VERSION, RECORD.size, capacity, 0, 0, 0.0, 0)
+        os.replace(tmp_file, self.path)
+        if self.mm is not None:
+            self.mm.close()
+        self.mm = mm
+        self.capacity = capacity
+        self.sequence = 0
+
+    def publish(self, series: List[SeriesSnapshot]):
+        """Replace the published series with a new consistent set"""
+        if len(series) > self.capacity:
+            capacity = self.capacity
+            while capacity < len(series):
+                capacity *= 2
+            self._create(capacity)
+        body = b"".join(
+            RECORD.pack(s.symbol.encode()[:24], s.exchange.encode()[:8], s.timestamp.timestamp(), s.open_interest,
+                        s.open_interest_value, _float(s.price), _float(s.volume_24h), _float(s.funding_rate),
+                        _float(s.avg_oi), _float(s.pct_change), _float(s.pct_from_avg), _float(s.avg_15min),
+                        _float(s.price_change), _float(s.oi_volume_ratio), _float(s.funding_oi),
+                        _float(s.funding_oi_ewma), _float(s.contract_divergence), s.samples,
+                        QUADRANTS.index(s.quadrant) if s.quadrant in QUADRANTS else NO_QUADRANT)
+            for s in series
+        )
+        self.cycle += 1
+        # Seqlock: odd while the body and header change, even (and larger) once they are consistent
+        self.sequence += 1
+        SEQUENCE.pack_into(self.mm, SEQUENCE_OFFSET, self.sequence)
+        self.mm[HEADER_SIZE:HEADER_SIZE + len(body)] = body
+        HEADER.pack_into(self.mm, 0, MAGIC, LAYOUT_VERSION, RECORD.size, self.capacity, len(series),
+                         self.sequence, time.time(), self.cycle)
+        self.sequence += 1
+        SEQUENCE.pack_into(self.mm, SEQUENCE_OFFSET, self.sequence)
+
+    def close(self):
+        if self.mm is not None:
+            self.mm.close()
+            self.mm = None
+
+class SnapshotReader:
+    """Reads consistent snapshots from a segment published by a running monitor"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.mm: Optional[mmap.mmap] = None
+        self.inode: Optional[int] = None
+
+    def _map(self):
+        with open(self.path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            inode = os.fstat(f.fileno()).st_ino
+        magic, layout, record_size = HEADER.unpack_from(mm, 0)[:3]
+        if magic != MAGIC or layout != LAYOUT_VERSION or record_size != RECORD.size:
+            mm.close()
+            raise ValueError(f"{self.path} is not a layout {LAYOUT_VERSION} snapshot segment")
+        if self.mm is not None:
+            self.mm.close()
+        self.mm, self.inode = mm, inode
+
+    def read(self) -> MonitorSnapshot:
+        """Return a consistent copy of the published snapshot"""
+        if self.mm is None or os.stat(self.path).st_ino != self.inode:
+            self._map()
+        for _ in range(READ_RETRIES):
+            before = SEQUENCE.unpack_from(self.mm, SEQUENCE_OFFSET)[0]
+            if before & 1:
+                time.sleep(0)  # Writer mid-update
+                continue
+            _, _, _, _, count, _, published_at, cycle = HEADER.unpack_from(self.mm, 0)
+            body = self.mm[HEADER_SIZE:HEADER_SIZE + count * RECORD.size]
+            if SEQUENCE.unpack_from(self.mm, SEQUENCE_OFFSET)[0] != before:
+                continue
+            series = [
+                SeriesSnapshot(
+                    symbol=symbol.rstrip(b"\0").decode(),
+                    exchange=exchange.rstrip(b"\0").decode(),
+                    timestamp=datetime.fromtimestamp(timestamp),
+                    open_interest=open_interest,
+                    open_interest_value=open_interest_value,
+                    price=_optional(price),
+                    volume_24h=_optional(volume),
+                    funding_rate=_optional(funding),
+                    avg_oi=_optional(avg_oi),
+                    pct_change=_optional(pct_change),
+                    pct_from_avg=_optional(pct_from_avg),
+                    avg_15min=_optional(avg_15min),
+                    samples=samples,
+                    price_change=_optional(price_change),
+                    quadrant=QUADRANTS[quadrant] if quadrant < len(QUADRANTS) else None,
+                    oi_volume_ratio=_optional(oi_volume_ratio),
+                    funding_oi=_optional(funding_oi),
+                    funding_oi_ewma=_optional(funding_oi_ewma),
+                    contract_divergence=_optional(contract_divergence),
+                )
+                for (symbol, exchange, timestamp, open_interest, open_interest_value, price, volume, funding,
+                     avg_oi, pct_change, pct_from_avg, avg_15min, price_change, oi_volume_ratio, funding_oi,
+                     funding_oi_ewma, contract_divergence, samples, quadrant) in RECORD.iter_unpack(body)
+            ]
+            return MonitorSnapshot(published_at=datetime.fromtimestamp(published_at), cycle=cycle, series=series)
+        raise RuntimeError(f"No consistent snapshot in {self.path} after {READ_RETRIES} attempts")
+
+    def get(self, symbol: str, exchange: Optional[str] = None) -> List[SeriesSnapshot]:
+        """Series of one symbol (optionally one exchange) from a fresh snapshot"""
+        return [s for s in self.read().series if s.symbol == symbol and (exchange is None or s.exchange == exchange)]
+
+    def close(self):
+        if self.mm is not None:
+            self.mm.close()
+            self.mm = None
+
+def read_snapshot(path: str = "open_interest_data.snap") -> MonitorSnapshot:
+    """One-shot read of a snapshot segment"""
+    reader = SnapshotReader(path)
+    try:
+        return reader.read()
+    finally:
+        reader.close()
+
+def print_snapshot(snapshot: MonitorSnapshot, series: List[SeriesSnapshot]):
+    age = (datetime.now() - snapshot.published_at).total_seconds()
+    print(f"📡 Snapshot #{snapshot.cycle} published {snapshot.published_at:%Y-%m-%d %H:%M:%S} ({age:.0f}s ago), "
+          f"{len(snapshot.series)} series")
+    print(f"{'symbol':<16} {'exchange':<8} {'OI value':>16} {'chg %':>8} {'vs avg %':>9} {'15m avg':>16} "
+          f"{'OI/vol':>7} {'quadrant':<15} {'sampled':>9}")
+    for s in series:
+        change = f"{s.pct_change:+.2f}" if s.pct_change is not None else "-"
+        from_avg = f"{s.pct_from_avg:+.2f}" if s.pct_from_avg is not None else "-"
+        avg_15min = f"{s.avg_15min:,.0f}" if s.avg_15min is not None else "-"
+        oi_volume = f"{s.oi_volume_ratio:.2f}" if s.oi_volume_ratio is not None else "-"
+        print(f"{s.symbol:<16} {s.exchange:<8} {s.open_interest_value:>16,.0f} {change:>8} {from_avg:>9} "
+              f"{avg_15min:>16} {oi_volume:>7} {s.quadrant or '-':<15} {s.timestamp:%H:%M:%S}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Read the monitor's latest-snapshot segment")
+    parser.add_argument('--file', default="open_interest_data.snap", help='Snapshot segment (next to the data file)')
+    parser.add_argument('--symbol', help='Only this symbol')
+    parser.add_argument('--exchange', help='Only this exchange')
+    parser.add_argument('--json', action='store_true', help='Print JSON instead of a table')
+    parser.add_argument('--watch', type=float, help='Re-read every N seconds')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.file):
+        print(f"❌ No snapshot segment at {args.file} (is the monitor running?)")
+        sys.exit(1)
+    reader = SnapshotReader(args.file)
+    while True:
+        snapshot = reader.read()
+        series = [
+            s for s in snapshot.series
+            if (not args.symbol or s.symbol == args.symbol) and (not args.exchange or s.exchange == args.exchange)
+        ]
+        if args.json:
+            print(json.dumps({'published_at': snapshot.published_at.isoformat(), 'cycle': snapshot.cycle,
+                              'series': [asdict(s) for s in series]}, default=str))
+        else:
+            print_snapshot(snapshot, series)
+        if not args.watch:
+            break
+        time.sleep(args.watch)
+        print()
+
+if __name__ == "__main__":
+    main()
@@ -65,7 +65,7 @@ show_usage() {
     echo "  cudis.json                   - CUDIS token only"
     echo ""
     echo "Enhanced Features:"
-    echo "  📊 Change alerts only (no regular reports)"
+    echo "  📊 Change alerts, daily and weekly OI reports"
     echo "  📈 Increase/decrease indicators"
     echo "  💰 Price and volume information"
     echo "  📱 Enhanced Telegram notifications"
@@ -159,7 +159,7 @@ main() {
         print_status "The enhanced monitor will check every 15 minutes and send alerts only when there are changes"
         echo ""
         echo "📊 Enhanced Features:"
-        echo "  • Change alerts only (no regular reports)"
+        echo "  • Change alerts, daily and weekly OI reports"
         echo "  • Increase/decrease indicators"
         echo "  • Price and volume information"
         echo "  • Percentage change from previous value"
@@ -0,0 +1,200 @@
+"""
+Non-blocking structured logging for the Open Interest Monitor
+Callers only put records on a queue; a listener thread writes them to the log file as JSON lines
+and to the console as text, so a slow disk never stalls the event loop. The file rotates at
+LOG_MAX_BYTES or at the next LOG_ROTATE_INTERVAL boundary, keeping LOG_BACKUPS old files.
+
+Records carry the cycle and series they belong to (log_context / extra={'symbol': ...}).
+INFO and WARNING records are sampled per call site and series: LOG_SAMPLE_BURST per LOG_SAMPLE_WINDOW pass
+and the rest are counted into the next record that does ("suppressed"); errors and debug records
+always pass. Writing a level name (e.g. DEBUG) into <log file>.level changes the level of the
+running process within LOG_LEVEL_POLL seconds; deleting the file restores LOG_LEVEL.
+"""
+
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from config import (LOG_LEVEL, LOG_FILE, LOG_LEVEL_POLL, LOG_MAX_BYTES, LOG_ROTATE_INTERVAL, LOG_BACKUPS,
+                    LOG_SAMPLE_WINDOW, LOG_SAMPLE_BURST)
+
+CONSOLE_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+CONTEXT_FIELDS = ('cycle', 'symbol', 'exchange', 'suppressed')  # Record attributes copied into the JSON lines
+CONTEXT: contextvars.ContextVar = contextvars.ContextVar('log_context', default={})
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+def push_log_context(**fields) -> contextvars.Token:
+    """Tag the caller's records (and those of threads it starts with asyncio.to_thread) with fields"""
+    return CONTEXT.set({**CONTEXT.get(), **fields})
+
+def pop_log_context(token: contextvars.Token):
+    CONTEXT.reset(token)
+
+@contextmanager
+def log_context(**fields):
+    token = push_log_context(**fields)
+    try:
+        yield
+    finally:
+        pop_log_context(token)
+
+class ContextFilter(logging.Filter):
+    """Stamps records with the log context; runs on the calling thread, before the record is queued"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        for name, value in CONTEXT.get().items():
+            if not hasattr(record, name):
+                setattr(record, name, value)
+        return True
+
+class SamplingFilter(logging.Filter):
+    """Passes the first `burst` INFO/WARNING records per call site, series and window and counts the rest.
+    Keying on the record's symbol and exchange keeps one noisy series from hiding another's records."""
+
+    def __init__(self, window: float = LOG_SAMPLE_WINDOW, burst: int = LOG_SAMPLE_BURST, clock=time.monotonic):
+        super().__init__()
+        self.window = window
+        self.burst = burst
+        self.clock = clock
+        self.sites: Dict[Tuple, list] = {}  # (path, line, symbol, exchange) -> [window start, passed, suppressed]
+        self.pruned_at = clock()
+        self.lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.ERROR or record.levelno <= logging.DEBUG:
+            return True
+        now = self.clock()
+        key = (record.pathname, record.lineno, getattr(record, 'symbol', None), getattr(record, 'exchange', None))
+        with self.lock:
+            if now - self.pruned_at >= self.window:
+                # Forget idle sites, e.g. of symbols no longer monitored; a suppressed count waits one more window
+                self.pruned_at = now
+                self.sites = {key: site for key, site in self.sites.items()
+                              if now - site[0] < (2 * self.window if site[2] else self.window)}
+            site = self.sites.get(key)
+            if site is None or now - site[0] >= self.window:
+                if site is not None and site[2]:
+                    record.suppressed = site[2]
+                site = self.sites[key] = [now, 0, 0]
+            if site[1] >= self.burst:
+                site[2] += 1
+                return False
+            site[1] += 1
+        return True
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for name in CONTEXT_FIELDS:
+            value = getattr(record, name, None)
+            if value is not None:
+                entry[name] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class RotatingLogFileHandler(logging.handlers.RotatingFileHandler):
+    """Rotates when the file reaches max_bytes or an `interval` boundary passes, whichever comes first"""
+
+    def __init__(self, filename: str, max_bytes: int = LOG_MAX_BYTES, interval: float = LOG_ROTATE_INTERVAL,
+                 backups: int = LOG_BACKUPS):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backups, encoding='utf-8', delay=True)
+        self.interval = interval
+        now = time.time()
+        self.rollover_at = now - now % interval + interval
+        # A file last written before the current period started (the process was down) rotates first
+        if os.path.exists(filename) and os.path.getsize(filename) and os.path.getmtime(filename) < now - now % interval:
+            self.rollover_at = now
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if time.time() >= self.rollover_at:
+            return True
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self):
+        super().doRollover()
+        now = time.time()
+        self.rollover_at = now - now % self.interval + self.interval
+
+class LevelWatcher(threading.Thread):
+    """Applies the level written in a control file to the root logger (mtime polling)"""
+
+    def __init__(self, path: str, default: str = LOG_LEVEL, interval: float = LOG_LEVEL_POLL):
+        super().__init__(name='log-level-watcher', daemon=True)
+        self.path = path
+        self.default = default.upper()
+        self.interval = interval
+        self.mtime: Optional[float] = None
+
+    def check(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            mtime = None
+        if mtime == self.mtime:
+            return
+        self.mtime = mtime
+        name = self.default
+        if mtime is not None:
+            try:
+                with open(self.path, 'r') as f:
+                    name = f.read().strip().upper() or self.default
+            except OSError:
+                return
+        level = logging.getLevelName(name)
+        if not isinstance(level, int):
+            logging.error(f"Unknown log level {name!r} in {self.path}, keeping {logging.getLevelName(logging.root.level)}")
+            return
+        if logging.root.level != level:
+            logging.root.setLevel(level)
+            logging.warning(f"Log level set to {name}")
+
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            self.check()
+
+def setup_logging(log_file: str = LOG_FILE, level: str = LOG_LEVEL) -> Optional[logging.handlers.QueueListener]:
+    """Route the root logger through a queue to a background writer; like basicConfig, a no-op when
+    the root logger already has handlers"""
+    global _listener
+    root = logging.getLogger()
+    if root.handlers:
+        return _listener
+    log_queue = queue.SimpleQueue()
+    handler = logging.handlers.QueueHandler(log_queue)
+    handler.addFilter(ContextFilter())
+    handler.addFilter(SamplingFilter())
+    file_handler = RotatingLogFileHandler(log_file)
+    file_handler.setFormatter(JsonFormatter())
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+    _listener = logging.handlers.QueueListener(log_queue, file_handler, console_handler)
+    _listener.start()
+    atexit.register(_listener.stop)  # Flushes what is still queued
+    root.addHandler(handler)
+    try:
+        root.setLevel(level.upper())
+    except ValueError:
+        root.setLevel(logging.INFO)
+    watcher = LevelWatcher(f"{os.path.splitext(log_file)[0]}.level", level)
+    watcher.check()
+    watcher.start()
+    return _listener
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Heartbeat-based Open Interest Monitor Supervisor
+Runs monitor workers as child processes that send heartbeats over a pipe from their event
+loop. A worker that exits or stops heartbeating (crashed or wedged) is restarted in well
+under a second, with exponential backoff when it keeps failing
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+HEARTBEAT_INTERVAL = 0.5  # Seconds between worker heartbeats
+# Seconds without a heartbeat before a worker is considered wedged; long enough for the cycle work that still
+# runs on the loop (averages, snapshot, regime). Crashes are caught sooner, as soon as the process exits.
+HEARTBEAT_TIMEOUT = 5.0
+STARTUP_GRACE = 60.0  # Seconds a new worker may take (loading history) before its first heartbeat
+POLL_INTERVAL = 0.1  # Seconds between supervisor health checks
+BACKOFF_BASE = 0.5  # First delay after repeated failures; doubles each time
+BACKOFF_MAX = 60.0
+STABLE_AFTER = 120.0  # Seconds of health after which the failure streak resets
+STATUS_FILE = "supervisor_status.json"
+
+async def send_heartbeats(conn, interval: float, status_fn=None):
+    """Send a heartbeat from the worker's event loop; stops arriving if the loop is wedged"""
+    while True:
+        status = status_fn() if status_fn else {}
+        conn.send(('heartbeat', time.time(), status))
+        await asyncio.sleep(interval)
+
+def scheduler_status(scheduler) -> Dict:
+    """Summarize a WallClockScheduler for heartbeat payloads"""
+    status = {}
+    for name, metrics in scheduler.get_metrics().items():
+        status[name] = {key: metrics[key] for key in ('runs', 'failures', 'skipped', 'last_fire_time', 'last_lateness')}
+    return status
+
+def monitor_worker_main(config_file: Optional[str], conn, announce: bool, heartbeat_interval: float):
+    """Child process running OpenInterestMonitor with heartbeats"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # The supervisor handles Ctrl+C
+    from monitor import OpenInterestMonitor
+
+    async def run():
+        monitor = OpenInterestMonitor(config_file)  # Before the first heartbeat, like enhanced_worker_main
+        heartbeat = asyncio.create_task(send_heartbeats(conn, heartbeat_interval, lambda: scheduler_status(monitor.scheduler)))
+        try:
+            await monitor.start_monitoring(announce=announce)
+        finally:
+            heartbeat.cancel()
+
+    asyncio.run(run())
+
+def enhanced_worker_main(config_file: Optional[str], conn, announce: bool, heartbeat_interval: float):
+    """Child process running EnhancedScheduler with heartbeats"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    from enhanced_scheduler import EnhancedScheduler
+
+    scheduler = EnhancedScheduler(config_file=config_file or "tokens_config.json")
+    if announce:
+        scheduler.send_startup_message()
+
+    async def run():
+        # Load the history before the first heartbeat, so a slow start counts against STARTUP_GRACE
+        scheduler.get_monitor()
+        heartbeat = asyncio.create_task(send_heartbeats(conn, heartbeat_interval, lambda: scheduler_status(scheduler.scheduler)))
+        try:
+            await scheduler.run_async()
+        finally:
+            heartbeat.cancel()
+
+    asyncio.run(run())
+
+WORKER_KINDS = {
+    'monitor': monitor_worker_main,
+    'enhanced': enhanced_worker_main,
+}
+
+class SupervisedWorker:
+    """A supervised child process and its health state"""
+
+    def __init__(self, name: str, kind: str, config_file: Optional[str]):
+        if kind not in WORKER_KINDS:
+            raise ValueError(f"Unknown worker kind: {kind}")
+        self.name = name
+        self.kind = kind
+        self.config_file = config_file
+        self.process: Optional[multiprocessing.Process] = None
+        self.conn = None
+        self.started_at: Optional[float] = None
+        self.last_heartbeat: Optional[float] = None
+        self.last_status: Dict = {}
+        self.restarts = 0
+        self.failure_streak = 0
+        self.next_start_at = 0.0
+        self.last_failure: Optional[str] = None
+
+    def health(self, now: float) -> Dict:
+        """Return the worker's health for status reporting"""
+        alive = self.process is not None and self.process.is_alive()
+        if not alive:
+            state = 'backoff' if self.next_start_at > now else 'stopped'
+        elif self.last_heartbeat is None:
+            state = 'starting'
+        else:
+            state = 'healthy'
+        return {
+            'name': self.name,
+            'kind': self.kind,
+            'config': self.config_file,
+            'pid': self.process.pid if alive else None,
+            'state': state,
+            'uptime': now - self.started_at if alive and self.started_at else 0.0,
+            'heartbeat_age': now - self.last_heartbeat if alive and self.last_heartbeat else None,
+            'restarts': self.restarts,
+            'failure_streak': self.failure_streak,
+            'last_failure': self.last_failure,
+            'jobs': self.last_status,
+        }
+
+class WorkerSupervisor:
+    """Start workers, watch their heartbeats and restart them with backoff"""
+
+    def __init__(self, workers: List[SupervisedWorker], heartbeat_interval: float = HEARTBEAT_INTERVAL,
+                 heartbeat_timeout: float = HEARTBEAT_TIMEOUT, startup_grace: float = STARTUP_GRACE,
+                 status_file: str = STATUS_FILE):
+        self.workers = workers
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.startup_grace = startup_grace
+        self.status_file = status_file
+        self.running = False
+        self.started_at = time.time()
+
+    def start_worker(self, worker: SupervisedWorker):
+        """Spawn a worker process with a fresh heartbeat pipe"""
+        parent_conn, child_conn = multiprocessing.Pipe(duplex=False)
+        announce = worker.restarts == 0  # Only the first start sends the Telegram startup message
+        worker.process = multiprocessing.Process(
+            target=WORKER_KINDS[worker.kind],
+            args=(worker.config_file, child_conn, announce, self.heartbeat_interval),
+            name=f"oi-worker-{worker.name}",
+            daemon=True
+        )
+        worker.process.start()
+        child_conn.close()
+        worker.conn = parent_conn
+        worker.started_at = time.time()
+        worker.last_heartbeat = None
+        logging.info(f"Started worker {worker.name} ({worker.kind}, pid {worker.process.pid})")
+
+    def stop_worker(self, worker: SupervisedWorker, timeout: float = 0.5):
+        """Terminate a worker, escalating to SIGKILL if it does not exit"""
+        if worker.process is None:
+            return
+        if worker.process.is_alive():
+            worker.process.terminate()
+            worker.process.join(timeout)
+            if worker.process.is_alive():
+                worker.process.kill()
+                worker.process.join(timeout)
+        if worker.conn is not None:
+            worker.conn.close()
+        worker.process = None
+        worker.conn = None
+
+    def drain_heartbeats(self, worker: SupervisedWorker):
+        """Read every pending heartbeat from a worker's pipe"""
+        try:
+            while worker.conn is not None and worker.conn.poll():
+                kind, sent_at, status = worker.conn.recv()
+                if kind == 'heartbeat':
+                    worker.last_heartbeat = time.time()
+                    worker.last_status = status
+        except (EOFError, OSError):
+            pass  # Worker exited; handled by the liveness check
+
+    def check_worker(self, worker: SupervisedWorker, now: float):
+        """Restart a worker that exited or missed its heartbeat"""
+        if worker.process is None:
+            if now >= worker.next_start_at:
+                self.start_worker(worker)
+            return
+
+        self.drain_heartbeats(worker)
+        failure = None
+        if not worker.process.is_alive():
+            failure = f"exited with code {worker.process.exitcode}"
+        elif worker.last_heartbeat is None:
+            if now - worker.started_at > self.startup_grace:
+                failure = f"no heartbeat within {self.startup_grace:.0f}s of start"
+        elif now - worker.last_heartbeat > self.heartbeat_timeout:
+            failure = f"missed heartbeat for {now - worker.last_heartbeat:.1f}s"
+
+        if failure is None:
+            if worker.failure_streak and now - worker.started_at > STABLE_AFTER:
+                worker.failure_streak = 0
+            return
+
+        logging.warning(f"Worker {worker.name} {failure}; restarting")
+        self.stop_worker(worker)
+        worker.restarts += 1
+        worker.last_failure = f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}: {failure}"
+        # First failure restarts immediately; repeated failures back off exponentially
+        delay = 0.0 if worker.failure_streak == 0 else min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (worker.failure_streak - 1))
+        worker.failure_streak += 1
+        worker.next_start_at = now + delay
+        if delay == 0.0:
+            self.start_worker(worker)
+        else:
+            logging.warning(f"Worker {worker.name} backing off {delay:.1f}s before restart")
+
+    def write_status(self, now: float):
+        """Atomically write worker health for the status command"""
+        status = {
+            'supervisor_pid': os.getpid(),
+            'started_at': self.started_at,
+            'updated_at': now,
+            'workers': [worker.health(now) for worker in self.workers],
+        }
+        tmp_file = f"{self.status_file}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(status, f, indent=2)
+        os.replace(tmp_file, self.status_file)
+
+    def run(self):
+        """Supervise workers until interrupted"""
+        self.running = True
+        last_status_write = 0.0
+        try:
+            while self.running:
+                now = time.time()
+                for worker in self.workers:
+                    try:
+                        self.check_worker(worker, now)
+                    except Exception as e:
+                        logging.error(f"Error supervising worker {worker.name}: {e}")
+                if now - last_status_write >= 1.0:
+                    self.write_status(now)
+                    last_status_write = now
+                time.sleep(POLL_INTERVAL)
+        except KeyboardInterrupt:
+            logging.info("Supervisor interrupted by user")
+        finally:
+            for worker in self.workers:
+                self.stop_worker(worker, timeout=5.0)
+            self.write_status(time.time())
+
+def read_status(status_file: str = STATUS_FILE) -> Optional[Dict]:
+    """Load the supervisor status file, if present"""
+    if not os.path.exists(status_file):
+        return None
+    with open(status_file, 'r') as f:
+        return json.load(f)
+
+def print_status(status_file: str = STATUS_FILE) -> bool:
+    """Print worker health; return True if the supervisor is running"""
+    status = read_status(status_file)
+    if status is None:
+        print("❌ Supervisor is not running (no status file)")
+        return False
+    age = time.time() - status['updated_at']
+    running = age < 5.0
+    if running:
+        print(f"✅ Supervisor running (pid {status['supervisor_pid']}, updated {age:.1f}s ago)")
+    else:
+        print(f"❌ Supervisor not running (status is {age:.0f}s old)")
+    for worker in status['workers']:
+        heartbeat = f"{worker['heartbeat_age']:.1f}s ago" if worker['heartbeat_age'] is not None else "none"
+        print(f"  {worker['name']} [{worker['kind']}] {worker['state']} pid={worker['pid']} "
+              f"uptime={worker['uptime']:.0f}s heartbeat={heartbeat} restarts={worker['restarts']}")
+        if worker['last_failure']:
+            print(f"    last failure: {worker['last_failure']}")
+        for job, metrics in (worker.get('jobs') or {}).items():
+            print(f"    job {job}: runs={metrics['runs']} failures={metrics['failures']} "
+                  f"skipped={metrics['skipped']} lateness={metrics['last_lateness'] * 1000:.0f}ms")
+    return running
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Heartbeat-based supervisor for Open Interest Monitor workers')
+    parser.add_argument('command', nargs='?', default='run', choices=['run', 'status'], help='Run the supervisor or show worker health')
+    parser.add_argument('--config', action='append', help='Token config file; repeat for one worker per config')
+    parser.add_argument('--kind', default='enhanced', choices=sorted(WORKER_KINDS), help='Worker type to run')
+    parser.add_argument('--heartbeat-timeout', type=float, default=HEARTBEAT_TIMEOUT, help='Seconds without heartbeat before restart')
+    parser.add_argument('--status-file', default=STATUS_FILE, help='Worker health status file')
+    args = parser.parse_args()
+
+    if args.command == 'status':
+        sys.exit(0 if print_status(args.status_file) else 1)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    configs = args.config or ["tokens_config.json"]
+    workers = [
+        SupervisedWorker(os.path.splitext(os.path.basename(config))[0], args.kind, config)
+        for config in configs
+    ]
+    supervisor = WorkerSupervisor(workers, heartbeat_timeout=args.heartbeat_timeout, status_file=args.status_file)
+    supervisor.run()
+
+if __name__ == "__main__":
+    main()
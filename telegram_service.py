@@ -1,38 +1,52 @@
-import aiohttp
 import logging
 from typing import Optional
-from config import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, TOPIC_ID
+from config import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, TOPIC_ID, REPORT_INTERVAL, REPORT_TOP_K
+from metrics import NOTIFIER_QUEUE_DEPTH, NOTIFICATIONS_TOTAL
 
-async def send_telegram_message(message: str) -> bool:
-    """Send a message to Telegram."""
-    if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
+async def send_telegram_message(message: str, chat_id: Optional[str] = None, topic_id: Optional[str] = None) -> bool:
+    """Send a message to Telegram.
+
+    chat_id and topic_id default to TELEGRAM_CHAT_ID and TOPIC_ID; passing them routes
+    the message to another chat or forum topic (e.g. per token group).
+    """
+    chat_id = chat_id or TELEGRAM_CHAT_ID
+    topic_id = topic_id or TOPIC_ID
+    if not TELEGRAM_BOT_TOKEN or not chat_id:
         logging.warning("Telegram bot token or chat ID not configured. Skipping Telegram message.")
         return False
 
     url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
     payload = {
-        'chat_id': TELEGRAM_CHAT_ID,
+        'chat_id': chat_id,
         'text': message,
         'parse_mode': 'HTML'
     }
     
     # Add topic_id if available
-    if TOPIC_ID:
-        payload['message_thread_id'] = TOPIC_ID
+    if topic_id:
+        payload['message_thread_id'] = topic_id
     
+    import aiohttp  # Deferred: costs ~150 ms at import and is only needed once a message is sent
+
+    NOTIFIER_QUEUE_DEPTH.inc()
     try:
         async with aiohttp.ClientSession() as session:
             async with session.post(url, json=payload) as response:
                 result = await response.json()
                 if response.status != 200:
                     logging.error(f"Telegram API error: {result}")
+                    NOTIFICATIONS_TOTAL.inc(status='error')
                     return False
                 else:
                     logging.info("Telegram message sent successfully")
+                    NOTIFICATIONS_TOTAL.inc(status='sent')
                     return True
     except Exception as e:
         logging.error(f"Error sending Telegram message: {e}")
+        NOTIFICATIONS_TOTAL.inc(status='error')
         return False
+    finally:
+        NOTIFIER_QUEUE_DEPTH.dec()
 
 def format_open_interest_alert(alert_data: dict) -> str:
     """Format open interest alert for Telegram message"""
@@ -108,6 +122,100 @@ def format_open_interest_alert(alert_data: dict) -> str:
     
     return message
 
+def format_rule_metric_alert(alert_data: dict) -> str:
+    """Format a declared rule's alert on a metric other than the % OI change (e.g. oi_volume_ratio)"""
+    severity = alert_data['severity']
+    emoji = "🚨" if severity == "high" else "⚠️" if severity == "medium" else "🔔"
+    message = f"{emoji} <b>OPEN INTEREST RULE ALERT</b> {emoji}\n\n"
+    message += f"<b>Token:</b> {alert_data['symbol']}\n"
+    message += f"<b>Exchange:</b> {alert_data['exchange'].upper()}\n"
+    message += f"<b>Rule:</b> {alert_data['rule']}\n"
+    message += f"<b>{alert_data['metric']}:</b> {alert_data['metric_value']:,.4g}\n"
+    message += f"<b>Current OI:</b> ${alert_data['current_oi']:,.0f}\n"
+    message += f"<b>Avg OI:</b> ${alert_data.get('avg_oi', 0.0):,.0f}\n"
+    message += f"<b>Severity:</b> {severity.upper()}\n"
+    message += f"<b>Time:</b> {alert_data['timestamp']}\n"
+    return message
+
+def format_market_regime_alert(regime_data: dict) -> str:
+    """Format a market-wide regime alert (one message instead of an alert per symbol)"""
+    deleveraging = regime_data['regime'] == "deleveraging"
+    emoji = "🌊" if deleveraging else "🌋"
+    message = f"{emoji} <b>MARKET-WIDE {regime_data['regime'].upper()}</b> {emoji}\n\n"
+    message += f"<b>Median OI Change:</b> {regime_data['median_change']:+.2f}%\n"
+    message += f"<b>Moving Together:</b> {regime_data['breadth']:.0%} of {regime_data['series']} series\n"
+    message += f"<b>Dispersion:</b> {regime_data['dispersion']:.2f}%\n"
+    message += f"<b>Alerts Collapsed:</b> {regime_data['suppressed']}\n"
+    message += f"<b>Time:</b> {regime_data['timestamp']}\n\n"
+    abnormal = regime_data['abnormal']
+    if abnormal:
+        message += "<b>Abnormal vs. market:</b>\n"
+        for symbol, exchange, change, zscore in abnormal[:10]:
+            message += f"  ⚡ {symbol} ({exchange}): {change:+.1f}% (z {zscore:+.1f})\n"
+        if len(abnormal) > 10:
+            message += f"  … and {len(abnormal) - 10} more\n"
+    else:
+        message += "No symbol is moving abnormally against the market.\n"
+    return message
+
+def format_scanner_digest(boards: list, universe: int, promoted: list) -> str:
+    """Format the scanner's leaderboard digest.
+
+    boards: [{'title', 'unit' ('pct' or 'ratio'), 'entries': [(symbol, exchange, value)]}]
+    """
+    message = "🔭 <b>OPEN INTEREST MOVERS</b>\n\n"
+    message += f"🌐 Perpetual series scanned: {universe}\n\n"
+    for board in boards:
+        if not board['entries']:
+            continue
+        message += f"<b>{board['title']}</b>\n"
+        for rank, (symbol, exchange, value) in enumerate(board['entries'], 1):
+            shown = f"{value:+.1f}%" if board['unit'] == 'pct' else f"{value:.2f}x"
+            message += f"  {rank}. {symbol} ({exchange}): {shown}\n"
+        message += "\n"
+    if promoted:
+        message += f"🎯 <b>In detailed monitoring:</b> {', '.join(promoted)}\n"
+    return message
+
+def format_oi_report(period: str, label: str, rows: list, artifact: str, top_k: int = REPORT_TOP_K) -> str:
+    """Format a periodic report's digest from its per-series rows (see reports.py)"""
+    message = f"🗓️ <b>OPEN INTEREST {period.upper()} REPORT</b>\n"
+    message += f"⏰ {label}\n"
+    message += f"🔍 Series: {len(rows)}\n\n"
+    if not rows:
+        return message + "No stored history for this period."
+    gains = sorted((row for row in rows if (row['change_pct'] or 0) > 0), key=lambda row: -row['change_pct'])
+    drops = sorted((row for row in rows if (row['change_pct'] or 0) < 0), key=lambda row: row['change_pct'])
+    for title, entries in (("📈 Biggest OI gains", gains[:top_k]), ("📉 Biggest OI drops", drops[:top_k])):
+        if entries:
+            message += f"<b>{title}</b>\n"
+            for rank, row in enumerate(entries, 1):
+                message += (f"  {rank}. {row['symbol']} ({row['exchange']}): {row['change_pct']:+.1f}% "
+                            f"(range {row['range_pct'] or 0:.1f}%)\n")
+            message += "\n"
+    moves = sorted(((change, at, row) for row in rows for change, at in row['biggest_moves'][:1]),
+                   key=lambda move: -abs(move[0]))[:top_k]
+    if moves:
+        message += f"<b>⚡ Biggest {REPORT_INTERVAL // 60}-min moves</b>\n"
+        for rank, (change, at, row) in enumerate(moves, 1):
+            message += f"  {rank}. {row['symbol']} ({row['exchange']}): {change:+.1f}% at {at}\n"
+        message += "\n"
+    above = sorted((row for row in rows if row['above_baseline_pct'] is not None),
+                   key=lambda row: -row['above_baseline_pct'])[:top_k]
+    if above:
+        message += "<b>🔥 Most time above baseline</b>\n"
+        for rank, row in enumerate(above, 1):
+            message += f"  {rank}. {row['symbol']} ({row['exchange']}): {row['above_baseline_pct']:.0f}% of the time\n"
+        message += "\n"
+    alerts = sum(row['alerts'] for row in rows)
+    scored = sum(row['alerts_scored'] for row in rows)
+    if alerts:
+        hits = sum(row['alert_hits'] for row in rows)
+        rate = f"{hits / scored:.0%} of {scored} scored" if scored else "none scored yet"
+        message += f"🎯 <b>Alert hit rate:</b> {rate} ({alerts} alerts)\n"
+    message += f"📎 Full report: {artifact}\n"
+    return message
+
 def format_summary_message(alerts: list, total_symbols: int) -> str:
     """Format a summary message for multiple alerts"""
     if not alerts:
@@ -128,10 +236,14 @@ def format_summary_message(alerts: list, total_symbols: int) -> str:
     for exchange, exchange_alert_list in exchange_alerts.items():
         message += f"<b>{exchange.upper()}</b>:\n"
         for alert in exchange_alert_list[:5]:  # Show top 5 per exchange
-            emoji = "🚨" if alert['percentage_change'] > 30 else "⚠️"
             current_oi = alert.get('current_oi', 0)
             avg_oi = alert.get('avg_oi', 0)
-            message += f"  {emoji} {alert['symbol']}: {alert['percentage_change']:+.1f}% (OI: ${current_oi:,.0f}, Avg: ${avg_oi:,.0f})\n"
+            if alert['percentage_change'] is None:  # A declared rule on another metric
+                shown, emoji = f"{alert['metric']} {alert['metric_value']:,.4g}", "🔔"
+            else:
+                shown = f"{alert['percentage_change']:+.1f}%"
+                emoji = "🚨" if alert['percentage_change'] > 30 else "⚠️"
+            message += f"  {emoji} {alert['symbol']}: {shown} (OI: ${current_oi:,.0f}, Avg: ${avg_oi:,.0f})\n"
         message += "\n"
     
     return message 
\ No newline at end of file
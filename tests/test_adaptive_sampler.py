@@ -0,0 +1,38 @@
+"""The sampling plan stays within each exchange's request budget and the token bucket enforces it"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from adaptive_sampler import AdaptiveSampler
+from exchange_service import REQUESTS_PER_SAMPLE
+
+SYMBOLS = [f"S{i}USDT" for i in range(10)]
+
+def sampler(budget: float) -> AdaptiveSampler:
+    return AdaptiveSampler(SYMBOLS, ["binance"], min_interval=60, max_interval=300, budgets={"binance": budget},
+                           spike_threshold=10.0, tick=15, clock=lambda: 0.0)
+
+def test_urgent_series_share_the_budget_left_over_the_base_rate():
+    plan = sampler(7.5)
+    plan.note_alert("S0USDT", "binance", now=0.0)
+    rates = plan.plan(0.0)
+    # Unconstrained, the alerting series alone would want one sample a minute
+    assert rates.sum() * REQUESTS_PER_SAMPLE == pytest.approx(7.5)
+    assert rates[1:] == pytest.approx([0.2] * 9)  # Quiet series keep one sample per max_interval
+    assert rates[0] == pytest.approx(0.7)
+
+def test_budget_below_the_base_rate_slows_every_series_evenly():
+    plan = sampler(3.0)
+    plan.note_alert("S0USDT", "binance", now=0.0)
+    assert plan.plan(0.0) == pytest.approx([0.1] * 10)
+
+def test_token_bucket_defers_the_rest_of_a_tick():
+    plan = sampler(7.5)
+    first = plan.due(0.0)["binance"]
+    assert len(first) == int(7.5 // REQUESTS_PER_SAMPLE)  # The bucket holds a minute of budget
+    # Nothing was observed, so the same series are still the most overdue once the bucket refills
+    assert plan.due(60.0)["binance"] == first
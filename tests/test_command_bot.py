@@ -0,0 +1,78 @@
+"""Bot commands are answered from the monitor's memory, and only for allowed chats and fresh messages"""
+
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import OpenInterestData
+
+def make_bot(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    from command_bot import CommandBot
+    from monitor import OpenInterestMonitor
+    monitor = OpenInterestMonitor(token_list=["BTCUSDT", "ETHUSDT", "SOLUSDT"], load_history=False)
+    now = datetime.now()
+    # An hour of 5-minute samples: BTC +20%, ETH -10%, SOL flat
+    for symbol, end in (("BTCUSDT", 1200.0), ("ETHUSDT", 900.0), ("SOLUSDT", 1000.0)):
+        for i in range(13):
+            value = 1000.0 + (end - 1000.0) * i / 12
+            record = OpenInterestData(symbol, "binance", value, value, now - timedelta(minutes=5 * (12 - i)),
+                                      50.0, value * 10, 0.0001)
+            monitor.historical_data[symbol].append(record)
+            monitor.derived.update(record)
+    monitor.calculate_historical_averages()
+    bot = CommandBot(monitor, token=None)
+    bot.allowed_chats = {"42"}
+    return bot, monitor
+
+def test_top_ranks_gainers_and_losers(tmp_path, monkeypatch):
+    bot, _ = make_bot(tmp_path, monkeypatch)
+    reply = bot.command_top(["1h"])
+    gainers, losers = reply.split("Losers")
+    assert "1. BTCUSDT (binance): +20.0%" in gainers and "ETHUSDT" not in gainers
+    assert "1. ETHUSDT (binance): -10.0%" in losers and "SOLUSDT" not in reply
+    assert bot.command_top(["2h"]).startswith("Usage")
+
+def test_oi_accepts_the_bare_token_name(tmp_path, monkeypatch):
+    bot, _ = make_bot(tmp_path, monkeypatch)
+    reply = bot.command_oi(["btc"])
+    assert reply.startswith("📊 <b>BTCUSDT</b>") and "$1.20K OI" in reply and "Baseline" in reply
+    assert bot.command_oi(["DOGE"]) == "❓ DOGE is not monitored"
+
+def test_mute_and_unmute(tmp_path, monkeypatch):
+    bot, monitor = make_bot(tmp_path, monkeypatch)
+    assert "muted for 30m" in bot.command_mute(["eth", "30m"])
+    assert monitor.is_muted("ETHUSDT") and not monitor.is_muted("BTCUSDT")
+    assert "muted for 168h" in bot.command_mute(["sol", "30d"])  # Capped at BOT_MAX_MUTE
+    assert bot.command_mute(["eth", "soon"]).startswith("❌")
+    assert bot.command_unmute(["ETHUSDT"]) == "🔔 ETHUSDT alerts unmuted"
+    assert not monitor.is_muted("ETHUSDT")
+    assert bot.command_unmute(["ETHUSDT"]) == "ETHUSDT is not muted"
+
+def test_only_fresh_commands_from_allowed_chats_are_answered(tmp_path, monkeypatch):
+    bot, _ = make_bot(tmp_path, monkeypatch)
+    replies = []
+
+    async def api(method, payload, timeout):
+        replies.append(payload)
+        return {'ok': True}
+
+    monkeypatch.setattr(bot, 'api', api)
+
+    def update(text, chat=42, age=0):
+        return {'update_id': 1, 'message': {'message_id': 7, 'chat': {'id': chat}, 'date': time.time() - age,
+                                            'text': text}}
+
+    async def scenario():
+        for message in (update("/status"), update("/status", chat=99), update("/status", age=3600),
+                        update("/nonsense"), update("hello"), update("/oi@SomeBot BTC")):
+            await bot.handle(message, time.perf_counter())
+
+    asyncio.run(scenario())
+    assert [reply['text'].splitlines()[0] for reply in replies] == ["🟢 <b>Open Interest Monitor</b>",
+                                                                    "📊 <b>BTCUSDT</b>"]
+    assert all(reply['chat_id'] == "42" and reply['reply_to_message_id'] == 7 for reply in replies)
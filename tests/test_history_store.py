@@ -0,0 +1,57 @@
+"""Range scans return exactly the samples in range, and resampling does not depend on chunk boundaries"""
+
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from history_store import HistoryStore, Resampler
+from models import OpenInterestData
+
+START = datetime(2024, 1, 1, 0, 7).timestamp()
+CADENCE = 600
+
+def samples(count: int, offset: int = 0):
+    for i in range(offset, offset + count):
+        value = 1000.0 + 37 * (i % 11) + i
+        yield OpenInterestData('BTCUSDT', 'binance', value, value, datetime.fromtimestamp(START + i * CADENCE))
+
+def test_scan_finds_the_range_across_segments(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    store.append(samples(500))  # Three and a half days: four daily segments
+    assert len(store.segments('binance', 'BTCUSDT')) == 4
+    start, end = START + 100 * CADENCE, START + 400 * CADENCE
+    chunks = list(store.scan('binance', 'BTCUSDT', start, end, chunk=64))
+    assert all(len(rows) <= 64 for rows in chunks)
+    timestamps = np.concatenate([rows['timestamp'] for rows in chunks])
+    assert timestamps.tolist() == [START + i * CADENCE for i in range(100, 401)]
+    # Bounds between samples select the samples strictly inside
+    inside = np.concatenate([rows['timestamp'] for rows in store.scan('binance', 'BTCUSDT', start + 1, end - 1)])
+    assert len(inside) == 299
+
+def test_late_samples_are_merged_in_order(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    records = list(samples(50))
+    store.append(records[25:])
+    store.append(records[:25])
+    timestamps = [t for rows in store.scan('binance', 'BTCUSDT') for t in rows['timestamp'].tolist()]
+    assert timestamps == [START + i * CADENCE for i in range(50)]
+
+def test_resampling_ignores_chunk_boundaries(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    store.append(samples(200))
+
+    def windows(chunk: int):
+        resampler = Resampler(3600)
+        result = [w for rows in store.scan('binance', 'BTCUSDT', chunk=chunk) for w in resampler.feed(rows)]
+        return result + list(resampler.flush())
+
+    whole = windows(1000)
+    assert windows(7) == whole
+    assert sum(w['count'] for w in whole) == 200
+    first = whole[0]  # 00:07 to 00:57, six samples
+    assert first['count'] == 6 and first['open'] == 1000.0 and first['close'] == 1000.0 + 37 * 5 + 5
+    assert first['high'] == max(1000.0 + 37 * i + i for i in range(6))
@@ -0,0 +1,58 @@
+"""Editing the token config adds and removes symbols in place, keeping the state of the unchanged ones"""
+
+import asyncio
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import OpenInterestData
+
+START = datetime.now().replace(microsecond=0) - timedelta(days=1)  # Inside the raw tier's retention
+
+def records(symbol: str, count: int):
+    return [OpenInterestData(symbol, "binance", 1000.0 + i, 1000.0 + i, START + timedelta(minutes=5 * i))
+            for i in range(count)]
+
+def write_config(path, config, mtime):
+    path.write_text(json.dumps(config))
+    os.utime(path, (mtime, mtime))
+
+def test_reload_adds_and_removes_symbols(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    from monitor import OpenInterestMonitor
+    config = tmp_path / "tokens.json"
+    write_config(config, {"symbols": ["BTCUSDT", "ETHUSDT"]}, 1000)
+    monitor = OpenInterestMonitor(str(config), load_history=False)
+    for symbol in ("BTCUSDT", "ETHUSDT"):
+        monitor.historical_data[symbol] = records(symbol, 10)
+        monitor.alerts_sent[f"{symbol}_spike_up"] = 0.0
+    btc_history = monitor.historical_data["BTCUSDT"]
+    # SOL was monitored before, so its samples are in the history store and no exchange is needed
+    monitor.open_retention().append(records("SOLUSDT", 20))
+
+    write_config(config, {"symbols": ["BTCUSDT", "SOLUSDT"], "spike_threshold": 7}, 2000)
+    assert asyncio.run(monitor.reload_config_if_changed())
+
+    assert monitor.token_list == ["BTCUSDT", "SOLUSDT"] and monitor.spike_threshold == 7
+    assert monitor.historical_data["BTCUSDT"] is btc_history
+    assert "ETHUSDT" not in monitor.historical_data
+    assert list(monitor.alerts_sent) == ["BTCUSDT_spike_up"]
+    # The newest HISTORY_DEPTH samples
+    assert [r.open_interest_value for r in monitor.historical_data["SOLUSDT"]] == [1000.0 + i for i in range(10, 20)]
+    assert "SOLUSDT" in monitor.historical_averages
+
+def test_invalid_config_keeps_the_previous_settings(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    from monitor import OpenInterestMonitor
+    config = tmp_path / "tokens.json"
+    write_config(config, {"symbols": ["BTCUSDT"], "spike_threshold": 7}, 1000)
+    monitor = OpenInterestMonitor(str(config), load_history=False)
+
+    write_config(config, {"symbols": [], "spike_threshold": 3}, 2000)
+    assert not asyncio.run(monitor.reload_config_if_changed())
+    assert monitor.token_list == ["BTCUSDT"] and monitor.spike_threshold == 7
+    # An unchanged mtime is not re-read
+    assert not asyncio.run(monitor.reload_config_if_changed())
@@ -0,0 +1,83 @@
+"""A slow stage holds the fetch back instead of buffering the cycle, and a failing stage stops the fetch"""
+
+import asyncio
+import os
+import sys
+import threading
+from datetime import datetime
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import ExchangeOpenInterestData, OpenInterestData
+from pipeline import CyclePipeline
+
+SAMPLES = 100
+
+class StreamingAggregator:
+    def __init__(self):
+        self.handed_over = 0
+        self.finished = threading.Event()
+
+    def stream_exchange_data(self, on_record):
+        now = datetime.now()
+        data = []
+        for i in range(SAMPLES):
+            record = OpenInterestData(f"S{i}USDT", "binance", 1000.0, 1000.0, now)
+            on_record(record)
+            self.handed_over += 1
+            data.append(record)
+        self.finished.set()
+        return {"binance": ExchangeOpenInterestData("binance", data, now, True)}
+
+class StubMonitor:
+    def __init__(self):
+        self.aggregator = StreamingAggregator()
+        self.regime_detector = None
+        self.detect_regimes = False
+        self.stored = []
+        self.store_open = threading.Event()
+        self.fail_detection = False
+
+    def prepare_detection(self):
+        pass
+
+    def detect_samples(self, records, exchanges):
+        if self.fail_detection:
+            raise RuntimeError("detection failed")
+        return [], []
+
+    def fenced_out(self):
+        return False
+
+    def store_samples(self, records):
+        self.store_open.wait()
+        self.stored.extend(records)
+
+def test_slow_store_holds_the_fetch_back():
+    monitor = StubMonitor()
+    pipeline = CyclePipeline(monitor, queue_size=2, batch=1)
+
+    async def scenario():
+        cycle = asyncio.create_task(pipeline.run(notify=False))
+        await asyncio.sleep(0.3)
+        # Only the queues' worth (and the samples the stages hold) was fetched while store was stuck
+        assert monitor.aggregator.handed_over < 10
+        monitor.store_open.set()
+        return await cycle
+
+    exchange_data, _, _, _ = asyncio.run(scenario())
+    assert len(exchange_data["binance"].data) == SAMPLES and len(monitor.stored) == SAMPLES
+    assert max(pipeline.peaks.values()) <= 2
+
+def test_failing_stage_aborts_and_releases_the_fetch():
+    monitor = StubMonitor()
+    monitor.fail_detection = True
+    monitor.store_open.set()
+    pipeline = CyclePipeline(monitor, queue_size=2, batch=1)
+
+    with pytest.raises(RuntimeError, match="detection failed"):
+        asyncio.run(asyncio.wait_for(pipeline.run(notify=False), 5))
+    # The fetch thread ran to completion rather than staying blocked on a full queue
+    assert monitor.aggregator.finished.wait(1) and pipeline.aborted
@@ -0,0 +1,80 @@
+"""The query API answers unchanged data with 304, streams long ranges and caches only small bodies"""
+
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+
+from aiohttp.test_utils import TestClient, TestServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import OpenInterestData
+
+START = datetime(2024, 1, 1)
+
+def make_api(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    from monitor import OpenInterestMonitor
+    from query_api import QueryAPI
+    monitor = OpenInterestMonitor(token_list=["BTCUSDT"], load_history=False)
+    monitor.historical_data["BTCUSDT"] = [
+        OpenInterestData("BTCUSDT", "binance", 1000.0 + i, 1000.0 + i, START + timedelta(minutes=i)) for i in range(120)]
+    return QueryAPI(monitor, 0), monitor
+
+def run(api, scenario):
+    async def main():
+        async with TestClient(TestServer(api.app)) as client:
+            return await scenario(client)
+    return asyncio.run(main())
+
+def test_etag_answers_304_until_the_next_cycle(tmp_path, monkeypatch):
+    api, monitor = make_api(tmp_path, monkeypatch)
+
+    async def scenario(client):
+        first = await client.get('/api/history/BTCUSDT')
+        etag = first.headers['ETag']
+        cached = await client.get('/api/history/BTCUSDT', headers={'If-None-Match': etag})
+        other = await client.get('/api/history/BTCUSDT?exchange=binance', headers={'If-None-Match': etag})
+        monitor.data_version += 1
+        after_cycle = await client.get('/api/history/BTCUSDT', headers={'If-None-Match': etag})
+        return first.status, cached.status, other.status, after_cycle.status, after_cycle.headers['ETag'] != etag
+
+    assert run(api, scenario) == (200, 304, 200, 200, True)
+
+def test_windows_are_streamed_and_cached_under_the_cap(tmp_path, monkeypatch):
+    api, _ = make_api(tmp_path, monkeypatch)
+
+    async def scenario(client):
+        streamed = await client.get('/api/windows/BTCUSDT?interval=1h&exchange=binance')
+        body = await streamed.json()  # The body is cached once the whole of it has been written
+        cached = await client.get('/api/windows/BTCUSDT?interval=1h&exchange=binance')
+        invalid = await client.get('/api/windows/BTCUSDT?interval=soon')
+        return streamed, body, cached, await cached.read(), invalid.status
+
+    streamed, body, cached, cached_body, invalid = run(api, scenario)
+    assert streamed.headers.get('Transfer-Encoding') == 'chunked'
+    assert body['symbol'] == "BTCUSDT" and body['interval'] == 3600
+    assert [(w['count'], w['open'], w['close']) for w in body['windows']] == [(60, 1000.0, 1059.0), (60, 1060.0, 1119.0)]
+    assert cached.headers.get('Transfer-Encoding') is None and b'"windows": [' in cached_body
+    assert invalid == 400
+
+def test_large_bodies_skip_the_cache(tmp_path, monkeypatch):
+    api, _ = make_api(tmp_path, monkeypatch)
+    monkeypatch.setattr('query_api.QUERY_CACHE_MAX_BYTES', 100)
+    monkeypatch.setattr('query_api.QUERY_STREAM_CHUNK', 50)
+
+    async def scenario(client):
+        windows = []
+        for _ in range(2):
+            windows.append(await client.get('/api/windows/BTCUSDT?interval=15m'))
+            await windows[-1].read()
+        history = await client.get('/api/history/BTCUSDT')
+        return ([response.headers.get('Transfer-Encoding') for response in windows],
+                history.headers.get('Transfer-Encoding'), await history.json())
+
+    encodings, history_encoding, history = run(api, scenario)
+    assert encodings == ['chunked', 'chunked'] and api.cache == {}
+    # Over QUERY_STREAM_CHUNK samples, the in-memory history is streamed too
+    assert history_encoding == 'chunked' and len(history) == 120
+    assert history[0]['open_interest_value'] == 1000.0 and history[-1]['timestamp'].startswith("2024-01-01T01:59")
@@ -0,0 +1,49 @@
+"""Alerts released early by the cross-section bound must never belong to a market-wide move"""
+
+import os
+import random
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import ExchangeOpenInterestData, OpenInterestData
+from regime import MarketRegimeDetector
+
+def snapshot(values):
+    now = datetime.now()
+    return {exchange: ExchangeOpenInterestData(exchange, [OpenInterestData(symbol, exchange, value, value, now)
+                                                          for symbol, value in series.items()], now, True)
+            for exchange, series in values.items()}
+
+def test_bound_only_releases_cycles_the_detector_calls_normal():
+    rng = random.Random(7)
+    released = regimes = 0
+    for _ in range(300):
+        symbols = [f"S{i}USDT" for i in range(rng.randint(5, 40))]
+        before = {exchange: {symbol: 1000.0 for symbol in symbols} for exchange in ('binance', 'bybit')}
+        drift, share = rng.uniform(-8, 8), rng.random()
+        after = {exchange: {symbol: 1000.0 * (1 + (drift if rng.random() < share else rng.gauss(0, 1)) / 100)
+                            for symbol in symbols} for exchange in before}
+        detector = MarketRegimeDetector()
+        detector.observe(snapshot(before))
+        bound = detector.bound()
+        records = [record for batch in snapshot(after).values() for record in batch.data]
+        rng.shuffle(records)
+        ruled_out = not bound.possible() or any(not bound.add(records[i:i + 8]) for i in range(0, len(records), 8))
+        regime = detector.observe(snapshot(after))
+        if regime is not None and regime.regime != "normal":
+            regimes += 1
+            assert not ruled_out
+        released += ruled_out
+    assert released and regimes
+
+def test_adaptive_ticks_are_classified_as_one_cross_section():
+    symbols = [f"S{i}USDT" for i in range(30)]
+    detector = MarketRegimeDetector()
+    detector.observe(snapshot({'binance': {symbol: 1000.0 for symbol in symbols}}))
+    # Every series drops 10% but each tick samples only a few of them
+    for i in range(0, 25, 5):
+        detector.merge(snapshot({'binance': {symbol: 900.0 for symbol in symbols[i:i + 5]}}))
+    regime = detector.observe(snapshot({'binance': {symbol: 900.0 for symbol in symbols[25:]}}))
+    assert regime.regime == "deleveraging" and regime.series == 30
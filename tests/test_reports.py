@@ -0,0 +1,66 @@
+"""Period reports fold each stored series into one row and score the period's alerts against the later OI"""
+
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import OpenInterestData
+from reports import generate_report, load_alerts
+from retention import RetentionManager
+
+PERIOD = 4 * 3600
+START = (time.time() - 86400) // 3600 * 3600  # Inside the raw tier's retention
+END = START + PERIOD
+
+def oi_value(t: float) -> float:
+    """1000 over the baseline, 900 over the period's first half, then 1100"""
+    if t < START:
+        return 1000.0
+    return 900.0 if t < START + PERIOD / 2 else 1100.0
+
+def store_history(root: str):
+    manager = RetentionManager(root)
+    for symbol in ("BTCUSDT", "ETHUSDT"):
+        manager.append(OpenInterestData(symbol, "binance", oi_value(t), oi_value(t), datetime.fromtimestamp(t))
+                       for t in range(int(START - 6 * 3600), int(END), 300))
+
+def write_alerts(path: str):
+    alerts = [
+        (START + 600, 1000.0, -10.0),  # Still below 1000 an hour later: a hit
+        (START + 3 * 3600, 900.0, -8.0),  # Back above 900 by the period's end: a miss
+        (START - 600, 1000.0, 5.0),  # Before the period
+    ]
+    with open(path, 'w') as f:
+        for timestamp, previous, change in alerts:
+            f.write(json.dumps({'timestamp': timestamp, 'exchange': 'binance', 'symbol': 'BTCUSDT',
+                                'previous_oi': previous, 'percentage_change': change}) + "\n")
+        f.write(json.dumps({'timestamp': START + 60, 'exchange': 'binance', 'symbol': 'BTCUSDT',
+                            'previous_oi': 1000.0, 'percentage_change': None, 'metric': 'oi_volume_ratio'}) + "\n")
+        f.write('{"timestamp": ')  # Cut short by a crash
+
+def test_load_alerts_keeps_the_period_and_oi_moves(tmp_path):
+    path = str(tmp_path / "alerts.jsonl")
+    write_alerts(path)
+    alerts = load_alerts(path, START, END)
+    assert alerts == {('binance', 'BTCUSDT'): [(START + 600, 1000.0, -10.0), (START + 3 * 3600, 900.0, -8.0)]}
+
+def test_report_rows(tmp_path):
+    root = str(tmp_path / "data.history")
+    store_history(root)
+    alert_log = str(tmp_path / "alerts.jsonl")
+    write_alerts(alert_log)
+
+    rows = {row['symbol']: row for row in generate_report(root, alert_log, START, END, workers=2)}
+    assert set(rows) == {"BTCUSDT", "ETHUSDT"}
+    btc = rows["BTCUSDT"]
+    assert btc['samples'] == PERIOD // 300
+    assert (btc['first'], btc['last'], btc['low'], btc['high']) == (900.0, 1100.0, 900.0, 1100.0)
+    assert abs(btc['change_pct'] - 200 / 9) < 1e-9
+    assert btc['baseline'] == 1000.0 and btc['above_baseline_pct'] == 50.0
+    assert btc['biggest_moves'][0][0] == btc['change_pct'] and len(btc['biggest_moves']) == 3
+    assert (btc['alerts'], btc['alerts_scored'], btc['alert_hits'], btc['hit_rate_pct']) == (2, 2, 1, 50.0)
+    assert rows["ETHUSDT"]['alerts'] == 0 and rows["ETHUSDT"]['hit_rate_pct'] is None
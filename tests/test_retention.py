@@ -0,0 +1,71 @@
+"""Restarts and shard rebalancing must leave the retention tiers as an uninterrupted run would"""
+
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import OpenInterestData
+from retention import RetentionManager
+from sharded_pool import rebalance_partitions, shard_history_dir
+
+HORIZON = 6 * 3600
+
+def samples(count: int, cadence: int = 900, symbol: str = 'BTCUSDT'):
+    start = (time.time() - 3 * 86400) // 3600 * 3600 + 7 * 60  # Off the window boundaries
+    for i in range(count):
+        value = 1000.0 + 37 * (i % 11) + i
+        yield OpenInterestData(symbol, 'binance', value, value, datetime.fromtimestamp(start + i * cadence),
+                               1.0, 0.0, 0.0)
+
+def run(root: str, restart_every: int = 0):
+    manager = None
+    for i, record in enumerate(samples(100)):
+        if manager is None or (restart_every and i % restart_every == 0):
+            manager = RetentionManager(root, baseline_horizon=HORIZON)
+        manager.append([record])
+    tiers = {tier.name: [tuple(row) for rows in tier.store.scan('binance', 'BTCUSDT') for row in rows.tolist()]
+             for tier in manager.tiers[1:]}
+    state = manager.state('binance', 'BTCUSDT')
+    return tiers, state.windows, list(state.baseline), manager.baseline('BTCUSDT')
+
+def test_restart_matches_uninterrupted_run(tmp_path):
+    uninterrupted = run(str(tmp_path / 'once'))
+    restarted = run(str(tmp_path / 'restarted'), restart_every=6)
+    tiers, windows, baseline, average = restarted
+    assert tiers == uninterrupted[0]
+    assert windows == uninterrupted[1]
+    assert baseline == uninterrupted[2]
+    assert average == uninterrupted[3]
+    assert len(tiers['1h']) == 24 and all(row[-1] == 4 for row in tiers['1h'])
+
+def test_rebalance_moves_history_to_the_new_owner(tmp_path):
+    shard_dir = str(tmp_path)
+    records = list(samples(100))
+    RetentionManager(shard_history_dir(shard_dir, 0), baseline_horizon=HORIZON).append(
+        records[:60] + list(samples(10, symbol='ETHUSDT')))
+    # A move cut short left part of the series with the new owner already
+    RetentionManager(shard_history_dir(shard_dir, 1), baseline_horizon=HORIZON).append(records[:30])
+    assert rebalance_partitions(shard_dir, {0: ['ETHUSDT'], 1: ['BTCUSDT']})
+
+    assert RetentionManager(shard_history_dir(shard_dir, 0)).symbols() == ['ETHUSDT']
+    moved = RetentionManager(shard_history_dir(shard_dir, 1), baseline_horizon=HORIZON)
+    moved.append(records[60:])
+    uninterrupted = RetentionManager(str(tmp_path / 'once'), baseline_horizon=HORIZON)
+    uninterrupted.append(records)
+    for tier, expected in zip(moved.tiers, uninterrupted.tiers):
+        assert ([row for rows in tier.store.scan('binance', 'BTCUSDT') for row in rows.tolist()]
+                == [row for rows in expected.store.scan('binance', 'BTCUSDT') for row in rows.tolist()])
+    assert moved.baseline('BTCUSDT') == uninterrupted.baseline('BTCUSDT')
+
+def test_replay_reads_the_full_history_from_the_store(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    from replay import load_history_source
+    data_file = tmp_path / 'open_interest_data.json'
+    data_file.write_text('{}')  # The JSON only keeps the newest samples; here none at all
+    RetentionManager(str(tmp_path / 'open_interest_data.history')).append(list(samples(100)))
+    history = load_history_source(str(data_file))
+    assert [record.open_interest_value for record in history['BTCUSDT']] == \
+        [record.open_interest_value for record in samples(100)]
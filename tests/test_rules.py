@@ -0,0 +1,48 @@
+"""Declared rules: per-symbol overrides, and alerts that report their metric in its own units"""
+
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import OpenInterestData
+
+RULES = {
+    "symbols": ["BTCUSDT", "ETHUSDT"],
+    "rules": [
+        {"name": "oi_change", "metric": "pct_change", "window": 1, "comparator": "abs_gte", "threshold": 5},
+        {"name": "crowded", "metric": "oi_volume_ratio", "comparator": "gte", "threshold": 0.1},
+    ],
+    "overrides": {"ETHUSDT": {"oi_change": {"threshold": 50}}, "BTCUSDT": {"crowded": {"enabled": False}}},
+}
+
+def monitor_with_rules(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    from monitor import OpenInterestMonitor
+    config = tmp_path / "rules.json"
+    config.write_text(json.dumps(RULES))
+    return OpenInterestMonitor(str(config), load_history=False)
+
+def cycle(monitor, values, at):
+    records = [OpenInterestData(symbol, "binance", value, value, at, 1.0, value * 5, 0.0001)
+               for symbol, value in values.items()]
+    return monitor.detect_samples(records, 1)[0]
+
+def test_overrides_apply_per_symbol(tmp_path, monkeypatch):
+    monitor = monitor_with_rules(tmp_path, monkeypatch)
+    start = datetime(2024, 1, 1)
+    alerts = cycle(monitor, {"BTCUSDT": 1000.0, "ETHUSDT": 1000.0}, start)
+    alerts += cycle(monitor, {"BTCUSDT": 1100.0, "ETHUSDT": 1100.0}, start + timedelta(minutes=15))
+    # +10% passes the 5% rule for BTC but not ETH's 50% override; BTC's crowded rule is disabled,
+    # ETH's fires once and then waits out its cooldown
+    assert sorted((alert.symbol, alert.rule) for alert in alerts) == [("BTCUSDT", "oi_change"), ("ETHUSDT", "crowded")]
+
+def test_metric_alerts_are_not_percentage_changes(tmp_path, monkeypatch):
+    monitor = monitor_with_rules(tmp_path, monkeypatch)
+    alerts = cycle(monitor, {"ETHUSDT": 1000.0}, datetime(2024, 1, 1))
+    crowded = next(alert for alert in alerts if alert.rule == "crowded")
+    assert crowded.percentage_change is None and crowded.alert_type == "metric"
+    assert crowded.metric == "oi_volume_ratio" and abs(crowded.metric_value - 0.2) < 1e-9
+    assert crowded.severity == "low"  # The % severity cutoffs do not apply to a ratio
@@ -0,0 +1,79 @@
+"""Scanner leaderboards rank the window moves of every series, and large movers are promoted and expire"""
+
+import json
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import ExchangeOpenInterestData, OpenInterestData
+
+START = 1_700_000_000.0
+
+def scan(values, volume=None):
+    now = datetime.now()
+    data = [OpenInterestData(symbol, "binance", value, value, now, 1.0, (volume or {}).get(symbol, 0.0))
+            for symbol, value in values.items()]
+    return {"binance": ExchangeOpenInterestData("binance", data, now, True)}
+
+def make_scanner(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    from scanner import MoverScanner
+    return MoverScanner(aggregator=object(), windows={"15m": 900}, interval=300, min_oi_value=1_000_000,
+                        state_file=None, promoted_file=str(tmp_path / "promoted.json"))
+
+def test_leaderboards_rank_window_moves(tmp_path, monkeypatch):
+    scanner = make_scanner(tmp_path, monkeypatch)
+    before = {"AUSDT": 2e6, "BUSDT": 2e6, "CUSDT": 2e6, "DUSDT": 2e6, "TINYUSDT": 1e5}
+    scanner.ingest(scan(before), START)
+    scanner.ingest(scan({**before, "AUSDT": 2.1e6}), START + 300)  # Inside the window: no change yet
+    assert scanner.boards["gain_15m"].top(3) == []
+    after = {"AUSDT": 2.2e6, "BUSDT": 3e6, "CUSDT": 1.5e6, "DUSDT": 2e6, "TINYUSDT": 1e6 - 1}
+    for t in (600, 900):
+        scanner.ingest(scan(after, volume={"BUSDT": 1.5e6}), START + t)
+
+    gains = scanner.boards["gain_15m"].top(3)
+    assert [(symbol, round(change, 6)) for (symbol, _), change in gains] == [
+        ("BUSDT", 50.0), ("AUSDT", 10.0), ("DUSDT", 0.0)]  # TINYUSDT is under the OI floor
+    losses = scanner.boards["loss_15m"].top(1)
+    assert losses[0][0][0] == "CUSDT" and round(losses[0][1], 6) == -25.0
+    assert scanner.boards["oi_to_volume"].top(5) == [(("BUSDT", "binance"), 2.0)]
+
+def test_superseded_scores_are_never_returned(tmp_path, monkeypatch):
+    make_scanner(tmp_path, monkeypatch)
+    from scanner import Leaderboard
+    board = Leaderboard("gain", "Gain", "pct")
+    for value in range(100):
+        board.update(("AUSDT", "binance"), float(value))
+        board.update(("BUSDT", "binance"), 50.0)
+    board.update(("CUSDT", "binance"), 99.0)
+    board.discard(("CUSDT", "binance"))
+    assert board.top(5) == [(("AUSDT", "binance"), 99.0), (("BUSDT", "binance"), 50.0)]
+    assert len(board.heap) <= 2 * len(board) + 64  # Stale entries are compacted away
+
+def test_delisted_series_leave_the_boards(tmp_path, monkeypatch):
+    scanner = make_scanner(tmp_path, monkeypatch)
+    scanner.ingest(scan({"AUSDT": 2e6, "BUSDT": 2e6}), START)
+    scanner.ingest(scan({"AUSDT": 3e6, "BUSDT": 3e6}), START + 900)
+    scanner.ingest(scan({"AUSDT": 3e6}), START + 1200)
+    assert [key for key, _ in scanner.boards["gain_15m"].top(10)] == [("AUSDT", "binance")]
+    assert ("BUSDT", "binance") not in scanner.samples
+
+def test_large_movers_are_promoted_until_the_ttl(tmp_path, monkeypatch):
+    from config import SCANNER_PROMOTION_TTL
+    scanner = make_scanner(tmp_path, monkeypatch)
+    scanner.ingest(scan({"AUSDT": 2e6, "BUSDT": 2e6}), START)
+    scanner.ingest(scan({"AUSDT": 3e6, "BUSDT": 2.1e6}), START + 900)  # +50% and +5%
+    assert scanner.update_promotions(START + 900) == ["AUSDT"]
+    promoted = json.loads((tmp_path / "promoted.json").read_text())
+    assert promoted["symbols"] == ["AUSDT"] and "gain_15m +50.0%" in promoted["promoted"]["AUSDT"]["reason"]
+    # Still leading a scan later: kept and not announced again
+    scanner.ingest(scan({"AUSDT": 3e6, "BUSDT": 2.1e6}), START + 1200)
+    assert scanner.update_promotions(START + 1200) == []
+    assert scanner.promoted["AUSDT"]["since"] == START + 900
+
+    scanner.ingest(scan({"AUSDT": 3e6, "BUSDT": 2.1e6}), START + 1200 + SCANNER_PROMOTION_TTL)
+    scanner.update_promotions(START + 1201 + SCANNER_PROMOTION_TTL)
+    assert scanner.promoted == {}
+    assert json.loads((tmp_path / "promoted.json").read_text())["symbols"] == []
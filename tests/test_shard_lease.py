@@ -0,0 +1,77 @@
+"""Lease renewals must not wait on shard flushes, and a node that lost a lease must stop writing"""
+
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shard_lease import LeaseNode, LeaseStore, SQLiteLeaseStore
+
+class SlowPersister:
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.flushed = self.discarded = False
+
+    def flush(self, timeout=None):
+        time.sleep(self.delay)
+        self.flushed = True
+
+    def discard(self):
+        self.discarded = True
+
+class FakeMonitor:
+    def __init__(self, delay: float = 0.0):
+        self.persister = SlowPersister(delay)
+
+def own(node: LeaseNode, shard_id: int, monitor: FakeMonitor) -> int:
+    token = node.store.acquire(shard_id, node.node_id, node.lease_ttl)
+    node.tokens[shard_id] = token
+    node.valid_until[shard_id] = time.time() + node.lease_ttl
+    node.owned[shard_id] = monitor
+    return token
+
+def test_partial_store_fails_at_construction():
+    class RenewOnly(LeaseStore):
+        def renew(self, shard_id, node_id, ttl):
+            return True
+
+    with pytest.raises(TypeError):
+        RenewOnly()
+
+def test_slow_flush_does_not_hold_up_renewals(tmp_path):
+    async def scenario():
+        node = LeaseNode("a", SQLiteLeaseStore(str(tmp_path / "leases.db")), ["BTCUSDT"], 1, shard_dir=str(tmp_path))
+        monitor = FakeMonitor(delay=1.0)
+        own(node, 0, monitor)
+        release = node.drop_shard(0)
+        started = time.monotonic()
+        await node.heartbeat_once()
+        assert time.monotonic() - started < 0.5
+        # Still ours until the flush finishes, so no other node can load half-written files
+        assert node.store.list_leases()[0]['owner'] == "a"
+        await release
+        assert monitor.persister.flushed
+        assert node.store.list_leases()[0]['owner'] is None
+
+    asyncio.run(scenario())
+
+def test_lost_lease_fences_writes_and_discards_pending_state(tmp_path):
+    async def scenario():
+        path = str(tmp_path / "leases.db")
+        node = LeaseNode("a", SQLiteLeaseStore(path), ["BTCUSDT"], 1, shard_dir=str(tmp_path), lease_ttl=0.2)
+        monitor = FakeMonitor()
+        token = own(node, 0, monitor)
+        assert node.holds(0, token)
+        await asyncio.sleep(0.3)
+        assert not node.holds(0, token)  # Expired: writes stop before anyone else can own the shard
+        other = SQLiteLeaseStore(path)
+        assert other.acquire(0, "b", 10.0) == token + 1
+        await node.heartbeat_once()
+        assert 0 not in node.owned and monitor.persister.discarded
+        assert other.list_leases()[0]['owner'] == "b"
+
+    asyncio.run(scenario())
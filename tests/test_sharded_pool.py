@@ -0,0 +1,66 @@
+"""The sharded coordinator classifies the market regime once across every shard's series"""
+
+import asyncio
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import ExchangeOpenInterestData, OpenInterestData
+
+SYMBOLS = [f"S{i:02d}USDT" for i in range(30)]
+
+class MarketDropAggregator:
+    """Every series drops 10% on the second cycle except S00USDT, which rises 40%"""
+
+    def __init__(self, token_list):
+        self.token_list = list(token_list)
+        self.cycles = 0
+
+    def get_all_exchange_data(self):
+        self.cycles += 1
+        now = datetime.now()
+        data = []
+        for symbol in self.token_list:
+            value = 1000.0
+            if self.cycles > 1:
+                value = 1400.0 if symbol == "S00USDT" else 900.0
+            data.append(OpenInterestData(symbol, "binance", value, value, now))
+        return {"binance": ExchangeOpenInterestData("binance", data, now, True)}
+
+def test_regime_is_classified_across_shards(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    from monitor import OpenInterestMonitor
+    from sharded_pool import ShardedMonitorPool
+
+    pool = ShardedMonitorPool(SYMBOLS, 3, shard_dir=str(tmp_path / "shards"), seed_file=None,
+                              aggregator_factory=MarketDropAggregator)
+    # Every shard holds fewer than REGIME_MIN_SERIES series, so none could classify on its own
+    assert all(len(symbols) < 20 for symbols in pool.assignment.values())
+    pool.notifier = OpenInterestMonitor(token_list=SYMBOLS, load_history=False)
+    sent = {'regimes': [], 'alerts': []}
+
+    async def send_regime(regime, **kwargs):
+        sent['regimes'].append(regime)
+
+    async def send_alerts(alerts, **kwargs):
+        sent['alerts'].extend(alerts)
+
+    async def ignore(*args, **kwargs):
+        pass
+
+    monkeypatch.setattr(pool.notifier, 'send_market_regime_alert', send_regime)
+    monkeypatch.setattr(pool.notifier, 'send_alerts', send_alerts)
+    monkeypatch.setattr(pool.notifier, 'send_summary', ignore)
+    pool.start()
+    try:
+        asyncio.run(pool.run_cycle())
+        result = asyncio.run(pool.run_cycle())
+    finally:
+        pool.stop()
+
+    assert result.regime is not None and result.regime.regime == "deleveraging"
+    assert result.regime.series == len(SYMBOLS)
+    assert [regime.regime for regime in sent['regimes']] == ["deleveraging"]
+    assert {alert.symbol for alert in sent['alerts']} == {"S00USDT"}
@@ -0,0 +1,54 @@
+"""Snapshot readers get the last complete publication: never a half-written one, and across file growth"""
+
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import SeriesSnapshot
+from snapshot import SEQUENCE, SEQUENCE_OFFSET, SnapshotReader, SnapshotWriter
+
+def series(symbol: str, value: float) -> SeriesSnapshot:
+    return SeriesSnapshot(symbol, "binance", datetime(2024, 1, 1), value, value, None, None, None, None, 1.5, None,
+                          None, 3, quadrant="long_buildup")
+
+def test_round_trip_keeps_missing_values(tmp_path):
+    path = str(tmp_path / "data.snap")
+    writer = SnapshotWriter(path)
+    writer.publish([series("BTCUSDT", 1000.0), series("ETHUSDT", 500.0)])
+    snapshot = SnapshotReader(path).read()
+    assert snapshot.cycle == 1
+    assert [s.symbol for s in snapshot.series] == ["BTCUSDT", "ETHUSDT"]
+    assert snapshot.series[0] == series("BTCUSDT", 1000.0)  # None survives as NaN and back
+
+def test_reader_waits_out_an_update_in_progress(tmp_path):
+    path = str(tmp_path / "data.snap")
+    writer = SnapshotWriter(path)
+    writer.publish([series("BTCUSDT", 1000.0)])
+    reader = SnapshotReader(path)
+    reader.read()
+    # Freeze the writer mid-update: odd sequence, body already overwritten
+    SEQUENCE.pack_into(writer.mm, SEQUENCE_OFFSET, writer.sequence + 1)
+
+    def finish():
+        time.sleep(0.05)
+        writer.publish([series("BTCUSDT", 2000.0)])
+
+    thread = threading.Thread(target=finish)
+    thread.start()
+    snapshot = reader.read()
+    thread.join()
+    assert snapshot.cycle == 2 and snapshot.series[0].open_interest_value == 2000.0
+
+def test_reader_remaps_after_the_writer_grows_the_file(tmp_path):
+    path = str(tmp_path / "data.snap")
+    writer = SnapshotWriter(path, capacity=2)
+    writer.publish([series("BTCUSDT", 1000.0)])
+    reader = SnapshotReader(path)
+    assert len(reader.read().series) == 1
+    writer.publish([series(f"S{i}USDT", float(i)) for i in range(5)])
+    assert writer.capacity == 8
+    assert [s.symbol for s in reader.read().series] == [f"S{i}USDT" for i in range(5)]
@@ -0,0 +1,43 @@
+"""A worker that takes a while to load its history must not be restarted as wedged"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from supervisor import SupervisedWorker, WorkerSupervisor
+
+def test_slow_start_is_not_killed(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    import enhanced_scheduler
+
+    def slow_get_monitor(self):
+        if self.monitor is None:
+            time.sleep(1.5)  # Loading a large history blocks the loop
+            self.monitor = object()
+        return self.monitor
+
+    async def idle(self):
+        await asyncio.sleep(0.3)
+        self.get_monitor()  # The first scheduled cycle runs with the monitor
+        await asyncio.sleep(30)
+
+    # Workers are forked, so the patched scheduler is what they run
+    monkeypatch.setattr(enhanced_scheduler.EnhancedScheduler, 'get_monitor', slow_get_monitor)
+    monkeypatch.setattr(enhanced_scheduler.EnhancedScheduler, 'run_async', idle)
+    monkeypatch.setattr(enhanced_scheduler.EnhancedScheduler, 'send_startup_message', lambda self: None)
+
+    worker = SupervisedWorker("slow", "enhanced", None)
+    watchdog = WorkerSupervisor([worker], heartbeat_interval=0.1, heartbeat_timeout=0.5, startup_grace=5.0,
+                                status_file=str(tmp_path / "status.json"))
+    try:
+        deadline = time.time() + 3.0
+        while time.time() < deadline:
+            watchdog.check_worker(worker, time.time())
+            time.sleep(0.05)
+        assert worker.restarts == 0
+        assert worker.last_heartbeat is not None and time.time() - worker.last_heartbeat < 0.5
+    finally:
+        watchdog.stop_worker(worker)
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Drift-free asyncio scheduler aligned to wall-clock window boundaries
+Fires each job at exact multiples of its interval in local time (e.g. :00, :15, :30, :45
+for a 15-minute interval) plus an optional offset, and never overlaps runs of the same job
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from metrics import SCHEDULER_LATENESS_SECONDS, SCHEDULER_SKIPPED_TOTAL
+
+class ScheduledJob:
+    """A periodic job and its lateness statistics"""
+
+    def __init__(self, name: str, func: Callable[[], Awaitable], interval: float, offset: float = 0.0,
+                 run_immediately: bool = False):
+        if interval <= 0:
+            raise ValueError(f"Job interval must be positive, got {interval}")
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.offset = offset % interval
+        self.run_immediately = run_immediately
+        self.task: Optional[asyncio.Task] = None  # Currently running invocation
+
+        # Metrics
+        self.runs = 0
+        self.skipped = 0  # Boundaries skipped because the previous run was still going
+        self.failures = 0
+        self.last_fire_time: Optional[float] = None
+        self.next_fire_time: Optional[float] = None
+        self.last_lateness = 0.0
+        self.max_lateness = 0.0
+        self.total_lateness = 0.0
+        self.last_duration = 0.0
+
+    def get_metrics(self) -> Dict:
+        """Return a snapshot of this job's scheduling metrics"""
+        return {
+            'interval': self.interval,
+            'offset': self.offset,
+            'runs': self.runs,
+            'skipped': self.skipped,
+            'failures': self.failures,
+            'running': self.task is not None and not self.task.done(),
+            'last_fire_time': self.last_fire_time,
+            'next_fire_time': self.next_fire_time,
+            'last_lateness': self.last_lateness,
+            'max_lateness': self.max_lateness,
+            'avg_lateness': self.total_lateness / self.runs if self.runs else 0.0,
+            'last_duration': self.last_duration,
+        }
+
+class WallClockScheduler:
+    """Run async jobs at wall-clock aligned boundaries without cumulative drift"""
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self.clock = clock
+        self.jobs: Dict[str, ScheduledJob] = {}
+
+    def add_job(self, name: str, func: Callable[[], Awaitable], interval: float, offset: float = 0.0,
+                run_immediately: bool = False) -> ScheduledJob:
+        """Register a job firing every `interval` seconds at local boundaries plus `offset` seconds"""
+        if name in self.jobs:
+            raise ValueError(f"Job already registered: {name}")
+        job = ScheduledJob(name, func, interval, offset, run_immediately)
+        self.jobs[name] = job
+        return job
+
+    def next_boundary(self, job: ScheduledJob, now: float) -> float:
+        """Return the first boundary for `job` strictly after `now` (epoch seconds)"""
+        # Align in local time so daily/hourly jobs land on local midnight/hours
+        utc_offset = datetime.fromtimestamp(now).astimezone().utcoffset().total_seconds()
+        local_now = now + utc_offset - job.offset
+        boundary = (local_now // job.interval + 1) * job.interval
+        return boundary + job.offset - utc_offset
+
+    async def _sleep_until(self, target: float):
+        """Sleep until the wall clock reaches `target`, re-checking to absorb timer drift"""
+        while True:
+            remaining = target - self.clock()
+            if remaining <= 0:
+                return
+            # Cap each sleep so wall-clock adjustments are picked up promptly
+            await asyncio.sleep(min(remaining, 30.0))
+
+    async def _invoke(self, job: ScheduledJob, scheduled_for: float):
+        """Run one invocation of a job and record lateness and duration"""
+        started = self.clock()
+        lateness = max(0.0, started - scheduled_for)
+        job.runs += 1
+        job.last_fire_time = started
+        job.last_lateness = lateness
+        job.max_lateness = max(job.max_lateness, lateness)
+        job.total_lateness += lateness
+        SCHEDULER_LATENESS_SECONDS.observe(lateness, job=job.name)
+        try:
+            await job.func()
+        except Exception as e:
+            job.failures += 1
+            logging.error(f"Scheduled job {job.name} failed: {e}")
+        finally:
+            job.last_duration = self.clock() - started
+            logging.info(f"Job {job.name} finished in {job.last_duration:.2f}s (lateness {lateness * 1000:.0f} ms)")
+
+    async def _run_job(self, job: ScheduledJob):
+        """Fire a job at each boundary until stopped"""
+        if job.run_immediately:
+            job.task = asyncio.create_task(self._invoke(job, self.clock()))
+
+        while True:
+            target = self.next_boundary(job, self.clock())
+            job.next_fire_time = target
+            logging.info(f"Next {job.name} run at {datetime.fromtimestamp(target).strftime('%Y-%m-%d %H:%M:%S')}")
+            await self._sleep_until(target)
+
+            if job.task is not None and not job.task.done():
+                job.skipped += 1
+                SCHEDULER_SKIPPED_TOTAL.inc(job=job.name)
+                logging.warning(f"Skipping {job.name} boundary: previous run still in progress")
+                continue
+            job.task = asyncio.create_task(self._invoke(job, target))
+
+    async def run(self):
+        """Run all registered jobs until cancelled"""
+        if not self.jobs:
+            raise ValueError("No jobs registered")
+        runners: List[asyncio.Task] = [asyncio.create_task(self._run_job(job)) for job in self.jobs.values()]
+        try:
+            await asyncio.gather(*runners)
+        finally:
+            for runner in runners:
+                runner.cancel()
+            for job in self.jobs.values():
+                if job.task is not None and not job.task.done():
+                    job.task.cancel()
+
+    def get_metrics(self) -> Dict[str, Dict]:
+        """Return lateness and run metrics for every job"""
+        return {name: job.get_metrics() for name, job in self.jobs.items()}